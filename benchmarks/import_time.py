@@ -0,0 +1,124 @@
+"""
+Import-time benchmark for the application's entry-point modules.
+
+Each module is imported in a fresh interpreter several times and the median
+wall time is compared with a stored baseline. The benchmark also fails if a
+module pulls in a heavy dependency that should only load on demand (the
+provider SDKs and LangGraph).
+
+Usage:
+    python benchmarks/import_time.py                    # compare with baseline
+    python benchmarks/import_time.py --update-baseline  # record new baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "import_time.json")
+
+# Modules that short-lived commands import before doing any work
+MODULES = [
+    "models.research_models",
+    "agents.base_agent",
+    "graph.workflow",
+    "reporting.renderers",
+    "main"
+]
+
+# Heavy packages that must only be imported when actually used
+DEFERRED_MODULES = ["langchain_openai", "langchain_anthropic", "langgraph"]
+
+# Allowed slowdown relative to the baseline before the benchmark fails
+DEFAULT_THRESHOLD = 0.5
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+deferred = sorted({{name.split(".")[0] for name in sys.modules}} & set({deferred!r}))
+print(json.dumps({{"seconds": elapsed, "deferred_loaded": deferred}}))
+"""
+
+
+def measure(module: str, repeats: int = 5) -> Dict[str, object]:
+    """Median import time of a module in fresh interpreters, plus any deferred modules it loaded."""
+    timings: List[float] = []
+    deferred_loaded: List[str] = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(src=SRC_DIR, module=module, deferred=DEFERRED_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        timings.append(sample["seconds"])
+        deferred_loaded = sample["deferred_loaded"]
+    return {"seconds": statistics.median(timings), "deferred_loaded": deferred_loaded}
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, float]:
+    """Stored median import time per module, or an empty mapping."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle).get("modules", {})
+
+
+def save_baseline(results: Dict[str, Dict[str, object]], path: str = BASELINE_PATH):
+    """Record the measured medians as the new baseline."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({
+            "python": sys.version.split()[0],
+            "modules": {module: round(result["seconds"], 4) for module, result in results.items()}
+        }, handle, indent=2)
+        handle.write("\n")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of entry-point modules")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.5 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the measurements as the new baseline")
+    args = parser.parse_args(argv)
+    
+    baseline = load_baseline()
+    results = {module: measure(module, args.repeats) for module in MODULES}
+    failures = []
+    
+    print(f"{'Module':<28} {'Median (ms)':>12} {'Baseline (ms)':>14}  Deferred modules loaded")
+    for module, result in results.items():
+        seconds = result["seconds"]
+        expected = baseline.get(module)
+        print(
+            f"{module:<28} {seconds * 1000:>12.1f} "
+            f"{(expected * 1000 if expected else float('nan')):>14.1f}  {', '.join(result['deferred_loaded']) or '-'}"
+        )
+        if result["deferred_loaded"]:
+            failures.append(f"{module} imports {', '.join(result['deferred_loaded'])} eagerly")
+        if expected and not args.update_baseline and seconds > expected * (1 + args.threshold):
+            failures.append(f"{module} import took {seconds * 1000:.0f}ms (baseline {expected * 1000:.0f}ms)")
+    
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+    
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Simulated LLM backend for benchmarks.
+
+Answers each agent's prompt with a valid canned JSON payload after a
+controlled latency, and can inject transient errors so the retry path is
+exercised. No network access or API keys are needed.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Canned answers keyed by a phrase from each agent's system prompt
+PAYLOADS: Dict[str, Dict[str, Any]] = {
+    "Market Research Analyst": {
+        "location": "", "competition_level": "Medium", "target_customers": ["Office workers", "Students"],
+        "peak_hours": ["11am-2pm", "5pm-8pm"], "seasonal_factors": ["Hot summers", "Festival season"],
+        "market_size_estimate": "250,000 potential customers", "competition_analysis": [],
+        "opportunities": ["Underserved business district"], "challenges": ["Limited parking"]
+    },
+    "Financial Advisor": {
+        "startup_costs": {"food_truck": 75000.0, "equipment": 25000.0, "permits": 3000.0},
+        "monthly_operating_costs": {"food_costs": 8000.0, "staff": 6000.0, "fuel": 800.0},
+        "revenue_projections": {"daily_revenue": 800.0, "monthly_revenue": 20000.0, "annual_revenue": 240000.0},
+        "break_even_timeline": "12-18 months", "profit_margins": {"gross_margin": 0.65, "net_margin": 0.15},
+        "cash_flow_analysis": "Positive after month 14", "funding_requirements": 103000.0,
+        "roi_projection": "15-20% ROI within 2-3 years"
+    },
+    "Operations Consultant": {
+        "permits_required": ["Business License", "Mobile Food Vendor Permit", "Health Permit"],
+        "permit_costs": {"business_license": 200.0, "vendor_permit": 600.0, "health_permit": 400.0},
+        "permit_timeline": "4-8 weeks", "health_regulations": ["Annual inspection"],
+        "location_constraints": ["No vending within 300ft of restaurants"],
+        "equipment_requirements": ["Fire suppression system"], "staffing_needs": {"minimum_staff": 2},
+        "daily_operations": ["Commissary prep"], "logistics_challenges": ["Water refills"]
+    },
+    "Business Consultant": {
+        "recommendation": "conditional", "confidence_level": "Medium", "key_strengths": ["Demand at lunch"],
+        "key_risks": ["Seasonality"], "success_factors": ["Rotating locations"], "next_steps": ["Apply for permits"],
+        "timeline_recommendation": "Launch in 6 months", "alternative_suggestions": []
+    }
+}
+
+
+class SimulatedResponse:
+    """Stands in for a chat model message, including token usage."""
+    
+    def __init__(self, content: str, input_tokens: int, output_tokens: int):
+        self.content = content
+        self.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+
+class SimulatedLLM:
+    """
+    Chat model with controlled latency and injected transient errors.
+    
+    Args:
+        latency: Seconds each call takes
+        jitter: Extra uniformly random seconds added to each call
+        error_rate: Fraction of calls that raise a retryable timeout
+        seed: Seed for jitter and error injection
+    """
+    
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def invoke(self, messages):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failing = self._random.random() < self.error_rate
+            if failing:
+                self.errors += 1
+        
+        if delay:
+            time.sleep(delay)
+        if failing:
+            raise TimeoutError("Simulated timeout from LLM backend")
+        
+        system_prompt = messages[0]["content"]
+        payload = next((payload for role, payload in PAYLOADS.items() if role in system_prompt), None)
+        if payload is None:
+            raise ValueError("Simulated LLM received an unknown prompt")
+        content = json.dumps(payload)
+        prompt_length = sum(len(message["content"]) for message in messages)
+        return SimulatedResponse(content, prompt_length // 4, len(content) // 4)
+
+
+def simulated_workflow(llm: SimulatedLLM, risk_scenarios: Optional[int] = None, **options: Any):
+    """
+    Workflow whose agents all call ``llm``.
+    
+    The agents are private to the returned workflow, so benchmarks do not
+    disturb the shared agent cache.
+    
+    Args:
+        llm: Simulated backend shared by every agent
+        risk_scenarios: Monte Carlo scenarios per synthesis (default: the agent's own)
+        **options: Passed to ``FoodTruckResearchWorkflow``
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+    from agents.business_consultant_agent import BusinessConsultantAgent
+    from agents.financial_advisor_agent import FinancialAdvisorAgent
+    from agents.market_research_agent import MarketResearchAgent
+    from agents.operations_consultant_agent import OperationsConsultantAgent
+    from graph.workflow import FoodTruckResearchWorkflow
+    
+    workflow = FoodTruckResearchWorkflow(**options)
+    workflow.market_agent = MarketResearchAgent(workflow.model_name, workflow.temperature)
+    workflow.financial_agent = FinancialAdvisorAgent(workflow.model_name, workflow.temperature)
+    workflow.operations_agent = OperationsConsultantAgent(workflow.model_name, workflow.temperature)
+    workflow.business_agent = BusinessConsultantAgent(
+        workflow.model_name, workflow.temperature, skip_decisive_synthesis=workflow.skip_decisive_synthesis
+    )
+    if risk_scenarios is not None:
+        workflow.business_agent.risk_scenarios = risk_scenarios
+    for agent in (workflow.market_agent, workflow.financial_agent, workflow.operations_agent, workflow.business_agent):
+        agent.llm = llm
+    return workflow
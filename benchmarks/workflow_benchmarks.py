@@ -0,0 +1,278 @@
+"""
+Performance benchmarks for the research workflow.
+
+Runs ``FoodTruckResearchWorkflow`` against a simulated LLM backend with
+controlled latency, so the numbers reflect this code rather than a provider:
+
+- single-run overhead, with and without the full risk simulation
+- batch throughput at concurrency 1, 8, 64 and 256
+- retry behavior under injected transient errors
+- memory per in-flight run
+- cold import time of the entry points
+
+Results are compared with the stored JSON baseline and the benchmark fails
+when any metric is worse than the baseline by more than the threshold.
+
+Usage:
+    python benchmarks/workflow_benchmarks.py                    # compare with baseline
+    python benchmarks/workflow_benchmarks.py --only throughput  # run one group
+    python benchmarks/workflow_benchmarks.py --update-baseline  # record new baseline
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from simulated_llm import SimulatedLLM, simulated_workflow
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "workflow.json")
+
+CONCURRENCY_LEVELS = [1, 8, 64, 256]
+
+# Simulated seconds per LLM call for the concurrency benchmarks
+CALL_LATENCY = 0.05
+
+# Scenarios per synthesis outside the single-run benchmark; the default
+# 200k makes the simulation, not the workflow, the throughput limit
+LIGHT_RISK_SCENARIOS = 2_000
+
+# Allowed change for the worse relative to the baseline before failing
+DEFAULT_THRESHOLD = 0.5
+
+LOWER, HIGHER = "lower", "higher"
+
+
+def _metric(value: float, unit: str, better: str) -> Dict[str, object]:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def _locations(count: int) -> List[str]:
+    return [f"Benchmark City {index}, TX" for index in range(count)]
+
+
+class _ScaledTime:
+    """Stands in for the ``time`` module with shortened sleeps."""
+    
+    def __init__(self, scale: float):
+        self.scale = scale
+    
+    def sleep(self, seconds: float):
+        time.sleep(seconds * self.scale)
+    
+    def __getattr__(self, name: str):
+        return getattr(time, name)
+
+
+@contextmanager
+def scaled_backoff(scale: float):
+    """Shorten retry backoff delays by ``scale`` while the block runs."""
+    from utils import retry_handler
+    
+    original = retry_handler.time
+    retry_handler.time = _ScaledTime(scale)
+    try:
+        yield
+    finally:
+        retry_handler.time = original
+
+
+def _run_batch(workflow, count: int, concurrency: int) -> Dict[str, object]:
+    """Research ``count`` locations through the batch runner and return its summary."""
+    from batch.runner import run_batch
+    
+    with tempfile.TemporaryDirectory() as directory:
+        return run_batch(_locations(count), workflow, os.path.join(directory, "results.jsonl"), concurrency=concurrency)
+
+
+def bench_single_run(quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """Median wall time of one run with an instant LLM, i.e. everything but the provider."""
+    runs = 3 if quick else 7
+    metrics = {}
+    for name, scenarios in (("single_run_ms", None), ("single_run_overhead_ms", LIGHT_RISK_SCENARIOS)):
+        workflow = simulated_workflow(SimulatedLLM(), risk_scenarios=scenarios)
+        workflow.run_research("Warm Up, TX")
+        timings = []
+        for location in _locations(runs):
+            start = time.perf_counter()
+            result = workflow.run_research(location)
+            timings.append(time.perf_counter() - start)
+            if result["status"] != "success":
+                raise RuntimeError(f"Benchmark run failed: {result.get('error_message')}")
+        metrics[name] = _metric(statistics.median(timings) * 1000, "ms", LOWER)
+    return metrics
+
+
+def bench_throughput(quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """Completed runs per second through the batch runner at each concurrency level."""
+    metrics = {}
+    for concurrency in CONCURRENCY_LEVELS:
+        count = max(concurrency, 8) if quick else max(concurrency * 2, 16)
+        workflow = simulated_workflow(SimulatedLLM(latency=CALL_LATENCY), risk_scenarios=LIGHT_RISK_SCENARIOS)
+        start = time.perf_counter()
+        summary = _run_batch(workflow, count, concurrency)
+        elapsed = time.perf_counter() - start
+        metrics[f"throughput_c{concurrency}_runs_per_s"] = _metric(summary["completed"] / elapsed, "runs/s", HIGHER)
+    return metrics
+
+
+def bench_retries(quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """Success rate and cost of retries when 20% of LLM calls time out."""
+    count = 40 if quick else 100
+    llm = SimulatedLLM(latency=0.01, error_rate=0.2, seed=42)
+    workflow = simulated_workflow(llm, risk_scenarios=LIGHT_RISK_SCENARIOS)
+    
+    # Backoff delays of 1s/2s become 10ms/20ms
+    with scaled_backoff(0.01):
+        start = time.perf_counter()
+        summary = _run_batch(workflow, count, concurrency=16)
+        elapsed = time.perf_counter() - start
+    
+    return {
+        "retry_success_rate": _metric(summary["status_counts"].get("success", 0) / count, "ratio", HIGHER),
+        "retry_calls_per_run": _metric(llm.calls / count, "calls", LOWER),
+        "retry_throughput_runs_per_s": _metric(count / elapsed, "runs/s", HIGHER)
+    }
+
+
+def bench_memory(quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """Peak traced memory per run while many runs wait on the LLM at once."""
+    in_flight = 16 if quick else 64
+    workflow = simulated_workflow(SimulatedLLM(latency=0.2), risk_scenarios=LIGHT_RISK_SCENARIOS)
+    workflow.run_research("Warm Up, TX")
+    gc.collect()
+    
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        _run_batch(workflow, in_flight, concurrency=in_flight)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {"memory_per_inflight_run_kb": _metric((peak - baseline) / in_flight / 1024, "KiB", LOWER)}
+
+
+def bench_import_time(quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """Median cold import time of the CLI and workflow modules."""
+    from import_time import measure
+    
+    repeats = 3 if quick else 5
+    return {
+        f"import_{module.replace('.', '_')}_ms": _metric(measure(module, repeats)["seconds"] * 1000, "ms", LOWER)
+        for module in ("main", "graph.workflow")
+    }
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Dict[str, Dict[str, object]]]] = {
+    "single_run": bench_single_run,
+    "throughput": bench_throughput,
+    "retries": bench_retries,
+    "memory": bench_memory,
+    "import_time": bench_import_time
+}
+
+
+def compare(
+    results: Dict[str, Dict[str, object]],
+    baseline: Dict[str, Dict[str, object]],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """
+    Describe every metric that is worse than its baseline by more than ``threshold``.
+    
+    Args:
+        results: Measured metrics
+        baseline: Stored metrics; metrics missing from it are not checked
+        threshold: Allowed change for the worse, e.g. 0.5 = 50%
+    
+    Returns:
+        One message per regressed metric
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("value")
+        if not expected:
+            continue
+        value = result["value"]
+        if result["better"] == LOWER:
+            regressed = value > expected * (1 + threshold)
+        else:
+            regressed = value * (1 + threshold) < expected
+        if regressed:
+            regressions.append(f"{name} is {value:g} {result['unit']} (baseline {expected:g})")
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, object]]:
+    """Stored metrics, or an empty mapping."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle).get("metrics", {})
+
+
+def save_baseline(results: Dict[str, Dict[str, object]], path: str = BASELINE_PATH):
+    """Record the measured metrics, keeping stored ones that were not re-run."""
+    metrics = {**load_baseline(path), **results}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"python": sys.version.split()[0], "metrics": metrics}, handle, indent=2)
+        handle.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the research workflow against a simulated LLM")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these groups")
+    parser.add_argument("--quick", action="store_true", help="Fewer runs per measurement")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed regression (0.5 = 50%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the measurements as the new baseline")
+    parser.add_argument("--json", help="Also write the measurements to this file")
+    args = parser.parse_args(argv)
+    
+    # Injected errors would otherwise log every retry
+    logging.getLogger("utils.retry_handler").setLevel(logging.CRITICAL)
+    
+    baseline = load_baseline(args.baseline)
+    results: Dict[str, Dict[str, object]] = {}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", flush=True)
+        results.update(BENCHMARKS[name](args.quick))
+    
+    print(f"\n{'Metric':<34} {'Value':>12} {'Baseline':>12} {'Change':>8}")
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("value")
+        change = f"{(result['value'] / expected - 1) * 100:+.0f}%" if expected else "-"
+        print(
+            f"{name:<34} {result['value']:>12g} {(expected if expected else float('nan')):>12g} {change:>8}"
+            f"  {result['unit']} ({result['better']} is better)"
+        )
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
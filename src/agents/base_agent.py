@@ -3,12 +3,22 @@ Base agent class for food truck research agents.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Type
+import json
 import os
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from models.research_models import AgentResponse, FoodTruckResearchState
-from utils.retry_handler import retry_api_call
+import time
+from pydantic import BaseModel
+from analysis.comparables import Comparable, find_comparable
+from models.research_models import AgentResponse, FoodTruckResearchState, RegionalContext
+from utils.cost_ledger import current_ledger
+from utils.json_repair import coerce_fields, repair_json, repair_prompt, validate_fields, worth_repairing
+from utils.metrics import FALLBACKS, JSON_REPAIRS, LLM_RETRIES, LLM_SECONDS, PARSE_FAILURES
+from utils.retry_handler import classify_api_error, retry_api_call
+from utils.tracing import INPUT_TOKENS, OUTPUT_TOKENS, current_span, span
+
+
+def _count_retry(error: Exception, agent: "BaseAgent", *args, **kwargs):
+    LLM_RETRIES.inc(agent=agent.agent_name, model=agent.model_name, reason=classify_api_error(error))
 
 
 class BaseAgent(ABC):
@@ -19,16 +29,23 @@ class BaseAgent(ABC):
         self.model_name = model_name
         self.temperature = temperature
         self.llm = self._initialize_llm()
-        
+    
     def _initialize_llm(self):
-        """Initialize the appropriate LLM based on model name."""
+        """
+        Initialize the appropriate LLM based on model name.
+        
+        Provider SDKs are imported here, and only for the selected provider,
+        because each adds about a second of import time to every process.
+        """
         if "gpt" in self.model_name.lower():
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
                 model=self.model_name,
                 temperature=self.temperature,
                 api_key=os.getenv("OPENAI_API_KEY")
             )
         elif "claude" in self.model_name.lower():
+            from langchain_anthropic import ChatAnthropic
             return ChatAnthropic(
                 model=self.model_name,
                 temperature=self.temperature,
@@ -36,6 +53,7 @@ class BaseAgent(ABC):
             )
         else:
             # Default to OpenAI
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
                 model="gpt-4",
                 temperature=self.temperature,
@@ -64,30 +82,158 @@ class BaseAgent(ABC):
         """Process a research request and return structured response."""
         pass
     
+    def system_prompt_for(self, state: FoodTruckResearchState, **options: Any) -> str:
+        """
+        The system prompt, followed by the state's regional context if the run has one.
+        
+        The regional block is the same for every city in a state and comes
+        before anything city-specific, so providers that cache prompt
+        prefixes reuse it across a regional sweep.
+        
+        Args:
+            state: Research state of the run
+            **options: Passed to ``create_system_prompt``
+        """
+        system_prompt = self.create_system_prompt(**options)
+        if state.regional_context is None:
+            return system_prompt
+        return f"{system_prompt}\n\n{self.format_regional_context(state.regional_context)}"
+    
     def _create_user_prompt(self, location: str, context: Optional[str] = None) -> str:
         """Create user prompt with location and optional context."""
         base_prompt = f"Please analyze the food truck business opportunity in {location}."
         
         if context:
             base_prompt += f"\n\nContext from previous analysis:\n{context}"
-            
+        
         base_prompt += "\n\nProvide a comprehensive analysis based on your expertise."
         return base_prompt
     
-    @retry_api_call(max_attempts=3, base_delay=1.0)
     def _safe_llm_call(self, system_prompt: str, user_prompt: str) -> str:
         """Make a safe LLM call with error handling and retry logic."""
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        with span("llm_call", agent=self.agent_name, model=self.model_name) as call_span:
+            content = self._llm_attempt(system_prompt, user_prompt)
+            call_span.set_attribute("retries", call_span.attributes.get("attempts", 1) - 1)
+            return content
+    
+    @retry_api_call(max_attempts=3, base_delay=1.0, on_retry=_count_retry)
+    def _llm_attempt(self, system_prompt: str, user_prompt: str) -> str:
+        """Send one request to the LLM; retried by ``_safe_llm_call``."""
+        call_span = current_span()
+        call_span.increment("attempts")
         
-        response = self.llm.invoke(messages)
+        # Refuse the call outright once the run's or batch's budget is spent
+        ledger = current_ledger()
+        if ledger is not None:
+            ledger.check()
         
-        if not response or not hasattr(response, 'content'):
-            raise Exception(f"Invalid response from LLM for {self.agent_name}")
+        with span("llm_attempt", agent=self.agent_name, attempt=call_span.attributes.get("attempts", 1)) as attempt_span:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            
+            started_at, outcome = time.perf_counter(), "error"
+            try:
+                response = self.llm.invoke(messages)
+                outcome = "success"
+            finally:
+                LLM_SECONDS.observe(
+                    time.perf_counter() - started_at, agent=self.agent_name, model=self.model_name, outcome=outcome
+                )
+            
+            if not response or not hasattr(response, 'content'):
+                raise Exception(f"Invalid response from LLM for {self.agent_name}")
+            
+            usage = getattr(response, "usage_metadata", None) or {}
+            for attribute, key in ((INPUT_TOKENS, "input_tokens"), (OUTPUT_TOKENS, "output_tokens")):
+                if usage.get(key) is not None:
+                    attempt_span.set_attribute(attribute, usage[key])
+                    call_span.increment(attribute, usage[key])
+            
+            if ledger is not None:
+                cost = ledger.record(
+                    self.agent_name,
+                    self.model_name,
+                    usage.get("input_tokens") or 0,
+                    usage.get("output_tokens") or 0
+                )
+                attempt_span.set_attribute("cost_usd", cost)
+            
+            return response.content
+    
+    def _parse_response(
+        self,
+        llm_response: str,
+        model_class: Type[BaseModel],
+        system_prompt: str,
+        location: str,
+        known: Optional[Dict[str, Any]] = None
+    ) -> BaseModel:
+        """
+        Parse an LLM response into ``model_class``, repairing it where possible.
+        
+        Malformed JSON is first cleaned up locally (see ``utils.json_repair``).
+        If some fields are still missing or invalid, but no more than half, a
+        short follow-up asks the LLM for just those fields and merges them in.
+        
+        Args:
+            llm_response: Raw LLM response
+            model_class: Model the response should match
+            system_prompt: System prompt for the follow-up
+            location: Location the response is about
+            known: Values for fields the response left out, e.g. the location
+        
+        Raises:
+            ValueError: The original parse or validation error if the response
+                could not be repaired
+        """
+        try:
+            data = json.loads(llm_response)
+            if known and isinstance(data, dict):
+                data = {**known, **data}
+            return model_class(**data)
+        except (ValueError, TypeError) as e:
+            error = e if isinstance(e, ValueError) else ValueError(f"Expected a JSON object: {str(e)}")
         
-        return response.content
+        data = repair_json(llm_response)
+        if data is None:
+            raise error
+        data = {**(known or {}), **coerce_fields(data, model_class)}
+        parsed, problems = validate_fields(model_class, data)
+        if parsed is not None:
+            JSON_REPAIRS.inc(agent=self.agent_name, stage="local")
+            return parsed
+        if not worth_repairing(model_class, problems):
+            raise error
+        
+        with span("repair_follow_up", agent=self.agent_name, fields=len(problems)):
+            try:
+                follow_up = repair_json(
+                    self._safe_llm_call(system_prompt, repair_prompt(model_class, problems, location))
+                ) or {}
+            except Exception:
+                # A failed follow-up leaves the agent's fallback to handle the response
+                raise error
+        
+        fixes = coerce_fields({field: value for field, value in follow_up.items() if field in problems}, model_class)
+        parsed, _ = validate_fields(model_class, {**data, **fixes})
+        if parsed is None:
+            raise error
+        JSON_REPAIRS.inc(agent=self.agent_name, stage="follow_up")
+        return parsed
+    
+    def _record_parse_fallback(self, parse_span, error: Exception):
+        """Note that the LLM response could not be used and a fallback builds the output."""
+        parse_span.set_attribute("fallback_used", True)
+        PARSE_FAILURES.inc(agent=self.agent_name, error=type(error).__name__)
+        FALLBACKS.inc(agent=self.agent_name)
+    
+    def _find_comparable(self, location: str, section: str, fallback_span) -> Optional[Comparable]:
+        """The nearest researched city whose ``section`` can stand in for this location's."""
+        comparable = find_comparable(location, section)
+        fallback_span.set_attribute("comparable", comparable.location if comparable else "")
+        return comparable
     
     def format_context_from_state(self, state: FoodTruckResearchState) -> str:
         """Format context information from previous agents."""
@@ -98,15 +244,31 @@ class BaseAgent(ABC):
             context_parts.append(f"- Competition Level: {state.market_research.competition_level}")
             context_parts.append(f"- Target Customers: {', '.join(state.market_research.target_customers)}")
             context_parts.append(f"- Market Size: {state.market_research.market_size_estimate}")
-            
+        
         if state.financial_analysis:
             context_parts.append("\nFINANCIAL ANALYSIS:")
             context_parts.append(f"- Funding Required: ${state.financial_analysis.funding_requirements:,.2f}")
             context_parts.append(f"- Break-even Timeline: {state.financial_analysis.break_even_timeline}")
-            
+        
         if state.operations_analysis:
             context_parts.append("\nOPERATIONS ANALYSIS:")
             context_parts.append(f"- Permits Required: {', '.join(state.operations_analysis.permits_required)}")
             context_parts.append(f"- Permit Timeline: {state.operations_analysis.permit_timeline}")
-            
-        return "\n".join(context_parts) if context_parts else ""
\ No newline at end of file
+        
+        return "\n".join(context_parts) if context_parts else ""
+    
+    def format_regional_context(self, context: RegionalContext) -> str:
+        """Format a state's regional context as a compact block that is identical for each of its cities."""
+        lines = [f"STATE-LEVEL CONTEXT FOR {context.state} (applies to every city in the state):"]
+        lines.append(f"- Statewide permits: {'; '.join(context.permits_required)}")
+        if context.permit_costs:
+            fees = ", ".join(f"{name} ${cost:,.0f}" for name, cost in sorted(context.permit_costs.items()))
+            lines.append(f"- Statewide permit fees: {fees}")
+        lines.append(f"- State health rules: {'; '.join(context.health_regulations)}")
+        lines.append(f"- Sales tax: {context.sales_tax_rate:.2%}; minimum wage: ${context.minimum_wage_hourly:,.2f}/hour")
+        if context.labor_costs_hourly:
+            wages = ", ".join(f"{role} ${wage:,.2f}" for role, wage in sorted(context.labor_costs_hourly.items()))
+            lines.append(f"- Typical hourly wages: {wages}")
+        if context.tax_and_labor_notes:
+            lines.append(f"- Tax and labor notes: {'; '.join(context.tax_and_labor_notes)}")
+        return "\n".join(lines)
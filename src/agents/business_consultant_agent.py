@@ -3,19 +3,75 @@ Business Consultant Agent for synthesizing research and providing recommendation
 """
 
 import json
-from typing import Dict, Any
+import threading
+import zlib
+from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent
+from analysis.prescreen import PrescreenConfig, describe_reasons, prescreen
+from analysis.risk_simulation import simulate_risk
 from models.research_models import (
     AgentResponse, 
     FoodTruckResearchState, 
     BusinessRecommendation,
-    RecommendationType
+    PrescreenResult,
+    RiskProfile
 )
+from utils.tracing import span
+
+
+def _format_optional(value, template: str) -> str:
+    """Format an optional metric, reporting missing values as not reached."""
+    return template.format(value) if value is not None else "not reached"
 
 
 class BusinessConsultantAgent(BaseAgent):
     """Agent specialized in synthesizing research and providing business recommendations."""
     
+    # Monte Carlo scenarios per synthesis; 200k keeps the simulation near 0.1s
+    risk_scenarios = 200_000
+    
+    # Month by which break-even probability is reported to the LLM
+    risk_decision_month = 24
+    
+    def __init__(
+        self,
+        model_name: str = "gpt-4",
+        temperature: float = 0.1,
+        prescreen_config: Optional[PrescreenConfig] = None,
+        skip_decisive_synthesis: bool = False
+    ):
+        """
+        Initialize the agent.
+        
+        Args:
+            model_name: LLM model name
+            temperature: LLM temperature
+            prescreen_config: Thresholds for the deterministic pre-screen
+            skip_decisive_synthesis: Use the pre-screen recommendation instead of
+                calling the LLM when the pre-screen score is decisive
+        """
+        super().__init__(model_name, temperature)
+        self.prescreen_config = prescreen_config or PrescreenConfig()
+        self.skip_decisive_synthesis = skip_decisive_synthesis
+        
+        # Running comparison of pre-screen and LLM recommendations; the agent is
+        # shared by every workflow in the process, so runs update it from many threads
+        self.prescreen_stats = {"compared": 0, "agreed": 0, "skipped": 0}
+        self._prescreen_lock = threading.Lock()
+    
+    @property
+    def prescreen_agreement_rate(self) -> Optional[float]:
+        """Share of LLM recommendations that matched the pre-screen, if any were compared."""
+        with self._prescreen_lock:
+            compared = self.prescreen_stats["compared"]
+            return self.prescreen_stats["agreed"] / compared if compared else None
+    
+    def _count_prescreen(self, *names: str):
+        """Increment pre-screen counters atomically."""
+        with self._prescreen_lock:
+            for name in names:
+                self.prescreen_stats[name] += 1
+    
     @property
     def agent_name(self) -> str:
         return "Business Consultant"
@@ -63,29 +119,56 @@ Your recommendation will guide final investment and launch decisions."""
         try:
             system_prompt = self.create_system_prompt()
             
-            # Create comprehensive context from all previous agents
-            context = self._create_comprehensive_context(state)
-            user_prompt = self._create_synthesis_prompt(state.location, context)
+            # Simulate cash-flow risk before asking for a recommendation
+            with span("risk_simulation", agent=self.agent_name):
+                risk_profile = self._simulate_risk(state)
+            screen = prescreen(state, risk_profile, self.prescreen_config)
+            message = f"Completed business recommendation synthesis for {state.location}"
+            used_fallback = False
             
-            # Get LLM response
-            llm_response = self._safe_llm_call(system_prompt, user_prompt)
+            if self.skip_decisive_synthesis and screen.decisive:
+                # The deterministic score is clear enough to skip the LLM call
+                screen = screen.copy(update={"applied": True})
+                with span("prescreen_synthesis", agent=self.agent_name):
+                    business_recommendation = self._extract_recommendation_fallback(state, risk_profile, screen)
+                self._count_prescreen("skipped")
+                message += f" (pre-screen score {screen.score:.0f}, synthesis skipped)"
+            else:
+                # Create comprehensive context from all previous agents
+                context = self._create_comprehensive_context(state, risk_profile)
+                user_prompt = self._create_synthesis_prompt(state.location, context)
+                
+                # Get LLM response
+                llm_response = self._safe_llm_call(system_prompt, user_prompt)
+                
+                # Parse JSON response
+                with span("parse_response", agent=self.agent_name) as parse_span:
+                    try:
+                        business_recommendation = self._parse_response(
+                            llm_response, BusinessRecommendation, system_prompt, state.location
+                        )
+                        self._record_agreement(screen, business_recommendation)
+                    except (json.JSONDecodeError, ValueError) as e:
+                        # Fallback if JSON parsing fails
+                        self._record_parse_fallback(parse_span, e)
+                        used_fallback = True
+                        screen = screen.copy(update={"applied": True})
+                        with span("fallback", agent=self.agent_name, reason=type(e).__name__):
+                            business_recommendation = self._extract_recommendation_fallback(state, risk_profile, screen)
             
-            # Parse JSON response
-            try:
-                recommendation_dict = json.loads(llm_response)
-                business_recommendation = BusinessRecommendation(**recommendation_dict)
-            except (json.JSONDecodeError, ValueError) as e:
-                # Fallback if JSON parsing fails
-                business_recommendation = self._extract_recommendation_fallback(state)
+            business_recommendation = business_recommendation.copy(
+                update={"risk_profile": risk_profile, "prescreen": screen}
+            )
             
             return AgentResponse(
                 agent_name=self.agent_name,
                 status="SUCCESS",
-                message=f"Completed business recommendation synthesis for {state.location}",
+                message=message,
                 data=business_recommendation,
-                next_agent=None  # Final agent in the workflow
+                next_agent=None,  # Final agent in the workflow
+                used_fallback=used_fallback
             )
-            
+        
         except Exception as e:
             return AgentResponse(
                 agent_name=self.agent_name,
@@ -94,7 +177,31 @@ Your recommendation will guide final investment and launch decisions."""
                 error_details=str(e)
             )
     
-    def _create_comprehensive_context(self, state: FoodTruckResearchState) -> str:
+    def _record_agreement(self, screen: PrescreenResult, recommendation: BusinessRecommendation):
+        """Track whether the LLM reached the same recommendation as the pre-screen."""
+        if recommendation.recommendation == screen.recommendation:
+            self._count_prescreen("compared", "agreed")
+        else:
+            self._count_prescreen("compared")
+    
+    def _simulate_risk(self, state: FoodTruckResearchState) -> Optional[RiskProfile]:
+        """Run the Monte Carlo risk simulation when financial data is available."""
+        if not state.financial_analysis:
+            return None
+        
+        # Seed from the location so repeated runs report the same risk figures
+        return simulate_risk(
+            state.financial_analysis,
+            state.market_research,
+            scenarios=self.risk_scenarios,
+            seed=zlib.crc32(state.location.lower().encode("utf-8"))
+        )
+    
+    def _create_comprehensive_context(
+        self,
+        state: FoodTruckResearchState,
+        risk_profile: Optional[RiskProfile] = None
+    ) -> str:
         """Create comprehensive context from all previous agent analyses."""
         context_sections = []
         
@@ -124,6 +231,18 @@ Your recommendation will guide final investment and launch decisions."""
             monthly_total = sum(financial.monthly_operating_costs.values())
             context_sections.append(f"Total Startup Costs: ${startup_total:,.2f}")
             context_sections.append(f"Monthly Operating Costs: ${monthly_total:,.2f}")
+            
+            metrics = financial.derived_metrics
+            if metrics:
+                context_sections.append(
+                    f"Computed Metrics ({metrics.horizon_months}-month horizon): "
+                    f"monthly net income ${metrics.monthly_net_income:,.2f}, "
+                    f"break-even {_format_optional(metrics.break_even_months, '{:.1f} months')}, "
+                    f"NPV {_format_optional(metrics.npv, '${:,.0f}')}, "
+                    f"IRR {_format_optional(metrics.irr, '{:.1%}')}"
+                )
+            if financial.consistency_flags:
+                context_sections.append(f"Corrected Projections: {'; '.join(financial.consistency_flags)}")
         
         # Operations Analysis Context
         if state.operations_analysis:
@@ -136,6 +255,23 @@ Your recommendation will guide final investment and launch decisions."""
             context_sections.append(f"Staffing Requirements: {operations.staffing_needs}")
             context_sections.append(f"Major Logistics Challenges: {', '.join(operations.logistics_challenges[:3])}")
         
+        # Risk Simulation Context
+        if risk_profile:
+            month = self.risk_decision_month
+            context_sections.append("\n=== RISK SIMULATION ===")
+            context_sections.append(
+                f"Break-even Probability: {risk_profile.probability_by(12):.0%} by month 12, "
+                f"{risk_profile.probability_by(month):.0%} by month {month}, "
+                f"{risk_profile.probability_by(risk_profile.horizon_months):.0%} by month {risk_profile.horizon_months}"
+            )
+            context_sections.append(
+                f"Probability of Loss at Month {risk_profile.horizon_months}: {risk_profile.probability_of_loss:.0%}"
+            )
+            context_sections.append(
+                f"Value at Risk ({risk_profile.confidence_level:.0%}): ${risk_profile.value_at_risk:,.0f} "
+                f"(expected shortfall ${risk_profile.expected_shortfall:,.0f})"
+            )
+        
         return "\n".join(context_sections)
     
     def _create_synthesis_prompt(self, location: str, context: str) -> str:
@@ -155,31 +291,26 @@ Provide a clear recommendation (go/no_go/conditional) with supporting rationale.
 Include specific next steps and success factors if recommending to proceed.
 Be realistic about challenges while identifying viable paths to success."""
     
-    def _extract_recommendation_fallback(self, state: FoodTruckResearchState) -> BusinessRecommendation:
+    def _extract_recommendation_fallback(
+        self,
+        state: FoodTruckResearchState,
+        risk_profile: Optional[RiskProfile] = None,
+        screen: Optional[PrescreenResult] = None
+    ) -> BusinessRecommendation:
         """Fallback method to provide basic recommendation."""
-        # Simple logic based on available data
-        recommendation_type = RecommendationType.CONDITIONAL
-        confidence = "Medium"
-        
-        # Basic decision logic
-        if (state.financial_analysis and 
-            state.financial_analysis.funding_requirements > 150000):
-            recommendation_type = RecommendationType.NO_GO
-            confidence = "High"
-        elif (state.market_research and 
-              state.market_research.competition_level == "Low"):
-            recommendation_type = RecommendationType.GO
-            confidence = "High"
+        # Decide from the deterministic pre-screen of the upstream analysis
+        screen = screen or prescreen(state, risk_profile, self.prescreen_config)
+        strengths, risks = describe_reasons(screen, self.prescreen_config)
         
         return BusinessRecommendation(
-            recommendation=recommendation_type,
-            confidence_level=confidence,
-            key_strengths=[
+            recommendation=screen.recommendation,
+            confidence_level=screen.confidence_level,
+            key_strengths=strengths or [
                 "Market opportunity identified",
                 "Clear target customer segments",
                 "Manageable operational requirements"
             ],
-            key_risks=[
+            key_risks=risks or [
                 "High initial investment",
                 "Regulatory complexity",
                 "Weather and seasonal dependencies"
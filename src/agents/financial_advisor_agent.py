@@ -3,9 +3,16 @@ Financial Advisor Agent for analyzing food truck business financials.
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent
+from analysis.comparables import Comparable
 from models.research_models import AgentResponse, FoodTruckResearchState, FinancialAnalysisData
+from analysis.financial_metrics import reconcile_financial_analysis
+from utils.tracing import span
+
+# Added to the user prompt when state tax and wage assumptions come from the regional context
+REGIONAL_ASSUMPTIONS_INSTRUCTION = """Use the state-level sales tax and wage assumptions above instead of re-deriving them.
+Keep cash_flow_analysis and roi_projection to the city-specific factors, in a sentence or two each."""
 
 
 class FinancialAdvisorAgent(BaseAgent):
@@ -78,31 +85,45 @@ Your analysis will guide investment decisions and operational planning."""
     def process_request(self, state: FoodTruckResearchState) -> AgentResponse:
         """Process financial analysis request."""
         try:
-            system_prompt = self.create_system_prompt()
+            system_prompt = self.system_prompt_for(state)
             
             # Include market research context
             context = self.format_context_from_state(state)
             user_prompt = self._create_user_prompt(state.location, context)
+            if state.regional_context is not None:
+                user_prompt += f"\n\n{REGIONAL_ASSUMPTIONS_INSTRUCTION}"
             
             # Get LLM response
             llm_response = self._safe_llm_call(system_prompt, user_prompt)
             
             # Parse JSON response
-            try:
-                financial_data_dict = json.loads(llm_response)
-                financial_data = FinancialAnalysisData(**financial_data_dict)
-            except (json.JSONDecodeError, ValueError) as e:
-                # Fallback if JSON parsing fails
-                financial_data = self._extract_financial_data_fallback(state.location)
+            used_fallback, comparable = False, None
+            with span("parse_response", agent=self.agent_name) as parse_span:
+                try:
+                    financial_data = self._parse_response(
+                        llm_response, FinancialAnalysisData, system_prompt, state.location
+                    )
+                except (json.JSONDecodeError, ValueError) as e:
+                    # Fallback if JSON parsing fails
+                    self._record_parse_fallback(parse_span, e)
+                    used_fallback = True
+                    with span("fallback", agent=self.agent_name, reason=type(e).__name__) as fallback_span:
+                        comparable = self._find_comparable(state.location, "financial_analysis", fallback_span)
+                        financial_data = self._extract_financial_data_fallback(state.location, comparable)
+            
+            # Derive metrics locally and correct inconsistent LLM arithmetic
+            financial_data = reconcile_financial_analysis(financial_data)
             
             return AgentResponse(
                 agent_name=self.agent_name,
                 status="SUCCESS",
                 message=f"Completed financial analysis for {state.location}",
                 data=financial_data,
-                next_agent="Operations Consultant"
+                next_agent="Operations Consultant",
+                used_fallback=used_fallback,
+                fallback_source=comparable.location if comparable else None
             )
-            
+        
         except Exception as e:
             return AgentResponse(
                 agent_name=self.agent_name,
@@ -111,8 +132,22 @@ Your analysis will guide investment decisions and operational planning."""
                 error_details=str(e)
             )
     
-    def _extract_financial_data_fallback(self, location: str) -> FinancialAnalysisData:
-        """Fallback method to provide basic financial estimates."""
+    def _extract_financial_data_fallback(
+        self,
+        location: str,
+        comparable: Optional[Comparable] = None
+    ) -> FinancialAnalysisData:
+        """Fallback financial estimates: the most comparable researched city's figures, else generic ones."""
+        if comparable is not None:
+            try:
+                # Derived metrics are recomputed by the caller
+                return FinancialAnalysisData(**{
+                    **comparable.data, "derived_metrics": None, "consistency_flags": [], "consistency_notes": []
+                })
+            except ValueError:
+                # Stored under an older schema; use the generic estimates
+                pass
+        
         return FinancialAnalysisData(
             startup_costs={
                 "food_truck": 75000.0,
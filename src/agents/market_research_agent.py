@@ -3,9 +3,11 @@ Market Research Agent for analyzing food truck business opportunities.
 """
 
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from agents.base_agent import BaseAgent
+from analysis.comparables import Comparable
 from models.research_models import AgentResponse, FoodTruckResearchState, MarketResearchData
+from utils.tracing import span
 
 
 class MarketResearchAgent(BaseAgent):
@@ -66,21 +68,34 @@ Be data-driven but practical. Your analysis will inform financial and operationa
             llm_response = self._safe_llm_call(system_prompt, user_prompt)
             
             # Parse JSON response
-            try:
-                market_data_dict = json.loads(llm_response)
-                market_data = MarketResearchData(**market_data_dict)
-            except (json.JSONDecodeError, ValueError) as e:
-                # If JSON parsing fails, extract key information manually
-                market_data = self._extract_market_data_fallback(llm_response, state.location)
+            used_fallback, comparable = False, None
+            with span("parse_response", agent=self.agent_name) as parse_span:
+                try:
+                    market_data = self._parse_response(
+                        llm_response,
+                        MarketResearchData,
+                        system_prompt,
+                        state.location,
+                        known={"location": state.location}
+                    )
+                except (json.JSONDecodeError, ValueError) as e:
+                    # If JSON parsing fails, extract key information manually
+                    self._record_parse_fallback(parse_span, e)
+                    used_fallback = True
+                    with span("fallback", agent=self.agent_name, reason=type(e).__name__) as fallback_span:
+                        comparable = self._find_comparable(state.location, "market_research", fallback_span)
+                        market_data = self._extract_market_data_fallback(llm_response, state.location, comparable)
             
             return AgentResponse(
                 agent_name=self.agent_name,
                 status="SUCCESS",
                 message=f"Completed market research analysis for {state.location}",
                 data=market_data,
-                next_agent="Financial Advisor"
+                next_agent="Financial Advisor",
+                used_fallback=used_fallback,
+                fallback_source=comparable.location if comparable else None
             )
-            
+        
         except Exception as e:
             return AgentResponse(
                 agent_name=self.agent_name,
@@ -89,8 +104,20 @@ Be data-driven but practical. Your analysis will inform financial and operationa
                 error_details=str(e)
             )
     
-    def _extract_market_data_fallback(self, response: str, location: str) -> MarketResearchData:
-        """Fallback method to extract market data if JSON parsing fails."""
+    def _extract_market_data_fallback(
+        self,
+        response: str,
+        location: str,
+        comparable: Optional[Comparable] = None
+    ) -> MarketResearchData:
+        """Fallback market data: the most comparable researched city's findings, else generic estimates."""
+        if comparable is not None:
+            try:
+                return MarketResearchData(**{**comparable.data, "location": location})
+            except ValueError:
+                # Stored under an older schema; use the generic estimates
+                pass
+        
         # Basic parsing fallback - in production, this would be more sophisticated
         return MarketResearchData(
             location=location,
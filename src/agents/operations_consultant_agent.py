@@ -3,9 +3,59 @@ Operations Consultant Agent for analyzing food truck operational requirements.
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from agents.base_agent import BaseAgent
-from models.research_models import AgentResponse, FoodTruckResearchState, OperationsAnalysisData
+from analysis.comparables import Comparable
+from analysis.permits import PermitRequirements, load_permit_kb
+from models.research_models import AgentResponse, FoodTruckResearchState, OperationsAnalysisData, RegionalContext
+from utils.metrics import PERMIT_KB_LOOKUPS
+from utils.tracing import span
+
+# Added to the user prompt when statewide rules come from the regional context
+REGIONAL_DELTA_INSTRUCTION = """The state-level context above already covers statewide permits, fees and health rules.
+Wherever you list permits, fees or health rules, include only what the city or county adds;
+they are combined with the statewide ones."""
+
+# Part of the response structure left out when the permit knowledge base covers the city
+PERMIT_STRUCTURE = """    "permits_required": ["string array of required permits/licenses"],
+    "permit_costs": {
+        "business_license": 200.0,
+        "food_service_permit": 500.0,
+        "mobile_vendor_permit": 1000.0,
+        "fire_permit": 150.0,
+        "other_permits": 300.0
+    },
+    "permit_timeline": "string - time needed to obtain permits",
+"""
+
+# The rest of the response structure
+OPERATIONS_STRUCTURE = """    "health_regulations": ["string array of key health requirements"],
+    "location_constraints": ["string array of operational constraints"],
+    "equipment_requirements": ["string array of essential equipment"],
+    "staffing_needs": {
+        "minimum_staff": 2,
+        "peak_staff": 4,
+        "roles": ["Manager/Cook", "Cashier", "Prep Cook", "Driver"],
+        "labor_costs_hourly": {
+            "manager": 20.0,
+            "cook": 18.0,
+            "cashier": 16.0,
+            "prep": 15.0
+        }
+    },
+    "daily_operations": ["string array of key daily tasks"],
+    "logistics_challenges": ["string array of supply chain considerations"]
+"""
+
+
+def _merge_unique(first: List[str], second: List[str]) -> List[str]:
+    """Items of both lists in order, without case-insensitive duplicates."""
+    seen, merged = set(), []
+    for item in first + second:
+        if item.strip().lower() not in seen:
+            seen.add(item.strip().lower())
+            merged.append(item)
+    return merged
 
 
 class OperationsConsultantAgent(BaseAgent):
@@ -19,7 +69,14 @@ class OperationsConsultantAgent(BaseAgent):
     def agent_description(self) -> str:
         return "Analyzes operational requirements, permits, logistics, and daily operations for food truck businesses"
     
-    def create_system_prompt(self) -> str:
+    def create_system_prompt(self, permits_known: bool = False) -> str:
+        """
+        Create the system prompt.
+        
+        Args:
+            permits_known: Leave the permit fields out of the response structure
+        """
+        structure = ("" if permits_known else PERMIT_STRUCTURE) + OPERATIONS_STRUCTURE
         return """You are an Operations Consultant specializing in food truck business operations.
 Your expertise includes:
 
@@ -33,32 +90,7 @@ Your expertise includes:
 
 IMPORTANT: You must respond with a JSON object that matches this exact structure:
 {
-    "permits_required": ["string array of required permits/licenses"],
-    "permit_costs": {
-        "business_license": 200.0,
-        "food_service_permit": 500.0,
-        "mobile_vendor_permit": 1000.0,
-        "fire_permit": 150.0,
-        "other_permits": 300.0
-    },
-    "permit_timeline": "string - time needed to obtain permits",
-    "health_regulations": ["string array of key health requirements"],
-    "location_constraints": ["string array of operational constraints"],
-    "equipment_requirements": ["string array of essential equipment"],
-    "staffing_needs": {
-        "minimum_staff": 2,
-        "peak_staff": 4,
-        "roles": ["Manager/Cook", "Cashier", "Prep Cook", "Driver"],
-        "labor_costs_hourly": {
-            "manager": 20.0,
-            "cook": 18.0,
-            "cashier": 16.0,
-            "prep": 15.0
-        }
-    },
-    "daily_operations": ["string array of key daily tasks"],
-    "logistics_challenges": ["string array of supply chain considerations"]
-}
+""" + structure + """}
 
 Focus on location-specific regulations and practical operational considerations.
 Consider local health department requirements, parking restrictions, and zoning laws.
@@ -69,31 +101,60 @@ Your analysis will guide implementation planning and operational setup."""
     def process_request(self, state: FoodTruckResearchState) -> AgentResponse:
         """Process operations analysis request."""
         try:
-            system_prompt = self.create_system_prompt()
+            # A city in the permit knowledge base needs no permit research; a state entry grounds it
+            permits = self._lookup_permits(state.location)
+            known_permits = permits if permits is not None and permits.level == "city" else None
+            system_prompt = self.system_prompt_for(state, permits_known=known_permits is not None)
             
             # Include previous analysis context
             context = self.format_context_from_state(state)
             user_prompt = self._create_user_prompt(state.location, context)
+            if known_permits is not None:
+                user_prompt += (
+                    f"\n\nPermits for {known_permits.name} are already known from the permit knowledge base; "
+                    "leave permits_required, permit_costs and permit_timeline out of your response."
+                )
+            elif permits is not None:
+                user_prompt += f"\n\n{permits.format()}\nBuild on these and add the city and county requirements."
+            if state.regional_context is not None:
+                user_prompt += f"\n\n{REGIONAL_DELTA_INSTRUCTION}"
             
             # Get LLM response
             llm_response = self._safe_llm_call(system_prompt, user_prompt)
             
             # Parse JSON response
-            try:
-                operations_data_dict = json.loads(llm_response)
-                operations_data = OperationsAnalysisData(**operations_data_dict)
-            except (json.JSONDecodeError, ValueError) as e:
-                # Fallback if JSON parsing fails
-                operations_data = self._extract_operations_data_fallback(state.location)
+            used_fallback, comparable = False, None
+            with span("parse_response", agent=self.agent_name) as parse_span:
+                try:
+                    operations_data = self._parse_response(
+                        llm_response,
+                        OperationsAnalysisData,
+                        system_prompt,
+                        state.location,
+                        known=known_permits.operations_fields() if known_permits else None
+                    )
+                    if state.regional_context is not None:
+                        operations_data = self._with_regional_context(operations_data, state.regional_context)
+                    if known_permits is not None:
+                        operations_data = operations_data.copy(update=known_permits.operations_fields())
+                except (json.JSONDecodeError, ValueError) as e:
+                    # Fallback if JSON parsing fails
+                    self._record_parse_fallback(parse_span, e)
+                    used_fallback = True
+                    with span("fallback", agent=self.agent_name, reason=type(e).__name__) as fallback_span:
+                        comparable = self._find_comparable(state.location, "operations_analysis", fallback_span)
+                        operations_data = self._extract_operations_data_fallback(state.location, comparable, permits)
             
             return AgentResponse(
                 agent_name=self.agent_name,
                 status="SUCCESS",
                 message=f"Completed operations analysis for {state.location}",
                 data=operations_data,
-                next_agent="Business Consultant"
+                next_agent="Business Consultant",
+                used_fallback=used_fallback,
+                fallback_source=comparable.location if comparable else None
             )
-            
+        
         except Exception as e:
             return AgentResponse(
                 agent_name=self.agent_name,
@@ -102,9 +163,46 @@ Your analysis will guide implementation planning and operational setup."""
                 error_details=str(e)
             )
     
-    def _extract_operations_data_fallback(self, location: str) -> OperationsAnalysisData:
-        """Fallback method to provide basic operations estimates."""
-        return OperationsAnalysisData(
+    def _lookup_permits(self, location: str) -> Optional[PermitRequirements]:
+        """The permit knowledge base entry for a location's city, else its state."""
+        with span("permit_lookup", agent=self.agent_name) as lookup_span:
+            permits = load_permit_kb().lookup(location)
+            level = permits.level if permits is not None else "miss"
+            lookup_span.set_attribute("level", level)
+        PERMIT_KB_LOOKUPS.inc(level=level)
+        return permits
+    
+    def _with_regional_context(self, data: OperationsAnalysisData, regional: RegionalContext) -> OperationsAnalysisData:
+        """Combine the statewide permits, fees and health rules with the city-specific ones from the LLM."""
+        return data.copy(update={
+            "permits_required": _merge_unique(regional.permits_required, data.permits_required),
+            "permit_costs": {**regional.permit_costs, **data.permit_costs},
+            "health_regulations": _merge_unique(regional.health_regulations, data.health_regulations)
+        })
+    
+    def _extract_operations_data_fallback(
+        self,
+        location: str,
+        comparable: Optional[Comparable] = None,
+        permits: Optional[PermitRequirements] = None
+    ) -> OperationsAnalysisData:
+        """
+        Fallback operations estimates: the most comparable researched city's, else generic ones.
+        
+        Permit fields come from the permit knowledge base when it covers the
+        city, or its state and there is no comparable city.
+        """
+        if comparable is not None:
+            try:
+                borrowed = OperationsAnalysisData(**comparable.data)
+                if permits is not None and permits.level == "city":
+                    borrowed = borrowed.copy(update=permits.operations_fields())
+                return borrowed
+            except ValueError:
+                # Stored under an older schema; use the generic estimates
+                pass
+        
+        generic = OperationsAnalysisData(
             permits_required=[
                 "Business License",
                 "Food Service Permit", 
@@ -169,4 +267,7 @@ Your analysis will guide implementation planning and operational setup."""
                 "Equipment maintenance scheduling",
                 "Seasonal storage considerations"
             ]
-        )
\ No newline at end of file
+        )
+        if permits is not None:
+            generic = generic.copy(update=permits.operations_fields())
+        return generic
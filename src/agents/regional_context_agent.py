@@ -0,0 +1,79 @@
+"""
+Regional Analyst Agent for state-level rules shared by every city in a state.
+"""
+
+from agents.base_agent import BaseAgent
+from models.research_models import AgentResponse, FoodTruckResearchState, RegionalContext
+from utils.location import US_STATES, split_location
+from utils.tracing import span
+
+STATE_NAMES = {code: name.title() for name, code in US_STATES.items()}
+
+
+class RegionalContextAgent(BaseAgent):
+    """Agent that researches a state's permits, health rules, taxes and wages once for all of its cities."""
+    
+    @property
+    def agent_name(self) -> str:
+        return "Regional Analyst"
+    
+    @property
+    def agent_description(self) -> str:
+        return "Summarizes the state-level permits, health rules, taxes and wages that apply to every food truck in a state"
+    
+    def create_system_prompt(self) -> str:
+        return """You are a Regional Analyst specializing in state-level requirements for food truck businesses.
+Your expertise includes:
+
+- Statewide business, tax and food service licensing
+- State food codes and health department rules
+- State sales tax and labor law
+- Typical wages by role across the state
+
+IMPORTANT: You must respond with a JSON object that matches this exact structure:
+{
+    "permits_required": ["string array of permits/licenses required statewide"],
+    "permit_costs": {"state_food_license": 300.0},
+    "health_regulations": ["string array of state food code requirements"],
+    "sales_tax_rate": 0.0625,
+    "minimum_wage_hourly": 7.25,
+    "labor_costs_hourly": {"manager": 20.0, "cook": 17.0, "cashier": 14.0},
+    "tax_and_labor_notes": ["string array of other state tax and labor rules affecting costs"]
+}
+
+Include only what applies statewide. City and county rules are researched separately for each city,
+so keep the lists short and specific."""
+    
+    def process_request(self, state: FoodTruckResearchState) -> AgentResponse:
+        """Research the state of ``state.location``; there is no fallback, since city agents work without it."""
+        try:
+            code = split_location(state.location)[1]
+            if code not in STATE_NAMES:
+                raise ValueError(f"No US state in location '{state.location}'")
+            
+            system_prompt = self.create_system_prompt()
+            user_prompt = (
+                f"Please summarize the statewide rules and cost assumptions for food trucks in "
+                f"{STATE_NAMES[code]} ({code})."
+            )
+            llm_response = self._safe_llm_call(system_prompt, user_prompt)
+            
+            with span("parse_response", agent=self.agent_name):
+                regional_context = self._parse_response(
+                    llm_response, RegionalContext, system_prompt, STATE_NAMES[code], known={"state": code}
+                )
+            
+            return AgentResponse(
+                agent_name=self.agent_name,
+                status="SUCCESS",
+                message=f"Completed regional context for {code}",
+                data=regional_context.copy(update={"state": code})
+            )
+        
+        except Exception as e:
+            return AgentResponse(
+                agent_name=self.agent_name,
+                status="ERROR",
+                message="Failed to complete regional context",
+                error_details=str(e)
+            )
@@ -0,0 +1,220 @@
+"""
+Nearest comparable researched city, for agent fallbacks.
+
+When an agent cannot use its LLM response it falls back to estimates. This
+module finds the most comparable city that has already been researched. The
+distance combines the geographic distance with a penalty for population
+differences, so the fallback can borrow that city's section in place of
+one-size-fits-all placeholders. Cities are located with the bundled
+``data/us_cities.csv``, and a KD-tree over the researched cities answers a
+lookup in microseconds, with no LLM call.
+"""
+
+import csv
+import math
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from storage.results_store import ResultsStore
+from utils.location import canonical_location
+from utils.spatial_index import KDTree, Point
+
+
+CITY_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "us_cities.csv")
+
+EARTH_RADIUS_KM = 6371.0
+
+# Distance in km that a tenfold population difference counts as
+POPULATION_DECADE_KM = 400.0
+
+# Result sections a fallback can borrow from another city
+COMPARABLE_SECTIONS = ("market_research", "financial_analysis", "operations_analysis")
+
+# Cities added since the KD-tree was built are scanned linearly until they
+# outnumber this many, or this share of the tree, so rebuilds stay amortized
+MIN_PENDING_CITIES = 64
+PENDING_SHARE = 0.125
+
+CityInfo = Tuple[float, float, int]
+
+
+@lru_cache(maxsize=None)
+def load_city_coordinates(path: str = CITY_DATA_PATH) -> Dict[str, CityInfo]:
+    """
+    Latitude, longitude and population of the bundled cities.
+    
+    Returns:
+        Mapping of canonical location (see ``canonical_location``) to
+        (latitude, longitude, population)
+    """
+    cities = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            key = canonical_location(f"{row['city']}, {row['state']}")
+            cities[key] = (float(row["latitude"]), float(row["longitude"]), int(row["population"]))
+    return cities
+
+
+def city_point(city: CityInfo) -> Point:
+    """
+    A city's position for the KD-tree.
+    
+    Cities are placed on a sphere of the Earth's radius, so straight-line
+    distances approximate travel distances in km. A fourth axis holds the
+    log population scaled by ``POPULATION_DECADE_KM``.
+    """
+    latitude, longitude, population = city
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return (
+        EARTH_RADIUS_KM * math.cos(phi) * math.cos(lam),
+        EARTH_RADIUS_KM * math.cos(phi) * math.sin(lam),
+        EARTH_RADIUS_KM * math.sin(phi),
+        POPULATION_DECADE_KM * math.log10(max(population, 1))
+    )
+
+
+class Comparable(BaseModel):
+    """A researched city's section borrowed for another location."""
+    
+    location: str = Field(description="Researched location the data comes from")
+    distance: float = Field(description="Combined geographic and population distance in km")
+    data: Dict[str, Any] = Field(description="The borrowed result section")
+
+
+class ComparableIndex:
+    """
+    Researched cities by position and size, with their LLM-produced sections.
+    
+    Stored results are loaded on the first lookup; results finished later
+    are added with ``add``. Sections that were themselves fallbacks are
+    never indexed, so placeholders do not spread from city to city. Only
+    one model's results are indexed, so a fallback never mixes in numbers
+    another model produced. New cities are searched linearly until enough
+    of them have accumulated to rebuild the KD-tree.
+    
+    Args:
+        results_store: Store of finished runs to index (None starts empty)
+        coordinates: City positions (default: the bundled city list)
+        model_name: Only index results produced by this model (None: any model)
+    """
+    
+    def __init__(
+        self,
+        results_store: Optional[ResultsStore] = None,
+        coordinates: Optional[Dict[str, CityInfo]] = None,
+        model_name: Optional[str] = None
+    ):
+        self.results_store = results_store
+        self.coordinates = coordinates if coordinates is not None else load_city_coordinates()
+        self.model_name = model_name
+        self._cities: Dict[str, Dict[str, Any]] = {}
+        self._tree: KDTree = KDTree([])
+        self._pending: List[str] = []
+        self._loaded = results_store is None
+        self._lock = threading.Lock()
+    
+    def add(self, result: Dict[str, Any], model_name: Optional[str] = None):
+        """
+        Index a finished run's sections, replacing older ones for the same city.
+        
+        Args:
+            result: Result dictionary as returned by ``run_research``
+            model_name: Model that produced it (defaults to result["model_name"]);
+                results of other models than the index's are ignored
+        """
+        if self.model_name and (model_name or result.get("model_name")) != self.model_name:
+            return
+        with self._lock:
+            self._add(result, replace=True)
+    
+    def _add(self, result: Dict[str, Any], replace: bool):
+        key = canonical_location(result.get("location") or "")
+        if key not in self.coordinates or result.get("status") != "success":
+            return
+        fallbacks = result.get("fallbacks") or {}
+        new = key not in self._cities
+        city = self._cities.setdefault(key, {"location": result["location"], "sections": {}})
+        for section in COMPARABLE_SECTIONS:
+            if result.get(section) and section not in fallbacks and (replace or section not in city["sections"]):
+                city["sections"][section] = result[section]
+        if not city["sections"]:
+            del self._cities[key]
+        elif new:
+            # Existing cities keep their place in the tree; only their sections change
+            self._pending.append(key)
+    
+    def _load(self):
+        # Newest first, so each city keeps its latest LLM-produced sections
+        filters = {"model_name": self.model_name} if self.model_name else {}
+        for result in self.results_store.iter_results(status="success", **filters):
+            self._add(result, replace=False)
+        self._loaded = True
+    
+    def _refresh_tree(self):
+        """Rebuild the KD-tree once the cities added since the last build are too many to scan."""
+        if len(self._pending) > max(MIN_PENDING_CITIES, PENDING_SHARE * self._tree.size):
+            self._tree = KDTree([(city_point(self.coordinates[key]), key) for key in self._cities])
+            self._pending = []
+    
+    def nearest(self, location: str, section: str) -> Optional[Comparable]:
+        """
+        The most comparable researched city that has ``section``.
+        
+        A previous run for the same city counts, at distance 0.
+        
+        Args:
+            location: Location to find a comparable city for
+            section: Result section needed, e.g. "financial_analysis"
+        
+        Returns:
+            The comparable city's section, or None if the location is not in
+            the city list or no researched city has the section
+        """
+        city = self.coordinates.get(canonical_location(location))
+        if city is None:
+            return None
+        
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._refresh_tree()
+            point = city_point(city)
+            match = self._tree.nearest(point, accept=lambda key: section in self._cities[key]["sections"])
+            for key in self._pending:
+                if section in self._cities[key]["sections"]:
+                    distance = math.dist(point, city_point(self.coordinates[key]))
+                    if match is None or distance < match[1]:
+                        match = (key, distance)
+            if match is None:
+                return None
+            key, distance = match
+            return Comparable(
+                location=self._cities[key]["location"],
+                distance=round(distance, 1),
+                data=self._cities[key]["sections"][section]
+            )
+
+
+_active_index: ContextVar[Optional[ComparableIndex]] = ContextVar("active_comparables", default=None)
+
+
+@contextmanager
+def use_comparables(index: Optional[ComparableIndex]) -> Iterator[Optional[ComparableIndex]]:
+    """Let agent fallbacks inside the block borrow from ``index``."""
+    token = _active_index.set(index)
+    try:
+        yield index
+    finally:
+        _active_index.reset(token)
+
+
+def find_comparable(location: str, section: str) -> Optional[Comparable]:
+    """The nearest comparable city's section from the active index, if any."""
+    index = _active_index.get()
+    return index.nearest(location, section) if index is not None else None
@@ -0,0 +1,427 @@
+"""
+Deterministic financial metrics computed from FinancialAnalysisData numbers.
+
+The LLM produces exact cost and revenue figures but free-text break-even
+and ROI statements that often disagree with them. This module derives
+break-even, payback, ROI, NPV and IRR directly from the numeric fields,
+vectorized with NumPy so thousands of locations are evaluated at once,
+and reconciles the LLM's text against the computed values.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from models.research_models import FinancialAnalysisData, FinancialMetrics
+from utils.text_parsing import parse_duration_months, parse_percent_range
+
+
+DEFAULT_HORIZON_MONTHS = 36
+DEFAULT_ANNUAL_DISCOUNT_RATE = 0.10
+DEFAULT_TOLERANCE = 0.25
+
+# Matches the daily/monthly ratio used in the financial advisor prompt
+OPERATING_DAYS_PER_MONTH = 25
+
+# Bisection brackets the monthly IRR to ~5e-4; Newton then converges quadratically
+IRR_BISECTION_STEPS = 12
+IRR_NEWTON_STEPS = 4
+
+# ROI statements that describe a yearly rate whatever duration they mention
+ANNUAL_ROI_PATTERN = re.compile(
+    r"\b(?:annual(?:ly)?|yearly|per (?:year|annum)|a year|each year)\b|/\s*(?:year|yr)\b", re.IGNORECASE
+)
+
+# FinancialAnalysisData fields computed here rather than stated by the LLM
+DERIVED_FIELDS = ("derived_metrics", "consistency_flags", "consistency_notes")
+
+FinancialInput = Union[FinancialAnalysisData, Dict[str, Any]]
+
+
+def _field(financial: FinancialInput, name: str) -> Any:
+    """Read a field from a FinancialAnalysisData object or its dictionary."""
+    if isinstance(financial, FinancialAnalysisData):
+        return getattr(financial, name)
+    return (financial or {}).get(name)
+
+
+def monthly_revenue_from_projections(revenue_projections: Dict[str, float]) -> float:
+    """
+    Resolve a monthly revenue figure from LLM revenue projections.
+    
+    Prefers an explicit monthly figure, then daily revenue times operating
+    days, then annual revenue divided by twelve.
+    """
+    by_period: Dict[str, float] = {}
+    for key, value in (revenue_projections or {}).items():
+        lowered = key.lower()
+        for period in ("monthly", "daily", "annual", "yearly"):
+            if period in lowered and period not in by_period:
+                by_period[period] = float(value)
+    
+    if "monthly" in by_period:
+        return by_period["monthly"]
+    if "daily" in by_period:
+        return by_period["daily"] * OPERATING_DAYS_PER_MONTH
+    if "annual" in by_period or "yearly" in by_period:
+        return by_period.get("annual", by_period.get("yearly", 0.0)) / 12.0
+    return 0.0
+
+
+def extract_inputs(financials: Sequence[FinancialInput]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract investment, monthly revenue and monthly cost arrays.
+    
+    Args:
+        financials: FinancialAnalysisData objects or their dictionaries
+    
+    Returns:
+        Tuple of (investment, monthly_revenue, monthly_operating_costs) arrays
+    """
+    count = len(financials)
+    investment = np.empty(count)
+    revenue = np.empty(count)
+    costs = np.empty(count)
+    
+    for index, financial in enumerate(financials):
+        funding = float(_field(financial, "funding_requirements") or 0.0)
+        investment[index] = funding if funding > 0 else sum((_field(financial, "startup_costs") or {}).values())
+        revenue[index] = monthly_revenue_from_projections(_field(financial, "revenue_projections") or {})
+        costs[index] = sum((_field(financial, "monthly_operating_costs") or {}).values())
+    
+    return investment, revenue, costs
+
+
+def _annuity_factor(monthly_rate: np.ndarray, months: Union[int, np.ndarray]) -> np.ndarray:
+    """Present value of one unit per month for the given months and rate."""
+    monthly_rate = np.asarray(monthly_rate, dtype=np.float64)
+    near_zero = np.abs(monthly_rate) < 1e-12
+    safe_rate = np.where(near_zero, 1.0, monthly_rate)
+    factor = (1.0 - (1.0 + safe_rate) ** -np.asarray(months, dtype=np.float64)) / safe_rate
+    return np.where(near_zero, months, factor)
+
+
+def compute_metric_arrays(
+    investment: np.ndarray,
+    monthly_revenue: np.ndarray,
+    monthly_operating_costs: np.ndarray,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE
+) -> Dict[str, np.ndarray]:
+    """
+    Compute financial metrics for many locations at once.
+    
+    Cash flows are modeled as an upfront investment followed by a constant
+    monthly net income over the horizon. Metrics that are undefined (for
+    example break-even when costs exceed revenue) are ``inf`` or ``nan``.
+    
+    Args:
+        investment: Upfront investment per location
+        monthly_revenue: Monthly revenue per location
+        monthly_operating_costs: Monthly operating costs per location
+        horizon_months: Analysis horizon for ROI, NPV and IRR
+        annual_discount_rate: Annual discount rate for NPV
+    
+    Returns:
+        Mapping of metric name to an array with one value per location
+    """
+    investment = np.asarray(investment, dtype=np.float64)
+    monthly_revenue = np.asarray(monthly_revenue, dtype=np.float64)
+    monthly_operating_costs = np.asarray(monthly_operating_costs, dtype=np.float64)
+    
+    net = monthly_revenue - monthly_operating_costs
+    profitable = net > 0
+    funded = investment > 0
+    monthly_rate = (1.0 + annual_discount_rate) ** (1.0 / 12.0) - 1.0
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even = np.where(profitable, investment / np.where(profitable, net, 1.0), np.inf)
+        payback = np.ceil(break_even)
+        
+        if monthly_rate > 0:
+            # Share of each month's income absorbed by interest on the investment
+            recovered_share = investment * monthly_rate / np.where(profitable, net, 1.0)
+            discounted_payback = np.where(
+                profitable & (recovered_share < 1.0),
+                -np.log1p(-recovered_share) / math.log1p(monthly_rate),
+                np.inf
+            )
+        else:
+            discounted_payback = break_even
+        
+        annual_roi = np.where(funded, 12.0 * net / np.where(funded, investment, 1.0), np.nan)
+        horizon_roi = np.where(
+            funded, (net * horizon_months - investment) / np.where(funded, investment, 1.0), np.nan
+        )
+    
+    npv = -investment + net * _annuity_factor(monthly_rate, horizon_months)
+    
+    return {
+        "investment": investment,
+        "monthly_revenue": monthly_revenue,
+        "monthly_operating_costs": monthly_operating_costs,
+        "monthly_net_income": net,
+        "break_even_months": break_even,
+        "payback_months": payback,
+        "discounted_payback_months": discounted_payback,
+        "annual_roi": annual_roi,
+        "horizon_roi": horizon_roi,
+        "npv": npv,
+        "irr": compute_irr(investment, net, horizon_months)
+    }
+
+
+def compute_irr(investment: np.ndarray, monthly_net_income: np.ndarray, horizon_months: int) -> np.ndarray:
+    """
+    Annualized IRR of an upfront investment followed by level monthly income.
+    
+    A few vectorized bisection steps bracket the monthly rate for every
+    location at once, then Newton steps polish it to full precision.
+    Locations without positive income or investment get ``nan``.
+    """
+    investment = np.asarray(investment, dtype=np.float64)
+    net = np.asarray(monthly_net_income, dtype=np.float64)
+    defined = (net > 0) & (investment > 0)
+    months = float(horizon_months)
+    
+    low = np.full(investment.shape, -0.99)
+    high = np.full(investment.shape, 1.0)
+    for _ in range(IRR_BISECTION_STEPS):
+        middle = (low + high) / 2.0
+        # NPV falls as the rate rises, so a positive NPV means the IRR is higher
+        above = -investment + net * _annuity_factor(middle, months) > 0
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+    
+    rate = (low + high) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(IRR_NEWTON_STEPS):
+            factor = _annuity_factor(rate, months)
+            derivative = net * (months * (1.0 + rate) ** (-months - 1.0) - factor) / rate
+            step = (-investment + net * factor) / derivative
+            # Keep the bracketed estimate wherever Newton is unstable
+            rate = np.where(np.isfinite(step) & (np.abs(rate) > 1e-9), rate - step, rate)
+    
+    return np.where(defined, (1.0 + rate) ** 12 - 1.0, np.nan)
+
+
+def compute_metrics_batch(
+    financials: Sequence[FinancialInput],
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE
+) -> Dict[str, np.ndarray]:
+    """Compute metric arrays for a sequence of financial analyses."""
+    investment, revenue, costs = extract_inputs(financials)
+    return compute_metric_arrays(investment, revenue, costs, horizon_months, annual_discount_rate)
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    """Convert non-finite metric values to None for serialization."""
+    return float(value) if np.isfinite(value) else None
+
+
+def metrics_from_arrays(
+    arrays: Dict[str, np.ndarray],
+    index: int,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE
+) -> FinancialMetrics:
+    """Build the FinancialMetrics model for one location of a batch result."""
+    payback = _finite_or_none(arrays["payback_months"][index])
+    return FinancialMetrics(
+        investment=float(arrays["investment"][index]),
+        monthly_revenue=float(arrays["monthly_revenue"][index]),
+        monthly_operating_costs=float(arrays["monthly_operating_costs"][index]),
+        monthly_net_income=float(arrays["monthly_net_income"][index]),
+        break_even_months=_finite_or_none(arrays["break_even_months"][index]),
+        payback_months=int(payback) if payback is not None else None,
+        discounted_payback_months=_finite_or_none(arrays["discounted_payback_months"][index]),
+        annual_roi=_finite_or_none(arrays["annual_roi"][index]),
+        horizon_roi=_finite_or_none(arrays["horizon_roi"][index]),
+        npv=_finite_or_none(arrays["npv"][index]),
+        irr=_finite_or_none(arrays["irr"][index]),
+        horizon_months=horizon_months,
+        annual_discount_rate=annual_discount_rate
+    )
+
+
+def compute_financial_metrics(
+    financial: FinancialInput,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE
+) -> FinancialMetrics:
+    """Compute metrics for a single financial analysis."""
+    arrays = compute_metrics_batch([financial], horizon_months, annual_discount_rate)
+    return metrics_from_arrays(arrays, 0, horizon_months, annual_discount_rate)
+
+
+def _within(value: Optional[float], bounds: Tuple[float, float], tolerance: float) -> bool:
+    """Check whether a value falls inside a range widened by a relative tolerance."""
+    if value is None:
+        return False
+    low, high = bounds
+    return low * (1.0 - tolerance) <= value <= high * (1.0 + tolerance)
+
+
+def _overlaps(values: Tuple[float, float], bounds: Tuple[float, float], tolerance: float) -> bool:
+    """Check whether a range of values meets a range widened by a relative tolerance."""
+    low, high = bounds
+    return values[1] >= low * (1.0 - tolerance) and values[0] <= high * (1.0 + tolerance)
+
+
+def roi_over(metrics: FinancialMetrics, months: float) -> Optional[float]:
+    """Cumulative ROI after a number of months, defined like ``horizon_roi``."""
+    if metrics.annual_roi is None:
+        return None
+    return metrics.annual_roi * months / 12.0 - 1.0
+
+
+def stated_roi_horizon(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    The horizon of a cumulative ROI statement, in months.
+    
+    "45% over 3 years" -> (36, 36); "25% annual ROI", "18% in the first
+    12 months" and statements without a duration -> None (annual).
+    """
+    if not text or ANNUAL_ROI_PATTERN.search(text):
+        return None
+    horizon = parse_duration_months(text)
+    if horizon is None or horizon[1] <= 12.0:
+        return None
+    return horizon
+
+
+def check_consistency(
+    financial: FinancialAnalysisData,
+    metrics: FinancialMetrics,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Compare the LLM's break-even and ROI statements with computed metrics.
+    
+    ROI statements over a multi-year horizon ("45% over 3 years") are
+    compared with the cumulative ROI over that horizon, all others with
+    the annual ROI.
+    
+    Args:
+        financial: Financial analysis as produced by the LLM
+        metrics: Metrics computed from the same analysis
+        tolerance: Relative slack allowed around the stated ranges
+    
+    Returns:
+        (issues, notes): field name to a description of a stated value that
+        disagrees with the metrics, and of a statement with no value to check
+    """
+    issues: Dict[str, str] = {}
+    notes: Dict[str, str] = {}
+    
+    stated_break_even = parse_duration_months(financial.break_even_timeline)
+    if stated_break_even is None:
+        notes["break_even_timeline"] = (
+            f"break_even_timeline '{financial.break_even_timeline}' has no parseable duration"
+        )
+    elif not _within(metrics.break_even_months, stated_break_even, tolerance):
+        issues["break_even_timeline"] = (
+            f"break_even_timeline '{financial.break_even_timeline}' disagrees with computed "
+            f"{format_break_even(metrics)}"
+        )
+    
+    stated_roi = parse_percent_range(financial.roi_projection)
+    horizon = stated_roi_horizon(financial.roi_projection)
+    if stated_roi is None:
+        notes["roi_projection"] = f"roi_projection '{financial.roi_projection}' has no parseable percentage"
+    elif horizon is not None:
+        computed = (roi_over(metrics, horizon[0]), roi_over(metrics, horizon[1]))
+        if computed[0] is None or not _overlaps(computed, stated_roi, tolerance):
+            issues["roi_projection"] = (
+                f"roi_projection '{financial.roi_projection}' disagrees with computed "
+                f"{format_roi(metrics, horizon[1])}"
+            )
+    elif not _within(metrics.annual_roi, stated_roi, tolerance):
+        issues["roi_projection"] = (
+            f"roi_projection '{financial.roi_projection}' disagrees with computed {format_roi(metrics)}"
+        )
+    
+    return issues, notes
+
+
+def format_break_even(metrics: FinancialMetrics) -> str:
+    """Describe the computed break-even point."""
+    if metrics.break_even_months is None:
+        return "no break-even (operating costs meet or exceed revenue)"
+    return f"{metrics.break_even_months:.1f} months to break even"
+
+
+def format_roi(metrics: FinancialMetrics, months: Optional[float] = None) -> str:
+    """Describe the computed return on investment, cumulative over ``months`` (default: the horizon)."""
+    if metrics.annual_roi is None:
+        return "ROI undefined (no investment recorded)"
+    if months is None:
+        months = metrics.horizon_months
+    return f"{metrics.annual_roi:.0%} annual ROI, {roi_over(metrics, months):.0%} cumulative over {months:.0f} months"
+
+
+def reconcile_financial_analysis(
+    financial: FinancialAnalysisData,
+    replace_inconsistent: bool = True,
+    tolerance: float = DEFAULT_TOLERANCE,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE,
+    metrics: Optional[FinancialMetrics] = None
+) -> FinancialAnalysisData:
+    """
+    Attach computed metrics and flag or replace inconsistent LLM statements.
+    
+    Only statements whose value was parsed and falls outside the tolerance
+    are replaced; statements with nothing to check are kept and noted.
+    
+    Args:
+        financial: Financial analysis as produced by the LLM
+        replace_inconsistent: Overwrite inconsistent text fields with computed values
+        tolerance: Relative slack allowed around the stated ranges
+        horizon_months: Analysis horizon for ROI, NPV and IRR
+        annual_discount_rate: Annual discount rate for NPV
+        metrics: Precomputed metrics (used by the batch path)
+    
+    Returns:
+        A copy of the analysis with derived_metrics, consistency_flags and consistency_notes set
+    """
+    if metrics is None:
+        metrics = compute_financial_metrics(financial, horizon_months, annual_discount_rate)
+    
+    issues, notes = check_consistency(financial, metrics, tolerance)
+    updates: Dict[str, Any] = {
+        "derived_metrics": metrics,
+        "consistency_flags": list(issues.values()),
+        "consistency_notes": list(notes.values())
+    }
+    
+    if replace_inconsistent:
+        if "break_even_timeline" in issues:
+            updates["break_even_timeline"] = f"{format_break_even(metrics)} (computed from projections)"
+        if "roi_projection" in issues:
+            updates["roi_projection"] = f"{format_roi(metrics)} (computed from projections)"
+    
+    return financial.copy(update=updates)
+
+
+def reconcile_many(
+    financials: Sequence[FinancialAnalysisData],
+    replace_inconsistent: bool = True,
+    tolerance: float = DEFAULT_TOLERANCE,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    annual_discount_rate: float = DEFAULT_ANNUAL_DISCOUNT_RATE
+) -> List[FinancialAnalysisData]:
+    """Reconcile many analyses, computing all metrics in one vectorized pass."""
+    arrays = compute_metrics_batch(financials, horizon_months, annual_discount_rate)
+    return [
+        reconcile_financial_analysis(
+            financial,
+            replace_inconsistent=replace_inconsistent,
+            tolerance=tolerance,
+            metrics=metrics_from_arrays(arrays, index, horizon_months, annual_discount_rate)
+        )
+        for index, financial in enumerate(financials)
+    ]
@@ -0,0 +1,128 @@
+"""
+Bundled, versioned knowledge base of permit requirements by jurisdiction.
+
+``data/permit_kb.json`` lists the permits, fees and typical timeline for
+each state and for the cities researched most often. Entries are indexed
+by (state, city) on the canonical location, with each city's aliases
+(e.g. "nyc", "brooklyn") pointing at the same entry. A lookup tries the
+longest prefix first: the city, then its state. A city entry fills the
+operations analysis permit fields directly; a state entry grounds the
+LLM's research of the city and county requirements.
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from utils.location import normalize_city, normalize_state, split_location
+
+
+PERMIT_KB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "permit_kb.json")
+
+# Fields of OperationsAnalysisData a knowledge base entry provides
+PERMIT_FIELDS = ("permits_required", "permit_costs", "permit_timeline")
+
+
+class PermitRequirements(BaseModel):
+    """Permit requirements of one jurisdiction from the knowledge base."""
+    
+    jurisdiction: str = Field(description="Canonical location of a city entry, or the state code")
+    name: str = Field(description="Display name, e.g. 'Austin, TX' or 'Texas'")
+    level: str = Field(description="'city' or 'state'")
+    permits_required: List[str] = Field(description="Permits and licenses required")
+    permit_costs: Dict[str, float] = Field(description="Typical fee per permit/license")
+    permit_timeline: str = Field(description="Typical time to obtain all permits")
+    version: str = Field(description="Knowledge base version the entry comes from")
+    
+    @property
+    def source(self) -> str:
+        """Provenance note for results built from this entry."""
+        return f"{self.name} (permit knowledge base {self.version})"
+    
+    def operations_fields(self) -> Dict[str, Any]:
+        """The OperationsAnalysisData fields this entry fills, with their source."""
+        fields = {field: getattr(self, field) for field in PERMIT_FIELDS}
+        fields["permit_source"] = self.source
+        return fields
+    
+    def format(self) -> str:
+        """Format the entry as grounding context for an LLM prompt."""
+        fees = ", ".join(f"{name} ${cost:,.0f}" for name, cost in self.permit_costs.items())
+        return "\n".join([
+            f"KNOWN PERMIT REQUIREMENTS FOR {self.name.upper()} ({self.level}-level, permit knowledge base {self.version}):",
+            f"- Permits: {'; '.join(self.permits_required)}",
+            f"- Typical fees: {fees}",
+            f"- Typical timeline: {self.permit_timeline}"
+        ])
+
+
+class PermitKnowledgeBase:
+    """
+    Permit requirements indexed by (state, city) prefix and city alias.
+    
+    Args:
+        data: Parsed knowledge base with "version" and "states"
+    
+    Raises:
+        ValueError: If the data has no version or two cities share an alias
+    """
+    
+    def __init__(self, data: Dict[str, Any]):
+        if not data.get("version"):
+            raise ValueError("Permit knowledge base has no version")
+        self.version: str = data["version"]
+        self.updated: Optional[str] = data.get("updated")
+        self._entries: Dict[Tuple[str, ...], PermitRequirements] = {}
+        
+        for state, state_entry in data.get("states", {}).items():
+            code = normalize_state(state)
+            self._entries[(code,)] = self._requirements(code, state_entry.get("name", code), "state", state_entry)
+            for city, city_entry in state_entry.get("cities", {}).items():
+                name = city_entry.get("name", f"{city.title()}, {code}")
+                requirements = self._requirements(f"{normalize_city(city)}, {code}", name, "city", city_entry)
+                for alias in [city] + city_entry.get("aliases", []):
+                    key = (code, normalize_city(alias))
+                    if key in self._entries:
+                        raise ValueError(f"Duplicate permit knowledge base entry for '{alias}, {code}'")
+                    self._entries[key] = requirements
+    
+    def _requirements(self, jurisdiction: str, name: str, level: str, entry: Dict[str, Any]) -> PermitRequirements:
+        return PermitRequirements(
+            jurisdiction=jurisdiction,
+            name=name,
+            level=level,
+            permits_required=entry["permits_required"],
+            permit_costs=entry.get("permit_costs", {}),
+            permit_timeline=entry.get("permit_timeline", ""),
+            version=self.version
+        )
+    
+    def __len__(self) -> int:
+        return len(set(entry.jurisdiction for entry in self._entries.values()))
+    
+    def lookup(self, location: str) -> Optional[PermitRequirements]:
+        """
+        The most specific entry for a location: its city (or a city alias), else its state.
+        
+        Args:
+            location: Location in any spelling accepted by ``canonical_location``
+        
+        Returns:
+            The entry, or None if neither the city nor the state is covered
+        """
+        city, state = split_location(location)
+        for key in ((state, city), (state,)):
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_permit_kb(path: str = PERMIT_KB_PATH) -> PermitKnowledgeBase:
+    """Load and index the bundled permit knowledge base (once per process)."""
+    with open(path, encoding="utf-8") as handle:
+        return PermitKnowledgeBase(json.load(handle))
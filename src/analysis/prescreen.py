@@ -0,0 +1,270 @@
+"""
+Deterministic pre-screen of a location ahead of the business synthesis LLM.
+
+A rule-based score over the market, financial and operations outputs (and
+the Monte Carlo risk profile when available). Each rule adds or subtracts
+points from a neutral 50 and records a reason code, so the preliminary
+recommendation can be explained and compared with the LLM's decision.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from analysis.financial_metrics import compute_financial_metrics
+from models.research_models import (
+    FoodTruckResearchState,
+    PrescreenResult,
+    RecommendationType,
+    RiskProfile
+)
+from utils.text_parsing import parse_duration_months
+
+
+NEUTRAL_SCORE = 50.0
+
+
+class PrescreenConfig(BaseModel):
+    """Thresholds and rule points for the pre-screen score."""
+    
+    go_threshold: float = Field(default=65.0, description="Scores at or above this are GO")
+    no_go_threshold: float = Field(default=35.0, description="Scores at or below this are NO_GO")
+    decisive_go_score: float = Field(default=85.0, description="GO scores at or above this may skip the LLM")
+    decisive_no_go_score: float = Field(default=15.0, description="NO_GO scores at or below this may skip the LLM")
+    
+    low_funding: float = Field(default=75000.0, description="Funding at or below this earns FUNDING_LOW")
+    high_funding: float = Field(default=150000.0, description="Funding above this earns FUNDING_HIGH")
+    fast_break_even_months: float = Field(default=18.0)
+    slow_break_even_months: float = Field(default=36.0)
+    fast_permit_months: float = Field(default=2.0)
+    slow_permit_months: float = Field(default=6.0)
+    decision_month: int = Field(default=24, description="Month at which break-even probability is judged")
+    high_break_even_probability: float = Field(default=0.75)
+    low_break_even_probability: float = Field(default=0.35)
+    
+    points: Dict[str, float] = Field(
+        default_factory=lambda: {
+            "COMPETITION_LOW": 10.0,
+            "COMPETITION_HIGH": -10.0,
+            "FUNDING_LOW": 5.0,
+            "FUNDING_HIGH": -10.0,
+            "NOT_PROFITABLE": -35.0,
+            "BREAK_EVEN_FAST": 10.0,
+            "BREAK_EVEN_SLOW": -15.0,
+            "NPV_POSITIVE": 10.0,
+            "NPV_NEGATIVE": -10.0,
+            "BREAK_EVEN_LIKELY": 15.0,
+            "BREAK_EVEN_UNLIKELY": -20.0,
+            "PERMITS_FAST": 5.0,
+            "PERMITS_SLOW": -5.0,
+            "PROJECTIONS_CORRECTED": -5.0
+        },
+        description="Points added to the score by each reason code"
+    )
+
+
+def load_prescreen_config(path: Optional[str] = None) -> Optional[PrescreenConfig]:
+    """
+    Pre-screen thresholds from a JSON file, or None if no path is given.
+    
+    The file holds any PrescreenConfig fields, e.g.
+    ``{"decisive_go_score": 90, "points": {"PERMITS_SLOW": -10}}``; rule
+    points not listed keep their defaults.
+    """
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    points = {**PrescreenConfig().points, **data.pop("points", {})}
+    return PrescreenConfig(**data, points=points)
+
+
+# Human-readable wording used when the pre-screen supplies the recommendation
+REASON_DESCRIPTIONS = {
+    "COMPETITION_LOW": "Low competition in the local food truck market",
+    "COMPETITION_HIGH": "High competition in the local food truck market",
+    "FUNDING_LOW": "Modest funding requirement",
+    "FUNDING_HIGH": "High funding requirement",
+    "NOT_PROFITABLE": "Projected operating costs exceed projected revenue",
+    "BREAK_EVEN_FAST": "Fast projected break-even",
+    "BREAK_EVEN_SLOW": "Slow or no projected break-even",
+    "NPV_POSITIVE": "Positive net present value over the analysis horizon",
+    "NPV_NEGATIVE": "Negative net present value over the analysis horizon",
+    "BREAK_EVEN_LIKELY": "High simulated probability of breaking even",
+    "BREAK_EVEN_UNLIKELY": "Low simulated probability of breaking even",
+    "PERMITS_FAST": "Short permit timeline",
+    "PERMITS_SLOW": "Long permit timeline",
+    "PROJECTIONS_CORRECTED": "Stated projections disagreed with the computed metrics"
+}
+
+# Sections whose absence prevents a decisive result
+REQUIRED_SECTIONS = ("market_research", "financial_analysis", "operations_analysis")
+
+
+def prescreen(
+    state: FoodTruckResearchState,
+    risk_profile: Optional[RiskProfile] = None,
+    config: Optional[PrescreenConfig] = None
+) -> PrescreenResult:
+    """
+    Score a location from the upstream agents' structured outputs.
+    
+    Args:
+        state: Research state with market, financial and operations analysis
+        risk_profile: Monte Carlo risk profile, if already simulated
+        config: Thresholds and rule points (defaults to PrescreenConfig())
+    
+    Returns:
+        PrescreenResult with score, preliminary recommendation and reason codes
+    """
+    config = config or PrescreenConfig()
+    reasons: List[str] = []
+    
+    market = state.market_research
+    if market:
+        if market.competition_level == "Low":
+            reasons.append("COMPETITION_LOW")
+        elif market.competition_level == "High":
+            reasons.append("COMPETITION_HIGH")
+    
+    financial = state.financial_analysis
+    if financial:
+        if financial.funding_requirements <= config.low_funding:
+            reasons.append("FUNDING_LOW")
+        elif financial.funding_requirements > config.high_funding:
+            reasons.append("FUNDING_HIGH")
+        
+        metrics = financial.derived_metrics or compute_financial_metrics(financial)
+        if metrics.monthly_net_income <= 0:
+            reasons.append("NOT_PROFITABLE")
+        elif metrics.break_even_months is not None and metrics.break_even_months <= config.fast_break_even_months:
+            reasons.append("BREAK_EVEN_FAST")
+        elif metrics.break_even_months is None or metrics.break_even_months > config.slow_break_even_months:
+            reasons.append("BREAK_EVEN_SLOW")
+        
+        if metrics.npv is not None:
+            reasons.append("NPV_POSITIVE" if metrics.npv > 0 else "NPV_NEGATIVE")
+        if financial.consistency_flags:
+            reasons.append("PROJECTIONS_CORRECTED")
+    
+    if risk_profile:
+        probability = risk_profile.probability_by(config.decision_month)
+        if probability >= config.high_break_even_probability:
+            reasons.append("BREAK_EVEN_LIKELY")
+        elif probability < config.low_break_even_probability:
+            reasons.append("BREAK_EVEN_UNLIKELY")
+    
+    operations = state.operations_analysis
+    if operations:
+        permit_months = parse_duration_months(operations.permit_timeline)
+        if permit_months:
+            if permit_months[1] <= config.fast_permit_months:
+                reasons.append("PERMITS_FAST")
+            elif permit_months[1] > config.slow_permit_months:
+                reasons.append("PERMITS_SLOW")
+    
+    score = NEUTRAL_SCORE + sum(config.points.get(reason, 0.0) for reason in reasons)
+    score = min(100.0, max(0.0, score))
+    
+    missing = [section for section in REQUIRED_SECTIONS if getattr(state, section) is None]
+    reasons.extend(f"MISSING_{section.upper()}" for section in missing)
+    
+    if score >= config.go_threshold:
+        recommendation = RecommendationType.GO
+    elif score <= config.no_go_threshold:
+        recommendation = RecommendationType.NO_GO
+    else:
+        recommendation = RecommendationType.CONDITIONAL
+    
+    decisive = not missing and (score >= config.decisive_go_score or score <= config.decisive_no_go_score)
+    if decisive:
+        confidence = "High"
+    elif recommendation != RecommendationType.CONDITIONAL and not missing:
+        confidence = "Medium"
+    else:
+        confidence = "Low"
+    
+    return PrescreenResult(
+        score=score,
+        recommendation=recommendation,
+        confidence_level=confidence,
+        reason_codes=reasons,
+        decisive=decisive
+    )
+
+
+def rescore(result: Dict[str, Any], config: Optional[PrescreenConfig] = None) -> PrescreenResult:
+    """Re-run the pre-screen over a stored result's sections and risk profile."""
+    business = result.get("business_recommendation") or {}
+    state = FoodTruckResearchState(
+        location=result.get("location", ""),
+        market_research=result.get("market_research"),
+        financial_analysis=result.get("financial_analysis"),
+        operations_analysis=result.get("operations_analysis")
+    )
+    risk_profile = RiskProfile(**business["risk_profile"]) if business.get("risk_profile") else None
+    return prescreen(state, risk_profile, config)
+
+
+def agreement_rate(results: Iterable[Dict[str, Any]], config: Optional[PrescreenConfig] = None) -> Dict[str, Any]:
+    """
+    Measure how often the pre-screen agrees with the LLM recommendation.
+    
+    Results whose recommendation was taken from the pre-screen are counted
+    as skipped, not as agreement.
+    
+    Args:
+        results: Result dictionaries as returned by ``run_research``
+        config: Re-score every result with these thresholds instead of using
+            its stored pre-screen
+    
+    Returns:
+        Dictionary with compared/agreed/skipped counts, the overall and
+        decisive-only agreement rates, and a (prescreen, llm) confusion count
+    """
+    compared = agreed = skipped = decisive_compared = decisive_agreed = 0
+    confusion: Dict[Tuple[str, str], int] = {}
+    
+    for result in results:
+        business = result.get("business_recommendation") or {}
+        screen = business.get("prescreen")
+        if not screen:
+            continue
+        if screen.get("applied"):
+            skipped += 1
+            continue
+        if config is not None:
+            screen = rescore(result, config).dict()
+        
+        predicted = getattr(screen["recommendation"], "value", screen["recommendation"])
+        actual = getattr(business.get("recommendation"), "value", business.get("recommendation"))
+        match = predicted == actual
+        compared += 1
+        agreed += match
+        if screen.get("decisive"):
+            decisive_compared += 1
+            decisive_agreed += match
+        confusion[(predicted, actual)] = confusion.get((predicted, actual), 0) + 1
+    
+    return {
+        "compared": compared,
+        "agreed": agreed,
+        "skipped": skipped,
+        "agreement_rate": agreed / compared if compared else None,
+        "decisive_agreement_rate": decisive_agreed / decisive_compared if decisive_compared else None,
+        "confusion": {f"{predicted}->{actual}": count for (predicted, actual), count in sorted(confusion.items())}
+    }
+
+
+def describe_reasons(result: PrescreenResult, config: Optional[PrescreenConfig] = None) -> Tuple[List[str], List[str]]:
+    """Split a result's reason codes into (strengths, risks) descriptions by the sign of their points."""
+    config = config or PrescreenConfig()
+    strengths: List[str] = []
+    risks: List[str] = []
+    for reason in result.reason_codes:
+        description = REASON_DESCRIPTIONS.get(reason)
+        if not description:
+            continue
+        (strengths if config.points.get(reason, 0.0) > 0 else risks).append(description)
+    return strengths, risks
@@ -0,0 +1,312 @@
+"""
+Multi-location ranking and top-k comparison of research results.
+
+Stored results are flattened into columns (see storage.columnar_export) and
+scored with one vectorized pass. The composite score is a weighted average
+of five components, each scaled to 0-1:
+
+- competition: Low / Medium / High competition level
+- funding: funding requirement relative to a budget ceiling
+- margin: computed net margin relative to a target margin
+- permit_timeline: months to obtain permits relative to a maximum
+- recommendation: GO / CONDITIONAL / NO_GO, pulled toward neutral by lower confidence
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from storage.columnar_export import ColumnarResults, flatten_results
+from utils.location import split_location
+from utils.text_parsing import parse_duration_months
+
+
+COMPETITION_SCORES = {"low": 1.0, "medium": 0.6, "high": 0.2}
+RECOMMENDATION_SCORES = {"go": 1.0, "conditional": 0.5, "no_go": 0.0}
+CONFIDENCE_WEIGHTS = {"high": 1.0, "medium": 0.75, "low": 0.5}
+
+# Used for any component whose input is missing
+NEUTRAL_SCORE = 0.5
+
+COMPONENTS = ("competition", "funding", "margin", "permit_timeline", "recommendation")
+
+ColumnSource = Union[Mapping[str, np.ndarray], ColumnarResults]
+
+
+class RankingConfig(BaseModel):
+    """Weights and scales for the composite location score."""
+    
+    competition_weight: float = Field(default=0.20, ge=0)
+    funding_weight: float = Field(default=0.20, ge=0)
+    margin_weight: float = Field(default=0.20, ge=0)
+    permit_timeline_weight: float = Field(default=0.15, ge=0)
+    recommendation_weight: float = Field(default=0.25, ge=0)
+    funding_ceiling: float = Field(default=250000.0, gt=0, description="Funding at or above this scores 0")
+    target_margin: float = Field(default=0.25, gt=0, description="Net margin at or above this scores 1")
+    max_permit_months: float = Field(default=6.0, gt=0, description="Permit timelines at or above this score 0")
+    
+    def weights(self) -> Dict[str, float]:
+        """Component weights keyed by component name."""
+        return {component: getattr(self, f"{component}_weight") for component in COMPONENTS}
+    
+    @classmethod
+    def from_spec(cls, spec: str) -> "RankingConfig":
+        """
+        Build a config from a "name=value,..." string, e.g. "funding=0.4,margin=0.1".
+        
+        Component names set weights; other names set RankingConfig fields.
+        
+        Raises:
+            ValueError: If a name is unknown or a value is not a number
+        """
+        values: Dict[str, float] = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, value = item.partition("=")
+            name = name.strip()
+            field = f"{name}_weight" if name in COMPONENTS else name
+            if field not in cls.__fields__:
+                raise ValueError(f"Unknown ranking option '{name}'")
+            values[field] = float(value)
+        return cls(**values)
+
+
+def _column(columns: ColumnSource, name: str, size: int, fill: Any) -> np.ndarray:
+    """Return a column (decoded if categorical) or a filled array if it is absent."""
+    if isinstance(columns, ColumnarResults):
+        return np.asarray(columns.decode(name)) if name in columns else np.full(size, fill)
+    return np.asarray(columns[name]) if name in columns else np.full(size, fill)
+
+
+def _lookup(values: np.ndarray, table: Mapping[str, float], default: float) -> np.ndarray:
+    """Map a text column through a score table, scoring each distinct label once."""
+    labels, inverse = np.unique(np.char.lower(values.astype(str)), return_inverse=True)
+    scores = np.array([table.get(label, default) for label in labels], dtype=np.float64)
+    return scores[inverse].reshape(values.shape)
+
+
+def _permit_months(values: np.ndarray) -> np.ndarray:
+    """Midpoint of each permit timeline in months (NaN if unparseable), parsing each distinct text once."""
+    texts, inverse = np.unique(values.astype(str), return_inverse=True)
+    months = np.full(len(texts), np.nan)
+    for index, text in enumerate(texts):
+        parsed = parse_duration_months(text)
+        if parsed:
+            months[index] = sum(parsed) / 2.0
+    return months[inverse].reshape(values.shape)
+
+
+def _net_margin(columns: ColumnSource, size: int) -> np.ndarray:
+    """Computed net margin, falling back to the LLM's stated net margin."""
+    net_income = _column(columns, "derived_metrics__monthly_net_income", size, np.nan).astype(np.float64)
+    revenue = _column(columns, "derived_metrics__monthly_revenue", size, np.nan).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(revenue > 0, net_income / revenue, np.nan)
+    
+    stated = _column(columns, "profit_margins__net_margin", size, np.nan).astype(np.float64)
+    # Stated margins are sometimes given as percentages (15 rather than 0.15)
+    stated = np.where(stated > 1.0, stated / 100.0, stated)
+    return np.where(np.isnan(margin), stated, margin)
+
+
+def score_columns(columns: ColumnSource, config: Optional[RankingConfig] = None) -> Dict[str, np.ndarray]:
+    """
+    Score every location in a set of flattened result columns.
+    
+    Args:
+        columns: Output of ``flatten_results`` or an opened columnar export
+        config: Weights and scales (defaults to RankingConfig())
+    
+    Returns:
+        Mapping with a 0-100 "score" array, one 0-1 array per component and
+        the raw inputs used ("funding_requirements", "net_margin", "permit_months")
+    """
+    config = config or RankingConfig()
+    size = len(columns["location"])
+    
+    funding = _column(columns, "funding_requirements", size, np.nan).astype(np.float64)
+    net_margin = _net_margin(columns, size)
+    permit_months = _permit_months(_column(columns, "permit_timeline", size, ""))
+    
+    recommendation = _lookup(_column(columns, "recommendation", size, ""), RECOMMENDATION_SCORES, NEUTRAL_SCORE)
+    confidence = _lookup(_column(columns, "confidence_level", size, ""), CONFIDENCE_WEIGHTS, CONFIDENCE_WEIGHTS["low"])
+    
+    components = {
+        "competition": _lookup(_column(columns, "competition_level", size, ""), COMPETITION_SCORES, NEUTRAL_SCORE),
+        "funding": np.clip(1.0 - funding / config.funding_ceiling, 0.0, 1.0),
+        "margin": np.clip(net_margin / config.target_margin, 0.0, 1.0),
+        "permit_timeline": np.clip(1.0 - permit_months / config.max_permit_months, 0.0, 1.0),
+        "recommendation": NEUTRAL_SCORE + (recommendation - NEUTRAL_SCORE) * confidence
+    }
+    
+    weights = config.weights()
+    total_weight = sum(weights.values()) or 1.0
+    score = np.zeros(size)
+    for component, values in components.items():
+        components[component] = np.where(np.isnan(values), NEUTRAL_SCORE, values)
+        score += weights[component] * components[component]
+    
+    return {
+        "score": score * 100.0 / total_weight,
+        **components,
+        "funding_requirements": funding,
+        "net_margin": net_margin,
+        "permit_months": permit_months
+    }
+
+
+def _optional_float(value: float) -> Optional[float]:
+    """Convert NaN to None for report rows."""
+    return None if np.isnan(value) else float(value)
+
+
+def _ranked_order(score: np.ndarray, funding: np.ndarray, locations: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """
+    Indices of the top-k rows by score.
+    
+    Ties are broken by lower funding, then location name. Partial selection
+    keeps this O(n) plus a sort of the candidates only; every row tied with
+    the k-th score stays a candidate so ties never depend on input order.
+    """
+    candidates = np.arange(len(score))
+    if k is not None and k < len(score):
+        kth_score = score[np.argpartition(-score, k - 1)[k - 1]]
+        candidates = np.nonzero(score >= kth_score)[0]
+    
+    tie_funding = np.where(np.isnan(funding[candidates]), np.inf, funding[candidates])
+    order = candidates[np.lexsort((locations[candidates], tie_funding, -score[candidates]))]
+    return order if k is None else order[:k]
+
+
+def rank_locations(
+    results: Union[Iterable[Dict[str, Any]], ColumnSource],
+    k: Optional[int] = 10,
+    config: Optional[RankingConfig] = None,
+    states: Optional[Sequence[str]] = None,
+    exclude_recommendations: Sequence[str] = (),
+    min_score: Optional[float] = None,
+    max_funding: Optional[float] = None,
+    group_by_state: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Rank locations by composite score and return the top k.
+    
+    Args:
+        results: Result dictionaries, flattened columns or a columnar export
+        k: Number of locations to return (per state when grouping; None for all)
+        config: Weights and scales
+        states: Only include these two-letter state codes
+        exclude_recommendations: Recommendations to drop, e.g. ("no_go",)
+        min_score: Drop locations scoring below this
+        max_funding: Drop locations needing more funding than this
+        group_by_state: Rank within each state instead of overall
+    
+    Returns:
+        Ranked rows with rank, location, state, score, component scores and inputs
+    """
+    if isinstance(results, (ColumnarResults, Mapping)):
+        columns = results
+    else:
+        columns = flatten_results(results)
+    if "location" not in columns or not len(columns["location"]):
+        return []
+    
+    locations = np.asarray(columns["location"]).astype(str)
+    location_states = np.array([split_location(location)[1] for location in locations], dtype=str)
+    scored = score_columns(columns, config)
+    size = len(locations)
+    
+    keep = np.ones(size, dtype=bool)
+    status = _column(columns, "status", size, "success").astype(str)
+    keep &= (status == "success") | (status == "")
+    if states:
+        keep &= np.isin(location_states, [state.upper() for state in states])
+    if exclude_recommendations:
+        recommendations = np.char.lower(_column(columns, "recommendation", size, "").astype(str))
+        keep &= ~np.isin(recommendations, [value.lower() for value in exclude_recommendations])
+    if min_score is not None:
+        keep &= scored["score"] >= min_score
+    if max_funding is not None:
+        keep &= ~(scored["funding_requirements"] > max_funding)
+    
+    kept = np.nonzero(keep)[0]
+    if group_by_state:
+        order_parts = []
+        for state in np.unique(location_states[kept]):
+            group = kept[location_states[kept] == state]
+            group_order = _ranked_order(
+                scored["score"][group], scored["funding_requirements"][group], locations[group], k
+            )
+            order_parts.append(group[group_order])
+        order = np.concatenate(order_parts) if order_parts else kept
+    else:
+        order = kept[_ranked_order(scored["score"][kept], scored["funding_requirements"][kept], locations[kept], k)]
+    
+    recommendations = _column(columns, "recommendation", size, "").astype(str)
+    confidence = _column(columns, "confidence_level", size, "").astype(str)
+    competition = _column(columns, "competition_level", size, "").astype(str)
+    
+    rows = []
+    rank = 0
+    previous_state = None
+    for index in order:
+        if group_by_state and location_states[index] != previous_state:
+            rank = 0
+            previous_state = location_states[index]
+        rank += 1
+        rows.append({
+            "rank": rank,
+            "location": str(locations[index]),
+            "state": str(location_states[index]),
+            "score": round(float(scored["score"][index]), 2),
+            "components": {component: round(float(scored[component][index]), 4) for component in COMPONENTS},
+            "recommendation": recommendations[index],
+            "confidence_level": confidence[index],
+            "competition_level": competition[index],
+            "funding_requirements": _optional_float(scored["funding_requirements"][index]),
+            "net_margin": _optional_float(scored["net_margin"][index]),
+            "permit_months": _optional_float(scored["permit_months"][index])
+        })
+    return rows
+
+
+def format_ranking_report(
+    rows: Sequence[Dict[str, Any]],
+    config: Optional[RankingConfig] = None,
+    group_by_state: bool = False
+) -> str:
+    """Render ranked rows as a Markdown comparison report, with one table per state when grouped."""
+    config = config or RankingConfig()
+    weights = config.weights()
+    weight_text = ", ".join(f"{component.replace('_', ' ')} {weight:g}" for component, weight in weights.items())
+    
+    lines = [
+        "# Food Truck Location Ranking",
+        "",
+        f"Weights: {weight_text}",
+        ""
+    ]
+    if not rows:
+        lines.append("No locations matched.")
+        return "\n".join(lines)
+    
+    header = (
+        "| Rank | Location | Score | Recommendation | Confidence | Competition | Funding | Net Margin | Permits (mo) |\n"
+        "|---:|---|---:|---|---|---|---:|---:|---:|"
+    )
+    current_state = None
+    for index, row in enumerate(rows):
+        if group_by_state and (index == 0 or row["state"] != current_state):
+            current_state = row["state"]
+            lines += ["", f"## {current_state or 'Unknown state'}", "", header]
+        elif index == 0:
+            lines.append(header)
+        
+        funding = f"${row['funding_requirements']:,.0f}" if row["funding_requirements"] is not None else "N/A"
+        margin = f"{row['net_margin']:.0%}" if row["net_margin"] is not None else "N/A"
+        permits = f"{row['permit_months']:.1f}" if row["permit_months"] is not None else "N/A"
+        lines.append(
+            f"| {row['rank']} | {row['location']} | {row['score']:.1f} | {(row['recommendation'] or 'N/A').upper()} "
+            f"| {row['confidence_level'] or 'N/A'} | {row['competition_level'] or 'N/A'} | {funding} | {margin} | {permits} |"
+        )
+    return "\n".join(lines)
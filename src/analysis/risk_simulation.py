@@ -0,0 +1,247 @@
+"""
+Vectorized Monte Carlo risk simulation for food truck financial projections.
+
+Each scenario draws multiplicative shocks for revenue, operating costs and
+startup investment around the FinancialAnalysisData point estimates, and
+applies a seasonal revenue profile derived from the market research. The
+cumulative cash position of every scenario is linear in those shocks, so
+each month is a handful of array operations over all scenarios at once.
+"""
+
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from analysis.financial_metrics import extract_inputs
+from models.research_models import FinancialAnalysisData, MarketResearchData, RiskProfile
+
+
+DEFAULT_SCENARIOS = 1_000_000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Scenarios processed per chunk; bounds memory at roughly 60 bytes per scenario
+CHUNK_SIZE = 250_000
+
+# Percentile curves are estimated from this many scenarios; the sampling error
+# at 200k draws is far below the spread of the curves themselves
+PERCENTILE_SAMPLE_SIZE = 200_000
+
+WINTER_MONTHS = (12, 1, 2)
+SPRING_MONTHS = (3, 4, 5)
+SUMMER_MONTHS = (6, 7, 8)
+
+# (keywords that must all appear, months affected, revenue multiplier)
+SEASONAL_RULES: List[Tuple[Tuple[str, ...], Tuple[int, ...], float]] = [
+    (("winter",), WINTER_MONTHS, 0.75),
+    (("cold",), WINTER_MONTHS, 0.85),
+    (("snow",), WINTER_MONTHS, 0.85),
+    (("summer", "heat"), SUMMER_MONTHS, 0.85),
+    (("summer", "hot"), SUMMER_MONTHS, 0.85),
+    (("summer", "peak"), SUMMER_MONTHS, 1.2),
+    (("summer", "busy"), SUMMER_MONTHS, 1.2),
+    (("touris",), SUMMER_MONTHS, 1.15),
+    (("student",), SUMMER_MONTHS, 0.8),
+    (("school",), SUMMER_MONTHS, 0.85),
+    (("rain",), SPRING_MONTHS, 0.9),
+    (("holiday",), (11, 12), 1.1)
+]
+
+# Seasonal factors that make revenue less predictable rather than shifting it
+VOLATILITY_KEYWORDS = ("weather", "event", "festival", "unpredictable", "storm", "hurricane")
+
+
+class RiskSimulationConfig(BaseModel):
+    """Distribution assumptions for the Monte Carlo simulation."""
+    
+    revenue_volatility: float = Field(default=0.25, description="Lognormal sigma of the revenue multiplier")
+    cost_volatility: float = Field(default=0.10, description="Lognormal sigma of the operating cost multiplier")
+    startup_volatility: float = Field(default=0.10, description="Lognormal sigma of the startup cost multiplier")
+    startup_overrun: float = Field(default=0.05, description="Expected startup cost overrun (0.05 = 5%)")
+    volatility_per_factor: float = Field(default=0.05, description="Extra revenue sigma per volatility-related seasonal factor")
+    ramp_up_months: int = Field(default=3, description="Months for revenue to ramp from ramp_up_start to full")
+    ramp_up_start: float = Field(default=0.5, description="Share of full revenue earned in the first month")
+    confidence_level: float = Field(default=0.95, description="Confidence level for value-at-risk")
+
+
+def seasonal_profile(
+    seasonal_factors: Sequence[str],
+    horizon_months: int,
+    start_month: int
+) -> Tuple[np.ndarray, int]:
+    """
+    Build the monthly revenue multipliers implied by market seasonal factors.
+    
+    The calendar profile is normalized to average 1.0 so that seasonality
+    redistributes, rather than changes, the projected annual revenue.
+    
+    Args:
+        seasonal_factors: Free-text seasonal considerations from market research
+        horizon_months: Number of months to cover
+        start_month: Calendar month (1-12) of the first simulated month
+    
+    Returns:
+        Tuple of (multiplier per simulated month, count of volatility factors)
+    """
+    calendar = np.ones(12)
+    volatility_factors = 0
+    
+    for factor in seasonal_factors or []:
+        text = factor.lower()
+        for keywords, months, multiplier in SEASONAL_RULES:
+            if all(keyword in text for keyword in keywords):
+                for month in months:
+                    calendar[month - 1] *= multiplier
+        if any(keyword in text for keyword in VOLATILITY_KEYWORDS):
+            volatility_factors += 1
+    
+    calendar /= calendar.mean()
+    month_index = (np.arange(horizon_months) + start_month - 1) % 12
+    return calendar[month_index], volatility_factors
+
+
+def _ramp_profile(horizon_months: int, config: RiskSimulationConfig) -> np.ndarray:
+    """Share of full revenue earned in each month while the business ramps up."""
+    ramp = np.ones(horizon_months)
+    if config.ramp_up_months > 0:
+        steps = min(config.ramp_up_months, horizon_months)
+        ramp[:steps] = np.linspace(config.ramp_up_start, 1.0, config.ramp_up_months + 1)[:steps]
+    return ramp
+
+
+def simulate_risk(
+    financial: Union[FinancialAnalysisData, Dict],
+    market: Optional[Union[MarketResearchData, Dict]] = None,
+    scenarios: int = DEFAULT_SCENARIOS,
+    horizon_months: int = 36,
+    start_month: Optional[int] = None,
+    config: Optional[RiskSimulationConfig] = None,
+    seed: Optional[Union[int, np.random.SeedSequence]] = None,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES
+) -> RiskProfile:
+    """
+    Simulate the cumulative cash position of one location.
+    
+    Args:
+        financial: Financial analysis providing the point estimates
+        market: Market research providing seasonal factors (optional)
+        scenarios: Number of Monte Carlo scenarios
+        horizon_months: Number of months to simulate
+        start_month: Calendar month of launch (defaults to the current month)
+        config: Distribution assumptions
+        seed: Random seed for reproducible results
+        percentiles: Percentiles to report for the cash curves
+    
+    Returns:
+        RiskProfile with break-even probabilities, value-at-risk and cash curves
+    """
+    config = config or RiskSimulationConfig()
+    start_month = start_month or datetime.date.today().month
+    rng = np.random.default_rng(seed)
+    
+    investment, monthly_revenue, monthly_costs = (float(values[0]) for values in extract_inputs([financial]))
+    if isinstance(market, MarketResearchData):
+        seasonal_factors = market.seasonal_factors
+    else:
+        seasonal_factors = (market or {}).get("seasonal_factors", [])
+    
+    season, volatility_factors = seasonal_profile(seasonal_factors, horizon_months, start_month)
+    revenue_sigma = config.revenue_volatility + config.volatility_per_factor * volatility_factors
+    
+    # Cumulative revenue and cost per unit of shock, shared by every scenario
+    cumulative_revenue = monthly_revenue * np.cumsum(season * _ramp_profile(horizon_months, config))
+    cumulative_costs = monthly_costs * np.arange(1, horizon_months + 1)
+    
+    first_break_even = np.empty(scenarios, dtype=np.int16)
+    final_cash = np.empty(scenarios)
+    sample_size = min(scenarios, PERCENTILE_SAMPLE_SIZE)
+    sampled_cash = np.empty((horizon_months, sample_size))
+    
+    for chunk_start in range(0, scenarios, CHUNK_SIZE):
+        chunk_end = min(chunk_start + CHUNK_SIZE, scenarios)
+        size = chunk_end - chunk_start
+        
+        # Lognormal multipliers centered so their mean is 1 (plus any overrun)
+        revenue_shock = rng.lognormal(-revenue_sigma ** 2 / 2, revenue_sigma, size)
+        cost_shock = rng.lognormal(-config.cost_volatility ** 2 / 2, config.cost_volatility, size)
+        startup_shock = rng.lognormal(
+            np.log1p(config.startup_overrun) - config.startup_volatility ** 2 / 2,
+            config.startup_volatility,
+            size
+        )
+        
+        upfront = -investment * startup_shock
+        first = np.full(size, horizon_months + 1, dtype=np.int16)
+        cash = upfront
+        for month in range(horizon_months):
+            cash = upfront + revenue_shock * cumulative_revenue[month] - cost_shock * cumulative_costs[month]
+            first[(first > horizon_months) & (cash >= 0)] = month + 1
+            if chunk_start < sample_size:
+                sampled_cash[month, chunk_start:min(chunk_end, sample_size)] = cash[:sample_size - chunk_start]
+        
+        first_break_even[chunk_start:chunk_end] = first
+        final_cash[chunk_start:chunk_end] = cash
+    
+    # Probability of having broken even by each month
+    counts = np.bincount(first_break_even, minlength=horizon_months + 2)[1:horizon_months + 1]
+    break_even_probability = np.cumsum(counts) / scenarios
+    reached_half = np.nonzero(break_even_probability >= 0.5)[0]
+    
+    tail_cutoff = np.percentile(final_cash, (1.0 - config.confidence_level) * 100)
+    tail = final_cash[final_cash <= tail_cutoff]
+    curves = np.percentile(sampled_cash, list(percentiles), axis=1)
+    
+    return RiskProfile(
+        scenarios=scenarios,
+        horizon_months=horizon_months,
+        break_even_probability=[round(float(value), 6) for value in break_even_probability],
+        median_break_even_month=int(reached_half[0]) + 1 if len(reached_half) else None,
+        probability_of_loss=float(np.mean(final_cash < 0)),
+        expected_final_cash=float(final_cash.mean()),
+        value_at_risk=float(max(0.0, -tail_cutoff)),
+        expected_shortfall=float(max(0.0, -tail.mean())) if len(tail) else 0.0,
+        confidence_level=config.confidence_level,
+        cash_percentiles={
+            f"p{percentile}": [round(float(value), 2) for value in curve]
+            for percentile, curve in zip(percentiles, curves)
+        },
+        seasonal_profile=[round(float(value), 4) for value in season]
+    )
+
+
+def simulate_many(
+    locations: Sequence[Tuple[Union[FinancialAnalysisData, Dict], Optional[Union[MarketResearchData, Dict]]]],
+    scenarios: int = DEFAULT_SCENARIOS,
+    horizon_months: int = 36,
+    start_month: Optional[int] = None,
+    config: Optional[RiskSimulationConfig] = None,
+    seed: Optional[int] = None
+) -> List[RiskProfile]:
+    """
+    Simulate many locations, e.g. to feed batch ranking.
+    
+    Args:
+        locations: (financial analysis, market research) pairs
+        scenarios: Scenarios per location
+        horizon_months: Number of months to simulate
+        start_month: Calendar month of launch (defaults to the current month)
+        config: Distribution assumptions shared by all locations
+        seed: Base random seed; each location gets an independent stream
+    
+    Returns:
+        One RiskProfile per location, in input order
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(locations))
+    return [
+        simulate_risk(
+            financial,
+            market,
+            scenarios=scenarios,
+            horizon_months=horizon_months,
+            start_month=start_month,
+            config=config,
+            seed=location_seed
+        )
+        for (financial, market), location_seed in zip(locations, seeds)
+    ]
@@ -0,0 +1,353 @@
+"""
+What-if and sensitivity analysis over stored research results.
+
+Applies parameter overrides to a result's FinancialAnalysisData and
+recomputes the derived metrics locally, so questions such as "what if the
+truck costs $20k less and daily revenue is 15% lower?" are answered without
+re-running the agents. The synthesis LLM is only re-invoked on request.
+"""
+
+import copy
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from analysis.financial_metrics import (
+    DERIVED_FIELDS,
+    compute_financial_metrics,
+    compute_metric_arrays,
+    extract_inputs,
+    format_break_even,
+    format_roi
+)
+from analysis.risk_simulation import simulate_risk
+from models.research_models import FinancialAnalysisData, FoodTruckResearchState
+
+
+# Numeric maps whose entries can be overridden as "<map>.<key>"
+OVERRIDABLE_MAPS = ("startup_costs", "monthly_operating_costs", "revenue_projections", "profit_margins")
+OVERRIDABLE_FIELDS = ("funding_requirements",)
+
+OVERRIDE_PATTERN = re.compile(r"^\s*([\w.]+)\s*(\+=|-=|\*=|=)\s*(-?[\d.]+)\s*(%?)\s*$")
+
+DEFAULT_SENSITIVITY_METRICS = ("npv", "break_even_months", "annual_roi", "irr")
+
+
+class ParameterOverride(BaseModel):
+    """A single change to a FinancialAnalysisData field."""
+    
+    path: str = Field(description="Field path, e.g. 'startup_costs.food_truck' or 'funding_requirements'")
+    mode: str = Field(default="set", description="set, add or scale")
+    value: float = Field(description="New value, amount to add, or scale factor")
+    
+    def apply(self, current: float) -> float:
+        """Return the overridden value for a current value."""
+        if self.mode == "add":
+            return current + self.value
+        if self.mode == "scale":
+            return current * self.value
+        return self.value
+
+
+def parse_override(text: str) -> ParameterOverride:
+    """
+    Parse an override expression.
+    
+    Supported forms: "startup_costs.food_truck-=20000",
+    "revenue_projections.daily_revenue*=0.85", "revenue_projections.daily_revenue-=15%",
+    "funding_requirements=110000".
+    
+    Raises:
+        ValueError: If the expression cannot be parsed
+    """
+    match = OVERRIDE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid override '{text}'; expected e.g. 'startup_costs.food_truck-=20000'")
+    
+    path, operator, number, percent = match.groups()
+    value = float(number)
+    
+    if percent:
+        if operator not in ("+=", "-="):
+            raise ValueError(f"Percent overrides must use += or -=: '{text}'")
+        factor = 1.0 + value / 100.0 if operator == "+=" else 1.0 - value / 100.0
+        return ParameterOverride(path=path, mode="scale", value=factor)
+    
+    if operator == "*=":
+        return ParameterOverride(path=path, mode="scale", value=value)
+    if operator == "+=":
+        return ParameterOverride(path=path, mode="add", value=value)
+    if operator == "-=":
+        return ParameterOverride(path=path, mode="add", value=-value)
+    return ParameterOverride(path=path, mode="set", value=value)
+
+
+def _split_path(path: str) -> Tuple[str, Optional[str]]:
+    """Validate an override path and split it into (field, map key)."""
+    field, _, key = path.partition(".")
+    if field in OVERRIDABLE_MAPS and key:
+        return field, key
+    if field in OVERRIDABLE_FIELDS and not key:
+        return field, None
+    raise ValueError(
+        f"Unsupported override path '{path}'; use one of {', '.join(OVERRIDABLE_FIELDS)} "
+        f"or <map>.<key> for maps {', '.join(OVERRIDABLE_MAPS)}"
+    )
+
+
+def apply_overrides(
+    financial: Union[FinancialAnalysisData, Dict[str, Any]],
+    overrides: Sequence[Union[ParameterOverride, str]]
+) -> FinancialAnalysisData:
+    """
+    Apply overrides and recompute the derived metrics.
+    
+    Changes to startup costs also move the funding requirement by the same
+    amount, and a change to one revenue projection scales the other revenue
+    projections by the same ratio, unless those fields are overridden too.
+    
+    Args:
+        financial: Financial analysis to modify (not mutated)
+        overrides: ParameterOverride objects or override expressions
+    
+    Returns:
+        New FinancialAnalysisData with updated numbers, metrics and statements
+    
+    Raises:
+        ValueError: If an override names an unsupported field or a map key the analysis does not have
+    """
+    data = financial.dict() if isinstance(financial, FinancialAnalysisData) else copy.deepcopy(financial)
+    parsed = [parse_override(item) if isinstance(item, str) else item for item in overrides]
+    targets = {override.path.split(".")[0] for override in parsed}
+    
+    startup_delta = 0.0
+    
+    for override in parsed:
+        field, key = _split_path(override.path)
+        if key is None:
+            data[field] = override.apply(float(data.get(field) or 0.0))
+            continue
+        
+        values = data.get(field) or {}
+        if key not in values:
+            raise ValueError(f"Unknown key '{key}' in {field}; valid keys are: {', '.join(values) or 'none'}")
+        old_value = float(values[key])
+        new_value = override.apply(old_value)
+        values[key] = new_value
+        
+        if field == "startup_costs":
+            startup_delta += new_value - old_value
+        elif field == "revenue_projections" and old_value:
+            # Keep the other revenue horizons consistent with the changed one
+            for other_key in values:
+                if other_key != key and not any(o.path == f"revenue_projections.{other_key}" for o in parsed):
+                    values[other_key] = float(values[other_key]) * new_value / old_value
+    
+    if startup_delta and "funding_requirements" not in targets:
+        data["funding_requirements"] = float(data.get("funding_requirements") or 0.0) + startup_delta
+    
+    updated = FinancialAnalysisData(**{
+        key: value for key, value in data.items() if key not in DERIVED_FIELDS
+    })
+    metrics = compute_financial_metrics(updated)
+    
+    # The LLM's statements described the original numbers, so restate them
+    return updated.copy(update={
+        "derived_metrics": metrics,
+        "break_even_timeline": f"{format_break_even(metrics)} (what-if)",
+        "roi_projection": f"{format_roi(metrics)} (what-if)",
+        "consistency_flags": [],
+        "consistency_notes": []
+    })
+
+
+def what_if(
+    result: Dict[str, Any],
+    overrides: Sequence[Union[ParameterOverride, str]],
+    resynthesize: bool = False,
+    workflow: Optional[Any] = None,
+    risk_scenarios: int = 200_000
+) -> Dict[str, Any]:
+    """
+    Evaluate a stored result under changed financial assumptions.
+    
+    Args:
+        result: Result dictionary from ``run_research`` or the results store
+        overrides: ParameterOverride objects or override expressions
+        resynthesize: Re-run the business synthesis LLM on the changed numbers
+        workflow: FoodTruckResearchWorkflow whose business agent is used to resynthesize
+        risk_scenarios: Monte Carlo scenarios for the updated risk profile
+    
+    Returns:
+        New result dictionary with the updated financial analysis, risk profile
+        and a "what_if" summary comparing base and scenario metrics
+    """
+    if not result.get("financial_analysis"):
+        raise ValueError("Result has no financial analysis to modify")
+    
+    base = FinancialAnalysisData(**{
+        key: value for key, value in result["financial_analysis"].items()
+        if key not in DERIVED_FIELDS
+    })
+    base_metrics = compute_financial_metrics(base)
+    scenario = apply_overrides(base, overrides)
+    
+    updated = copy.deepcopy(result)
+    updated["financial_analysis"] = scenario.dict()
+    updated.pop("cache_hit", None)
+    
+    business = updated.get("business_recommendation")
+    if resynthesize:
+        if workflow is None:
+            raise ValueError("A workflow is required to resynthesize the recommendation")
+        research_state = FoodTruckResearchState(
+            location=result.get("location", ""),
+            market_research=result.get("market_research"),
+            financial_analysis=scenario,
+            operations_analysis=result.get("operations_analysis")
+        )
+        response = workflow.business_agent.process_request(research_state)
+        if response.status != "SUCCESS":
+            raise RuntimeError(response.error_details or "Business synthesis failed")
+        updated["business_recommendation"] = response.data.dict()
+    elif business and business.get("risk_profile"):
+        business["risk_profile"] = simulate_risk(
+            scenario, result.get("market_research"), scenarios=risk_scenarios
+        ).dict()
+    
+    base_values = base_metrics.dict()
+    scenario_values = scenario.derived_metrics.dict()
+    updated["what_if"] = {
+        "base_run_id": result.get("run_id"),
+        "overrides": [
+            (parse_override(item) if isinstance(item, str) else item).dict() for item in overrides
+        ],
+        "resynthesized": resynthesize,
+        "base_metrics": base_values,
+        "metric_changes": {
+            name: scenario_values[name] - base_values[name]
+            for name in DEFAULT_SENSITIVITY_METRICS
+            if base_values.get(name) is not None and scenario_values.get(name) is not None
+        }
+    }
+    return updated
+
+
+def default_sensitivity_parameters(financial: FinancialAnalysisData) -> List[str]:
+    """Every startup cost, operating cost and the primary revenue projection."""
+    parameters = [f"startup_costs.{key}" for key in financial.startup_costs]
+    parameters += [f"monthly_operating_costs.{key}" for key in financial.monthly_operating_costs]
+    for key in financial.revenue_projections:
+        if "monthly" in key.lower() or "daily" in key.lower():
+            parameters.append(f"revenue_projections.{key}")
+            break
+    return parameters
+
+
+def sensitivity_table(
+    financial: Union[FinancialAnalysisData, Dict[str, Any]],
+    parameters: Optional[Union[Sequence[str], Dict[str, Tuple[float, float]]]] = None,
+    low: float = -0.2,
+    high: float = 0.2,
+    metric: str = "npv",
+    horizon_months: int = 36,
+    annual_discount_rate: float = 0.10
+) -> List[Dict[str, Any]]:
+    """
+    Build a tornado-style sensitivity table over many parameters at once.
+    
+    Each parameter is moved to its low and high value while all others stay
+    at their base values. All 2P+1 variants are evaluated in one vectorized
+    metrics pass.
+    
+    Args:
+        financial: Base financial analysis
+        parameters: Parameter paths, or a mapping of path to (low, high) relative
+            changes; defaults to every cost item and the main revenue projection
+        low: Default relative change for the low case (-0.2 = 20% lower)
+        high: Default relative change for the high case
+        metric: Metric used to rank parameters by swing
+        horizon_months: Analysis horizon for ROI, NPV and IRR
+        annual_discount_rate: Annual discount rate for NPV
+    
+    Returns:
+        Rows ordered by descending swing, each with base, low and high values
+        of the parameter and of every default sensitivity metric
+    """
+    if not isinstance(financial, FinancialAnalysisData):
+        financial = FinancialAnalysisData(**{
+            key: value for key, value in financial.items()
+            if key not in DERIVED_FIELDS
+        })
+    
+    if parameters is None:
+        parameters = default_sensitivity_parameters(financial)
+    ranges = parameters if isinstance(parameters, dict) else {path: (low, high) for path in parameters}
+    
+    investment, revenue, costs = (values[0] for values in extract_inputs([financial]))
+    variant_investment = [investment]
+    variant_revenue = [revenue]
+    variant_costs = [costs]
+    rows: List[Dict[str, Any]] = []
+    
+    for path, (low_change, high_change) in ranges.items():
+        field, key = _split_path(path)
+        base_value = float(getattr(financial, field) if key is None else getattr(financial, field).get(key, 0.0))
+        row = {"parameter": path, "base_value": base_value}
+        
+        for case, change in (("low", low_change), ("high", high_change)):
+            delta = base_value * change
+            row[f"{case}_value"] = base_value + delta
+            case_investment, case_revenue, case_costs = investment, revenue, costs
+            if field in ("startup_costs", "funding_requirements"):
+                case_investment = investment + delta
+            elif field == "monthly_operating_costs":
+                case_costs = costs + delta
+            elif field == "revenue_projections":
+                # Revenue horizons move together, as in apply_overrides
+                case_revenue = revenue * (1.0 + change)
+            variant_investment.append(case_investment)
+            variant_revenue.append(case_revenue)
+            variant_costs.append(case_costs)
+        rows.append(row)
+    
+    arrays = compute_metric_arrays(
+        np.array(variant_investment),
+        np.array(variant_revenue),
+        np.array(variant_costs),
+        horizon_months,
+        annual_discount_rate
+    )
+    
+    base_metrics = {name: float(arrays[name][0]) for name in DEFAULT_SENSITIVITY_METRICS}
+    for index, row in enumerate(rows):
+        for name in DEFAULT_SENSITIVITY_METRICS:
+            row[f"base_{name}"] = base_metrics[name]
+            row[f"low_{name}"] = float(arrays[name][1 + 2 * index])
+            row[f"high_{name}"] = float(arrays[name][2 + 2 * index])
+        row["swing"] = abs(row[f"high_{metric}"] - row[f"low_{metric}"])
+        if np.isnan(row["swing"]):
+            row["swing"] = float("inf")
+    
+    return sorted(rows, key=lambda row: row["swing"], reverse=True)
+
+
+def format_tornado(rows: Sequence[Dict[str, Any]], metric: str = "npv", width: int = 40) -> str:
+    """Render a sensitivity table as a text tornado chart."""
+    if not rows:
+        return "No parameters to analyze."
+    
+    finite_swings = [row["swing"] for row in rows if np.isfinite(row["swing"])]
+    largest = max(finite_swings) if finite_swings else 1.0
+    label_width = max(len(row["parameter"]) for row in rows)
+    lines = [f"Sensitivity of {metric} (base {rows[0][f'base_{metric}']:,.2f})"]
+    
+    for row in rows:
+        bar_length = width if not np.isfinite(row["swing"]) else int(round(width * row["swing"] / (largest or 1.0)))
+        lines.append(
+            f"{row['parameter']:<{label_width}}  {'█' * bar_length:<{width}}  "
+            f"{row[f'low_{metric}']:>14,.2f} .. {row[f'high_{metric}']:<14,.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,450 @@
+"""
+Resumable batch runs over a file of locations.
+
+Locations are read from a CSV or plain-text file and researched with a
+bounded thread pool, optionally in several processes at once. Each finished
+location is appended to a JSON Lines output file as soon as it completes. A
+restarted batch skips every location already present in that file, so an
+interrupted run loses at most the locations that were in flight.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from reporting.renderers import write_report
+from utils.location import canonical_location
+from utils.metrics import REGISTRY
+
+
+# CSV headers accepted as the location column, in order of preference
+LOCATION_COLUMNS = ("location", "locations", "city_state", "market")
+
+
+def read_locations(path: str, column: Optional[str] = None) -> List[str]:
+    """
+    Read locations from a CSV or plain-text file.
+    
+    Text files hold one location per line; blank lines and lines starting
+    with "#" are ignored. CSV files (``.csv``) use the named column, a
+    ``location`` column, or separate ``city`` and ``state`` columns.
+    Duplicates, compared by canonical location, are dropped.
+    
+    Args:
+        path: Input file path
+        column: CSV column holding the location
+    
+    Returns:
+        Locations in file order
+    
+    Raises:
+        ValueError: If a CSV file has no usable location column
+    """
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        if path.lower().endswith(".csv") or column:
+            raw = list(_read_csv_locations(handle, column))
+        else:
+            raw = [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+    
+    locations, seen = [], set()
+    for location in raw:
+        key = canonical_location(location)
+        if key and key not in seen:
+            seen.add(key)
+            locations.append(location.strip())
+    return locations
+
+
+def _read_csv_locations(handle, column: Optional[str]) -> Iterable[str]:
+    """Yield locations from CSV rows."""
+    reader = csv.DictReader(handle)
+    fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+    
+    if column:
+        if column.strip().lower() not in fields:
+            raise ValueError(f"CSV has no column named {column!r}")
+        location_field = fields[column.strip().lower()]
+    else:
+        location_field = next((fields[name] for name in LOCATION_COLUMNS if name in fields), None)
+    
+    if location_field:
+        # Unquoted "City, ST" in the last column spills into DictReader's overflow list
+        last_column = location_field == reader.fieldnames[-1]
+        for row in reader:
+            parts = [row.get(location_field) or ""]
+            if last_column:
+                parts += row.get(None) or []
+            yield ", ".join(part.strip() for part in parts if part.strip())
+    elif "city" in fields and "state" in fields:
+        for row in reader:
+            city = (row.get(fields["city"]) or "").strip()
+            state = (row.get(fields["state"]) or "").strip()
+            yield f"{city}, {state}" if city and state else ""
+    else:
+        raise ValueError("CSV needs a 'location' column or 'city' and 'state' columns")
+
+
+def completed_locations(output_path: str, include_errors: bool = True) -> Set[str]:
+    """
+    Canonical locations already recorded in a batch output file.
+    
+    A partially written last line (from an interrupted run) is ignored.
+    
+    Args:
+        output_path: JSON Lines output of a previous run
+        include_errors: Count failed locations as done; False retries them
+    
+    Returns:
+        Set of canonical locations to skip
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    
+    with open(output_path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not include_errors and record.get("status") == "error":
+                continue
+            if record.get("location"):
+                done.add(canonical_location(record["location"]))
+    return done
+
+
+def _run_cost(result: Dict[str, Any]) -> float:
+    """LLM spend of a fresh run; cache hits cost nothing."""
+    if result.get("cache_hit"):
+        return 0.0
+    return (result.get("cost") or {}).get("cost_usd", 0.0)
+
+
+class BatchProgress:
+    """Counts, throughput and ETA for a running batch."""
+    
+    def __init__(self, total: int, skipped: int = 0):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.status_counts: Dict[str, int] = {}
+        self.cost_usd = 0.0
+        self.started_at = time.monotonic()
+    
+    def record(self, status: str, cost_usd: float = 0.0):
+        """Count one finished location and its LLM spend."""
+        self.completed += 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        self.cost_usd += cost_usd
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the batch started."""
+        return time.monotonic() - self.started_at
+    
+    @property
+    def throughput(self) -> float:
+        """Locations finished per minute in this run."""
+        return self.completed / self.elapsed * 60 if self.elapsed > 0 else 0.0
+    
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds until the batch finishes, once anything has completed."""
+        if not self.completed:
+            return None
+        return (self.total - self.completed) * self.elapsed / self.completed
+    
+    def summary(self) -> Dict[str, Any]:
+        """Final counts as a plain dictionary."""
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "status_counts": dict(sorted(self.status_counts.items())),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "locations_per_minute": round(self.throughput, 2),
+            "cost_usd": round(self.cost_usd, 6)
+        }
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Render seconds as e.g. "1h 02m", "4m 05s" or "12s"."""
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def run_batch(
+    locations: List[str],
+    workflow: Any,
+    output_path: str,
+    concurrency: int = 4,
+    max_cache_age: Optional[float] = None,
+    retry_errors: bool = False,
+    report_dir: Optional[str] = None,
+    report_formats: Sequence[str] = (),
+    on_result: Optional[Callable[[Dict[str, Any], BatchProgress], None]] = None
+) -> Dict[str, Any]:
+    """
+    Research locations concurrently, appending each result to a JSONL file.
+    
+    Args:
+        locations: Locations to research
+        workflow: Object with ``run_research(location, max_cache_age=...)``;
+            it is shared by all worker threads
+        output_path: JSON Lines file to append results to
+        concurrency: Maximum research runs at once
+        max_cache_age: Passed through to ``run_research``
+        retry_errors: Re-run locations whose previous result was an error; the
+            new record is appended after the old one
+        report_dir: Also write a report per successful location into this directory
+        report_formats: Report formats to write (see ``reporting.renderers``)
+        on_result: Called after each result is written, e.g. to print progress
+    
+    Returns:
+        Summary from ``BatchProgress.summary``
+    """
+    pending, skipped = _pending_locations(locations, output_path, retry_errors)
+    progress = BatchProgress(total=len(pending), skipped=skipped)
+    if not pending:
+        return progress.summary()
+    
+    # Results are written from this thread only, in completion order
+    with open(output_path, "a", encoding="utf-8") as output:
+        for result, line in _research_stream(
+            workflow, pending, concurrency, max_cache_age, report_dir, report_formats
+        ):
+            output.write(line + "\n")
+            output.flush()
+            progress.record(result.get("status") or "unknown", _run_cost(result))
+            if on_result:
+                on_result(result, progress)
+    
+    return progress.summary()
+
+
+def run_batch_processes(
+    locations: List[str],
+    workflow_factory: Callable[[], Any],
+    output_path: str,
+    processes: int = os.cpu_count() or 1,
+    concurrency: int = 4,
+    max_cache_age: Optional[float] = None,
+    retry_errors: bool = False,
+    report_dir: Optional[str] = None,
+    report_formats: Sequence[str] = (),
+    on_result: Optional[Callable[[Dict[str, Any], BatchProgress], None]] = None
+) -> Dict[str, Any]:
+    """
+    Research locations across a pool of processes, each with its own thread pool.
+    
+    Model validation, JSON encoding and report rendering run in the worker
+    processes, so CPU-side work is spread over cores instead of serializing
+    on one interpreter lock. Processes pull locations from a shared queue,
+    so faster ones take more work. The parent only appends the encoded lines
+    to the output file and merges per-process metrics, including each
+    process's ``utils.metrics`` registry into its own.
+    
+    Args:
+        locations: Locations to research
+        workflow_factory: Picklable callable that builds a workflow in each process
+        output_path: JSON Lines file to append results to
+        processes: Worker processes to start
+        concurrency: Research runs at once within each process
+        max_cache_age: Passed through to ``run_research``
+        retry_errors: Re-run locations whose previous result was an error
+        report_dir: Also write a report per successful location into this directory
+        report_formats: Report formats to write
+        on_result: Called after each result is written with the result's
+            location, status and error message (the full result stays in the worker)
+    
+    Returns:
+        Summary from ``BatchProgress.summary`` plus a ``processes`` list of
+        per-process metrics and the total ``cpu_seconds``
+    """
+    pending, skipped = _pending_locations(locations, output_path, retry_errors)
+    progress = BatchProgress(total=len(pending), skipped=skipped)
+    if not pending:
+        return {**progress.summary(), "processes": [], "cpu_seconds": 0.0}
+    
+    processes = max(1, min(processes, len(pending)))
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue()
+    for location in pending:
+        tasks.put(location)
+    for _ in range(processes):
+        tasks.put(None)
+    
+    workers = [
+        context.Process(
+            target=_shard_main,
+            args=(workflow_factory, tasks, results, concurrency, max_cache_age, report_dir, tuple(report_formats)),
+            name=f"batch-{index}",
+            daemon=True
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    shard_metrics: List[Dict[str, Any]] = []
+    with open(output_path, "a", encoding="utf-8") as output:
+        while len(shard_metrics) < len(workers):
+            try:
+                kind, payload, line = results.get(timeout=1.0)
+            except queue.Empty:
+                # A crashed process never reports; its unfinished locations run on the next resume
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+            
+            if kind == "done":
+                REGISTRY.merge(payload.pop("registry"))
+                shard_metrics.append(payload)
+                continue
+            output.write(line + "\n")
+            output.flush()
+            progress.record(payload["status"], payload.get("cost_usd", 0.0))
+            if on_result:
+                on_result(payload, progress)
+    
+    for worker in workers:
+        worker.join()
+    
+    return {
+        **progress.summary(),
+        "processes": sorted(shard_metrics, key=lambda metrics: metrics["pid"]),
+        "cpu_seconds": round(sum(metrics["cpu_seconds"] for metrics in shard_metrics), 3)
+    }
+
+
+def _shard_main(
+    workflow_factory: Callable[[], Any],
+    tasks,
+    results,
+    concurrency: int,
+    max_cache_age: Optional[float],
+    report_dir: Optional[str],
+    report_formats: Sequence[str]
+):
+    """Worker process body: research locations from ``tasks`` and stream lines to ``results``."""
+    started_at, cpu_started_at = time.monotonic(), time.process_time()
+    status_counts: Dict[str, int] = {}
+    error = None
+    
+    def next_locations() -> Iterator[str]:
+        while True:
+            location = tasks.get()
+            if location is None:
+                return
+            yield location
+    
+    try:
+        workflow = workflow_factory()
+        for result, line in _research_stream(
+            workflow, next_locations(), concurrency, max_cache_age, report_dir, report_formats
+        ):
+            status = result.get("status") or "unknown"
+            status_counts[status] = status_counts.get(status, 0) + 1
+            summary = {
+                "location": result.get("location"),
+                "status": status,
+                "error_message": result.get("error_message"),
+                "cost_usd": _run_cost(result)
+            }
+            results.put(("result", summary, line))
+    except Exception as e:
+        error = f"Batch process error: {str(e)}"
+    finally:
+        results.put(("done", {
+            "pid": os.getpid(),
+            "completed": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "wall_seconds": round(time.monotonic() - started_at, 3),
+            "cpu_seconds": round(time.process_time() - cpu_started_at, 3),
+            "error": error,
+            "registry": REGISTRY.snapshot()
+        }, None))
+
+
+def _pending_locations(locations: List[str], output_path: str, retry_errors: bool) -> Tuple[List[str], int]:
+    """Locations not yet in the output file, and how many were skipped; prepares the file for appending."""
+    done = completed_locations(output_path, include_errors=not retry_errors)
+    pending = [location for location in locations if canonical_location(location) not in done]
+    if pending:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        _terminate_partial_line(output_path)
+    return pending, len(locations) - len(pending)
+
+
+def _research_stream(
+    workflow: Any,
+    locations: Iterable[str],
+    concurrency: int,
+    max_cache_age: Optional[float],
+    report_dir: Optional[str],
+    report_formats: Sequence[str]
+) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Research locations with a bounded thread pool.
+    
+    Yields:
+        (result, JSON line) pairs in completion order
+    """
+    def research(location: str) -> Tuple[Dict[str, Any], str]:
+        try:
+            result = workflow.run_research(location, max_cache_age=max_cache_age)
+        except Exception as e:
+            result = {"location": location, "status": "error", "error_message": f"Batch worker error: {str(e)}"}
+        
+        if report_dir and result.get("status") == "success":
+            for format_name in report_formats:
+                try:
+                    write_report(result, report_dir, format_name)
+                except Exception as e:
+                    result.setdefault("report_errors", []).append(f"{format_name}: {str(e)}")
+        return result, json.dumps(result, default=str)
+    
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as executor:
+        remaining = iter(locations)
+        in_flight = set()
+        
+        # Submit lazily so the input list never turns into thousands of queued futures
+        for location in remaining:
+            in_flight.add(executor.submit(research, location))
+            if len(in_flight) >= concurrency:
+                break
+        
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+                
+                next_location = next(remaining, None)
+                if next_location is not None:
+                    in_flight.add(executor.submit(research, next_location))
+
+
+def _terminate_partial_line(path: str):
+    """Start a fresh line if an interrupted run left the file without a trailing newline."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as handle:
+        handle.seek(-1, os.SEEK_END)
+        if handle.read(1) != b"\n":
+            handle.write(b"\n")
@@ -0,0 +1,137 @@
+"""
+Worker loop that pulls research jobs from the durable job queue.
+
+Several worker processes can run against the same queue database. Each one
+leases a job, keeps the lease alive with a heartbeat thread while the
+workflow runs, and then completes or fails it. A worker that is killed stops
+heartbeating, so its lease expires and the job is picked up again elsewhere.
+"""
+
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from storage.job_queue import JOB_DEAD, JOB_LEASED, JOB_QUEUED, JobQueue
+
+
+def default_worker_id() -> str:
+    """Host and process id, e.g. "build-01:4121"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Heartbeat:
+    """Extends a job's lease in the background until stopped."""
+    
+    def __init__(self, queue: JobQueue, job: Dict[str, Any], interval: float):
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job['id']}", daemon=True)
+    
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+    
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                if not self.queue.heartbeat(self.job):
+                    self.lost.set()
+                    return
+        finally:
+            # The heartbeat thread opened its own connection
+            self.queue.close()
+
+
+def run_worker(
+    queue: JobQueue,
+    workflow_factory: Callable[[Optional[str]], Any],
+    results_store: Optional[Any] = None,
+    worker_id: Optional[str] = None,
+    poll_interval: float = 1.0,
+    exit_when_empty: bool = False,
+    max_jobs: Optional[int] = None,
+    stop_event: Optional[threading.Event] = None,
+    on_job: Optional[Callable[[Dict[str, Any], str], None]] = None
+) -> Dict[str, int]:
+    """
+    Process queued research jobs until stopped.
+    
+    Results are stored on the job row when it completes, and then saved to
+    the results store. A job whose lease was lost while it ran is not
+    completed; the worker that now holds it finishes it instead.
+    
+    Args:
+        queue: Job queue to pull from
+        workflow_factory: Builds a workflow for a job's model (None for the default);
+            called once per model. Its workflows should not have a results store,
+            so results are only saved once the job is completed
+        results_store: Optional ResultsStore that completed results are saved to
+        worker_id: Name recorded on leased jobs (default: host:pid)
+        poll_interval: Seconds to wait when no job is ready
+        exit_when_empty: Return once no jobs are queued or leased
+        max_jobs: Return after this many jobs
+        stop_event: Set to stop after the current job
+        on_job: Called with each finished job and its outcome
+    
+    Returns:
+        Counts of succeeded, retried, dead and lost jobs
+    """
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    heartbeat_interval = max(queue.visibility_timeout / 3, 0.05)
+    workflows: Dict[Optional[str], Any] = {}
+    stats = {"succeeded": 0, "retried": 0, "dead": 0, "lost": 0}
+    processed = 0
+    
+    while not stop_event.is_set() and (max_jobs is None or processed < max_jobs):
+        job = queue.lease(worker_id)
+        if job is None:
+            if exit_when_empty:
+                counts = queue.counts()
+                if not counts[JOB_QUEUED] and not counts[JOB_LEASED]:
+                    break
+            stop_event.wait(poll_interval)
+            continue
+        
+        with _Heartbeat(queue, job, heartbeat_interval) as heartbeat:
+            try:
+                model_name = job["model_name"]
+                if model_name not in workflows:
+                    workflows[model_name] = workflow_factory(model_name)
+                result = workflows[model_name].run_research(
+                    job["location"],
+                    max_cache_age=job["payload"].get("max_cache_age"),
+                    queued_at=job["available_at"]
+                )
+                error = None if result.get("status") == "success" else result.get("error_message") or "Research failed"
+            except Exception as e:
+                result, error = None, f"Worker error: {str(e)}"
+        
+        # A spent budget stays spent; retrying the job would fail the same way
+        retryable = not (result or {}).get("budget_exceeded")
+        
+        processed += 1
+        if heartbeat.lost.is_set():
+            outcome = "lost"
+        elif error is None:
+            outcome = "succeeded" if queue.complete(job, result) else "lost"
+            if outcome == "succeeded" and results_store is not None and not result.get("cache_hit"):
+                results_store.save_result(result, model_name=result.get("model_name"))
+        else:
+            status = queue.fail(job, error, retryable=retryable)
+            outcome = {JOB_QUEUED: "retried", JOB_DEAD: "dead"}.get(status, "lost")
+        
+        stats[outcome] += 1
+        if on_job:
+            on_job(job, outcome)
+    
+    return stats
+
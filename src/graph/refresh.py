@@ -0,0 +1,146 @@
+"""
+Per-section TTLs for refreshing stored research.
+
+Sections go stale at different rates: competition and pricing (market
+research, financial analysis) change faster than permits and regulations
+(operations analysis). A refresh starts from the latest stored result for
+a location and re-runs only the sections older than their TTL, plus the
+sections computed from them, so a periodic refresh of known locations
+costs a fraction of the LLM calls of researching them again.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+DAY_SECONDS = 86400.0
+
+# Result sections in the order the workflow produces them
+SECTIONS = ("market_research", "financial_analysis", "operations_analysis", "business_recommendation")
+
+SECTION_TTLS = {
+    "market_research": 30 * DAY_SECONDS,
+    "financial_analysis": 30 * DAY_SECONDS,
+    "operations_analysis": 180 * DAY_SECONDS,
+    "business_recommendation": 90 * DAY_SECONDS
+}
+
+# Sections each section is computed from. Operations analysis sees earlier
+# sections only as prompt context; permits and regulations do not go stale
+# when competition or prices change.
+SECTION_DEPENDENCIES = {
+    "market_research": (),
+    "financial_analysis": ("market_research",),
+    "operations_analysis": (),
+    "business_recommendation": ("market_research", "financial_analysis", "operations_analysis")
+}
+
+# Short names accepted by ``parse_section_ttl``
+SECTION_ALIASES = {
+    "market": "market_research",
+    "financial": "financial_analysis",
+    "operations": "operations_analysis",
+    "recommendation": "business_recommendation",
+    "business": "business_recommendation"
+}
+
+TTL_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*$", re.IGNORECASE)
+
+# A bare "m" is rejected: it reads as minutes or months equally well
+TTL_UNITS = {
+    "": 1.0,
+    "s": 1.0,
+    "min": 60.0,
+    "h": 3600.0,
+    "d": DAY_SECONDS,
+    "w": 7 * DAY_SECONDS,
+    "mo": 30 * DAY_SECONDS
+}
+
+
+def section_times(result: Mapping[str, Any]) -> Dict[str, float]:
+    """
+    When each section of a stored result was produced.
+    
+    Results from before per-section times were recorded count every
+    section as produced when the run completed.
+    
+    Returns:
+        Mapping of section to Unix time, for the sections the result has
+    """
+    recorded = result.get("section_times") or {}
+    completed_at = result.get("completed_at")
+    times = {}
+    for section in SECTIONS:
+        produced_at = recorded.get(section, completed_at)
+        if result.get(section) and produced_at is not None:
+            times[section] = float(produced_at)
+    return times
+
+
+def sections_to_refresh(
+    result: Mapping[str, Any],
+    ttls: Optional[Mapping[str, float]] = None,
+    now: Optional[float] = None
+) -> List[str]:
+    """
+    Sections of a stored result that a refresh has to re-run.
+    
+    A section is re-run when it is missing, older than its TTL, or was a
+    fallback, and whenever a section it is computed from is re-run.
+    
+    Args:
+        result: Latest stored result for the location
+        ttls: Seconds each section stays fresh; sections not listed use ``SECTION_TTLS``
+        now: Unix time to measure ages at (default: now)
+    
+    Returns:
+        Sections to re-run, in workflow order (empty if everything is fresh)
+    """
+    ttls = {**SECTION_TTLS, **(ttls or {})}
+    now = time.time() if now is None else now
+    produced = section_times(result)
+    fallbacks = result.get("fallbacks") or {}
+    
+    stale: List[str] = []
+    for section in SECTIONS:
+        expired = section not in produced or now - produced[section] >= ttls[section] or section in fallbacks
+        if expired or any(dependency in stale for dependency in SECTION_DEPENDENCIES[section]):
+            stale.append(section)
+    return stale
+
+
+def parse_ttl(text: str) -> float:
+    """
+    Parse a duration such as "30d", "12h", "2w", "1mo" or "3600" into seconds.
+    
+    Raises:
+        ValueError: If the text is not a number with an optional s/min/h/d/w/mo unit
+    """
+    match = TTL_PATTERN.match(text)
+    if not match or match.group(2).lower() not in TTL_UNITS:
+        raise ValueError(f"Invalid duration '{text}'; use e.g. 30d, 12h, 2w or 1mo (units: s, min, h, d, w, mo)")
+    return float(match.group(1)) * TTL_UNITS[match.group(2).lower()]
+
+
+def parse_section_ttl(text: str) -> Dict[str, float]:
+    """
+    Parse a "section=duration" setting, e.g. "market=7d" or "operations_analysis=26w".
+    
+    Raises:
+        ValueError: For an unknown section or invalid duration
+    """
+    name, separator, duration = text.partition("=")
+    section = SECTION_ALIASES.get(name.strip().lower(), name.strip().lower())
+    if not separator or section not in SECTIONS:
+        names = ", ".join(list(SECTION_ALIASES) + list(SECTIONS))
+        raise ValueError(f"Invalid TTL '{text}'; use section=duration with section one of {names}")
+    return {section: parse_ttl(duration)}
+
+
+def merge_section_ttls(settings: Sequence[str]) -> Dict[str, float]:
+    """Combine ``parse_section_ttl`` settings; later settings win."""
+    ttls: Dict[str, float] = {}
+    for text in settings:
+        ttls.update(parse_section_ttl(text))
+    return ttls
@@ -2,73 +2,263 @@
 LangGraph workflow for food truck research agents.
 """
 
-from typing import Dict, Any, Annotated, Optional
+import logging
+import operator
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, Annotated, Callable, List, Optional, Sequence, Tuple, Type
+from pydantic import BaseModel
 from typing_extensions import TypedDict
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
 
-from models.research_models import FoodTruckResearchState, AgentResponse
+from models.research_models import FoodTruckResearchState, AgentResponse, RunEvent
 from agents.market_research_agent import MarketResearchAgent
 from agents.financial_advisor_agent import FinancialAdvisorAgent
 from agents.operations_consultant_agent import OperationsConsultantAgent
 from agents.business_consultant_agent import BusinessConsultantAgent
+from agents.regional_context_agent import RegionalContextAgent
+from agents.base_agent import BaseAgent
+from storage.results_store import ResultsStore
+from analysis.prescreen import PrescreenConfig
+from analysis.comparables import ComparableIndex, use_comparables
+from graph.refresh import SECTION_TTLS, SECTIONS, section_times, sections_to_refresh
+from reporting.renderers import render_to_string
+from utils.event_log import append_events, make_event, events_to_dicts
+from utils.cost_ledger import CostLedger, use_ledger
+from utils.location import STATE_CODES, split_location
+from utils.metrics import CACHE_LOOKUPS, NODE_SECONDS, RUN_SECONDS, RUNS, RUNS_IN_FLIGHT
+from utils.profiling import ProfilingConfig, profile_node, profile_run
+from utils.tracing import Trace, export_trace, span, start_trace
 
 
 class WorkflowState(TypedDict):
     """State for the LangGraph workflow."""
     location: str
+    model_name: str
+    started_at: float
     market_research: Optional[Dict[str, Any]]
     financial_analysis: Optional[Dict[str, Any]]
     operations_analysis: Optional[Dict[str, Any]]
     business_recommendation: Optional[Dict[str, Any]]
-    messages: Annotated[list, add_messages]
+    run_id: str
+    events: Annotated[List[RunEvent], append_events]
     current_agent: str
     status: str
     error_message: str
+    fallbacks: Annotated[Dict[str, str], operator.or_]
+    section_times: Annotated[Dict[str, float], operator.or_]
+    refresh_sections: List[str]
+    regional_context: Optional[Dict[str, Any]]
+
+
+# Node name -> workflow method that implements it, in execution order
+NODE_METHODS = [
+    ("market_research_node", "_market_research_node"),
+    ("financial_analysis_node", "_financial_analysis_node"),
+    ("operations_analysis_node", "_operations_analysis_node"),
+    ("business_synthesis_node", "_business_synthesis_node")
+]
+
+# Node name -> result section it produces
+NODE_SECTIONS = {
+    "market_research_node": "market_research",
+    "financial_analysis_node": "financial_analysis",
+    "operations_analysis_node": "operations_analysis",
+    "business_synthesis_node": "business_recommendation"
+}
+
+# State rules change about as slowly as a city's permits
+REGIONAL_CONTEXT_TTL = SECTION_TTLS["operations_analysis"]
+
+# After a failed regional pass, the state's runs go without context for this long
+REGIONAL_FAILURE_TTL = 15 * 60.0
+
+_AGENT_CACHE: Dict[Tuple, BaseAgent] = {}
+_AGENT_CACHE_LOCK = threading.Lock()
+
+
+def shared_agent(agent_class: Type[BaseAgent], model_name: str, temperature: float, **options: Any) -> BaseAgent:
+    """
+    Return the process-wide agent for a model configuration, creating it on first use.
+    
+    Agents hold only their LLM client and settings, so every workflow with the
+    same configuration can reuse one instance instead of building new clients.
+    
+    Args:
+        agent_class: Agent class to construct
+        model_name: Model the agent should use
+        temperature: Sampling temperature
+        **options: Extra constructor arguments; part of the cache key (models by value)
+    
+    Returns:
+        The cached agent instance
+    """
+    options_key = tuple(sorted(
+        (name, value.json() if isinstance(value, BaseModel) else value) for name, value in options.items()
+    ))
+    key = (agent_class, model_name, temperature, options_key)
+    agent = _AGENT_CACHE.get(key)
+    if agent is None:
+        with _AGENT_CACHE_LOCK:
+            agent = _AGENT_CACHE.get(key)
+            if agent is None:
+                agent = agent_class(model_name, temperature, **options)
+                _AGENT_CACHE[key] = agent
+    return agent
+
+
+def clear_agent_cache():
+    """Drop all shared agents, e.g. after credentials change."""
+    with _AGENT_CACHE_LOCK:
+        _AGENT_CACHE.clear()
+
+
+@lru_cache(maxsize=None)
+def compiled_graph():
+    """
+    Compile the research graph once per process.
+    
+    The graph structure does not depend on the model configuration, so each
+    node looks up the workflow instance passed in ``config["configurable"]``
+    and calls that instance's node method. Nodes whose section is not in the
+    state's ``refresh_sections`` keep the section carried over from the
+    refreshed run.
+    """
+    # Imported on first build; LangGraph adds most of a second to start-up
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.graph import StateGraph, START, END
+    
+    def dispatch(node_name: str, method_name: str):
+        def node(state: WorkflowState, config: RunnableConfig) -> Dict[str, Any]:
+            workflow = config["configurable"]["workflow"]
+            section = NODE_SECTIONS[node_name]
+            if section not in state.get("refresh_sections", SECTIONS):
+                return workflow._reused_section(state, node_name, section)
+            
+            started_at = time.perf_counter()
+            try:
+                with span(node_name, kind="node") as node_span, profile_node(node_name):
+                    update = getattr(workflow, method_name)(state)
+                    node_span.set_attribute("status", update.get("status", ""))
+                    if update.get("status") == "success":
+                        update["section_times"] = {section: time.time()}
+                    return update
+            finally:
+                NODE_SECONDS.observe(time.perf_counter() - started_at, node=node_name)
+        return node
+    
+    graph = StateGraph(WorkflowState)
+    previous = START
+    for node_name, method_name in NODE_METHODS:
+        graph.add_node(node_name, dispatch(node_name, method_name))
+        graph.add_edge(previous, node_name)
+        previous = node_name
+    graph.add_edge(previous, END)
+    
+    return graph.compile()
+
+
+class _SharedAgent:
+    """
+    Workflow attribute that resolves to the shared agent for the workflow's
+    model settings. Assigning to it overrides the agent for that instance only.
+    """
+    
+    def __init__(self, agent_class: Type[BaseAgent], *option_names: str):
+        self.agent_class = agent_class
+        self.option_names = option_names
+    
+    def __set_name__(self, owner, name: str):
+        self.name = name
+    
+    def __get__(self, workflow, owner=None):
+        if workflow is None:
+            return self
+        agent = workflow.__dict__.get(self.name)
+        if agent is None:
+            options = {option: getattr(workflow, option) for option in self.option_names}
+            agent = shared_agent(self.agent_class, workflow.model_name, workflow.temperature, **options)
+            workflow.__dict__[self.name] = agent
+        return agent
+    
+    def __set__(self, workflow, agent: BaseAgent):
+        workflow.__dict__[self.name] = agent
 
 
 class FoodTruckResearchWorkflow:
     """LangGraph workflow orchestrating food truck research agents."""
     
-    def __init__(self, model_name: str = "gpt-4", temperature: float = 0.1):
-        """Initialize the workflow with agent instances."""
-        self.market_agent = MarketResearchAgent(model_name, temperature)
-        self.financial_agent = FinancialAdvisorAgent(model_name, temperature)
-        self.operations_agent = OperationsConsultantAgent(model_name, temperature)
-        self.business_agent = BusinessConsultantAgent(model_name, temperature)
-        
-        # Build the workflow graph
-        self.workflow = self._build_workflow()
+    # Agents are created on first use and shared between workflows with the same settings
+    market_agent = _SharedAgent(MarketResearchAgent)
+    financial_agent = _SharedAgent(FinancialAdvisorAgent)
+    operations_agent = _SharedAgent(OperationsConsultantAgent)
+    business_agent = _SharedAgent(BusinessConsultantAgent, "skip_decisive_synthesis", "prescreen_config")
+    regional_agent = _SharedAgent(RegionalContextAgent)
     
-    def _build_workflow(self) -> StateGraph:
-        """Build the LangGraph StateGraph workflow."""
-        
-        # Create the state graph
-        workflow = StateGraph(WorkflowState)
-        
-        # Add agent nodes
-        workflow.add_node("market_research_node", self._market_research_node)
-        workflow.add_node("financial_analysis_node", self._financial_analysis_node)
-        workflow.add_node("operations_analysis_node", self._operations_analysis_node)
-        workflow.add_node("business_synthesis_node", self._business_synthesis_node)
+    def __init__(
+        self,
+        model_name: str = "gpt-4",
+        temperature: float = 0.1,
+        results_store: Optional[ResultsStore] = None,
+        skip_decisive_synthesis: bool = False,
+        prescreen_config: Optional[PrescreenConfig] = None,
+        trace_path: Optional[str] = None,
+        profiling: Optional[ProfilingConfig] = None,
+        cost_ledger: Optional[CostLedger] = None,
+        run_budget_usd: Optional[float] = None,
+        regional_context: bool = False
+    ):
+        """
+        Initialize the workflow; agents and the compiled graph are shared and built lazily.
         
-        # Define the sequential flow
-        workflow.add_edge(START, "market_research_node")
-        workflow.add_edge("market_research_node", "financial_analysis_node")
-        workflow.add_edge("financial_analysis_node", "operations_analysis_node")
-        workflow.add_edge("operations_analysis_node", "business_synthesis_node")
-        workflow.add_edge("business_synthesis_node", END)
-        
-        return workflow.compile()
+        Args:
+            model_name: LLM model for every agent
+            temperature: LLM temperature
+            results_store: Store that finished runs are saved to and cached results read from;
+                agent fallbacks also borrow sections from its most comparable city
+            skip_decisive_synthesis: Let decisive pre-screen scores replace the synthesis LLM call
+            prescreen_config: Pre-screen thresholds and rule points (default: PrescreenConfig())
+            trace_path: OTLP/JSON lines file that each run's trace is appended to
+            profiling: CPU/memory profiling of sampled runs (off by default)
+            cost_ledger: Ledger every run's LLM spend rolls up into, e.g. one per
+                batch; its budget stops all runs (default: an unbounded ledger)
+            run_budget_usd: Stop making LLM calls in a run once it has spent this much
+            regional_context: Research each state's permits, health rules, taxes and wages
+                once (cached in the results store for ``REGIONAL_CONTEXT_TTL``) and give the
+                financial and operations agents that context as a shared prompt prefix, so
+                they only ask the LLM for city-specific details
+        """
+        self.model_name = model_name
+        self.temperature = temperature
+        self.results_store = results_store
+        self.skip_decisive_synthesis = skip_decisive_synthesis
+        self.prescreen_config = prescreen_config
+        self.trace_path = trace_path
+        self.profiling = profiling
+        self.cost_ledger = cost_ledger or CostLedger("workflow")
+        self.run_budget_usd = run_budget_usd
+        self.comparables = ComparableIndex(results_store, model_name=model_name) if results_store else None
+        self.regional_context = regional_context
+        self._regional_contexts: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._regional_failures: Dict[str, float] = {}
+        self._regional_locks: Dict[str, threading.Lock] = {}
+        self._regional_locks_lock = threading.Lock()
+        self._workflow = None
+    
+    @property
+    def workflow(self):
+        """The shared compiled graph, bound to this workflow instance."""
+        if self._workflow is None:
+            self._workflow = compiled_graph().with_config(configurable={"workflow": self})
+        return self._workflow
     
     def _market_research_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Execute market research analysis."""
         try:
             # Create research state from workflow state
-            research_state = FoodTruckResearchState(
-                location=state["location"],
-                messages=[str(msg) for msg in state.get("messages", [])]
-            )
+            research_state = FoodTruckResearchState(location=state["location"])
             
             # Execute market research
             response: AgentResponse = self.market_agent.process_request(research_state)
@@ -78,20 +268,25 @@ class FoodTruckResearchWorkflow:
                     "market_research": response.data.dict() if response.data else {},
                     "current_agent": "Financial Advisor",
                     "status": "success",
-                    "messages": state.get("messages", []) + [f"Market Research completed for {state['location']}"]
+                    "fallbacks": self._fallback_update("market_research", response),
+                    "events": self._event(state, "market_research_node", "Market Research completed")
                 }
             else:
                 return {
                     "status": "error",
                     "error_message": response.error_details or "Market research failed",
-                    "messages": state.get("messages", []) + [f"Market Research failed: {response.message}"]
+                    "events": self._event(
+                        state, "market_research_node", f"Market Research failed: {response.message}", level="error"
+                    )
                 }
-                
+        
         except Exception as e:
             return {
                 "status": "error",
                 "error_message": f"Market research node error: {str(e)}",
-                "messages": state.get("messages", []) + [f"Market Research error: {str(e)}"]
+                "events": self._event(
+                    state, "market_research_node", f"Market Research error: {str(e)}", level="error"
+                )
             }
     
     def _financial_analysis_node(self, state: WorkflowState) -> Dict[str, Any]:
@@ -101,7 +296,7 @@ class FoodTruckResearchWorkflow:
             research_state = FoodTruckResearchState(
                 location=state["location"],
                 market_research=state.get("market_research") if state.get("market_research") else None,
-                messages=[str(msg) for msg in state.get("messages", [])]
+                regional_context=state.get("regional_context")
             )
             
             # Execute financial analysis
@@ -112,20 +307,25 @@ class FoodTruckResearchWorkflow:
                     "financial_analysis": response.data.dict() if response.data else {},
                     "current_agent": "Operations Consultant",
                     "status": "success",
-                    "messages": state.get("messages", []) + [f"Financial Analysis completed for {state['location']}"]
+                    "fallbacks": self._fallback_update("financial_analysis", response),
+                    "events": self._event(state, "financial_analysis_node", "Financial Analysis completed")
                 }
             else:
                 return {
                     "status": "error",
                     "error_message": response.error_details or "Financial analysis failed",
-                    "messages": state.get("messages", []) + [f"Financial Analysis failed: {response.message}"]
+                    "events": self._event(
+                        state, "financial_analysis_node", f"Financial Analysis failed: {response.message}", level="error"
+                    )
                 }
-                
+        
         except Exception as e:
             return {
                 "status": "error",
                 "error_message": f"Financial analysis node error: {str(e)}",
-                "messages": state.get("messages", []) + [f"Financial Analysis error: {str(e)}"]
+                "events": self._event(
+                    state, "financial_analysis_node", f"Financial Analysis error: {str(e)}", level="error"
+                )
             }
     
     def _operations_analysis_node(self, state: WorkflowState) -> Dict[str, Any]:
@@ -136,7 +336,7 @@ class FoodTruckResearchWorkflow:
                 location=state["location"],
                 market_research=state.get("market_research") if state.get("market_research") else None,
                 financial_analysis=state.get("financial_analysis") if state.get("financial_analysis") else None,
-                messages=[str(msg) for msg in state.get("messages", [])]
+                regional_context=state.get("regional_context")
             )
             
             # Execute operations analysis
@@ -147,20 +347,25 @@ class FoodTruckResearchWorkflow:
                     "operations_analysis": response.data.dict() if response.data else {},
                     "current_agent": "Business Consultant",
                     "status": "success",
-                    "messages": state.get("messages", []) + [f"Operations Analysis completed for {state['location']}"]
+                    "fallbacks": self._fallback_update("operations_analysis", response),
+                    "events": self._event(state, "operations_analysis_node", "Operations Analysis completed")
                 }
             else:
                 return {
                     "status": "error",
                     "error_message": response.error_details or "Operations analysis failed",
-                    "messages": state.get("messages", []) + [f"Operations Analysis failed: {response.message}"]
+                    "events": self._event(
+                        state, "operations_analysis_node", f"Operations Analysis failed: {response.message}", level="error"
+                    )
                 }
-                
+        
         except Exception as e:
             return {
                 "status": "error",
                 "error_message": f"Operations analysis node error: {str(e)}",
-                "messages": state.get("messages", []) + [f"Operations Analysis error: {str(e)}"]
+                "events": self._event(
+                    state, "operations_analysis_node", f"Operations Analysis error: {str(e)}", level="error"
+                )
             }
     
     def _business_synthesis_node(self, state: WorkflowState) -> Dict[str, Any]:
@@ -171,133 +376,374 @@ class FoodTruckResearchWorkflow:
                 location=state["location"],
                 market_research=state.get("market_research") if state.get("market_research") else None,
                 financial_analysis=state.get("financial_analysis") if state.get("financial_analysis") else None,
-                operations_analysis=state.get("operations_analysis") if state.get("operations_analysis") else None,
-                messages=[str(msg) for msg in state.get("messages", [])]
+                operations_analysis=state.get("operations_analysis") if state.get("operations_analysis") else None
             )
             
             # Execute business synthesis
             response: AgentResponse = self.business_agent.process_request(research_state)
             
             if response.status == "SUCCESS":
+                screen = response.data.prescreen if response.data else None
                 return {
                     "business_recommendation": response.data.dict() if response.data else {},
                     "current_agent": "Complete",
                     "status": "success",
-                    "messages": state.get("messages", []) + [f"Business Recommendation completed for {state['location']}"]
+                    "fallbacks": self._fallback_update("business_recommendation", response),
+                    "events": self._event(
+                        state,
+                        "business_synthesis_node",
+                        "Business Recommendation completed",
+                        prescreen_score=screen.score if screen else None,
+                        prescreen_applied=screen.applied if screen else False
+                    )
                 }
             else:
                 return {
                     "status": "error",
                     "error_message": response.error_details or "Business synthesis failed",
-                    "messages": state.get("messages", []) + [f"Business Synthesis failed: {response.message}"]
+                    "events": self._event(
+                        state, "business_synthesis_node", f"Business Synthesis failed: {response.message}", level="error"
+                    )
                 }
-                
+        
         except Exception as e:
             return {
                 "status": "error",
                 "error_message": f"Business synthesis node error: {str(e)}",
-                "messages": state.get("messages", []) + [f"Business Synthesis error: {str(e)}"]
+                "events": self._event(
+                    state, "business_synthesis_node", f"Business Synthesis error: {str(e)}", level="error"
+                )
             }
     
-    def run_research(self, location: str) -> Dict[str, Any]:
-        """Run the complete food truck research workflow."""
+    @staticmethod
+    def _fallback_update(section: str, response: AgentResponse) -> Dict[str, str]:
+        """Record where a section came from if its agent fell back, e.g. {"market_research": "Austin, TX"}."""
+        if not response.used_fallback:
+            return {}
+        return {section: response.fallback_source or "defaults"}
+    
+    def _regional_context(self, location: str) -> Optional[Dict[str, Any]]:
+        """
+        The regional context for a location's state.
+        
+        Each state is researched once: concurrent runs in the same state wait
+        for the first, and the context is kept in memory and in the results
+        store until it is older than ``REGIONAL_CONTEXT_TTL``. A failed pass
+        is not retried for ``REGIONAL_FAILURE_TTL``, so a sweep of one state
+        does not repeat the failing call for every city.
+        
+        Returns:
+            The context, or None if the location has no US state or the
+            Regional Analyst failed (city runs then work without it)
+        """
+        state = split_location(location)[1]
+        if state not in STATE_CODES:
+            return None
+        
+        with self._regional_locks_lock:
+            lock = self._regional_locks.setdefault(state, threading.Lock())
+        with lock, span("regional_context", state=state) as regional_span:
+            cached, source = self._regional_contexts.get(state), "memory"
+            if cached is not None and time.time() - cached[1] >= REGIONAL_CONTEXT_TTL:
+                cached = None
+            if cached is None and self.results_store:
+                cached = self._load_regional_context(state)
+                source = "store"
+            if cached is None:
+                failed_at = self._regional_failures.get(state)
+                if failed_at is not None and time.time() - failed_at < REGIONAL_FAILURE_TTL:
+                    regional_span.set_attribute("source", "failed")
+                    return None
+                response = self.regional_agent.process_request(FoodTruckResearchState(location=location))
+                source = "llm"
+                if response.status != "SUCCESS":
+                    regional_span.set_attribute("error", response.error_details or "")
+                    self._regional_failures[state] = time.time()
+                    return None
+                self._regional_failures.pop(state, None)
+                cached = (response.data.dict(), time.time())
+                self._save_regional_context(state, cached[0])
+            
+            regional_span.set_attribute("source", source)
+            self._regional_contexts[state] = cached
+            return cached[0]
+    
+    def _load_regional_context(self, state: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """A state's stored regional context, or None if it is missing, expired or unreadable."""
+        try:
+            return self.results_store.get_regional_context(state, self.model_name, max_age_seconds=REGIONAL_CONTEXT_TTL)
+        except Exception as e:
+            # Researching the state again is better than failing the run
+            logging.getLogger(__name__).warning(f"Failed to load regional context: {str(e)}")
+            return None
+    
+    def _save_regional_context(self, state: str, context: Dict[str, Any]):
+        """Persist a state's regional context for later runs and processes, if a store is configured."""
+        if not self.results_store:
+            return
+        
+        try:
+            self.results_store.save_regional_context(state, self.model_name, context)
+        except Exception as e:
+            # The context is still used for this process's runs
+            logging.getLogger(__name__).warning(f"Failed to store regional context: {str(e)}")
+    
+    def _reused_section(self, state: WorkflowState, node: str, section: str) -> Dict[str, Any]:
+        """Keep a still-fresh section from the refreshed run instead of re-running its node."""
+        produced_at = state["section_times"].get(section)
+        produced_on = datetime.fromtimestamp(produced_at).strftime("%Y-%m-%d") if produced_at else "an earlier run"
+        return {
+            "events": self._event(
+                state,
+                node,
+                f"{section.replace('_', ' ').title()} reused from {produced_on}",
+                reused=True
+            )
+        }
+    
+    def _event(
+        self,
+        state: WorkflowState,
+        node: str,
+        message: str,
+        level: str = "info",
+        **payload: Any
+    ) -> List[RunEvent]:
+        """Create the event list a node returns for the append-only log."""
+        return [make_event(state["run_id"], node, message, level, **payload)]
+    
+    def run_research(
+        self,
+        location: str,
+        max_cache_age: Optional[float] = None,
+        on_event: Optional[Callable[[RunEvent], None]] = None,
+        queued_at: Optional[float] = None,
+        profile: Optional[bool] = None,
+        refresh_ttls: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the complete food truck research workflow.
+        
+        Every run is traced; the result carries a ``trace_summary`` and, when
+        the workflow has a ``trace_path``, the full trace is appended there.
+        Runs picked by the workflow's profiling config (or ``profile=True``)
+        are profiled, and the result's ``profile`` lists the saved files. The
+        result's ``cost`` holds the run's LLM spend per agent and model.
+        Latencies, in-flight runs and cache hits are recorded in
+        ``utils.metrics.REGISTRY``.
+        
+        Args:
+            location: City and state to research
+            max_cache_age: Serve a stored result for the same location and model
+                if one completed within this many seconds (requires a results store)
+            on_event: Called with each run event as soon as its node finishes
+            queued_at: Unix time the run was requested, to report queue wait
+            profile: True or False overrides profiling sampling for this run
+            refresh_ttls: Refresh the latest stored result for the location
+                (requires a results store): only sections older than these
+                TTLs in seconds, fallback sections and the sections computed
+                from them are re-run (see ``graph.refresh``); sections not
+                listed use ``SECTION_TTLS``. A result with nothing to re-run
+                is returned as a cache hit.
+        
+        Returns:
+            Final workflow state with all agent outputs; ``refresh_sections``
+            lists the sections this run produced
+        """
+        started_at = time.perf_counter()
+        RUNS_IN_FLIGHT.inc()
+        try:
+            result = self._run_traced(location, max_cache_age, on_event, queued_at, profile, refresh_ttls)
+        finally:
+            RUNS_IN_FLIGHT.dec()
+        RUNS.inc(status="cached" if result.get("cache_hit") else result.get("status") or "unknown")
+        RUN_SECONDS.observe(time.perf_counter() - started_at)
+        return result
+    
+    def _run_traced(
+        self,
+        location: str,
+        max_cache_age: Optional[float],
+        on_event: Optional[Callable[[RunEvent], None]],
+        queued_at: Optional[float],
+        profile: Optional[bool],
+        refresh_ttls: Optional[Dict[str, float]]
+    ) -> Dict[str, Any]:
+        """Serve a run from the cache, refresh a stored run or execute a new one, inside one trace."""
+        cached, previous, sections = None, None, list(SECTIONS)
+        with start_trace("run_research", queued_at=queued_at, location=location, model=self.model_name) as trace:
+            if self.results_store and max_cache_age is not None:
+                with span("cache_lookup") as lookup:
+                    cached = self.results_store.get_latest(
+                        location, model_name=self.model_name, max_age_seconds=max_cache_age
+                    )
+                    lookup.set_attribute("cache_hit", cached is not None)
+                CACHE_LOOKUPS.inc(result="hit" if cached else "miss")
+            
+            if self.results_store and refresh_ttls is not None and not cached:
+                with span("refresh_plan") as plan:
+                    previous = self.results_store.get_latest(location, model_name=self.model_name)
+                    if previous:
+                        sections = sections_to_refresh(previous, refresh_ttls)
+                        cached = previous if not sections else None
+                    plan.set_attribute("refresh_sections", ",".join(sections))
+            
+            if cached:
+                trace.root.set_attribute("cache_hit", True)
+            else:
+                run_id = uuid.uuid4().hex
+                run_ledger = self.cost_ledger.child(run_id, budget_usd=self.run_budget_usd)
+                with use_ledger(run_ledger), use_comparables(self.comparables):
+                    with profile_run(run_id, self.profiling, force=profile) as profiler:
+                        final_state = self._execute(location, on_event, run_id, previous, sections)
+                if profiler is not None:
+                    final_state["profile"] = profiler.outputs
+                if previous:
+                    final_state["refreshed_from"] = previous.get("run_id")
+                final_state["cost"] = run_ledger.summary()
+                if run_ledger.exceeded is not None:
+                    final_state["status"] = "error"
+                    final_state["error_message"] = str(run_ledger.exceeded)
+                    final_state["budget_exceeded"] = True
+                trace.root.set_attribute("cost_usd", final_state["cost"]["cost_usd"])
+                trace.root.set_attribute("run_id", final_state["run_id"])
+                trace.root.set_attribute("status", final_state.get("status", ""))
+        
+        self._export_trace(trace)
+        if cached:
+            cached["cache_hit"] = True
+            return cached
+        
+        final_state["completed_at"] = time.time()
+        final_state["trace_summary"] = trace.summary()
+        final_state["events"] = events_to_dicts(final_state.get("events", []))
+        self._store_result(final_state)
+        return final_state
+    
+    def _execute(
+        self,
+        location: str,
+        on_event: Optional[Callable[[RunEvent], None]],
+        run_id: str,
+        previous: Optional[Dict[str, Any]] = None,
+        sections: Sequence[str] = SECTIONS
+    ) -> Dict[str, Any]:
+        """
+        Run the graph for a location and return its final state.
+        
+        Args:
+            location: City and state to research
+            on_event: Called with each run event as soon as its node finishes
+            run_id: Id of the new run
+            previous: Stored run being refreshed; its sections not in ``sections`` are kept
+            sections: Sections to (re-)run
+        """
+        # Initialize workflow state, carrying over the sections a refresh keeps
+        previous = previous or {}
+        kept = [section for section in SECTIONS if previous.get(section) and section not in sections]
+        if kept:
+            start_event = make_event(
+                run_id,
+                "workflow",
+                f"Refreshing food truck research for {location}: {', '.join(sections)}",
+                refreshed_from=previous.get("run_id")
+            )
+        else:
+            start_event = make_event(run_id, "workflow", f"Starting food truck research for {location}")
+        events = [start_event]
+        
+        regional_context = None
+        if self.regional_context:
+            try:
+                regional_context = self._regional_context(location)
+            except Exception as e:
+                # City runs work without the state-level context
+                events.append(make_event(run_id, "workflow", f"Regional context unavailable: {str(e)}", level="warning"))
+        if regional_context:
+            events.append(make_event(run_id, "workflow", f"Using regional context for {regional_context['state']}"))
         
-        # Initialize workflow state
         initial_state: WorkflowState = {
             "location": location,
-            "market_research": None,
-            "financial_analysis": None,
-            "operations_analysis": None,
-            "business_recommendation": None,
-            "messages": [f"Starting food truck research for {location}"],
+            "model_name": self.model_name,
+            "started_at": time.time(),
+            "run_id": run_id,
+            **{section: previous[section] if section in kept else None for section in SECTIONS},
+            "events": events,
             "current_agent": "Market Research Analyst",
             "status": "starting",
-            "error_message": ""
+            "error_message": "",
+            "fallbacks": {section: source for section, source in previous.get("fallbacks", {}).items() if section in kept},
+            "section_times": {section: at for section, at in section_times(previous).items() if section in kept},
+            "refresh_sections": list(sections),
+            "regional_context": regional_context
         }
         
         try:
             # Execute the workflow
-            final_state = self.workflow.invoke(initial_state)
-            return final_state
-            
+            if on_event is None:
+                return self.workflow.invoke(initial_state)
+            return self._invoke_with_events(initial_state, on_event)
+        
         except Exception as e:
+            events = initial_state["events"]
+            events.append(make_event(run_id, "workflow", f"Workflow error: {str(e)}", level="error"))
+            self._notify(on_event, events[-1])
             return {
                 **initial_state,
                 "status": "error",
-                "error_message": f"Workflow execution failed: {str(e)}",
-                "messages": initial_state["messages"] + [f"Workflow error: {str(e)}"]
+                "error_message": f"Workflow execution failed: {str(e)}"
             }
     
-    def format_results(self, results: Dict[str, Any]) -> str:
-        """Format workflow results into a readable report."""
-        
-        if results.get("status") == "error":
-            return f"Research failed: {results.get('error_message', 'Unknown error')}"
+    def _export_trace(self, trace: Trace):
+        """Append the run's trace to the trace file, if one is configured."""
+        if not self.trace_path:
+            return
         
-        location = results.get("location", "Unknown Location")
-        report_lines = [
-            f"# Food Truck Business Research Report: {location}",
-            "=" * 60,
-            ""
-        ]
-        
-        # Market Research Section
-        market_data = results.get("market_research", {})
-        if market_data:
-            report_lines.extend([
-                "## Market Research Analysis",
-                f"**Competition Level:** {market_data.get('competition_level', 'N/A')}",
-                f"**Target Customers:** {', '.join(market_data.get('target_customers', []))}",
-                f"**Market Size:** {market_data.get('market_size_estimate', 'N/A')}",
-                f"**Peak Hours:** {', '.join(market_data.get('peak_hours', []))}",
-                f"**Key Opportunities:** {', '.join(market_data.get('opportunities', []))}",
-                ""
-            ])
-        
-        # Financial Analysis Section
-        financial_data = results.get("financial_analysis", {})
-        if financial_data:
-            funding = financial_data.get("funding_requirements", 0)
-            report_lines.extend([
-                "## Financial Analysis",
-                f"**Total Funding Required:** ${funding:,.2f}",
-                f"**Break-even Timeline:** {financial_data.get('break_even_timeline', 'N/A')}",
-                f"**ROI Projection:** {financial_data.get('roi_projection', 'N/A')}",
-                ""
-            ])
-        
-        # Operations Section
-        operations_data = results.get("operations_analysis", {})
-        if operations_data:
-            permits = operations_data.get("permits_required", [])
-            report_lines.extend([
-                "## Operations Requirements",
-                f"**Required Permits:** {', '.join(permits)}",
-                f"**Permit Timeline:** {operations_data.get('permit_timeline', 'N/A')}",
-                f"**Staffing Needs:** {operations_data.get('staffing_needs', {}).get('minimum_staff', 'N/A')} minimum staff",
-                ""
-            ])
-        
-        # Business Recommendation Section
-        business_data = results.get("business_recommendation", {})
-        if business_data:
-            recommendation = business_data.get("recommendation", "N/A").upper()
-            confidence = business_data.get("confidence_level", "N/A")
-            report_lines.extend([
-                "## Business Recommendation",
-                f"**Recommendation:** {recommendation} (Confidence: {confidence})",
-                f"**Key Strengths:** {', '.join(business_data.get('key_strengths', []))}",
-                f"**Key Risks:** {', '.join(business_data.get('key_risks', []))}",
-                f"**Timeline:** {business_data.get('timeline_recommendation', 'N/A')}",
-                ""
-            ])
-            
-            next_steps = business_data.get("next_steps", [])
-            if next_steps:
-                report_lines.extend([
-                    "**Recommended Next Steps:**",
-                    *[f"- {step}" for step in next_steps],
-                    ""
-                ])
+        try:
+            export_trace(trace, self.trace_path)
+        except OSError as e:
+            # Tracing must never fail a run
+            logging.getLogger(__name__).warning(f"Failed to export trace: {str(e)}")
+    
+    def _invoke_with_events(
+        self,
+        initial_state: WorkflowState,
+        on_event: Callable[[RunEvent], None]
+    ) -> Dict[str, Any]:
+        """Run the graph step by step, passing each new event to the listener."""
+        final_state: Dict[str, Any] = dict(initial_state)
+        delivered = 0
+        for final_state in self.workflow.stream(initial_state, stream_mode="values"):
+            events = final_state.get("events", [])
+            for event in events[delivered:]:
+                self._notify(on_event, event)
+            delivered = len(events)
+        return final_state
+    
+    @staticmethod
+    def _notify(on_event: Optional[Callable[[RunEvent], None]], event: RunEvent):
+        """Deliver an event to a listener; listener failures never affect the run."""
+        if on_event is None:
+            return
+        try:
+            on_event(event)
+        except Exception:
+            pass
+    
+    def _store_result(self, results: Dict[str, Any]):
+        """Persist a finished run to the results store, if one is configured, and index it for fallbacks."""
+        if not self.results_store:
+            return
         
-        return "\n".join(report_lines)
\ No newline at end of file
+        try:
+            self.results_store.save_result(results, model_name=self.model_name)
+            self.comparables.add(results, model_name=self.model_name)
+        except Exception as e:
+            # Storage problems must never discard a completed run
+            results["events"].append(
+                make_event(results["run_id"], "workflow", f"Failed to store results: {str(e)}", level="warning").dict()
+            )
+    
+    def format_results(self, results: Dict[str, Any]) -> str:
+        """Format workflow results into a readable report."""
+        return render_to_string(results, "markdown")
\ No newline at end of file
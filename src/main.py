@@ -2,12 +2,37 @@
 Main entry point for the Food Truck Research Agents application.
 """
 
+import argparse
+import functools
+import glob
+import json
+import multiprocessing
 import os
+import signal
 import sys
-from typing import Optional
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from dotenv import load_dotenv
 
+from analysis.prescreen import PrescreenConfig, agreement_rate, load_prescreen_config
+from analysis.ranking import RankingConfig, format_ranking_report, rank_locations
+from analysis.what_if import format_tornado, parse_override, sensitivity_table, what_if
+from batch.runner import BatchProgress, format_duration, read_locations, run_batch, run_batch_processes
+from batch.worker import default_worker_id, run_worker
+from graph.refresh import SECTIONS, merge_section_ttls, sections_to_refresh
 from graph.workflow import FoodTruckResearchWorkflow
+from reporting.renderers import RENDERERS, render_stream, write_combined_report, write_report, write_reports
+from service.server import run_server
+from storage.columnar_export import load_columnar, write_columnar
+from storage.job_queue import JOB_DEAD, JOB_STATUSES, JobQueue
+from storage.results_store import ResultsStore
+from utils.cost_ledger import CostLedger, load_price_table
+from utils.event_log import export_events_jsonl
+from utils.metrics import dump_metrics
+from utils.profiling import ProfilingConfig, merge_profiles, top_functions
+from utils.tracing import format_gantt, load_traces
 
 
 def load_environment():
@@ -48,6 +73,136 @@ def get_model_config() -> tuple[str, float]:
     return model_name, temperature
 
 
+def get_results_store(path: Optional[str] = None) -> ResultsStore:
+    """Open the local results database (RESULTS_DB_PATH or food_truck_results.db)."""
+    return ResultsStore(path or os.getenv("RESULTS_DB_PATH", "food_truck_results.db"))
+
+
+def get_job_queue(path: Optional[str] = None) -> JobQueue:
+    """Open the durable job queue (JOB_QUEUE_PATH or food_truck_jobs.db)."""
+    return JobQueue(
+        path or os.getenv("JOB_QUEUE_PATH", "food_truck_jobs.db"),
+        visibility_timeout=float(os.getenv("JOB_VISIBILITY_TIMEOUT", "600"))
+    )
+
+
+def get_cache_max_age() -> Optional[float]:
+    """Return the result cache window in seconds from RESULTS_CACHE_MAX_AGE_HOURS, if set."""
+    max_age_hours = os.getenv("RESULTS_CACHE_MAX_AGE_HOURS")
+    return float(max_age_hours) * 3600 if max_age_hours else None
+
+
+def get_trace_path() -> Optional[str]:
+    """Return the file run traces are appended to (TRACE_EXPORT_PATH), if set."""
+    return os.getenv("TRACE_EXPORT_PATH") or None
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def get_profiling_config(
+    cpu: bool = False,
+    memory: bool = False,
+    sample_rate: Optional[float] = None,
+    output_dir: Optional[str] = None
+) -> Optional[ProfilingConfig]:
+    """
+    Profiling settings from flags, falling back to PROFILE_CPU, PROFILE_MEMORY,
+    PROFILE_SAMPLE_RATE and PROFILE_DIR.
+    
+    A sample rate on its own turns on CPU profiling. Profiles default to a
+    ``profiles`` directory next to the results database.
+    
+    Returns:
+        ProfilingConfig, or None when profiling is off
+    """
+    cpu = cpu or _env_flag("PROFILE_CPU")
+    memory = memory or _env_flag("PROFILE_MEMORY")
+    if sample_rate is None and os.getenv("PROFILE_SAMPLE_RATE"):
+        sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE"))
+    if sample_rate is not None and not (cpu or memory):
+        cpu = True
+    if not (cpu or memory):
+        return None
+    
+    results_dir = os.path.dirname(os.path.abspath(os.getenv("RESULTS_DB_PATH", "food_truck_results.db")))
+    return ProfilingConfig(
+        cpu=cpu,
+        memory=memory,
+        sample_rate=1.0 if sample_rate is None else sample_rate,
+        output_dir=output_dir or os.getenv("PROFILE_DIR") or os.path.join(results_dir, "profiles")
+    )
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def get_cost_ledger(budget_usd: Optional[float] = None, name: str = "total") -> CostLedger:
+    """
+    Ledger for everything this process runs, priced with LLM_PRICE_TABLE.
+    
+    Args:
+        budget_usd: Spend cap (default: LLM_TOTAL_BUDGET_USD, if set)
+        name: Scope named in budget errors
+    """
+    if budget_usd is None:
+        budget_usd = _env_float("LLM_TOTAL_BUDGET_USD")
+    return CostLedger(name, budget_usd=budget_usd, prices=load_price_table(os.getenv("LLM_PRICE_TABLE")))
+
+
+def get_run_budget() -> Optional[float]:
+    """Per-run LLM spend cap in dollars (LLM_RUN_BUDGET_USD), if set."""
+    return _env_float("LLM_RUN_BUDGET_USD")
+
+
+# Seconds between metrics dumps while a batch is running
+METRICS_DUMP_INTERVAL_SECONDS = 15.0
+
+
+def write_metrics_file(path: str) -> bool:
+    """Dump this process's metrics in Prometheus text format; returns False on failure."""
+    try:
+        dump_metrics(path)
+        return True
+    except OSError as e:
+        print(f"⚠️  Could not write metrics to {path}: {str(e)}")
+        return False
+
+
+def print_profile_summary(results: Dict[str, Any]):
+    """Print where a profiled run's output went and its most expensive steps."""
+    profile = results.get("profile")
+    if not profile:
+        return
+    
+    print("\n🔬 Profile")
+    for key in ("cpu_profile", "memory_profile"):
+        if profile.get(key):
+            print(f"  {key.replace('_', ' ')}: {profile[key]}")
+    for entry in profile.get("top_functions", [])[:5]:
+        print(f"  {entry['cumulative_seconds']:>8.3f}s  {entry['function']}")
+    for node, allocated_kb in profile.get("memory_by_node_kb", {}).items():
+        print(f"  {allocated_kb:>8.1f} KiB  {node}")
+
+
+def get_skip_decisive_synthesis() -> bool:
+    """Whether decisive pre-screen scores replace the synthesis LLM call (PRESCREEN_SKIP_DECISIVE)."""
+    return _env_flag("PRESCREEN_SKIP_DECISIVE")
+
+
+def get_prescreen_config(path: Optional[str] = None) -> Optional[PrescreenConfig]:
+    """Pre-screen thresholds from a JSON file (default: PRESCREEN_CONFIG), if set."""
+    return load_prescreen_config(path or os.getenv("PRESCREEN_CONFIG"))
+
+
+def get_regional_context() -> bool:
+    """Whether state-level context is researched once per state and shared by its cities (REGIONAL_CONTEXT)."""
+    return _env_flag("REGIONAL_CONTEXT")
+
+
 def get_location_input() -> str:
     """Get location input from user with validation."""
     while True:
@@ -103,11 +258,23 @@ def run_interactive_mode():
     
     # Initialize and run workflow
     try:
-        workflow = FoodTruckResearchWorkflow(model_name=model_name, temperature=temperature)
+        workflow = FoodTruckResearchWorkflow(
+            model_name=model_name,
+            temperature=temperature,
+            results_store=get_results_store(),
+            skip_decisive_synthesis=get_skip_decisive_synthesis(),
+            prescreen_config=get_prescreen_config(),
+            regional_context=get_regional_context(),
+            trace_path=get_trace_path(),
+            profiling=get_profiling_config(),
+            cost_ledger=get_cost_ledger(),
+            run_budget_usd=get_run_budget()
+        )
         
         # Run research with progress updates
         display_progress("Market Research Analysis", 1, 4)
-        results = workflow.run_research(location)
+        results = workflow.run_research(location, max_cache_age=get_cache_max_age())
+        export_run_events(results)
         
         # Check for errors
         if results.get("status") == "error":
@@ -126,8 +293,8 @@ def run_interactive_mode():
         # Offer to save results
         save_option = input("\n💾 Save results to file? (y/n): ").strip().lower()
         if save_option in ['y', 'yes']:
-            save_results_to_file(formatted_report, location)
-        
+            save_results_to_file(results)
+    
     except KeyboardInterrupt:
         print("\n\n⏹️  Research cancelled by user.")
     except Exception as e:
@@ -135,23 +302,40 @@ def run_interactive_mode():
         print("Please check your API keys and try again.")
 
 
-def save_results_to_file(report: str, location: str):
-    """Save research results to a file."""
+def get_report_dir() -> str:
+    """Directory that saved reports are written to (REPORT_OUTPUT_DIR, default: current directory)."""
+    return os.getenv("REPORT_OUTPUT_DIR", ".")
+
+
+def save_results_to_file(results: dict, formats: Sequence[str] = ("markdown",)):
+    """Save research results to report files in the report output directory."""
     try:
-        # Create filename from location
-        safe_location = location.replace(" ", "_").replace(",", "").lower()
-        filename = f"food_truck_research_{safe_location}.md"
-        
-        with open(filename, 'w') as f:
-            f.write(report)
-        
-        print(f"✅ Results saved to: {filename}")
-        
+        for format_name in formats:
+            path = write_report(results, get_report_dir(), format_name)
+            print(f"✅ Results saved to: {path}")
+    
     except Exception as e:
         print(f"❌ Failed to save file: {str(e)}")
 
 
-def run_command_line_mode(location: str, model: Optional[str] = None):
+def export_run_events(results: dict):
+    """Append the run's event log to EVENT_LOG_PATH when configured."""
+    event_log_path = os.getenv("EVENT_LOG_PATH")
+    if not event_log_path:
+        return
+    
+    try:
+        export_events_jsonl(results.get("events", []), event_log_path)
+    except Exception as e:
+        print(f"⚠️  Warning: Failed to export event log: {str(e)}")
+
+
+def run_command_line_mode(
+    location: str,
+    model: Optional[str] = None,
+    profile_cpu: bool = False,
+    profile_memory: bool = False
+):
     """Run the application in command-line mode."""
     print(f"🚚 Food Truck Research: {location}")
     
@@ -166,30 +350,781 @@ def run_command_line_mode(location: str, model: Optional[str] = None):
     print(f"🤖 Model: {model_name}")
     
     try:
-        workflow = FoodTruckResearchWorkflow(model_name=model_name, temperature=temperature)
-        results = workflow.run_research(location)
+        workflow = FoodTruckResearchWorkflow(
+            model_name=model_name,
+            temperature=temperature,
+            results_store=get_results_store(),
+            skip_decisive_synthesis=get_skip_decisive_synthesis(),
+            prescreen_config=get_prescreen_config(),
+            regional_context=get_regional_context(),
+            trace_path=get_trace_path(),
+            profiling=get_profiling_config(cpu=profile_cpu, memory=profile_memory),
+            cost_ledger=get_cost_ledger(),
+            run_budget_usd=get_run_budget()
+        )
+        results = workflow.run_research(location, max_cache_age=get_cache_max_age())
+        export_run_events(results)
         
         if results.get("status") == "error":
             print(f"❌ Error: {results.get('error_message')}")
+            print_profile_summary(results)
             sys.exit(1)
         
         # Output results
         formatted_report = workflow.format_results(results)
         print(formatted_report)
-        
+        print_profile_summary(results)
+    
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
 
 
+def add_query_arguments(parser: argparse.ArgumentParser):
+    """Add the stored-results filter options shared by query-style commands."""
+    parser.add_argument("--db", help="Results database path (default: RESULTS_DB_PATH or food_truck_results.db)")
+    parser.add_argument("--state", help="Two-letter state code or state name")
+    parser.add_argument("--recommendation", choices=["go", "no_go", "conditional"])
+    parser.add_argument("--min-funding", type=float, help="Minimum funding requirement")
+    parser.add_argument("--max-funding", type=float, help="Maximum funding requirement")
+    parser.add_argument("--model", help="Only results produced by this model")
+    parser.add_argument("--location", help="Only results for this location")
+    parser.add_argument("--since-days", type=float, help="Only runs from the last N days")
+    parser.add_argument("--newest", action="store_true", help="Keep only the newest run per location")
+    parser.add_argument("--limit", type=int, help="Maximum number of results")
+
+
+def query_filters_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    """Translate parsed query options into ResultsStore.query keyword arguments."""
+    return {
+        "state": args.state,
+        "recommendation": args.recommendation,
+        "min_funding": args.min_funding,
+        "max_funding": args.max_funding,
+        "model_name": args.model,
+        "location": args.location,
+        "since": time.time() - args.since_days * 86400 if args.since_days is not None else None,
+        "newest_per_location": args.newest,
+        "limit": args.limit
+    }
+
+
+def run_query_command(argv: List[str]):
+    """Query stored research results, e.g. all GO cities in TX under $120k."""
+    parser = argparse.ArgumentParser(prog="main.py query", description="Query stored research results")
+    add_query_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="Print full results as JSON Lines")
+    args = parser.parse_args(argv)
+    
+    store = get_results_store(args.db)
+    rows = store.query(include_result=args.json, **query_filters_from_args(args))
+    
+    if args.json:
+        for row in rows:
+            print(json.dumps(row["result"], default=str))
+        return
+    
+    print(f"{'Location':<30} {'State':<6} {'Recommendation':<15} {'Funding':>12}  {'Model':<20} Run Date")
+    for row in rows:
+        funding = row["funding_requirements"]
+        funding_text = f"${funding:,.0f}" if funding is not None else "N/A"
+        run_date = datetime.fromtimestamp(row["run_at"]).strftime("%Y-%m-%d %H:%M")
+        print(
+            f"{row['location']:<30} {row['state']:<6} {(row['recommendation'] or 'N/A').upper():<15} "
+            f"{funding_text:>12}  {row['model_name']:<20} {run_date}"
+        )
+    print(f"\n{len(rows)} result(s)")
+
+
+def run_export_command(argv: List[str]):
+    """Export stored research results to a memory-mappable columnar directory."""
+    parser = argparse.ArgumentParser(prog="main.py export", description="Export stored results as columnar arrays")
+    parser.add_argument("output_dir", help="Directory to write column files into")
+    add_query_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    store = get_results_store(args.db)
+    manifest = write_columnar(store.iter_results(**query_filters_from_args(args)), args.output_dir)
+    print(f"✅ Exported {manifest['row_count']} result(s) with {len(manifest['columns'])} columns to {args.output_dir}")
+
+
+def run_what_if_command(argv: List[str]):
+    """Re-evaluate a stored result under changed financial assumptions."""
+    parser = argparse.ArgumentParser(prog="main.py what-if", description="What-if analysis of a stored result")
+    parser.add_argument("location", help="Location of the stored result")
+    parser.add_argument("--db", help="Results database path (default: RESULTS_DB_PATH or food_truck_results.db)")
+    parser.add_argument("--model", help="Use the stored result produced by this model")
+    parser.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        help="Override such as 'startup_costs.food_truck-=20000' or 'revenue_projections.daily_revenue-=15%%'"
+    )
+    parser.add_argument("--tornado", action="store_true", help="Print a sensitivity table for every cost and revenue item")
+    parser.add_argument("--resynthesize", action="store_true", help="Re-run the business recommendation (uses the LLM)")
+    parser.add_argument("--json", action="store_true", help="Print the updated result as JSON")
+    args = parser.parse_args(argv)
+    
+    try:
+        overrides = [parse_override(text) for text in args.overrides]
+    except ValueError as e:
+        parser.error(str(e))
+    
+    store = get_results_store(args.db)
+    result = store.get_latest(args.location, model_name=args.model)
+    if result is None:
+        print(f"❌ No stored result for {args.location}")
+        sys.exit(1)
+    
+    workflow = None
+    if args.resynthesize:
+        model_name, temperature = get_model_config()
+        workflow = FoodTruckResearchWorkflow(
+            model_name=args.model or model_name,
+            temperature=temperature,
+            prescreen_config=get_prescreen_config()
+        )
+    
+    try:
+        updated = what_if(result, overrides, resynthesize=args.resynthesize, workflow=workflow)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if args.json:
+        print(json.dumps(updated, indent=2, default=str))
+    else:
+        financial = updated["financial_analysis"]
+        base_metrics = updated["what_if"]["base_metrics"]
+        print(f"🔧 WHAT-IF: {updated['location']}")
+        for override in updated["what_if"]["overrides"]:
+            print(f"   • {override['path']} {override['mode']} {override['value']:,.2f}")
+        print(f"\n   Break-even: {financial['break_even_timeline']}")
+        print(f"   ROI: {financial['roi_projection']}")
+        print(f"   Funding Required: ${financial['funding_requirements']:,.0f}")
+        for name, change in updated["what_if"]["metric_changes"].items():
+            print(f"   {name}: {base_metrics[name]:,.4f} → {base_metrics[name] + change:,.4f} ({change:+,.4f})")
+        recommendation = updated.get("business_recommendation") or {}
+        risk_profile = recommendation.get("risk_profile")
+        if risk_profile:
+            month = min(24, risk_profile["horizon_months"])
+            print(f"   Break-even probability by month {month}: {risk_profile['break_even_probability'][month - 1]:.0%}")
+        if args.resynthesize:
+            print(f"   Recommendation: {recommendation.get('recommendation', 'N/A').upper()}")
+    
+    if args.tornado:
+        print()
+        print(format_tornado(sensitivity_table(updated["financial_analysis"])))
+
+
+def run_refresh_command(argv: List[str]):
+    """Re-run only the expired sections of stored results."""
+    parser = argparse.ArgumentParser(
+        prog="main.py refresh",
+        description="Refresh stored research, re-running only sections older than their TTL"
+    )
+    parser.add_argument("locations", nargs="*", help="Locations to refresh (default: every stored location)")
+    parser.add_argument("--file", help="CSV or text file of locations")
+    parser.add_argument("--column", help="CSV column holding the location")
+    parser.add_argument("--db", help="Results database path (default: RESULTS_DB_PATH or food_truck_results.db)")
+    parser.add_argument("--model", help="Model name (default: MODEL_NAME)")
+    parser.add_argument(
+        "--ttl",
+        dest="ttls",
+        action="append",
+        default=[],
+        help="Section TTL such as 'market=7d' or 'operations=26w' (repeatable; others keep their defaults)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only show which sections would be re-run")
+    args = parser.parse_args(argv)
+    
+    try:
+        ttls = merge_section_ttls(args.ttls)
+        locations = list(args.locations)
+        if args.file:
+            locations += read_locations(args.file, column=args.column)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    
+    load_environment()
+    model_name, temperature = get_model_config()
+    model_name = args.model or model_name
+    store = get_results_store(args.db)
+    if not locations:
+        locations = [row["location"] for row in store.query(model_name=model_name, newest_per_location=True)]
+    
+    workflow = None
+    if not args.dry_run:
+        workflow = FoodTruckResearchWorkflow(
+            model_name=model_name,
+            temperature=temperature,
+            results_store=store,
+            skip_decisive_synthesis=get_skip_decisive_synthesis(),
+            prescreen_config=get_prescreen_config(),
+            regional_context=get_regional_context(),
+            trace_path=get_trace_path(),
+            cost_ledger=get_cost_ledger(),
+            run_budget_usd=get_run_budget()
+        )
+    
+    print(f"🔄 Refresh: {len(locations)} location(s) with {model_name}")
+    rerun, errors, cost_usd = 0, 0, 0.0
+    for location in locations:
+        if args.dry_run:
+            previous = store.get_latest(location, model_name=model_name)
+            sections = sections_to_refresh(previous, ttls) if previous else list(SECTIONS)
+            marker = "🆕" if previous is None else "⏭" if not sections else "🔄"
+        else:
+            results = workflow.run_research(location, refresh_ttls=ttls)
+            sections = [] if results.get("cache_hit") else results.get("refresh_sections", list(SECTIONS))
+            cost_usd += (results.get("cost") or {}).get("cost_usd", 0.0)
+            if results.get("status") == "error":
+                errors += 1
+                marker = "❌"
+            else:
+                marker = "✅" if sections else "⏭"
+        rerun += len(sections)
+        print(f"  {marker} {location}: {', '.join(sections) if sections else 'fresh'}")
+    
+    total = len(locations) * len(SECTIONS)
+    verb = "Would re-run" if args.dry_run else "Re-ran"
+    print(f"\n📊 {verb} {rerun} of {total} section(s)" + ("" if args.dry_run else f"; LLM cost ${cost_usd:,.4f}"))
+    if errors:
+        sys.exit(1)
+
+
+def run_rank_command(argv: List[str]):
+    """Rank stored locations by composite score and print the top k."""
+    parser = argparse.ArgumentParser(prog="main.py rank", description="Rank stored research results")
+    add_query_arguments(parser)
+    parser.add_argument("--top", type=int, default=10, help="Number of locations to show (per state with --by-state)")
+    parser.add_argument("--by-state", action="store_true", help="Rank locations within each state")
+    parser.add_argument("--exclude", action="append", default=[], help="Drop a recommendation, e.g. --exclude no_go")
+    parser.add_argument("--min-score", type=float, help="Drop locations scoring below this (0-100)")
+    parser.add_argument(
+        "--weights",
+        default="",
+        help="Scoring options, e.g. 'funding=0.4,competition=0.1,funding_ceiling=150000'"
+    )
+    parser.add_argument("--columnar", help="Rank an exported columnar directory instead of the database")
+    parser.add_argument("--json", action="store_true", help="Print ranked rows as JSON Lines")
+    args = parser.parse_args(argv)
+    
+    try:
+        config = RankingConfig.from_spec(args.weights)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.columnar:
+        results = load_columnar(args.columnar)
+    else:
+        filters = query_filters_from_args(args)
+        filters.update({"newest_per_location": True, "limit": None})
+        results = get_results_store(args.db).iter_results(**filters)
+    
+    rows = rank_locations(
+        results,
+        k=args.top,
+        config=config,
+        exclude_recommendations=args.exclude,
+        min_score=args.min_score,
+        group_by_state=args.by_state
+    )
+    
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print(format_ranking_report(rows, config, group_by_state=args.by_state))
+
+
+def run_agreement_command(argv: List[str]):
+    """Report how often the deterministic pre-screen agreed with the LLM recommendation."""
+    parser = argparse.ArgumentParser(
+        prog="main.py agreement",
+        description="Pre-screen vs. LLM recommendation agreement over stored results"
+    )
+    add_query_arguments(parser)
+    parser.add_argument(
+        "--config",
+        help="Re-score stored results with the thresholds in this JSON file (default: PRESCREEN_CONFIG, if set)"
+    )
+    args = parser.parse_args(argv)
+    
+    config = get_prescreen_config(args.config)
+    stats = agreement_rate(get_results_store(args.db).iter_results(**query_filters_from_args(args)), config)
+    rate = stats["agreement_rate"]
+    decisive_rate = stats["decisive_agreement_rate"]
+    print(f"Compared: {stats['compared']}  Agreed: {stats['agreed']}  Skipped (pre-screen applied): {stats['skipped']}")
+    print(f"Agreement rate: {rate:.1%}" if rate is not None else "Agreement rate: N/A")
+    print(f"Decisive agreement rate: {decisive_rate:.1%}" if decisive_rate is not None else "Decisive agreement rate: N/A")
+    for pair, count in stats["confusion"].items():
+        print(f"   {pair}: {count}")
+
+
+def run_report_command(argv: List[str]):
+    """Render stored results as Markdown, HTML, JSON or CSV reports."""
+    parser = argparse.ArgumentParser(prog="main.py report", description="Render stored research results")
+    add_query_arguments(parser)
+    parser.add_argument(
+        "--format",
+        dest="formats",
+        action="append",
+        choices=list(RENDERERS) + ["md"],
+        help="Report format (repeatable; default: markdown)"
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--output-dir", help="Write one report file per location into this directory")
+    output.add_argument("--combined", help="Write all results into this single file")
+    args = parser.parse_args(argv)
+    
+    formats = args.formats or ["markdown"]
+    results = get_results_store(args.db).iter_results(**query_filters_from_args(args))
+    
+    if args.output_dir:
+        paths = write_reports(results, args.output_dir, formats)
+        print(f"✅ Wrote {len(paths)} report file(s) to {args.output_dir}")
+    elif args.combined:
+        if len(formats) > 1:
+            parser.error("--combined takes a single --format")
+        count = write_combined_report(results, args.combined, formats[0])
+        print(f"✅ Wrote {count} result(s) to {args.combined}")
+    else:
+        if len(formats) > 1:
+            parser.error("stdout output takes a single --format")
+        render_stream(results, sys.stdout, formats[0])
+        if formats[0] in ("markdown", "md"):
+            sys.stdout.write("\n")
+
+
+def build_batch_workflow(
+    model_name: str,
+    temperature: float,
+    skip_decisive_synthesis: bool,
+    results_db_path: Optional[str],
+    profiling: Optional[ProfilingConfig] = None,
+    budget_usd: Optional[float] = None,
+    run_budget_usd: Optional[float] = None,
+    regional_context: bool = False,
+    prescreen_config: Optional[PrescreenConfig] = None
+) -> FoodTruckResearchWorkflow:
+    """Workflow for batch runs; module-level so worker processes can rebuild it."""
+    return FoodTruckResearchWorkflow(
+        model_name=model_name,
+        temperature=temperature,
+        results_store=get_results_store(results_db_path),
+        skip_decisive_synthesis=skip_decisive_synthesis,
+        prescreen_config=prescreen_config,
+        regional_context=regional_context,
+        trace_path=get_trace_path(),
+        profiling=profiling,
+        cost_ledger=get_cost_ledger(budget_usd, name="batch"),
+        run_budget_usd=run_budget_usd
+    )
+
+
+def add_profiling_arguments(parser: argparse.ArgumentParser):
+    """Add the opt-in CPU and memory profiling options."""
+    parser.add_argument("--profile-cpu", action="store_true", help="Save a cProfile of each run")
+    parser.add_argument("--profile-memory", action="store_true", help="Record per-node tracemalloc allocations")
+    parser.add_argument("--profile-sample-rate", type=float, help="Profile only this fraction of runs (0-1)")
+    parser.add_argument("--profile-dir", help="Directory for profiles (default: next to the results)")
+
+
+def run_batch_command(argv: List[str]):
+    """Research every location in a CSV or text file, appending results to a JSONL file."""
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Research a file of locations")
+    parser.add_argument("input", help="CSV (with a location or city/state columns) or text file, one location per line")
+    parser.add_argument("--output", "-o", default="batch_results.jsonl", help="JSON Lines output; reruns skip locations already in it")
+    parser.add_argument("--column", help="CSV column holding the location")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum research runs at once (per process)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes; use more to spread CPU work over cores")
+    parser.add_argument("--model", help="Model name (default: MODEL_NAME)")
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run locations whose previous result was an error")
+    parser.add_argument("--report-dir", help="Also write a report per successful location into this directory")
+    parser.add_argument(
+        "--report-format",
+        dest="report_formats",
+        action="append",
+        choices=list(RENDERERS) + ["md"],
+        help="Report format for --report-dir (repeatable; default: markdown)"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=_env_float("LLM_TOTAL_BUDGET_USD"),
+        help="Stop making LLM calls once the batch has spent this many dollars"
+    )
+    parser.add_argument(
+        "--run-budget",
+        type=float,
+        default=get_run_budget(),
+        help="Stop a location's LLM calls once it has spent this many dollars"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=os.getenv("METRICS_FILE"),
+        help="Prometheus text dump of latencies and counters (default: METRICS_FILE, else <output>_metrics.prom)"
+    )
+    parser.add_argument(
+        "--regional-context",
+        action="store_true",
+        default=get_regional_context(),
+        help="Research each state's permits, taxes and wages once and share them with its cities (default: REGIONAL_CONTEXT)"
+    )
+    add_profiling_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics_file = args.metrics_file or f"{os.path.splitext(args.output)[0]}_metrics.prom"
+    
+    try:
+        locations = read_locations(args.input, column=args.column)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    
+    model_name, temperature = get_model_config()
+    profiling = get_profiling_config(
+        cpu=args.profile_cpu,
+        memory=args.profile_memory,
+        sample_rate=args.profile_sample_rate,
+        output_dir=args.profile_dir or f"{os.path.splitext(args.output)[0]}_profiles"
+    )
+    workflow_factory = functools.partial(
+        build_batch_workflow,
+        args.model or model_name,
+        temperature,
+        get_skip_decisive_synthesis(),
+        os.getenv("RESULTS_DB_PATH"),
+        profiling,
+        # Each process keeps its own ledger, so the batch budget is split between them
+        args.budget / max(args.processes, 1) if args.budget is not None else None,
+        args.run_budget,
+        args.regional_context,
+        get_prescreen_config()
+    )
+    
+    def report_progress(result: Dict[str, Any], progress: BatchProgress):
+        marker = "✅" if result.get("status") == "success" else "❌"
+        print(
+            f"[{progress.completed}/{progress.total}] {marker} {result.get('location')} | "
+            f"{progress.throughput:.1f}/min | ETA {format_duration(progress.eta_seconds)} | "
+            f"${progress.cost_usd:,.2f}",
+            flush=True
+        )
+        # Keep the dump fresh for scrapers while a long batch runs
+        nonlocal last_metrics_dump
+        if time.monotonic() - last_metrics_dump >= METRICS_DUMP_INTERVAL_SECONDS:
+            write_metrics_file(metrics_file)
+            last_metrics_dump = time.monotonic()
+    
+    last_metrics_dump = time.monotonic()
+    
+    concurrency = args.concurrency
+    if profiling and profiling.memory and concurrency > 1:
+        # tracemalloc is process-wide; concurrent runs would mix their node allocations
+        print("🔬 Memory profiling: running one location at a time per process")
+        concurrency = 1
+    
+    options = {
+        "concurrency": concurrency,
+        "max_cache_age": get_cache_max_age(),
+        "retry_errors": args.retry_errors,
+        "report_dir": args.report_dir,
+        "report_formats": args.report_formats or ["markdown"],
+        "on_result": report_progress
+    }
+    print(f"🚚 Batch: {len(locations)} location(s) from {args.input} → {args.output}")
+    if args.processes > 1:
+        summary = run_batch_processes(locations, workflow_factory, args.output, processes=args.processes, **options)
+    else:
+        summary = run_batch(locations, workflow_factory(), args.output, **options)
+    
+    elapsed = format_duration(summary["elapsed_seconds"])
+    print(f"\n📊 Completed {summary['completed']} in {elapsed} ({summary['locations_per_minute']:.1f}/min)")
+    print(f"  skipped (already in output): {summary['skipped']}")
+    for status, count in summary["status_counts"].items():
+        print(f"  {status}: {count}")
+    budget_note = f" of ${args.budget:,.2f} budget" if args.budget is not None else ""
+    print(f"  LLM cost: ${summary['cost_usd']:,.4f}{budget_note}")
+    for metrics in summary.get("processes", []):
+        print(
+            f"  process {metrics['pid']}: {metrics['completed']} done, "
+            f"{metrics['cpu_seconds']:.1f}s CPU / {metrics['wall_seconds']:.1f}s wall"
+            + (f" ({metrics['error']})" if metrics["error"] else "")
+        )
+    if write_metrics_file(metrics_file):
+        print(f"  metrics: {metrics_file}")
+    
+    if profiling and profiling.cpu:
+        # Per-run profiles (from every process) combined into one for the batch
+        batch_profile = os.path.join(profiling.output_dir, "batch.prof")
+        paths = [path for path in glob.glob(os.path.join(profiling.output_dir, "*.prof")) if path != batch_profile]
+        combined = merge_profiles(paths, batch_profile)
+        if combined is not None:
+            print(f"\n🔬 Combined CPU profile of {len(paths)} run(s): {batch_profile}")
+            for entry in top_functions(combined, 10):
+                print(f"  {entry['cumulative_seconds']:>8.3f}s  {entry['function']}")
+    if summary["status_counts"].get("error"):
+        sys.exit(1)
+
+
+def run_enqueue_command(argv: List[str]):
+    """Add locations from the command line or a file to the durable job queue."""
+    parser = argparse.ArgumentParser(prog="main.py enqueue", description="Queue research jobs for workers")
+    parser.add_argument("locations", nargs="*", help="Locations to queue, e.g. 'Austin, TX'")
+    parser.add_argument("--file", help="CSV or text file of locations")
+    parser.add_argument("--column", help="CSV column holding the location")
+    parser.add_argument("--priority", type=int, default=0, help="Higher priorities run first")
+    parser.add_argument("--max-attempts", type=int, help="Attempts before a job is dead-lettered")
+    parser.add_argument("--model", help="Model for these jobs (default: the worker's model)")
+    parser.add_argument("--queue", help="Queue database path (default: JOB_QUEUE_PATH or food_truck_jobs.db)")
+    args = parser.parse_args(argv)
+    
+    locations = list(args.locations)
+    if args.file:
+        try:
+            locations += read_locations(args.file, column=args.column)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if not locations:
+        parser.error("give locations or --file")
+    
+    queue = get_job_queue(args.queue)
+    job_ids = queue.enqueue_many(
+        locations,
+        model_name=args.model,
+        priority=args.priority,
+        max_attempts=args.max_attempts,
+        payload={"max_cache_age": get_cache_max_age()}
+    )
+    print(f"✅ Queued {len(set(job_ids))} job(s) in {queue.path}")
+    print(" | ".join(f"{status}: {count}" for status, count in queue.counts().items()))
+
+
+def _worker_process(queue_path: Optional[str], exit_when_empty: bool, index: int):
+    """Entry point of one worker process; builds its own queue, store and workflows."""
+    model_name, temperature = get_model_config()
+    queue = get_job_queue(queue_path)
+    results_store = get_results_store()
+    skip_decisive_synthesis = get_skip_decisive_synthesis()
+    prescreen_config = get_prescreen_config()
+    regional_context = get_regional_context()
+    profiling = get_profiling_config()
+    # Shared by every model's workflow, so LLM_TOTAL_BUDGET_USD caps the process
+    cost_ledger = get_cost_ledger(name=f"worker {index}")
+    stop_event = threading.Event()
+    worker_id = f"{default_worker_id()}/{index}"
+    
+    def request_stop(signum, frame):
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    def workflow_factory(model: Optional[str]) -> FoodTruckResearchWorkflow:
+        # No results store on the workflow: the worker saves results once the job completes
+        return FoodTruckResearchWorkflow(
+            model_name=model or model_name,
+            temperature=temperature,
+            skip_decisive_synthesis=skip_decisive_synthesis,
+            prescreen_config=prescreen_config,
+            regional_context=regional_context,
+            trace_path=get_trace_path(),
+            profiling=profiling,
+            cost_ledger=cost_ledger,
+            run_budget_usd=get_run_budget()
+        )
+    
+    def report(job: Dict[str, Any], outcome: str):
+        marker = "✅" if outcome == "succeeded" else "❌"
+        print(f"[{worker_id}] {marker} job {job['id']} {job['location']}: {outcome}", flush=True)
+    
+    stats = run_worker(
+        queue,
+        workflow_factory,
+        results_store=results_store,
+        worker_id=worker_id,
+        exit_when_empty=exit_when_empty,
+        stop_event=stop_event,
+        on_job=report
+    )
+    print(f"[{worker_id}] stopped: {json.dumps(stats)}", flush=True)
+
+
+def run_worker_command(argv: List[str]):
+    """Run worker processes that pull research jobs from the durable queue."""
+    parser = argparse.ArgumentParser(prog="main.py worker", description="Process queued research jobs")
+    parser.add_argument("--processes", "-n", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--queue", help="Queue database path (default: JOB_QUEUE_PATH or food_truck_jobs.db)")
+    parser.add_argument("--exit-when-empty", action="store_true", help="Stop once no jobs are queued or running")
+    args = parser.parse_args(argv)
+    
+    if args.processes <= 1:
+        _worker_process(args.queue, args.exit_when_empty, 0)
+        return
+    
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_process, args=(args.queue, args.exit_when_empty, index), name=f"worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    
+    # Workers receive Ctrl-C themselves and finish their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+
+def run_queue_command(argv: List[str]):
+    """Show job queue status, list jobs, or requeue dead-lettered jobs."""
+    parser = argparse.ArgumentParser(prog="main.py queue", description="Inspect the durable job queue")
+    parser.add_argument("--queue", help="Queue database path (default: JOB_QUEUE_PATH or food_truck_jobs.db)")
+    parser.add_argument("--list", choices=JOB_STATUSES, help="List jobs in this status")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--requeue-dead", action="store_true", help="Give every dead-lettered job a fresh set of attempts")
+    args = parser.parse_args(argv)
+    
+    queue = get_job_queue(args.queue)
+    if args.requeue_dead:
+        print(f"✅ Requeued {queue.requeue_dead()} dead-lettered job(s)")
+    
+    print(" | ".join(f"{status}: {count}" for status, count in queue.counts().items()))
+    if args.list:
+        for job in queue.list_jobs(args.list, limit=args.limit):
+            line = f"{job['id']:>6}  p{job['priority']:<3} {job['location']:<30} attempts {job['attempts']}/{job['max_attempts']}"
+            if job["status"] == JOB_DEAD or job["last_error"]:
+                line += f"  {job['last_error']}"
+            print(line)
+
+
+def run_trace_command(argv: List[str]):
+    """Print the critical path and a Gantt chart of recorded research runs."""
+    parser = argparse.ArgumentParser(prog="main.py trace", description="Show per-node timing of traced runs")
+    parser.add_argument("--file", default=os.getenv("TRACE_EXPORT_PATH"), help="Trace file (default: TRACE_EXPORT_PATH)")
+    parser.add_argument("--trace-id", help="Show only this trace")
+    parser.add_argument("--last", type=int, default=1, help="Show the most recent N traces")
+    parser.add_argument("--width", type=int, default=50, help="Width of the Gantt bars")
+    parser.add_argument("--json", action="store_true", help="Print run summaries as JSON Lines instead")
+    args = parser.parse_args(argv)
+    
+    if not args.file or not os.path.exists(args.file):
+        print("❌ No trace file; set TRACE_EXPORT_PATH or pass --file")
+        sys.exit(1)
+    
+    traces = load_traces(args.file)
+    if args.trace_id:
+        traces = [trace for trace in traces if trace.trace_id == args.trace_id]
+    else:
+        traces = traces[-args.last:] if args.last > 0 else traces
+    if not traces:
+        print("❌ No matching traces")
+        sys.exit(1)
+    
+    for trace in traces:
+        summary = trace.summary()
+        if args.json:
+            print(json.dumps(summary, default=str))
+            continue
+        print(format_gantt(trace, width=args.width))
+        print(f"Critical path: {' → '.join(step['name'] for step in summary['critical_path'])}")
+        print(
+            f"Queue wait {summary['queue_wait_ms'] / 1000:.2f}s | LLM attempts {summary['llm_attempts']} "
+            f"(retries {summary['retries']}) | tokens {summary['input_tokens']} in / {summary['output_tokens']} out | "
+            f"fallbacks {summary['fallbacks']}\n"
+        )
+
+
+def run_serve_command(argv: List[str]):
+    """Serve research jobs over HTTP with warm workflows and a concurrency limit."""
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Run the research HTTP service")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8080")))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("SERVICE_MAX_CONCURRENCY", "4")),
+        help="Maximum research runs at once"
+    )
+    parser.add_argument("--max-queued", type=int, default=1000, help="Reject new jobs beyond this many waiting")
+    parser.add_argument(
+        "--models",
+        default=os.getenv("SERVICE_MODELS", ""),
+        help="Comma-separated models jobs may ask for besides MODEL_NAME"
+    )
+    args = parser.parse_args(argv)
+    
+    model_name, temperature = get_model_config()
+    results_store = get_results_store()
+    skip_decisive_synthesis = get_skip_decisive_synthesis()
+    prescreen_config = get_prescreen_config()
+    regional_context = get_regional_context()
+    profiling = get_profiling_config()
+    cost_ledger = get_cost_ledger(name="service")
+    
+    def workflow_factory(model: str) -> FoodTruckResearchWorkflow:
+        return FoodTruckResearchWorkflow(
+            model_name=model,
+            temperature=temperature,
+            results_store=results_store,
+            skip_decisive_synthesis=skip_decisive_synthesis,
+            prescreen_config=prescreen_config,
+            regional_context=regional_context,
+            trace_path=get_trace_path(),
+            profiling=profiling,
+            cost_ledger=cost_ledger,
+            run_budget_usd=get_run_budget()
+        )
+    
+    run_server(
+        workflow_factory,
+        host=args.host,
+        port=args.port,
+        default_model=model_name,
+        max_concurrency=args.concurrency,
+        max_queued=args.max_queued,
+        allowed_models=[model.strip() for model in args.models.split(",") if model.strip()]
+    )
+
+
+COMMANDS = {
+    "query": run_query_command,
+    "export": run_export_command,
+    "rank": run_rank_command,
+    "agreement": run_agreement_command,
+    "report": run_report_command,
+    "serve": run_serve_command,
+    "batch": run_batch_command,
+    "enqueue": run_enqueue_command,
+    "worker": run_worker_command,
+    "queue": run_queue_command,
+    "trace": run_trace_command,
+    "what-if": run_what_if_command,
+    "refresh": run_refresh_command
+}
+
+
 def main():
     """Main application entry point."""
     
+    # Dispatch subcommands
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
     # Parse command line arguments
-    if len(sys.argv) > 1:
-        location = sys.argv[1]
-        model = sys.argv[2] if len(sys.argv) > 2 else None
-        run_command_line_mode(location, model)
+    profile_flags = {"--profile-cpu", "--profile-memory"}
+    arguments = [argument for argument in sys.argv[1:] if argument not in profile_flags]
+    if arguments:
+        location = arguments[0]
+        model = arguments[1] if len(arguments) > 1 else None
+        run_command_line_mode(
+            location,
+            model,
+            profile_cpu="--profile-cpu" in sys.argv,
+            profile_memory="--profile-memory" in sys.argv
+        )
     else:
         run_interactive_mode()
 
@@ -28,6 +28,24 @@ class MarketResearchData(BaseModel):
     challenges: List[str] = Field(description="Market challenges identified")
 
 
+class FinancialMetrics(BaseModel):
+    """Financial metrics computed deterministically from the numeric projections."""
+    
+    investment: float = Field(description="Upfront investment (funding requirement or total startup costs)")
+    monthly_revenue: float = Field(description="Projected monthly revenue")
+    monthly_operating_costs: float = Field(description="Total monthly operating costs")
+    monthly_net_income: float = Field(description="Monthly revenue minus operating costs")
+    break_even_months: Optional[float] = Field(default=None, description="Months to recover the investment (None if never)")
+    payback_months: Optional[int] = Field(default=None, description="Whole months until cumulative cash turns positive")
+    discounted_payback_months: Optional[float] = Field(default=None, description="Break-even months using discounted cash flows")
+    annual_roi: Optional[float] = Field(default=None, description="Annual net income divided by investment")
+    horizon_roi: Optional[float] = Field(default=None, description="Cumulative ROI over the analysis horizon")
+    npv: Optional[float] = Field(default=None, description="Net present value over the analysis horizon")
+    irr: Optional[float] = Field(default=None, description="Annualized internal rate of return over the horizon")
+    horizon_months: int = Field(description="Analysis horizon in months")
+    annual_discount_rate: float = Field(description="Annual discount rate used for NPV")
+
+
 class FinancialAnalysisData(BaseModel):
     """Financial analysis from the Financial Advisor Agent."""
     
@@ -39,6 +57,9 @@ class FinancialAnalysisData(BaseModel):
     cash_flow_analysis: str = Field(description="Cash flow considerations and projections")
     funding_requirements: float = Field(description="Total funding needed to start")
     roi_projection: str = Field(description="Return on investment timeline and percentage")
+    derived_metrics: Optional[FinancialMetrics] = Field(default=None, description="Metrics computed locally from the numeric fields")
+    consistency_flags: List[str] = Field(default_factory=list, description="Stated values that disagree with the computed metrics")
+    consistency_notes: List[str] = Field(default_factory=list, description="Statements kept as written because they have no value to check")
 
 
 class OperationsAnalysisData(BaseModel):
@@ -53,6 +74,53 @@ class OperationsAnalysisData(BaseModel):
     staffing_needs: Dict[str, Any] = Field(description="Staffing requirements and roles")
     daily_operations: List[str] = Field(description="Key daily operational considerations")
     logistics_challenges: List[str] = Field(description="Logistics and supply chain considerations")
+    permit_source: Optional[str] = Field(default=None, description="Permit knowledge base entry the permit fields come from")
+
+
+class RegionalContext(BaseModel):
+    """State-level rules and cost assumptions shared by every city in a state, from the Regional Analyst Agent."""
+    
+    state: str = Field(description="Two-letter state code")
+    permits_required: List[str] = Field(description="Permits and licenses required statewide")
+    permit_costs: Dict[str, float] = Field(default_factory=dict, description="Fees for the statewide permits/licenses")
+    health_regulations: List[str] = Field(description="State food code and health department requirements")
+    sales_tax_rate: float = Field(description="State sales tax rate as a fraction (e.g. 0.0625)")
+    minimum_wage_hourly: float = Field(description="State minimum wage in dollars per hour")
+    labor_costs_hourly: Dict[str, float] = Field(default_factory=dict, description="Typical hourly wages by role in the state")
+    tax_and_labor_notes: List[str] = Field(default_factory=list, description="Other state tax and labor rules affecting costs")
+
+
+class RiskProfile(BaseModel):
+    """Monte Carlo risk profile of a location's projected cash position."""
+    
+    scenarios: int = Field(description="Number of simulated scenarios")
+    horizon_months: int = Field(description="Simulated horizon in months")
+    break_even_probability: List[float] = Field(description="Probability of having broken even by month N (index N-1)")
+    median_break_even_month: Optional[int] = Field(default=None, description="Month by which half of scenarios break even")
+    probability_of_loss: float = Field(description="Probability that cumulative cash is negative at the horizon")
+    expected_final_cash: float = Field(description="Mean cumulative cash position at the horizon")
+    value_at_risk: float = Field(description="Loss at the horizon not exceeded with the configured confidence")
+    expected_shortfall: float = Field(description="Mean loss in the scenarios beyond the value-at-risk")
+    confidence_level: float = Field(description="Confidence level used for value-at-risk")
+    cash_percentiles: Dict[str, List[float]] = Field(description="Cumulative cash curve per percentile (e.g. 'p50')")
+    seasonal_profile: List[float] = Field(description="Monthly revenue multipliers applied over the horizon")
+    
+    def probability_by(self, month: int) -> float:
+        """Return the probability of breaking even by the given month."""
+        if month <= 0 or not self.break_even_probability:
+            return 0.0
+        return self.break_even_probability[min(month, len(self.break_even_probability)) - 1]
+
+
+class PrescreenResult(BaseModel):
+    """Deterministic pre-screen score computed ahead of the synthesis LLM."""
+    
+    score: float = Field(description="Composite score from 0 (clear no-go) to 100 (clear go)")
+    recommendation: RecommendationType = Field(description="Preliminary recommendation implied by the score")
+    confidence_level: str = Field(description="High/Medium/Low confidence in the preliminary recommendation")
+    reason_codes: List[str] = Field(default_factory=list, description="Rules that moved the score, e.g. 'COMPETITION_HIGH'")
+    decisive: bool = Field(default=False, description="Score is far enough from the thresholds to skip the synthesis LLM")
+    applied: bool = Field(default=False, description="The final recommendation was taken from the pre-screen")
 
 
 class BusinessRecommendation(BaseModel):
@@ -66,6 +134,8 @@ class BusinessRecommendation(BaseModel):
     next_steps: List[str] = Field(description="Recommended next steps if proceeding")
     timeline_recommendation: str = Field(description="Recommended timeline for launch")
     alternative_suggestions: List[str] = Field(description="Alternative approaches or locations")
+    risk_profile: Optional[RiskProfile] = Field(default=None, description="Monte Carlo risk profile behind the recommendation")
+    prescreen: Optional[PrescreenResult] = Field(default=None, description="Deterministic pre-screen of the same inputs")
 
 
 class FoodTruckResearchState(BaseModel):
@@ -76,6 +146,7 @@ class FoodTruckResearchState(BaseModel):
     financial_analysis: Optional[FinancialAnalysisData] = Field(default=None, description="Financial analysis results")
     operations_analysis: Optional[OperationsAnalysisData] = Field(default=None, description="Operations analysis results")
     business_recommendation: Optional[BusinessRecommendation] = Field(default=None, description="Final business recommendation")
+    regional_context: Optional[RegionalContext] = Field(default=None, description="State-level context shared by cities in the state")
     messages: List[str] = Field(default_factory=list, description="Agent communication history")
     current_agent: Optional[str] = Field(default=None, description="Currently active agent")
     
@@ -84,6 +155,17 @@ class FoodTruckResearchState(BaseModel):
         arbitrary_types_allowed = True
 
 
+class RunEvent(BaseModel):
+    """Structured entry in the per-run workflow event log."""
+    
+    timestamp: float = Field(description="Unix timestamp when the event was recorded")
+    run_id: str = Field(description="Identifier of the workflow run that produced the event")
+    node: str = Field(description="Workflow node or component that emitted the event")
+    level: str = Field(default="info", description="Event severity: debug/info/warning/error")
+    message: str = Field(description="Human-readable event summary")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="Structured event details")
+
+
 class AgentResponse(BaseModel):
     """Standard response format for all agents."""
     
@@ -92,4 +174,6 @@ class AgentResponse(BaseModel):
     message: str = Field(description="Human-readable status message")
     data: Optional[Any] = Field(default=None, description="Agent-specific data payload")
     next_agent: Optional[str] = Field(default=None, description="Recommended next agent in workflow")
-    error_details: Optional[str] = Field(default=None, description="Error details if status is ERROR")
\ No newline at end of file
+    error_details: Optional[str] = Field(default=None, description="Error details if status is ERROR")
+    used_fallback: bool = Field(default=False, description="Data was built by a fallback instead of from the LLM response")
+    fallback_source: Optional[str] = Field(default=None, description="Researched city the fallback data was borrowed from")
\ No newline at end of file
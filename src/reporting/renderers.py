@@ -0,0 +1,477 @@
+"""
+Streaming report renderers for research results.
+
+Each result is described once as a sequence of report blocks (title,
+headings, fields, lists) and every format renders those blocks straight to
+a file handle, so one report or a batch of thousands is written without
+building the output in memory. Batch files open with a format header
+(CSV columns, JSON array, HTML document) written by ``begin`` and close
+with ``end``.
+"""
+
+import csv
+import html
+import io
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.atomic_files import atomic_write
+
+
+# Report blocks: ("title", text), ("heading", text), ("field", label, value),
+# ("list", label, items), ("break",), ("error", message)
+Block = Tuple[Any, ...]
+
+CSV_COLUMNS = [
+    "location",
+    "status",
+    "run_id",
+    "recommendation",
+    "confidence_level",
+    "competition_level",
+    "funding_requirements",
+    "break_even_timeline",
+    "roi_projection",
+    "monthly_net_income",
+    "npv",
+    "irr",
+    "permit_timeline",
+    "break_even_probability_24m",
+    "prescreen_score",
+    "llm_cost_usd",
+    "error_message"
+]
+
+
+def _value(value: Any) -> Any:
+    """Unwrap enum values such as RecommendationType."""
+    return getattr(value, "value", value)
+
+
+def report_blocks(results: Dict[str, Any]) -> Iterator[Block]:
+    """
+    Describe a result as report blocks, section by section.
+    
+    Args:
+        results: Result dictionary as returned by ``run_research``
+    
+    Yields:
+        Report blocks in display order
+    """
+    if results.get("status") == "error":
+        yield ("error", f"Research failed: {results.get('error_message', 'Unknown error')}")
+        yield from _cost_blocks(results.get("cost"))
+        return
+    
+    location = results.get("location", "Unknown Location")
+    yield ("title", f"Food Truck Business Research Report: {location}")
+    
+    # Market Research Section
+    market_data = results.get("market_research", {})
+    if market_data:
+        yield ("heading", "Market Research Analysis")
+        yield ("field", "Competition Level", market_data.get("competition_level", "N/A"))
+        yield ("field", "Target Customers", ", ".join(market_data.get("target_customers", [])))
+        yield ("field", "Market Size", market_data.get("market_size_estimate", "N/A"))
+        yield ("field", "Peak Hours", ", ".join(market_data.get("peak_hours", [])))
+        yield ("field", "Key Opportunities", ", ".join(market_data.get("opportunities", [])))
+        yield ("break",)
+    
+    # Financial Analysis Section
+    financial_data = results.get("financial_analysis", {})
+    if financial_data:
+        funding = financial_data.get("funding_requirements", 0)
+        yield ("heading", "Financial Analysis")
+        yield ("field", "Total Funding Required", f"${funding:,.2f}")
+        yield ("field", "Break-even Timeline", financial_data.get("break_even_timeline", "N/A"))
+        yield ("field", "ROI Projection", financial_data.get("roi_projection", "N/A"))
+        yield ("break",)
+        
+        metrics = financial_data.get("derived_metrics")
+        if metrics:
+            npv = metrics.get("npv")
+            irr = metrics.get("irr")
+            yield ("field", "Monthly Net Income (computed)", f"${metrics.get('monthly_net_income', 0):,.2f}")
+            yield (
+                "field",
+                f"NPV over {metrics.get('horizon_months')} months",
+                f"${npv:,.2f}" if npv is not None else "N/A"
+            )
+            yield ("field", "IRR (annualized)", f"{irr:.1%}" if irr is not None else "N/A")
+            yield ("break",)
+        
+        flags = financial_data.get("consistency_flags", [])
+        if flags:
+            yield ("list", "Corrected Projections", flags)
+            yield ("break",)
+        notes = financial_data.get("consistency_notes", [])
+        if notes:
+            yield ("list", "Unchecked Projections", notes)
+            yield ("break",)
+    
+    # Operations Section
+    operations_data = results.get("operations_analysis", {})
+    if operations_data:
+        minimum_staff = operations_data.get("staffing_needs", {}).get("minimum_staff", "N/A")
+        yield ("heading", "Operations Requirements")
+        yield ("field", "Required Permits", ", ".join(operations_data.get("permits_required", [])))
+        yield ("field", "Permit Timeline", operations_data.get("permit_timeline", "N/A"))
+        if operations_data.get("permit_source"):
+            yield ("field", "Permit Source", operations_data["permit_source"])
+        yield ("field", "Staffing Needs", f"{minimum_staff} minimum staff")
+        yield ("break",)
+    
+    # Business Recommendation Section
+    business_data = results.get("business_recommendation", {})
+    if business_data:
+        recommendation = str(_value(business_data.get("recommendation", "N/A"))).upper()
+        confidence = business_data.get("confidence_level", "N/A")
+        yield ("heading", "Business Recommendation")
+        yield ("field", "Recommendation", f"{recommendation} (Confidence: {confidence})")
+        yield ("field", "Key Strengths", ", ".join(business_data.get("key_strengths", [])))
+        yield ("field", "Key Risks", ", ".join(business_data.get("key_risks", [])))
+        yield ("field", "Timeline", business_data.get("timeline_recommendation", "N/A"))
+        yield ("break",)
+        
+        risk = business_data.get("risk_profile")
+        if risk:
+            probabilities = risk.get("break_even_probability", [])
+            horizon = risk.get("horizon_months", len(probabilities))
+            checkpoints = [month for month in (12, 24, horizon) if 0 < month <= len(probabilities)]
+            yield ("field", "Break-even Probability", ", ".join(
+                f"{probabilities[month - 1]:.0%} by month {month}" for month in dict.fromkeys(checkpoints)
+            ))
+            yield (
+                "field",
+                f"Value at Risk ({risk.get('confidence_level', 0.95):.0%})",
+                f"${risk.get('value_at_risk', 0):,.0f}"
+            )
+            yield ("break",)
+        
+        screen = business_data.get("prescreen")
+        if screen:
+            source = "recommendation source" if screen.get("applied") else "LLM cross-check"
+            reasons = ", ".join(screen.get("reason_codes", [])) or "no rules triggered"
+            yield ("field", "Pre-screen Score", f"{screen.get('score', 0):.0f}/100 ({source}; {reasons})")
+            yield ("break",)
+        
+        next_steps = business_data.get("next_steps", [])
+        if next_steps:
+            yield ("list", "Recommended Next Steps", next_steps)
+            yield ("break",)
+    
+    yield from _cost_blocks(results.get("cost"))
+
+
+def _cost_blocks(cost: Optional[Dict[str, Any]]) -> Iterator[Block]:
+    """LLM spend of the run, per agent."""
+    if not cost:
+        return
+    
+    yield ("heading", "LLM Cost")
+    budget = cost.get("budget_usd")
+    total = f"${cost.get('cost_usd', 0):,.4f} ({cost.get('calls', 0)} calls, "
+    total += f"{cost.get('input_tokens', 0):,} in / {cost.get('output_tokens', 0):,} out tokens)"
+    if budget is not None:
+        total += f"; budget ${budget:,.2f}" + (" exceeded" if cost.get("budget_exceeded") else "")
+    yield ("field", "Total", total)
+    for agent, totals in cost.get("by_agent", {}).items():
+        yield ("field", agent, f"${totals.get('cost_usd', 0):,.4f} ({totals.get('calls', 0)} calls)")
+    if cost.get("unpriced_calls"):
+        yield ("field", "Unpriced Calls", f"{cost['unpriced_calls']} (model missing from the price table)")
+    yield ("break",)
+
+
+def summary_row(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a result into the one-line summary used by the CSV format."""
+    market = results.get("market_research") or {}
+    financial = results.get("financial_analysis") or {}
+    metrics = financial.get("derived_metrics") or {}
+    operations = results.get("operations_analysis") or {}
+    business = results.get("business_recommendation") or {}
+    risk = business.get("risk_profile") or {}
+    screen = business.get("prescreen") or {}
+    probabilities = risk.get("break_even_probability") or []
+    
+    return {
+        "location": results.get("location", ""),
+        "status": results.get("status", ""),
+        "run_id": results.get("run_id", ""),
+        "recommendation": _value(business.get("recommendation", "")),
+        "confidence_level": business.get("confidence_level", ""),
+        "competition_level": market.get("competition_level", ""),
+        "funding_requirements": financial.get("funding_requirements", ""),
+        "break_even_timeline": financial.get("break_even_timeline", ""),
+        "roi_projection": financial.get("roi_projection", ""),
+        "monthly_net_income": metrics.get("monthly_net_income", ""),
+        "npv": metrics.get("npv", ""),
+        "irr": metrics.get("irr", ""),
+        "permit_timeline": operations.get("permit_timeline", ""),
+        "break_even_probability_24m": probabilities[min(24, len(probabilities)) - 1] if probabilities else "",
+        "prescreen_score": screen.get("score", ""),
+        "llm_cost_usd": (results.get("cost") or {}).get("cost_usd", ""),
+        "error_message": results.get("error_message", "")
+    }
+
+
+class ReportRenderer(ABC):
+    """Writes results in one output format to a text handle."""
+    
+    format_name = ""
+    extension = ""
+    
+    def __init__(self):
+        self._count = 0
+    
+    def begin(self, handle: IO[str]):
+        """Write anything that precedes the first result."""
+        self._count = 0
+    
+    def render(self, results: Dict[str, Any], handle: IO[str]):
+        """Write one result, separated from any previous one."""
+        self._write_result(results, handle, first=self._count == 0)
+        self._count += 1
+    
+    def end(self, handle: IO[str]):
+        """Write anything that follows the last result."""
+    
+    @abstractmethod
+    def _write_result(self, results: Dict[str, Any], handle: IO[str], first: bool):
+        """Write one result to the handle."""
+
+
+class MarkdownRenderer(ReportRenderer):
+    """Markdown report, the format shown by the CLI."""
+    
+    format_name = "markdown"
+    extension = "md"
+    
+    def _write_result(self, results: Dict[str, Any], handle: IO[str], first: bool):
+        if not first:
+            handle.write("\n\n---\n\n")
+        
+        lines = self._lines(results)
+        handle.write(next(lines, ""))
+        for line in lines:
+            handle.write("\n")
+            handle.write(line)
+    
+    @staticmethod
+    def _lines(results: Dict[str, Any]) -> Iterator[str]:
+        for block in report_blocks(results):
+            kind = block[0]
+            if kind == "error":
+                yield block[1]
+            elif kind == "title":
+                yield f"# {block[1]}"
+                yield "=" * 60
+                yield ""
+            elif kind == "heading":
+                yield f"## {block[1]}"
+            elif kind == "field":
+                yield f"**{block[1]}:** {block[2]}"
+            elif kind == "list":
+                yield f"**{block[1]}:**"
+                for item in block[2]:
+                    yield f"- {item}"
+            elif kind == "break":
+                yield ""
+
+
+class HtmlRenderer(ReportRenderer):
+    """Standalone HTML document with one section per result."""
+    
+    format_name = "html"
+    extension = "html"
+    
+    def begin(self, handle: IO[str]):
+        super().begin(handle)
+        handle.write(
+            "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>Food Truck Business Research</title>\n"
+            "<style>body{font-family:sans-serif;max-width:60em;margin:2em auto;line-height:1.4}"
+            "section{border-bottom:1px solid #ccc;padding-bottom:1em}.error{color:#b00}</style>\n"
+            "</head>\n<body>\n"
+        )
+    
+    def end(self, handle: IO[str]):
+        handle.write("</body>\n</html>\n")
+    
+    def _write_result(self, results: Dict[str, Any], handle: IO[str], first: bool):
+        handle.write("<section>\n")
+        for block in report_blocks(results):
+            kind = block[0]
+            if kind == "error":
+                handle.write(f"<p class=\"error\">{html.escape(block[1])}</p>\n")
+            elif kind == "title":
+                handle.write(f"<h1>{html.escape(block[1])}</h1>\n")
+            elif kind == "heading":
+                handle.write(f"<h2>{html.escape(block[1])}</h2>\n")
+            elif kind == "field":
+                handle.write(f"<p><strong>{html.escape(block[1])}:</strong> {html.escape(str(block[2]))}</p>\n")
+            elif kind == "list":
+                handle.write(f"<p><strong>{html.escape(block[1])}:</strong></p>\n<ul>\n")
+                for item in block[2]:
+                    handle.write(f"<li>{html.escape(str(item))}</li>\n")
+                handle.write("</ul>\n")
+        handle.write("</section>\n")
+
+
+class JsonRenderer(ReportRenderer):
+    """Full results as JSON: an object for one result, an array for a batch."""
+    
+    format_name = "json"
+    extension = "json"
+    
+    def __init__(self, batch: bool = False):
+        super().__init__()
+        self.batch = batch
+    
+    def begin(self, handle: IO[str]):
+        super().begin(handle)
+        if self.batch:
+            handle.write("[\n")
+    
+    def end(self, handle: IO[str]):
+        handle.write("\n]\n" if self.batch else "\n")
+    
+    def _write_result(self, results: Dict[str, Any], handle: IO[str], first: bool):
+        if not first:
+            handle.write(",\n")
+        json.dump(results, handle, indent=2 if not self.batch else None, default=str)
+
+
+class CsvRenderer(ReportRenderer):
+    """One summary row per result under a single header row."""
+    
+    format_name = "csv"
+    extension = "csv"
+    
+    def begin(self, handle: IO[str]):
+        super().begin(handle)
+        self._writer = csv.DictWriter(handle, fieldnames=CSV_COLUMNS, lineterminator="\n")
+        self._writer.writeheader()
+    
+    def _write_result(self, results: Dict[str, Any], handle: IO[str], first: bool):
+        self._writer.writerow(summary_row(results))
+
+
+RENDERERS = {
+    "markdown": MarkdownRenderer,
+    "html": HtmlRenderer,
+    "json": JsonRenderer,
+    "csv": CsvRenderer
+}
+
+FORMAT_ALIASES = {"md": "markdown", "htm": "html"}
+
+
+def get_renderer(format_name: str, batch: bool = False) -> ReportRenderer:
+    """
+    Create a renderer by format name ("markdown"/"md", "html", "json", "csv").
+    
+    Raises:
+        ValueError: If the format is unknown
+    """
+    name = FORMAT_ALIASES.get(format_name.lower(), format_name.lower())
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown report format '{format_name}'; choose from {', '.join(RENDERERS)}")
+    return JsonRenderer(batch=batch) if name == "json" else RENDERERS[name]()
+
+
+def render_stream(
+    results: Iterable[Dict[str, Any]],
+    handle: IO[str],
+    format_name: str = "markdown",
+    batch: bool = True
+) -> int:
+    """
+    Stream results to an open handle (e.g. sys.stdout) in one format.
+    
+    Args:
+        results: Result dictionaries; consumed one at a time
+        handle: Writable text handle
+        format_name: Output format
+        batch: Treat the output as a collection (JSON array rather than object)
+    
+    Returns:
+        Number of results written
+    """
+    renderer = get_renderer(format_name, batch=batch)
+    renderer.begin(handle)
+    count = 0
+    for result in results:
+        renderer.render(result, handle)
+        count += 1
+    renderer.end(handle)
+    return count
+
+
+def report_filename(location: str, format_name: str = "markdown") -> str:
+    """File name for a location's report, e.g. food_truck_research_austin_tx.md."""
+    safe_location = location.replace(" ", "_").replace(",", "").replace("/", "_").lower()
+    return f"food_truck_research_{safe_location}.{get_renderer(format_name).extension}"
+
+
+def write_report(
+    results: Dict[str, Any],
+    output_dir: str = ".",
+    format_name: str = "markdown",
+    filename: Optional[str] = None
+) -> str:
+    """
+    Atomically write one result's report into an output directory.
+    
+    Returns:
+        Path of the written file
+    """
+    path = os.path.join(output_dir, filename or report_filename(results.get("location", "unknown"), format_name))
+    with atomic_write(path, newline="") as handle:
+        render_stream([results], handle, format_name, batch=False)
+    return path
+
+
+def write_reports(
+    results: Iterable[Dict[str, Any]],
+    output_dir: str,
+    formats: Sequence[str] = ("markdown",)
+) -> List[str]:
+    """
+    Atomically write one report file per result and format.
+    
+    Results are consumed one at a time, so memory use stays flat for large
+    batches. A location that appears more than once keeps its first report.
+    
+    Returns:
+        Paths of the written files
+    """
+    paths: List[str] = []
+    written = set()
+    for result in results:
+        for format_name in formats:
+            filename = report_filename(result.get("location", "unknown"), format_name)
+            if filename in written:
+                continue
+            written.add(filename)
+            paths.append(write_report(result, output_dir, format_name, filename))
+    return paths
+
+
+def write_combined_report(results: Iterable[Dict[str, Any]], path: str, format_name: str = "markdown") -> int:
+    """
+    Atomically stream many results into a single file.
+    
+    Returns:
+        Number of results written
+    """
+    with atomic_write(path, newline="") as handle:
+        return render_stream(results, handle, format_name, batch=True)
+
+
+def render_to_string(results: Dict[str, Any], format_name: str = "markdown") -> str:
+    """Render one result to a string (for display and callers that need text)."""
+    buffer = io.StringIO()
+    render_stream([results], buffer, format_name, batch=False)
+    return buffer.getvalue()
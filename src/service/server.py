@@ -0,0 +1,524 @@
+"""
+Long-running HTTP service for food truck research jobs.
+
+A small HTTP/1.1 server on stdlib asyncio. Workflows (and their LLM
+clients) are created once per model and reused for every job. Each job runs
+the blocking workflow in a worker thread, and a semaphore enforces the
+concurrency limit.
+
+Endpoints:
+    POST /jobs                 {"location": "Austin, TX", "model": optional (served models only), "max_cache_age": optional}
+    GET  /jobs                 Recent jobs, newest first
+    GET  /jobs/{id}            Job status
+    GET  /jobs/{id}/result     Finished result (?format=json|markdown|html|csv)
+    GET  /jobs/{id}/events     Server-sent events with run progress
+    GET  /health               Liveness and load
+    GET  /metrics              Latencies and counters in Prometheus text format
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from reporting.renderers import get_renderer, render_to_string
+from utils.event_log import events_to_dicts
+from utils.metrics import REGISTRY, render_prometheus
+
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+
+# Seconds between SSE keep-alive comments while a job is quiet
+SSE_KEEPALIVE_SECONDS = 15.0
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+SERVICE_JOBS = REGISTRY.gauge("food_truck_service_jobs", "Jobs held by the service, by status", ("status",))
+
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    503: "Service Unavailable"
+}
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "prometheus": "text/plain; version=0.0.4; charset=utf-8"
+}
+
+
+class HTTPError(Exception):
+    """Error that maps directly to an HTTP response."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ResearchJob:
+    """State of one research job, shared between the event loop and its worker thread."""
+    
+    def __init__(self, location: str, model_name: str, max_cache_age: Optional[float] = None):
+        self.job_id = uuid.uuid4().hex
+        self.location = location
+        self.model_name = model_name
+        self.max_cache_age = max_cache_age
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+    
+    def notify(self):
+        """Wake every SSE stream waiting for this job to change."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until the job changes; returns False on timeout."""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    def summary(self) -> Dict[str, Any]:
+        """Job status as returned by the API."""
+        return {
+            "job_id": self.job_id,
+            "location": self.location,
+            "model": self.model_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "event_count": len(self.events),
+            "cache_hit": bool(self.result and self.result.get("cache_hit"))
+        }
+
+
+class ResearchService:
+    """Job registry and runner behind the HTTP endpoints."""
+    
+    def __init__(
+        self,
+        workflow_factory: Callable[[str], Any],
+        default_model: str = "gpt-4",
+        max_concurrency: int = 4,
+        max_queued: int = 1000,
+        max_retained_jobs: int = 1000,
+        allowed_models: Optional[Iterable[str]] = None
+    ):
+        """
+        Initialize the service.
+        
+        Args:
+            workflow_factory: Builds a warm workflow for a model name
+            default_model: Model used when a job does not name one
+            max_concurrency: Maximum number of research runs at once
+            max_queued: Jobs waiting beyond this are rejected with 503
+            max_retained_jobs: Finished jobs kept for status and result lookups
+            allowed_models: Models jobs may ask for (default: only the default model);
+                each one holds a warm workflow for the life of the service
+        """
+        self.workflow_factory = workflow_factory
+        self.default_model = default_model
+        self.allowed_models = frozenset(allowed_models or ()) | {default_model}
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.max_retained_jobs = max_retained_jobs
+        
+        self.jobs: "OrderedDict[str, ResearchJob]" = OrderedDict()
+        self._workflows: Dict[str, Any] = {}
+        self._workflow_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="research")
+        self._tasks: set = set()
+    
+    def workflow_for(self, model_name: str) -> Any:
+        """Return the warm workflow for a model, creating it on first use."""
+        with self._workflow_lock:
+            if model_name not in self._workflows:
+                self._workflows[model_name] = self.workflow_factory(model_name)
+            return self._workflows[model_name]
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_SUCCEEDED: 0, JOB_FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+    
+    def warm_models(self) -> List[str]:
+        """Models whose workflows are already built."""
+        with self._workflow_lock:
+            return sorted(self._workflows)
+    
+    async def warm(self, model_name: str):
+        """Build a model's workflow ahead of its first job."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.workflow_for, model_name)
+    
+    def submit(
+        self,
+        location: str,
+        model_name: Optional[str] = None,
+        max_cache_age: Optional[float] = None
+    ) -> ResearchJob:
+        """
+        Queue a research job on the running event loop.
+        
+        Raises:
+            HTTPError: 400 if the model is not served, 503 if the queue is full
+        """
+        model_name = model_name or self.default_model
+        if model_name not in self.allowed_models:
+            raise HTTPError(400, f"Model '{model_name}' is not served; use one of {sorted(self.allowed_models)}")
+        if self.counts()[JOB_QUEUED] >= self.max_queued:
+            raise HTTPError(503, "Job queue is full, retry later")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        job = ResearchJob(location, model_name, max_cache_age)
+        self.jobs[job.job_id] = job
+        self._evict_finished()
+        
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+    
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond the retention limit."""
+        excess = len(self.jobs) - self.max_retained_jobs
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:excess]:
+            del self.jobs[job_id]
+    
+    async def _run(self, job: ResearchJob):
+        """Run a job in a worker thread once a concurrency slot is free."""
+        loop = asyncio.get_running_loop()
+        
+        def on_event(event):
+            # Called from the worker thread; hand the event to the loop
+            loop.call_soon_threadsafe(self._record_event, job, event.dict())
+        
+        async with self._semaphore:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            job.notify()
+            try:
+                workflow = await loop.run_in_executor(self._executor, self.workflow_for, job.model_name)
+                result = await loop.run_in_executor(
+                    self._executor,
+                    lambda: workflow.run_research(
+                        job.location, max_cache_age=job.max_cache_age, on_event=on_event, queued_at=job.created_at
+                    )
+                )
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+            else:
+                job.result = result
+                if result.get("cache_hit"):
+                    job.events = events_to_dicts(result.get("events", []))
+                if result.get("status") == "error":
+                    job.status = JOB_FAILED
+                    job.error = result.get("error_message") or "Research failed"
+                else:
+                    job.status = JOB_SUCCEEDED
+            job.finished_at = time.time()
+            job.notify()
+    
+    def _record_event(self, job: ResearchJob, event: Dict[str, Any]):
+        job.events.append(event)
+        job.notify()
+    
+    def get(self, job_id: str) -> ResearchJob:
+        """
+        Look up a job.
+        
+        Raises:
+            HTTPError: 404 if the job is unknown or has been evicted
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"Unknown job '{job_id}'")
+        return job
+    
+    async def drain(self):
+        """Wait for every submitted job to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def close(self):
+        """Release worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ResearchServer:
+    """Minimal HTTP/1.1 front end for a ResearchService."""
+    
+    def __init__(self, service: ResearchService, host: str = "127.0.0.1", port: int = 8080):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self) -> Tuple[str, int]:
+        """Start listening; returns the bound (host, port)."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.port = port
+        return host, port
+    
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def stop(self):
+        """Stop accepting connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+    
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Read one request; returns None when the client closed the connection."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        
+        headers: Dict[str, str] = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(400, "Too many headers")
+        
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    streamed = await self._dispatch(method, target, body, writer)
+                    if streamed or not keep_alive:
+                        break
+                except HTTPError as e:
+                    self._write_json(writer, e.status, {"error": e.message})
+                    break
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, RuntimeError):
+                pass
+    
+    async def _dispatch(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Route a request; returns True if the response was streamed and the connection must close."""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        
+        if parts == ["health"]:
+            self._require(method, "GET")
+            self._write_json(writer, 200, {
+                "status": "ok",
+                "max_concurrency": self.service.max_concurrency,
+                "jobs": self.service.counts(),
+                "warm_models": self.service.warm_models()
+            })
+        elif parts == ["metrics"]:
+            self._require(method, "GET")
+            for status, count in self.service.counts().items():
+                SERVICE_JOBS.set(count, status=status)
+            self._write_response(writer, 200, CONTENT_TYPES["prometheus"], render_prometheus().encode("utf-8"))
+        elif parts == ["jobs"] and method == "POST":
+            self._write_json(writer, 202, self._submit(body).summary())
+        elif parts == ["jobs"]:
+            self._require(method, "GET")
+            limit = self._non_negative_int(query.get("limit", "100"), "limit")
+            jobs = list(self.service.jobs.values())[::-1][:limit]
+            self._write_json(writer, 200, {"jobs": [job.summary() for job in jobs]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            self._require(method, "GET")
+            self._write_json(writer, 200, self.service.get(parts[1]).summary())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            self._require(method, "GET")
+            self._write_result(writer, self.service.get(parts[1]), query.get("format", "json"))
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            self._require(method, "GET")
+            await self._stream_events(writer, self.service.get(parts[1]))
+            return True
+        else:
+            raise HTTPError(404, f"No route for {url.path}")
+        return False
+    
+    @staticmethod
+    def _require(method: str, expected: str):
+        if method != expected:
+            raise HTTPError(405, f"Use {expected}")
+    
+    @staticmethod
+    def _non_negative_int(value: str, name: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            number = -1
+        if number < 0:
+            raise HTTPError(400, f"Parameter '{name}' must be a non-negative integer")
+        return number
+    
+    def _submit(self, body: bytes) -> ResearchJob:
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, "Request body must be JSON")
+        location = str(payload.get("location") or "").strip() if isinstance(payload, dict) else ""
+        if not location:
+            raise HTTPError(400, "Field 'location' is required")
+        max_cache_age = payload.get("max_cache_age")
+        if max_cache_age is not None and not isinstance(max_cache_age, (int, float)):
+            raise HTTPError(400, "Field 'max_cache_age' must be a number of seconds")
+        model_name = payload.get("model")
+        if model_name is not None and not isinstance(model_name, str):
+            raise HTTPError(400, "Field 'model' must be a string")
+        return self.service.submit(location, model_name, max_cache_age)
+    
+    def _write_result(self, writer: asyncio.StreamWriter, job: ResearchJob, format_name: str):
+        if job.status not in FINISHED_STATES:
+            raise HTTPError(409, f"Job is {job.status}")
+        if job.result is None:
+            raise HTTPError(409, job.error or "Job produced no result")
+        try:
+            renderer = get_renderer(format_name)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        
+        if renderer.format_name == "json":
+            self._write_json(writer, 200, job.result)
+        else:
+            body = render_to_string(job.result, renderer.format_name).encode("utf-8")
+            self._write_response(writer, 200, CONTENT_TYPES[renderer.format_name], body)
+    
+    async def _stream_events(self, writer: asyncio.StreamWriter, job: ResearchJob):
+        """Send past and future events of a job as server-sent events until it finishes."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        sent = 0
+        status = None
+        while True:
+            while sent < len(job.events):
+                writer.write(f"event: progress\ndata: {json.dumps(job.events[sent], default=str)}\n\n".encode("utf-8"))
+                sent += 1
+            if job.status != status:
+                status = job.status
+                writer.write(f"event: status\ndata: {json.dumps(job.summary())}\n\n".encode("utf-8"))
+            await writer.drain()
+            if job.status in FINISHED_STATES and sent >= len(job.events):
+                writer.write(b"event: done\ndata: {}\n\n")
+                await writer.drain()
+                return
+            if not await job.wait_for_change(SSE_KEEPALIVE_SECONDS):
+                writer.write(b": keep-alive\n\n")
+    
+    def _write_json(self, writer: asyncio.StreamWriter, status: int, payload: Any):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self._write_response(writer, status, CONTENT_TYPES["json"], body)
+    
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes):
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+
+
+def run_server(
+    workflow_factory: Callable[[str], Any],
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    default_model: str = "gpt-4",
+    max_concurrency: int = 4,
+    max_queued: int = 1000,
+    allowed_models: Optional[Iterable[str]] = None
+):
+    """Serve research jobs over HTTP until interrupted."""
+    service = ResearchService(
+        workflow_factory,
+        default_model=default_model,
+        max_concurrency=max_concurrency,
+        max_queued=max_queued,
+        allowed_models=allowed_models
+    )
+    server = ResearchServer(service, host, port)
+    
+    async def main():
+        bound_host, bound_port = await server.start()
+        # Build the default workflow up front so the first job starts warm
+        await service.warm(default_model)
+        print(f"🚚 Food truck research service on http://{bound_host}:{bound_port} (concurrency {max_concurrency})")
+        await server.serve_forever()
+    
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,321 @@
+"""
+Columnar export of research results for large-scale analysis.
+
+Results are flattened into typed NumPy arrays (one per column) and written
+as a directory of uncompressed ``.npy`` files plus a ``manifest.json``.
+Every column can be memory-mapped, so analysts can scan tens of thousands
+of locations without deserializing JSON per row.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Numeric maps that are expanded into one float column per key
+NUMERIC_MAP_FIELDS = {
+    "financial_analysis": [
+        "startup_costs",
+        "monthly_operating_costs",
+        "revenue_projections",
+        "profit_margins",
+        "derived_metrics"
+    ],
+    "operations_analysis": ["permit_costs"]
+}
+
+# Cost maps that also get a "<field>__total" column
+SUMMED_MAP_FIELDS = {"startup_costs", "monthly_operating_costs", "permit_costs"}
+
+# Low-cardinality text columns stored as integer codes plus a category list
+CATEGORICAL_COLUMNS = {
+    "status",
+    "competition_level",
+    "recommendation",
+    "confidence_level"
+}
+
+# Scalar text columns copied as-is
+TEXT_COLUMNS = {
+    "market_research": ["market_size_estimate"],
+    "financial_analysis": ["break_even_timeline", "roi_projection"],
+    "operations_analysis": ["permit_timeline"],
+    "business_recommendation": ["timeline_recommendation"]
+}
+
+# List columns summarized by their length
+COUNT_COLUMNS = {
+    "market_research": ["target_customers", "competition_analysis", "opportunities", "challenges"],
+    "operations_analysis": ["permits_required", "health_regulations", "equipment_requirements"],
+    "business_recommendation": ["key_strengths", "key_risks", "next_steps"]
+}
+
+
+def _as_dict(section: Any) -> Dict[str, Any]:
+    """Return a section as a plain dictionary regardless of its source type."""
+    if section is None:
+        return {}
+    if isinstance(section, BaseModel):
+        return section.dict()
+    return dict(section)
+
+
+def _column_key(*parts: str) -> str:
+    """Build a filesystem-safe column name from its path components."""
+    return "__".join(re.sub(r"[^a-z0-9]+", "_", part.lower()).strip("_") for part in parts)
+
+
+def _map_columns(field: str, keys: Iterable[str], reserved: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Column names for the keys of a numeric map, without collisions.
+    
+    Keys that normalize to the same name (e.g. "Food Truck" and "food_truck")
+    or to a reserved name get a short hash of the key appended; a key that is
+    already in normalized form keeps the plain name. The names depend only on
+    the keys involved, so a key maps to the same column in every row that has
+    the same colliding keys.
+    
+    Args:
+        field: Name of the map field
+        keys: Keys of the map
+        reserved: Column names already used by the row for this field
+    
+    Returns:
+        Mapping of each key to its column name
+    """
+    groups: Dict[str, List[str]] = {}
+    for key in keys:
+        groups.setdefault(_column_key(field, str(key)), []).append(key)
+    
+    taken = set(reserved)
+    prefix = _column_key(field) + "__"
+    columns: Dict[str, str] = {}
+    for name, group in groups.items():
+        for key in group:
+            if name not in taken and (len(group) == 1 or name == prefix + str(key)):
+                columns[key] = name
+            else:
+                digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:8]
+                columns[key] = f"{name}_{digest}"
+    return columns
+
+
+def _to_float(value: Any) -> float:
+    """Convert a value to float, mapping anything unparseable to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def flatten_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten one workflow result into a single row of scalar values.
+    
+    Args:
+        result: Result dictionary as returned by ``run_research``
+    
+    Returns:
+        Mapping of column name to scalar value
+    """
+    market = _as_dict(result.get("market_research"))
+    financial = _as_dict(result.get("financial_analysis"))
+    operations = _as_dict(result.get("operations_analysis"))
+    business = _as_dict(result.get("business_recommendation"))
+    sections = {
+        "market_research": market,
+        "financial_analysis": financial,
+        "operations_analysis": operations,
+        "business_recommendation": business
+    }
+    
+    recommendation = business.get("recommendation", "")
+    row: Dict[str, Any] = {
+        "location": result.get("location", ""),
+        "run_id": result.get("run_id", ""),
+        "status": result.get("status", ""),
+        "competition_level": market.get("competition_level", ""),
+        "recommendation": getattr(recommendation, "value", recommendation) or "",
+        "confidence_level": business.get("confidence_level", ""),
+        "funding_requirements": _to_float(financial.get("funding_requirements")),
+        "minimum_staff": _to_float(_as_dict(operations.get("staffing_needs")).get("minimum_staff")),
+        "peak_staff": _to_float(_as_dict(operations.get("staffing_needs")).get("peak_staff"))
+    }
+    
+    for section_name, fields in TEXT_COLUMNS.items():
+        for field in fields:
+            row[field] = str(sections[section_name].get(field, "") or "")
+    
+    for section_name, fields in COUNT_COLUMNS.items():
+        for field in fields:
+            row[f"n_{field}"] = len(sections[section_name].get(field) or [])
+    
+    for section_name, fields in NUMERIC_MAP_FIELDS.items():
+        for field in fields:
+            values = sections[section_name].get(field) or {}
+            total_column = _column_key(field, "total")
+            columns = _map_columns(field, values, [total_column] if field in SUMMED_MAP_FIELDS else [])
+            total = 0.0
+            for key, value in values.items():
+                number = _to_float(value)
+                row[columns[key]] = number
+                if not np.isnan(number):
+                    total += number
+            if field in SUMMED_MAP_FIELDS:
+                row[total_column] = total if values else float("nan")
+    
+    return row
+
+
+def flatten_results(results: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Flatten many workflow results into typed column arrays.
+    
+    Numeric columns are float64 (NaN when a location lacks the key), list
+    counts are int32 and text columns are fixed-width unicode arrays.
+    
+    Args:
+        results: Result dictionaries as returned by ``run_research``
+    
+    Returns:
+        Mapping of column name to a NumPy array with one entry per result
+    """
+    rows = [flatten_result(result) for result in results]
+    
+    # Preserve first-seen column order so files are stable across runs
+    column_names: List[str] = []
+    seen = set()
+    for row in rows:
+        for name in row:
+            if name not in seen:
+                seen.add(name)
+                column_names.append(name)
+    
+    columns: Dict[str, np.ndarray] = {}
+    for name in column_names:
+        sample = next(row[name] for row in rows if name in row)
+        if isinstance(sample, str):
+            columns[name] = np.array([row.get(name, "") for row in rows], dtype=str)
+        elif isinstance(sample, int):
+            columns[name] = np.array([row.get(name, 0) for row in rows], dtype=np.int32)
+        else:
+            columns[name] = np.array([row.get(name, np.nan) for row in rows], dtype=np.float64)
+    return columns
+
+
+def _encode_categorical(values: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Encode a text column as compact integer codes and its category list."""
+    categories, codes = np.unique(values, return_inverse=True)
+    code_dtype = np.int8 if len(categories) < 128 else np.int32
+    return codes.astype(code_dtype), [str(category) for category in categories]
+
+
+def write_columnar(results: Iterable[Dict[str, Any]], output_dir: str) -> Dict[str, Any]:
+    """
+    Write research results to a memory-mappable columnar directory.
+    
+    Args:
+        results: Result dictionaries as returned by ``run_research``
+        output_dir: Directory that receives one ``.npy`` file per column
+    
+    Returns:
+        The manifest describing the written columns
+    """
+    columns = flatten_results(results)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    row_count = len(next(iter(columns.values()))) if columns else 0
+    manifest: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "row_count": row_count,
+        "columns": {},
+        "categories": {}
+    }
+    
+    for name, values in columns.items():
+        if name in CATEGORICAL_COLUMNS:
+            values, categories = _encode_categorical(values)
+            manifest["categories"][name] = categories
+        np.save(os.path.join(output_dir, f"{name}.npy"), values, allow_pickle=False)
+        manifest["columns"][name] = values.dtype.str
+    
+    # Write the manifest last so a partially written export is never loadable
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest
+
+
+class ColumnarResults:
+    """Read-only view over an exported columnar results directory."""
+    
+    def __init__(self, path: str, mmap: bool = True):
+        """
+        Open an exported results directory.
+        
+        Args:
+            path: Directory written by ``write_columnar``
+            mmap: Memory-map column files instead of reading them into memory
+        """
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as handle:
+            self.manifest = json.load(handle)
+        
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version: {self.manifest.get('format_version')}")
+        
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+        self.categories: Dict[str, List[str]] = self.manifest.get("categories", {})
+        self._columns: Dict[str, np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        return self.manifest["row_count"]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.manifest["columns"]
+    
+    @property
+    def column_names(self) -> List[str]:
+        """Names of all exported columns."""
+        return list(self.manifest["columns"])
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Return the raw (possibly memory-mapped) array for a column."""
+        if name not in self._columns:
+            if name not in self:
+                raise KeyError(name)
+            self._columns[name] = np.load(
+                os.path.join(self.path, f"{name}.npy"),
+                mmap_mode=self.mmap_mode,
+                allow_pickle=False
+            )
+        return self._columns[name]
+    
+    def decode(self, name: str) -> np.ndarray:
+        """Return a column with categorical codes mapped back to their labels."""
+        values = self[name]
+        if name in self.categories:
+            return np.asarray(self.categories[name], dtype=str)[values]
+        return values
+    
+    def category_code(self, name: str, label: str) -> Optional[int]:
+        """Return the integer code for a categorical label, or None if absent."""
+        try:
+            return self.categories[name].index(label)
+        except (KeyError, ValueError):
+            return None
+
+
+def load_columnar(path: str, mmap: bool = True) -> ColumnarResults:
+    """Open a columnar results export for scanning."""
+    return ColumnarResults(path, mmap=mmap)
@@ -0,0 +1,402 @@
+"""
+Durable SQLite-backed queue of research jobs shared by worker processes.
+
+A worker leases the highest-priority ready job for a visibility timeout and
+extends the lease with heartbeats while it runs. If the worker dies, the
+lease expires and another worker picks the job up. Completion and failure
+only count when the caller still holds the lease, so a worker that lost its
+lease cannot finish a job twice. Jobs that fail ``max_attempts`` times, or
+that fail with a non-retryable error, are moved to the dead-letter state.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.location import canonical_location
+
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_DEAD = "dead"
+JOB_STATUSES = (JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_DEAD)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT NOT NULL,
+    canonical_location TEXT NOT NULL,
+    model_name TEXT,
+    payload_json TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires_at REAL,
+    last_error TEXT,
+    run_id TEXT,
+    result_json TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready
+    ON research_jobs (priority DESC, available_at, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_lease_expiry
+    ON research_jobs (lease_expires_at) WHERE status = 'leased';
+CREATE INDEX IF NOT EXISTS idx_jobs_location_status
+    ON research_jobs (canonical_location, model_name, status);
+"""
+
+JOB_COLUMNS = (
+    "id", "location", "model_name", "payload_json", "priority", "status", "attempts", "max_attempts",
+    "available_at", "lease_owner", "lease_token", "lease_expires_at", "last_error", "run_id",
+    "created_at", "updated_at", "finished_at"
+)
+
+
+class JobQueue:
+    """Priority queue of research jobs with leases, retries and dead-lettering."""
+    
+    def __init__(
+        self,
+        path: str = "food_truck_jobs.db",
+        visibility_timeout: float = 600.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 30.0,
+        max_retry_backoff: float = 3600.0
+    ):
+        """
+        Open (and create if needed) a job queue database.
+        
+        Args:
+            path: SQLite database file shared by all workers
+            visibility_timeout: Seconds a lease lasts without a heartbeat
+            max_attempts: Default number of attempts before a job is dead-lettered
+            retry_backoff: Delay before the first retry; doubles per attempt
+            max_retry_backoff: Upper bound on the retry delay
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._local = threading.local()
+        
+        self._connection().executescript(SCHEMA)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def _transaction(self):
+        """Context manager for a write transaction that holds the database write lock."""
+        return _ImmediateTransaction(self._connection())
+    
+    def close(self):
+        """Close the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+    
+    def enqueue(
+        self,
+        location: str,
+        model_name: Optional[str] = None,
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe: bool = True
+    ) -> int:
+        """
+        Add a research job.
+        
+        Args:
+            location: Location to research
+            model_name: Model to use (None for the worker's default)
+            priority: Higher priorities are leased first
+            max_attempts: Attempts before dead-lettering (default: queue setting)
+            payload: Extra options for the worker, e.g. {"max_cache_age": 3600}
+            dedupe: Return the existing job if the same location and model is
+                already queued or running
+        
+        Returns:
+            Job id
+        """
+        return self.enqueue_many([location], model_name, priority, max_attempts, payload, dedupe)[0]
+    
+    def enqueue_many(
+        self,
+        locations: Iterable[str],
+        model_name: Optional[str] = None,
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe: bool = True
+    ) -> List[int]:
+        """Add several jobs in one transaction; arguments as for ``enqueue``."""
+        now = time.time()
+        payload_json = json.dumps(payload or {}, default=str)
+        job_ids = []
+        
+        with self._transaction() as connection:
+            for location in locations:
+                key = canonical_location(location)
+                if dedupe:
+                    existing = connection.execute(
+                        "SELECT id FROM research_jobs WHERE canonical_location = ? AND model_name IS ? "
+                        "AND status IN (?, ?) ORDER BY id LIMIT 1",
+                        (key, model_name, JOB_QUEUED, JOB_LEASED)
+                    ).fetchone()
+                    if existing:
+                        job_ids.append(existing[0])
+                        continue
+                
+                cursor = connection.execute(
+                    """
+                    INSERT INTO research_jobs (
+                        location, canonical_location, model_name, payload_json, priority, status,
+                        max_attempts, available_at, created_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        location, key, model_name, payload_json, priority, JOB_QUEUED,
+                        max_attempts or self.max_attempts, now, now, now
+                    )
+                )
+                job_ids.append(cursor.lastrowid)
+        return job_ids
+    
+    def lease(self, worker_id: str, visibility_timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next ready job.
+        
+        Expired leases are recovered first: jobs with attempts left go back to
+        the queue and the rest are dead-lettered.
+        
+        Args:
+            worker_id: Identifies the worker in the job row
+            visibility_timeout: Lease length in seconds (default: queue setting)
+        
+        Returns:
+            The leased job (including its ``lease_token``), or None if nothing is ready
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        
+        with self._transaction() as connection:
+            self._recover_expired(connection, now)
+            row = connection.execute(
+                "SELECT id FROM research_jobs WHERE status = ? AND available_at <= ? "
+                "ORDER BY priority DESC, available_at, id LIMIT 1",
+                (JOB_QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            connection.execute(
+                """
+                UPDATE research_jobs SET status = ?, attempts = attempts + 1, lease_owner = ?,
+                    lease_token = ?, lease_expires_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (JOB_LEASED, worker_id, token, now + (visibility_timeout or self.visibility_timeout), now, row[0])
+            )
+            return self._get(connection, row[0])
+    
+    def _recover_expired(self, connection: sqlite3.Connection, now: float):
+        """Requeue or dead-letter jobs whose worker stopped heartbeating."""
+        connection.execute(
+            """
+            UPDATE research_jobs SET status = ?, finished_at = ?, updated_at = ?, lease_token = NULL,
+                last_error = 'Lease expired after ' || attempts || ' attempt(s): ' || COALESCE(last_error, 'worker lost')
+            WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts
+            """,
+            (JOB_DEAD, now, now, JOB_LEASED, now)
+        )
+        connection.execute(
+            """
+            UPDATE research_jobs SET status = ?, available_at = ?, updated_at = ?, lease_token = NULL,
+                last_error = COALESCE(last_error, 'Lease expired')
+            WHERE status = ? AND lease_expires_at <= ?
+            """,
+            (JOB_QUEUED, now, now, JOB_LEASED, now)
+        )
+    
+    def heartbeat(self, job: Dict[str, Any], visibility_timeout: Optional[float] = None) -> bool:
+        """
+        Extend a lease.
+        
+        Returns:
+            False if the lease was lost (expired and taken by another worker)
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE research_jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (now + (visibility_timeout or self.visibility_timeout), now, job["id"], JOB_LEASED, job["lease_token"])
+            )
+            return cursor.rowcount == 1
+    
+    def complete(self, job: Dict[str, Any], result: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Mark a leased job done and keep its result.
+        
+        Returns:
+            False if the caller no longer holds the lease; the result is then discarded
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                """
+                UPDATE research_jobs SET status = ?, finished_at = ?, updated_at = ?, lease_token = NULL,
+                    run_id = ?, result_json = ?
+                WHERE id = ? AND status = ? AND lease_token = ?
+                """,
+                (
+                    JOB_DONE, now, now, (result or {}).get("run_id"),
+                    json.dumps(result, default=str) if result is not None else None,
+                    job["id"], JOB_LEASED, job["lease_token"]
+                )
+            )
+            return cursor.rowcount == 1
+    
+    def fail(self, job: Dict[str, Any], error: str, retryable: bool = True) -> Optional[str]:
+        """
+        Record a failed attempt.
+        
+        Retryable failures go back to the queue with exponential backoff until
+        the job runs out of attempts; everything else is dead-lettered.
+        
+        Returns:
+            The job's new status, or None if the caller no longer holds the lease
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts, max_attempts FROM research_jobs WHERE id = ? AND status = ? AND lease_token = ?",
+                (job["id"], JOB_LEASED, job["lease_token"])
+            ).fetchone()
+            if row is None:
+                return None
+            
+            attempts, max_attempts = row
+            if retryable and attempts < max_attempts:
+                delay = min(self.retry_backoff * 2 ** (attempts - 1), self.max_retry_backoff)
+                connection.execute(
+                    "UPDATE research_jobs SET status = ?, available_at = ?, updated_at = ?, lease_token = NULL, "
+                    "last_error = ? WHERE id = ?",
+                    (JOB_QUEUED, now + delay, now, error, job["id"])
+                )
+                return JOB_QUEUED
+            
+            connection.execute(
+                "UPDATE research_jobs SET status = ?, finished_at = ?, updated_at = ?, lease_token = NULL, "
+                "last_error = ? WHERE id = ?",
+                (JOB_DEAD, now, now, error, job["id"])
+            )
+            return JOB_DEAD
+    
+    def release(self, job: Dict[str, Any]) -> bool:
+        """Return a leased job to the queue without counting the attempt (e.g. on shutdown)."""
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE research_jobs SET status = ?, attempts = MAX(attempts - 1, 0), available_at = ?, "
+                "updated_at = ?, lease_token = NULL WHERE id = ? AND status = ? AND lease_token = ?",
+                (JOB_QUEUED, now, now, job["id"], JOB_LEASED, job["lease_token"])
+            )
+            return cursor.rowcount == 1
+    
+    def requeue_dead(self, job_ids: Optional[List[int]] = None) -> int:
+        """
+        Give dead-lettered jobs a fresh set of attempts.
+        
+        Args:
+            job_ids: Jobs to requeue (None for every dead job)
+        
+        Returns:
+            Number of jobs requeued
+        """
+        now = time.time()
+        sql = (
+            "UPDATE research_jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ?, "
+            "finished_at = NULL WHERE status = ?"
+        )
+        params: List[Any] = [JOB_QUEUED, now, now, JOB_DEAD]
+        if job_ids is not None:
+            sql += f" AND id IN ({', '.join('?' for _ in job_ids)})"
+            params.extend(job_ids)
+        
+        with self._transaction() as connection:
+            return connection.execute(sql, params).rowcount
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        counts = {status: 0 for status in JOB_STATUSES}
+        for status, count in self._connection().execute(
+            "SELECT status, COUNT(*) FROM research_jobs GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+    
+    def get(self, job_id: int, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a job by id, optionally with its decoded result."""
+        return self._get(self._connection(), job_id, include_result)
+    
+    def _get(self, connection: sqlite3.Connection, job_id: int, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch a job row on the given connection."""
+        columns = ", ".join(JOB_COLUMNS + (("result_json",) if include_result else ()))
+        values = connection.execute(f"SELECT {columns} FROM research_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_from_row(values, include_result) if values else None
+    
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Jobs in a status (or all), most recently updated first."""
+        sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM research_jobs"
+        params: List[Any] = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [_job_from_row(values) for values in self._connection().execute(sql, params)]
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolling back if the block raises."""
+    
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+    
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def _job_from_row(values: tuple, include_result: bool = False) -> Dict[str, Any]:
+    """Decode a job row."""
+    job = dict(zip(JOB_COLUMNS, values))
+    job["payload"] = json.loads(job.pop("payload_json") or "{}")
+    if include_result:
+        job["result"] = json.loads(values[-1]) if values[-1] else None
+    return job
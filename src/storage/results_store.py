@@ -0,0 +1,367 @@
+"""
+SQLite-backed store for completed food truck research results.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.location import canonical_location, normalize_state, split_location
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT,
+    location TEXT NOT NULL,
+    canonical_location TEXT NOT NULL,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    recommendation TEXT,
+    confidence_level TEXT,
+    funding_requirements REAL,
+    result_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_location_model_run
+    ON research_results (canonical_location, model_name, run_at);
+CREATE INDEX IF NOT EXISTS idx_results_state_recommendation_funding
+    ON research_results (state, recommendation, funding_requirements);
+CREATE INDEX IF NOT EXISTS idx_results_recommendation_funding
+    ON research_results (recommendation, funding_requirements);
+CREATE INDEX IF NOT EXISTS idx_results_funding
+    ON research_results (funding_requirements);
+CREATE INDEX IF NOT EXISTS idx_results_model
+    ON research_results (model_name);
+CREATE INDEX IF NOT EXISTS idx_results_run_at
+    ON research_results (run_at);
+CREATE TABLE IF NOT EXISTS regional_context (
+    state TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    context_json TEXT NOT NULL,
+    PRIMARY KEY (state, model_name)
+);
+"""
+
+SUMMARY_COLUMNS = (
+    "id", "run_id", "location", "canonical_location", "city", "state", "model_name",
+    "run_at", "status", "recommendation", "confidence_level", "funding_requirements"
+)
+
+
+class ResultsStore:
+    """Indexed local database of workflow results with a simple query API."""
+    
+    def __init__(self, path: str = "food_truck_results.db"):
+        """
+        Open (and create if needed) a results database.
+        
+        Args:
+            path: SQLite database file, or ":memory:" for a private in-memory store
+        """
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # In-memory databases are per-connection, so share a single one
+        self._shared_connection = (
+            sqlite3.connect(path, check_same_thread=False) if path == ":memory:" else None
+        )
+        
+        with self._write_lock:
+            connection = self._connection()
+            connection.executescript(SCHEMA)
+            connection.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        if self._shared_connection is not None:
+            return self._shared_connection
+        
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def close(self):
+        """Close the calling thread's connection."""
+        if self._shared_connection is not None:
+            self._shared_connection.close()
+            return
+        
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+    
+    def save_result(self, result: Dict[str, Any], model_name: Optional[str] = None) -> int:
+        """
+        Persist a workflow result.
+        
+        Args:
+            result: Result dictionary as returned by ``run_research``
+            model_name: Model that produced the result (defaults to result["model_name"])
+        
+        Returns:
+            Row id of the stored result
+        """
+        location = result.get("location", "")
+        city, state = split_location(location)
+        financial = result.get("financial_analysis") or {}
+        business = result.get("business_recommendation") or {}
+        recommendation = business.get("recommendation")
+        
+        row = (
+            result.get("run_id"),
+            location,
+            canonical_location(location),
+            city,
+            state,
+            model_name or result.get("model_name") or "",
+            result.get("completed_at") or time.time(),
+            result.get("status", ""),
+            getattr(recommendation, "value", recommendation),
+            business.get("confidence_level"),
+            financial.get("funding_requirements"),
+            json.dumps(result, default=str)
+        )
+        
+        with self._write_lock:
+            connection = self._connection()
+            cursor = connection.execute(
+                """
+                INSERT INTO research_results (
+                    run_id, location, canonical_location, city, state, model_name,
+                    run_at, status, recommendation, confidence_level,
+                    funding_requirements, result_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                row
+            )
+            connection.commit()
+            return cursor.lastrowid
+    
+    def get_latest(
+        self,
+        location: str,
+        model_name: Optional[str] = None,
+        max_age_seconds: Optional[float] = None,
+        status: Optional[str] = "success"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the newest stored result for a location, or None.
+        
+        Args:
+            location: Location in any spelling accepted by ``canonical_location``
+            model_name: Only consider results produced by this model
+            max_age_seconds: Ignore results older than this many seconds
+            status: Only consider results with this status (None for any)
+        """
+        clauses = ["canonical_location = ?"]
+        params: List[Any] = [canonical_location(location)]
+        
+        if model_name:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        if max_age_seconds is not None:
+            clauses.append("run_at >= ?")
+            params.append(time.time() - max_age_seconds)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        
+        row = self._connection().execute(
+            f"SELECT result_json FROM research_results WHERE {' AND '.join(clauses)} "
+            "ORDER BY run_at DESC LIMIT 1",
+            params
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_regional_context(self, state: str, model_name: str, context: Dict[str, Any]):
+        """
+        Store a state's regional context, replacing the previous one for the model.
+        
+        Args:
+            state: Two-letter state code or state name
+            model_name: Model that produced the context
+            context: Regional context as a dictionary
+        """
+        with self._write_lock:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO regional_context (state, model_name, created_at, context_json) "
+                "VALUES (?, ?, ?, ?)",
+                (normalize_state(state), model_name, time.time(), json.dumps(context, default=str))
+            )
+            connection.commit()
+    
+    def get_regional_context(
+        self,
+        state: str,
+        model_name: str,
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Return a state's stored regional context and when it was created, or None.
+        
+        Args:
+            state: Two-letter state code or state name
+            model_name: Model that produced the context
+            max_age_seconds: Ignore a context older than this many seconds
+        """
+        row = self._connection().execute(
+            "SELECT context_json, created_at FROM regional_context WHERE state = ? AND model_name = ?",
+            (normalize_state(state), model_name)
+        ).fetchone()
+        if row is None or (max_age_seconds is not None and row[1] < time.time() - max_age_seconds):
+            return None
+        return json.loads(row[0]), row[1]
+    
+    def query(
+        self,
+        state: Optional[str] = None,
+        recommendation: Optional[str] = None,
+        min_funding: Optional[float] = None,
+        max_funding: Optional[float] = None,
+        model_name: Optional[str] = None,
+        location: Optional[str] = None,
+        since: Optional[float] = None,
+        status: Optional[str] = "success",
+        newest_per_location: bool = False,
+        include_result: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query stored results.
+        
+        Location, state, model, date and status filters select the candidate
+        runs. With ``newest_per_location`` only the latest candidate run per
+        canonical location is kept before the recommendation and funding
+        filters are applied, so a city whose newest run is NO_GO is not
+        reported through an older GO run.
+        
+        Args:
+            state: Two-letter state code or state name
+            recommendation: "go", "no_go" or "conditional"
+            min_funding: Minimum funding requirement (inclusive)
+            max_funding: Maximum funding requirement (inclusive)
+            model_name: Only results produced by this model
+            location: Only results for this location
+            since: Only runs at or after this Unix timestamp
+            status: Only runs with this status (None for any)
+            newest_per_location: Keep only the newest run per location
+            include_result: Attach the full decoded result under "result"
+            limit: Maximum number of rows to return
+        
+        Returns:
+            Summary rows ordered newest first
+        """
+        return list(self._iter_rows(
+            include_result,
+            state=state,
+            recommendation=recommendation,
+            min_funding=min_funding,
+            max_funding=max_funding,
+            model_name=model_name,
+            location=location,
+            since=since,
+            status=status,
+            newest_per_location=newest_per_location,
+            limit=limit
+        ))
+    
+    def _query_sql(
+        self,
+        include_result: bool,
+        state: Optional[str] = None,
+        recommendation: Optional[str] = None,
+        min_funding: Optional[float] = None,
+        max_funding: Optional[float] = None,
+        model_name: Optional[str] = None,
+        location: Optional[str] = None,
+        since: Optional[float] = None,
+        status: Optional[str] = "success",
+        newest_per_location: bool = False,
+        limit: Optional[int] = None
+    ) -> Tuple[str, List[Any]]:
+        """Build the SQL and parameters for a ``query`` call."""
+        candidate_clauses: List[str] = []
+        candidate_params: List[Any] = []
+        
+        if state:
+            candidate_clauses.append("state = ?")
+            candidate_params.append(normalize_state(state))
+        if model_name:
+            candidate_clauses.append("model_name = ?")
+            candidate_params.append(model_name)
+        if location:
+            candidate_clauses.append("canonical_location = ?")
+            candidate_params.append(canonical_location(location))
+        if since is not None:
+            candidate_clauses.append("run_at >= ?")
+            candidate_params.append(since)
+        if status:
+            candidate_clauses.append("status = ?")
+            candidate_params.append(status)
+        
+        outcome_clauses: List[str] = []
+        outcome_params: List[Any] = []
+        
+        if recommendation:
+            outcome_clauses.append("recommendation = ?")
+            outcome_params.append(recommendation.lower())
+        if min_funding is not None:
+            outcome_clauses.append("funding_requirements >= ?")
+            outcome_params.append(min_funding)
+        if max_funding is not None:
+            outcome_clauses.append("funding_requirements <= ?")
+            outcome_params.append(max_funding)
+        
+        columns = ", ".join(SUMMARY_COLUMNS + (("result_json",) if include_result else ()))
+        candidate_where = f"WHERE {' AND '.join(candidate_clauses)}" if candidate_clauses else ""
+        
+        if newest_per_location:
+            outcome_where = f"WHERE rank = 1{''.join(' AND ' + c for c in outcome_clauses)}"
+            sql = (
+                f"SELECT {columns} FROM ("
+                f"SELECT *, ROW_NUMBER() OVER ("
+                f"PARTITION BY canonical_location ORDER BY run_at DESC, id DESC) AS rank "
+                f"FROM research_results {candidate_where}"
+                f") {outcome_where} ORDER BY run_at DESC"
+            )
+        else:
+            all_clauses = candidate_clauses + outcome_clauses
+            where = f"WHERE {' AND '.join(all_clauses)}" if all_clauses else ""
+            sql = f"SELECT {columns} FROM research_results {where} ORDER BY run_at DESC"
+        
+        params = candidate_params + outcome_params
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+    
+    def _iter_rows(self, include_result: bool, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Yield query rows straight from the cursor."""
+        sql, params = self._query_sql(include_result, **filters)
+        for values in self._connection().execute(sql, params):
+            row = dict(zip(SUMMARY_COLUMNS, values))
+            if include_result:
+                row["result"] = json.loads(values[-1])
+            yield row
+    
+    def iter_results(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Yield full stored results matching the ``query`` filters.
+        
+        Rows are decoded one at a time from the cursor, so memory use stays
+        flat however many results match.
+        """
+        for row in self._iter_rows(True, **filters):
+            yield row["result"]
@@ -0,0 +1,48 @@
+"""
+Atomic file writing.
+
+Content is written to a temporary file in the destination directory and
+moved into place with ``os.replace`` only once it is complete, so readers
+never see a partially written file and a failed write leaves no debris.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: str = "utf-8", newline: Optional[str] = None) -> Iterator[IO]:
+    """
+    Open a temporary file that replaces ``path`` when the block exits cleanly.
+    
+    Args:
+        path: Final file path; its directory is created if needed
+        mode: "w" for text or "wb" for binary
+        encoding: Text encoding (ignored for binary mode)
+        newline: Newline translation for text mode (use "" for CSV)
+    
+    Yields:
+        Writable file handle
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        if "b" in mode:
+            handle = os.fdopen(descriptor, mode)
+        else:
+            handle = os.fdopen(descriptor, mode, encoding=encoding, newline=newline)
+        with handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,196 @@
+"""
+LLM cost accounting and spend budgets.
+
+Token usage from every LLM call is priced with a per-model table and
+recorded in a ledger. A run's ledger rolls up into its parent, the
+workflow's ledger, which spans a whole batch (or a server's lifetime), so
+spend can be read per run, per agent and per batch. A ledger with a budget
+refuses new LLM calls once its spend, or any parent's, has reached it.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ModelPrice(BaseModel):
+    """Price of one model in US dollars per million tokens."""
+    
+    input_per_million: float = Field(ge=0)
+    output_per_million: float = Field(ge=0)
+    
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Dollar cost of one call."""
+        return (input_tokens * self.input_per_million + output_tokens * self.output_per_million) / 1_000_000
+
+
+# List prices keyed by model-name prefix; the longest matching prefix wins
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    "gpt-4o-mini": ModelPrice(input_per_million=0.15, output_per_million=0.60),
+    "gpt-4o": ModelPrice(input_per_million=2.50, output_per_million=10.00),
+    "gpt-4-turbo": ModelPrice(input_per_million=10.00, output_per_million=30.00),
+    "gpt-4": ModelPrice(input_per_million=30.00, output_per_million=60.00),
+    "gpt-3.5-turbo": ModelPrice(input_per_million=0.50, output_per_million=1.50),
+    "claude-3-5-haiku": ModelPrice(input_per_million=0.80, output_per_million=4.00),
+    "claude-3-5-sonnet": ModelPrice(input_per_million=3.00, output_per_million=15.00),
+    "claude-3-opus": ModelPrice(input_per_million=15.00, output_per_million=75.00),
+    "claude-3-sonnet": ModelPrice(input_per_million=3.00, output_per_million=15.00),
+    "claude-3-haiku": ModelPrice(input_per_million=0.25, output_per_million=1.25)
+}
+
+
+def load_price_table(path: Optional[str] = None) -> Dict[str, ModelPrice]:
+    """
+    The default price table, overridden by a JSON file if given.
+    
+    The file maps model-name prefixes to prices, e.g.
+    ``{"gpt-4o": {"input_per_million": 2.5, "output_per_million": 10}}``.
+    """
+    prices = dict(DEFAULT_PRICES)
+    if path:
+        with open(path, encoding="utf-8") as handle:
+            for prefix, price in json.load(handle).items():
+                prices[prefix] = ModelPrice(**price)
+    return prices
+
+
+def price_for(model_name: str, prices: Dict[str, ModelPrice]) -> Optional[ModelPrice]:
+    """Price of the longest prefix matching the model name, or None if unpriced."""
+    model_name = (model_name or "").lower()
+    matches = [prefix for prefix in prices if model_name.startswith(prefix.lower())]
+    return prices[max(matches, key=len)] if matches else None
+
+
+class BudgetExceededError(Exception):
+    """Raised instead of making an LLM call once a spend budget is used up."""
+    
+    # Checked by the retry handler: waiting does not bring budget back
+    retryable = False
+    
+    def __init__(self, scope: str, budget_usd: float, spent_usd: float):
+        self.scope = scope
+        self.budget_usd = budget_usd
+        self.spent_usd = spent_usd
+        super().__init__(f"LLM budget exceeded for {scope}: spent ${spent_usd:.4f} of ${budget_usd:.4f}")
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+
+class CostLedger:
+    """
+    Running LLM spend, optionally capped by a budget.
+    
+    Args:
+        name: Scope shown in summaries and budget errors, e.g. a run id or "batch"
+        budget_usd: Refuse new calls once spend reaches this many dollars
+        prices: Per-model price table (default: the parent's, else ``DEFAULT_PRICES``)
+        parent: Ledger that every recorded call also rolls up into
+    """
+    
+    def __init__(
+        self,
+        name: str = "total",
+        budget_usd: Optional[float] = None,
+        prices: Optional[Dict[str, ModelPrice]] = None,
+        parent: Optional["CostLedger"] = None
+    ):
+        self.name = name
+        self.budget_usd = budget_usd
+        self.parent = parent
+        self.prices = prices if prices is not None else (parent.prices if parent else DEFAULT_PRICES)
+        self.totals = _empty_totals()
+        self.unpriced_calls = 0
+        self.by_agent: Dict[str, Dict[str, Any]] = {}
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+        self.exceeded: Optional[BudgetExceededError] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def spent_usd(self) -> float:
+        return self.totals["cost_usd"]
+    
+    def child(self, name: str, budget_usd: Optional[float] = None) -> "CostLedger":
+        """A ledger for one run that rolls up into this one."""
+        return CostLedger(name, budget_usd=budget_usd, parent=self)
+    
+    def check(self):
+        """
+        Raise BudgetExceededError if this ledger or any parent is out of budget.
+        
+        The error is remembered on this ledger so the run can report it.
+        """
+        ledger = self
+        while ledger is not None:
+            if ledger.budget_usd is not None and ledger.spent_usd >= ledger.budget_usd:
+                self.exceeded = BudgetExceededError(ledger.name, ledger.budget_usd, ledger.spent_usd)
+                raise self.exceeded
+            ledger = ledger.parent
+    
+    def record(self, agent: str, model_name: str, input_tokens: int, output_tokens: int) -> float:
+        """
+        Price one call's token usage and add it here and to every parent.
+        
+        Returns:
+            The call's cost in dollars (0 for models missing from the price table)
+        """
+        price = price_for(model_name, self.prices)
+        cost = price.cost(input_tokens, output_tokens) if price else 0.0
+        ledger = self
+        while ledger is not None:
+            ledger._add(agent, model_name, input_tokens, output_tokens, cost, priced=price is not None)
+            ledger = ledger.parent
+        return cost
+    
+    def _add(self, agent: str, model_name: str, input_tokens: int, output_tokens: int, cost: float, priced: bool):
+        with self._lock:
+            for totals in (
+                self.totals,
+                self.by_agent.setdefault(agent, _empty_totals()),
+                self.by_model.setdefault(model_name, _empty_totals())
+            ):
+                totals["calls"] += 1
+                totals["input_tokens"] += input_tokens
+                totals["output_tokens"] += output_tokens
+                totals["cost_usd"] += cost
+            if not priced:
+                self.unpriced_calls += 1
+    
+    def summary(self) -> Dict[str, Any]:
+        """Totals with per-agent and per-model breakdowns, rounded for display and storage."""
+        def rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+            return {**totals, "cost_usd": round(totals["cost_usd"], 6)}
+        
+        with self._lock:
+            return {
+                "scope": self.name,
+                **rounded(self.totals),
+                "unpriced_calls": self.unpriced_calls,
+                "budget_usd": self.budget_usd,
+                "budget_exceeded": self.exceeded is not None,
+                "by_agent": {agent: rounded(totals) for agent, totals in self.by_agent.items()},
+                "by_model": {model: rounded(totals) for model, totals in self.by_model.items()}
+            }
+
+
+_active_ledger: ContextVar[Optional[CostLedger]] = ContextVar("active_ledger", default=None)
+
+
+@contextmanager
+def use_ledger(ledger: CostLedger) -> Iterator[CostLedger]:
+    """Charge LLM calls made inside the block to ``ledger``."""
+    token = _active_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _active_ledger.reset(token)
+
+
+def current_ledger() -> Optional[CostLedger]:
+    """The ledger LLM calls are charged to, if any."""
+    return _active_ledger.get()
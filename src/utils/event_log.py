@@ -0,0 +1,80 @@
+"""
+Append-only event log utilities for workflow runs.
+"""
+
+import json
+import time
+from typing import Any, Dict, IO, Iterable, List, Union
+
+from models.research_models import RunEvent
+
+
+def append_events(existing: List[RunEvent], new: List[RunEvent]) -> List[RunEvent]:
+    """
+    LangGraph reducer that appends new events to the run's log in place.
+    
+    Nodes return only the events they produced, so each append is O(1)
+    amortized per event and the accumulated history is never re-copied.
+    
+    Args:
+        existing: Events recorded so far in this run
+        new: Events produced by the node that just finished
+    
+    Returns:
+        The same list object, extended with the new events
+    """
+    if existing is None:
+        existing = []
+    if new:
+        existing.extend(new)
+    return existing
+
+
+def make_event(
+    run_id: str,
+    node: str,
+    message: str,
+    level: str = "info",
+    **payload: Any
+) -> RunEvent:
+    """Create a timestamped run event."""
+    return RunEvent(
+        timestamp=time.time(),
+        run_id=run_id,
+        node=node,
+        level=level,
+        message=message,
+        payload=payload
+    )
+
+
+def events_to_dicts(events: Iterable[Union[RunEvent, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Convert events to plain dictionaries suitable for JSON serialization."""
+    return [event.dict() if isinstance(event, RunEvent) else dict(event) for event in events]
+
+
+def export_events_jsonl(
+    events: Iterable[Union[RunEvent, Dict[str, Any]]],
+    destination: Union[str, IO[str]],
+    append: bool = True
+) -> int:
+    """
+    Write events as JSON Lines to a path or an open text handle.
+    
+    Args:
+        events: Events to export
+        destination: File path or writable text handle
+        append: Append to an existing file instead of truncating it
+    
+    Returns:
+        Number of events written
+    """
+    if isinstance(destination, str):
+        with open(destination, "a" if append else "w", encoding="utf-8") as handle:
+            return export_events_jsonl(events, handle)
+    
+    count = 0
+    for event in events_to_dicts(events):
+        destination.write(json.dumps(event, default=str) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,195 @@
+"""
+Repair of malformed JSON objects in LLM responses.
+
+Agents ask the LLM for a JSON object matching a pydantic model. Responses
+often arrive wrapped in markdown fences or prose, cut off mid-object, with
+trailing commas, or with numbers written as "$75,000". ``repair_json`` and
+``coerce_fields`` clean these up locally. ``validate_fields`` then names
+the fields that are still missing or invalid, so ``repair_prompt`` can ask
+the LLM for just those fields instead of a whole new response.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from utils.text_parsing import parse_number
+
+
+FENCE_PATTERN = re.compile(r"```[A-Za-z]*[ \t]*\n?(.*?)```", re.DOTALL)
+
+# Follow-ups are only worth it when most of the object is already usable
+MAX_REPAIR_FRACTION = 0.5
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_code_fences(text: str) -> str:
+    """The longest fenced code block in a text, or the text without stray fences."""
+    blocks = FENCE_PATTERN.findall(text)
+    if blocks:
+        return max(blocks, key=len)
+    return re.sub(r"```[A-Za-z]*", "", text)
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    The longest top-level ``{...}`` object in a text.
+    
+    Braces inside strings are ignored. An object that is cut off, e.g. by
+    the output token limit, is closed by appending the missing quote and
+    brackets.
+    
+    Returns:
+        The object's text, or None if the text has no ``{``
+    """
+    candidates: List[str] = []
+    start, stack, in_string, escaped = None, [], False, False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"' and stack:
+            in_string = True
+        elif char == "{" and not stack:
+            start, stack = position, ["{"]
+        elif char in _CLOSERS and stack:
+            stack.append(char)
+        elif char in "}]" and stack:
+            if _CLOSERS[stack[-1]] != char:
+                # Mismatched bracket: give up on this object
+                stack = []
+                continue
+            stack.pop()
+            if not stack:
+                candidates.append(text[start:position + 1])
+    
+    if stack:
+        candidates.append(
+            text[start:].rstrip().rstrip(",") + ('"' if in_string else "") + "".join(_CLOSERS[c] for c in reversed(stack))
+        )
+    return max(candidates, key=len) if candidates else None
+
+
+def remove_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, outside strings."""
+    result: List[str] = []
+    in_string, escaped = False, False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "," and text[position + 1:].lstrip()[:1] in ("}", "]"):
+            continue
+        result.append(char)
+    return "".join(result)
+
+
+def repair_json(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON object in an LLM response, cleaning it up if needed.
+    
+    Tries the text as-is, then the longest object inside code fences or
+    prose, closed if truncated and without trailing commas.
+    
+    Returns:
+        The parsed object, or None if no object could be recovered
+    """
+    if not text:
+        return None
+    
+    try:
+        value = json.loads(text)
+        return value if isinstance(value, dict) else None
+    except ValueError:
+        pass
+    
+    candidate = extract_json_object(strip_code_fences(text))
+    if candidate is None:
+        return None
+    try:
+        value = json.loads(remove_trailing_commas(candidate))
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+@lru_cache(maxsize=None)
+def _properties(model: Type[BaseModel]) -> Dict[str, Dict[str, Any]]:
+    return model.schema().get("properties", {})
+
+
+def _numeric(schema: Dict[str, Any]) -> bool:
+    options = schema.get("anyOf", [schema])
+    return any(option.get("type") in ("number", "integer") for option in options)
+
+
+def _coerce(value: Any, schema: Dict[str, Any]) -> Any:
+    if isinstance(value, str) and _numeric(schema):
+        number = parse_number(value)
+        return value if number is None else number
+    # "additionalProperties" is a bare ``true`` for Dict[str, Any] fields
+    values = schema.get("additionalProperties")
+    if isinstance(value, dict) and isinstance(values, dict) and _numeric(values):
+        return {key: _coerce(item, values) for key, item in value.items()}
+    items = schema.get("items")
+    if isinstance(value, list) and isinstance(items, dict) and _numeric(items):
+        return [_coerce(item, items) for item in value]
+    return value
+
+
+def coerce_fields(data: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    """Convert numbers written as text, e.g. "$75,000" or "15%", in the model's numeric fields."""
+    properties = _properties(model)
+    return {key: _coerce(value, properties.get(key, {})) for key, value in data.items()}
+
+
+def validate_fields(model: Type[BaseModel], data: Dict[str, Any]) -> Tuple[Optional[BaseModel], Dict[str, str]]:
+    """
+    Build the model, or report what stops it being built.
+    
+    Returns:
+        (instance, {}) on success, else (None, {field: problem}) for every
+        missing or invalid top-level field
+    """
+    try:
+        return model(**data), {}
+    except ValidationError as e:
+        problems: Dict[str, str] = {}
+        for error in e.errors():
+            field = str(error["loc"][0]) if error["loc"] else "__root__"
+            problems.setdefault(field, error["msg"])
+        return None, problems
+
+
+def worth_repairing(model: Type[BaseModel], problems: Dict[str, str]) -> bool:
+    """Whether few enough fields are broken for a follow-up to beat a fallback."""
+    fields = _properties(model)
+    return bool(problems) and "__root__" not in problems and len(problems) <= MAX_REPAIR_FRACTION * len(fields)
+
+
+def repair_prompt(model: Type[BaseModel], problems: Dict[str, str], location: str) -> str:
+    """A short follow-up asking only for the broken fields."""
+    properties = _properties(model)
+    lines = [
+        f"Your analysis of {location} was missing or had invalid values for these fields:"
+    ]
+    for field, problem in problems.items():
+        schema = {key: value for key, value in properties.get(field, {}).items() if key != "title"}
+        lines.append(f"- {field} ({problem}); expected: {json.dumps(schema)}")
+    lines.append("Respond with only a JSON object containing exactly these fields.")
+    return "\n".join(lines)
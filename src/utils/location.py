@@ -0,0 +1,78 @@
+"""
+Location normalization utilities shared by storage and lookup components.
+"""
+
+import re
+from typing import Tuple
+
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR",
+    "california": "CA", "colorado": "CO", "connecticut": "CT", "delaware": "DE",
+    "district of columbia": "DC", "florida": "FL", "georgia": "GA", "hawaii": "HI",
+    "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+    "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME",
+    "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE",
+    "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM",
+    "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI",
+    "south carolina": "SC", "south dakota": "SD", "tennessee": "TN", "texas": "TX",
+    "utah": "UT", "vermont": "VT", "virginia": "VA", "washington": "WA",
+    "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY"
+}
+
+STATE_CODES = set(US_STATES.values())
+
+# Common city abbreviations seen in user input
+CITY_ALIASES = {
+    "st": "saint",
+    "st.": "saint",
+    "ft": "fort",
+    "ft.": "fort",
+    "mt": "mount",
+    "mt.": "mount"
+}
+
+
+def normalize_state(state: str) -> str:
+    """Return the two-letter code for a state name or code, or the cleaned input."""
+    cleaned = re.sub(r"\s+", " ", state.strip().strip(".")).lower()
+    if cleaned.upper() in STATE_CODES:
+        return cleaned.upper()
+    return US_STATES.get(cleaned, cleaned.upper())
+
+
+def normalize_city(city: str) -> str:
+    """Lowercase a city name, collapse whitespace and expand common abbreviations."""
+    words = re.sub(r"\s+", " ", city.strip()).lower().split(" ")
+    return " ".join(CITY_ALIASES.get(word, word) for word in words if word)
+
+
+def split_location(location: str) -> Tuple[str, str]:
+    """
+    Split a "City, State" string into normalized city and state parts.
+    
+    Args:
+        location: Free-form location such as "St. Louis, Missouri"
+    
+    Returns:
+        Tuple of (normalized city, two-letter state code or "" if missing)
+    """
+    parts = [part for part in location.split(",") if part.strip()]
+    if not parts:
+        return "", ""
+    if len(parts) == 1:
+        return normalize_city(parts[0]), ""
+    return normalize_city(",".join(parts[:-1])), normalize_state(parts[-1])
+
+
+def canonical_location(location: str) -> str:
+    """
+    Build the canonical lookup key for a location.
+    
+    "St. Louis, Missouri", "saint louis, MO" and " St Louis ,mo" all map
+    to "saint louis, MO".
+    """
+    city, state = split_location(location)
+    return f"{city}, {state}" if state else city
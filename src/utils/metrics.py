@@ -0,0 +1,323 @@
+"""
+In-process metrics: counters, gauges and latency histograms.
+
+Metrics live in a registry for the lifetime of the process and are cheap
+to update from any thread: an update is a dictionary lookup and an
+addition under a lock, and histograms bucket values with a binary search
+over fixed bounds. The service exposes the registry in Prometheus text
+format at ``/metrics``; batch runs dump it to a file when they finish.
+Worker processes send ``snapshot()``s that the parent ``merge()``s.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.atomic_files import atomic_write
+
+# Upper bounds in seconds, from a fast parse or cache hit to a slow LLM call
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Common parts of a named metric with a fixed set of label names."""
+    
+    kind = ""
+    
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+    
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A count that only goes up, e.g. retries or fallbacks."""
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+    
+    def value(self, **labels: Any) -> float:
+        return self._series.get(self._key(labels), 0.0)
+    
+    def total(self) -> float:
+        """Sum over every label combination."""
+        with self._lock:
+            return sum(self._series.values())
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in series
+        ]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, e.g. runs in flight.
+    
+    A gauge without labels can instead be computed when it is read, see
+    ``set_function``.
+    """
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+    
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+    
+    def set_function(self, function: Callable[[], float]):
+        """Compute the gauge's value from ``function`` whenever it is read."""
+        self._function = function
+    
+    def value(self, **labels: Any) -> float:
+        if self._function is not None:
+            return self._function()
+        return super().value(**labels)
+    
+    def render(self) -> List[str]:
+        if self._function is None:
+            return super().render()
+        return self._header() + [f"{self.name} {_format_value(self._function())}"]
+
+
+class Histogram(_Metric):
+    """Counts of observed values in fixed buckets, with their sum, e.g. latencies."""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last is +Inf), sum of values
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+    
+    def sum(self, **labels: Any) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = self._header()
+        bucket_labels = self.labelnames + ("le",)
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels, key + (_format_value(bound),))} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """A named set of metrics that can be rendered, snapshotted and merged."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+    
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self) -> Dict[str, List[Any]]:
+        """Plain, picklable copy of every stored series, for ``merge``."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            with metric._lock:
+                if isinstance(metric, Histogram):
+                    series = [[list(key), [list(counts), total]] for key, (counts, total) in metric._series.items()]
+                else:
+                    series = [[list(key), value] for key, value in metric._series.items()]
+            snapshot[metric.name] = series
+        return snapshot
+    
+    def merge(self, snapshot: Dict[str, List[Any]]):
+        """
+        Add another process's snapshot into this registry.
+        
+        Counters, gauges and histogram buckets are summed; metrics this
+        registry does not know are ignored.
+        """
+        for name, series in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            with metric._lock:
+                for key, value in series:
+                    key = tuple(key)
+                    if isinstance(metric, Histogram):
+                        counts, total = value
+                        existing = metric._series.setdefault(key, [[0] * len(counts), 0.0])
+                        existing[0] = [mine + theirs for mine, theirs in zip(existing[0], counts)]
+                        existing[1] += total
+                    else:
+                        metric._series[key] = metric._series.get(key, 0.0) + value
+    
+    def clear(self):
+        """Reset every metric's series, e.g. between tests."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_SECONDS = REGISTRY.histogram(
+    "food_truck_node_duration_seconds", "Time spent in each workflow node", ("node",)
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "food_truck_llm_request_duration_seconds", "Latency of single LLM requests", ("agent", "model", "outcome")
+)
+LLM_RETRIES = REGISTRY.counter(
+    "food_truck_llm_retries_total", "LLM requests retried, by classified error reason", ("agent", "model", "reason")
+)
+FALLBACKS = REGISTRY.counter(
+    "food_truck_fallbacks_total", "Agent outputs built by a fallback instead of the LLM response", ("agent",)
+)
+PARSE_FAILURES = REGISTRY.counter(
+    "food_truck_json_parse_failures_total", "LLM responses that failed JSON parsing or validation", ("agent", "error")
+)
+JSON_REPAIRS = REGISTRY.counter(
+    "food_truck_json_repairs_total", "Malformed LLM responses repaired, by repair stage", ("agent", "stage")
+)
+PERMIT_KB_LOOKUPS = REGISTRY.counter(
+    "food_truck_permit_kb_lookups_total", "Permit knowledge base lookups by matching level", ("level",)
+)
+RUNS_IN_FLIGHT = REGISTRY.gauge("food_truck_runs_in_flight", "Research runs currently executing")
+RUNS = REGISTRY.counter("food_truck_runs_total", "Finished research runs by status", ("status",))
+RUN_SECONDS = REGISTRY.histogram(
+    "food_truck_run_duration_seconds", "Wall time of research runs, cache hits included"
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "food_truck_cache_lookups_total", "Results-store lookups for a reusable result", ("result",)
+)
+CACHE_HIT_RATIO = REGISTRY.gauge("food_truck_cache_hit_ratio", "Share of cache lookups that found a result")
+
+
+def _cache_hit_ratio() -> float:
+    hits, misses = CACHE_LOOKUPS.value(result="hit"), CACHE_LOOKUPS.value(result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratio)
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """The registry in Prometheus text format."""
+    return registry.render()
+
+
+def dump_metrics(path: str, registry: MetricsRegistry = REGISTRY):
+    """
+    Write the registry to a file in Prometheus text format.
+    
+    The file is replaced atomically, so a node exporter textfile collector
+    never reads a partial dump.
+    """
+    with atomic_write(path) as handle:
+        handle.write(registry.render())
@@ -0,0 +1,251 @@
+"""
+Opt-in CPU and memory profiling of research runs.
+
+CPU profiling wraps a run in cProfile and saves the stats as a ``.prof``
+file, which ``pstats``, snakeviz or ``merge_profiles`` can read. Memory
+profiling takes tracemalloc snapshots before and after every graph node and
+records the growth and top allocating lines per node. A sample rate lets
+production runs be profiled occasionally rather than always.
+
+Profiles are written to the configured directory, named after the run id,
+and their paths are stored on the run's result.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingConfig(BaseModel):
+    """Which profilers run, how often, and where their output goes."""
+    
+    cpu: bool = Field(default=False, description="Wrap runs in cProfile")
+    memory: bool = Field(default=False, description="Snapshot tracemalloc around every node")
+    sample_rate: float = Field(default=1.0, ge=0, le=1, description="Fraction of runs to profile")
+    output_dir: str = Field(default="profiles", description="Directory profiles are written to")
+    top_allocators: int = Field(default=10, ge=1, description="Allocating lines kept per node")
+    top_functions: int = Field(default=15, ge=1, description="Functions kept in the run's CPU summary")
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether any profiler is switched on."""
+        return (self.cpu or self.memory) and self.sample_rate > 0
+    
+    def should_profile(self) -> bool:
+        """Decide whether the next run is profiled."""
+        return self.enabled and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+
+_active_profiler: ContextVar[Optional["RunProfiler"]] = ContextVar("active_profiler", default=None)
+
+# tracemalloc is process-wide; it runs while any memory-profiled run is active.
+# Allocations are attributed by line, so one frame per trace is enough
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_users = 1
+        elif _tracemalloc_users:
+            _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    """Drop allocations made by the import system and tracemalloc itself."""
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, tracemalloc.__file__)
+    ])
+
+
+class RunProfiler:
+    """Profiles one research run; created by ``profile_run``."""
+    
+    def __init__(self, run_id: str, config: ProfilingConfig):
+        self.run_id = run_id
+        self.config = config
+        self.nodes: List[Dict[str, Any]] = []
+        self.outputs: Dict[str, Any] = {}
+        self._cpu_profiler = cProfile.Profile() if config.cpu else None
+    
+    @contextmanager
+    def node(self, name: str) -> Iterator[None]:
+        """Record memory growth and top allocators of one graph node."""
+        if not self.config.memory or not tracemalloc.is_tracing():
+            yield
+            return
+        
+        before = _filtered(tracemalloc.take_snapshot())
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = _filtered(tracemalloc.take_snapshot())
+            differences = after.compare_to(before, "lineno")
+            self.nodes.append({
+                "node": name,
+                "allocated_kb": round(sum(stat.size_diff for stat in differences) / 1024, 1),
+                "traced_kb": round(current / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "top_allocators": [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_diff_kb": round(stat.size_diff / 1024, 1),
+                        "count_diff": stat.count_diff
+                    }
+                    for stat in differences[:self.config.top_allocators]
+                    if stat.size_diff
+                ]
+            })
+    
+    def start(self):
+        if self.config.memory:
+            _start_tracemalloc()
+        if self._cpu_profiler:
+            try:
+                self._cpu_profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active cProfile per process
+                self._cpu_profiler = None
+                self.outputs["cpu_profile_skipped"] = "another profiler was active"
+    
+    def stop(self):
+        if self._cpu_profiler:
+            self._cpu_profiler.disable()
+        if self.config.memory:
+            _stop_tracemalloc()
+    
+    def save(self) -> Dict[str, Any]:
+        """Write the collected profiles and return their paths and summaries."""
+        os.makedirs(self.config.output_dir, exist_ok=True)
+        base = os.path.join(self.config.output_dir, self.run_id)
+        
+        if self._cpu_profiler:
+            self.outputs["cpu_profile"] = f"{base}.prof"
+            self._cpu_profiler.dump_stats(self.outputs["cpu_profile"])
+            self.outputs["top_functions"] = top_functions(
+                pstats.Stats(self._cpu_profiler), self.config.top_functions
+            )
+        
+        if self.config.memory:
+            self.outputs["memory_profile"] = f"{base}.memory.json"
+            with open(self.outputs["memory_profile"], "w", encoding="utf-8") as handle:
+                json.dump({"run_id": self.run_id, "nodes": self.nodes}, handle, indent=2)
+            self.outputs["memory_by_node_kb"] = {node["node"]: node["allocated_kb"] for node in self.nodes}
+        
+        return self.outputs
+
+
+@contextmanager
+def profile_run(
+    run_id: str,
+    config: Optional[ProfilingConfig],
+    force: Optional[bool] = None
+) -> Iterator[Optional[RunProfiler]]:
+    """
+    Profile the block as one run when the config (or ``force``) says so.
+    
+    Args:
+        run_id: Names the profile files
+        config: Profiling settings; None disables profiling
+        force: True or False overrides sampling for this run; True with
+            nothing enabled records a CPU profile
+    
+    Yields:
+        The active RunProfiler, or None when this run is not profiled
+    """
+    if force and (config is None or not config.enabled):
+        # Forcing a run with nothing switched on means a CPU profile
+        config = (config or ProfilingConfig()).copy(update={"cpu": True, "sample_rate": 1.0})
+    if config is None or not config.enabled or force is False or (force is None and not config.should_profile()):
+        yield None
+        return
+    
+    profiler = RunProfiler(run_id, config)
+    token = _active_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active_profiler.reset(token)
+        try:
+            profiler.save()
+        except OSError as e:
+            # Profiling must never fail a run
+            logging.getLogger(__name__).warning(f"Failed to save profile for run {run_id}: {str(e)}")
+
+
+@contextmanager
+def profile_node(name: str) -> Iterator[None]:
+    """Memory-profile a graph node if the current run is being profiled."""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.node(name):
+        yield
+
+
+def top_functions(stats: pstats.Stats, limit: int = 15) -> List[Dict[str, Any]]:
+    """The most expensive functions by cumulative time."""
+    entries = []
+    for (filename, lineno, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        entries.append({
+            "function": f"{os.path.basename(filename)}:{lineno}({function})",
+            "calls": calls,
+            "total_seconds": round(total, 4),
+            "cumulative_seconds": round(cumulative, 4)
+        })
+    entries.sort(key=lambda entry: entry["cumulative_seconds"], reverse=True)
+    return entries[:limit]
+
+
+def merge_profiles(paths: List[str], output_path: str) -> Optional[pstats.Stats]:
+    """
+    Combine saved cProfile stats, e.g. every run of a batch, into one file.
+    
+    Args:
+        paths: ``.prof`` files to merge; unreadable ones are skipped
+        output_path: Where to write the combined stats
+    
+    Returns:
+        The combined stats, or None if nothing could be read
+    """
+    combined = None
+    for path in paths:
+        try:
+            if combined is None:
+                combined = pstats.Stats(path)
+            else:
+                combined.add(path)
+        except (OSError, TypeError, EOFError) as e:
+            logging.getLogger(__name__).warning(f"Skipping unreadable profile {path}: {str(e)}")
+    if combined is not None:
+        combined.dump_stats(output_path)
+    return combined
@@ -43,7 +43,8 @@ class RetryHandler:
     def retry_on_exception(
         self,
         exceptions: Union[Exception, tuple] = Exception,
-        should_retry_func: Optional[Callable[[Exception], bool]] = None
+        should_retry_func: Optional[Callable[[Exception], bool]] = None,
+        on_retry: Optional[Callable[..., None]] = None
     ):
         """
         Decorator for retrying function calls on specified exceptions.
@@ -51,6 +52,8 @@ class RetryHandler:
         Args:
             exceptions: Exception types to retry on
             should_retry_func: Optional function to determine if retry should happen
+            on_retry: Optional function called with the exception and the call's
+                arguments before each retry, e.g. to count retries
         """
         def decorator(func: Callable) -> Callable:
             @wraps(func)
@@ -60,7 +63,7 @@ class RetryHandler:
                 for attempt in range(self.max_attempts):
                     try:
                         return func(*args, **kwargs)
-                        
+                    
                     except exceptions as e:
                         last_exception = e
                         
@@ -80,76 +83,87 @@ class RetryHandler:
                             f"Attempt {attempt + 1}/{self.max_attempts} failed for {func.__name__}: {str(e)}. "
                             f"Retrying in {delay:.1f} seconds..."
                         )
+                        if on_retry:
+                            on_retry(e, *args, **kwargs)
                         time.sleep(delay)
                 
                 # This should never be reached, but just in case
                 if last_exception:
                     raise last_exception
-                    
+            
             return wrapper
         return decorator
 
 
-def is_retryable_api_error(exception: Exception) -> bool:
+# Error message patterns by reason, checked in order; the first match wins
+ERROR_REASON_PATTERNS = [
+    ("auth", ["invalid api key", "authentication", "unauthorized", "forbidden", "401", "403"]),
+    ("not_found", ["not found", "404"]),
+    ("bad_request", ["400"]),
+    ("rate_limit", ["rate limit"]),
+    ("timeout", ["timeout"]),
+    ("server_error", ["temporary", "service unavailable", "internal server error", "502", "503", "504"]),
+    ("connection", ["connection error", "network error"])
+]
+
+# Reasons that waiting and trying again cannot fix
+NON_RETRYABLE_REASONS = {"final", "auth", "not_found", "bad_request"}
+
+
+def classify_api_error(exception: Exception) -> str:
     """
-    Determine if an API error should be retried.
+    Classify an API error by its likely cause.
     
     Args:
-        exception: The exception to check
-        
+        exception: The exception to classify
+    
     Returns:
-        True if the error should be retried, False otherwise
+        One of "final" (the error declared itself not retryable), "auth",
+        "not_found", "bad_request", "rate_limit", "timeout", "server_error",
+        "connection" or "unknown"
     """
-    error_message = str(exception).lower()
-    
-    # Retryable conditions
-    retryable_patterns = [
-        "rate limit",
-        "timeout",
-        "temporary",
-        "service unavailable",
-        "internal server error",
-        "connection error",
-        "network error",
-        "502",
-        "503",
-        "504"
-    ]
+    # Errors can declare themselves final, e.g. an exhausted spend budget
+    if getattr(exception, "retryable", True) is False:
+        return "final"
     
-    # Non-retryable conditions
-    non_retryable_patterns = [
-        "invalid api key",
-        "authentication",
-        "unauthorized",
-        "forbidden",
-        "not found",
-        "400",
-        "401",
-        "403",
-        "404"
-    ]
+    error_message = str(exception).lower()
+    for reason, patterns in ERROR_REASON_PATTERNS:
+        if any(pattern in error_message for pattern in patterns):
+            return reason
     
-    # Check for non-retryable errors first
-    for pattern in non_retryable_patterns:
-        if pattern in error_message:
-            return False
+    if isinstance(exception, TimeoutError):
+        return "timeout"
+    if isinstance(exception, ConnectionError):
+        return "connection"
+    return "unknown"
+
+
+def is_retryable_api_error(exception: Exception) -> bool:
+    """
+    Determine if an API error should be retried.
     
-    # Check for retryable errors
-    for pattern in retryable_patterns:
-        if pattern in error_message:
-            return True
+    Args:
+        exception: The exception to check
     
-    # Default to retrying unknown errors (conservative approach)
-    return True
+    Returns:
+        True if the error should be retried, False otherwise
+    """
+    # Unknown errors are retried (conservative approach)
+    return classify_api_error(exception) not in NON_RETRYABLE_REASONS
 
 
 # Pre-configured retry handlers for common use cases
-def retry_api_call(max_attempts: int = 3, base_delay: float = 1.0):
+def retry_api_call(
+    max_attempts: int = 3,
+    base_delay: float = 1.0,
+    on_retry: Optional[Callable[..., None]] = None
+):
     """Decorator for retrying API calls with smart error detection."""
     handler = RetryHandler(max_attempts=max_attempts, base_delay=base_delay)
     return handler.retry_on_exception(
         exceptions=Exception,
-        should_retry_func=is_retryable_api_error
+        should_retry_func=is_retryable_api_error,
+        on_retry=on_retry
     )
 
 
@@ -177,10 +191,10 @@ def execute_with_retry(
         base_delay: Initial delay between retries
         should_retry_func: Optional function to determine retry eligibility
         *args, **kwargs: Arguments to pass to the function
-        
+    
     Returns:
         Function result
-        
+    
     Raises:
         Last encountered exception if all retries fail
     """
@@ -0,0 +1,93 @@
+"""
+KD-tree for nearest-neighbor lookups over small sets of points.
+
+Pure Python, built once from a list of points and queried many times. A
+query visits O(log n) nodes for the few thousand points it is used with,
+so lookups take microseconds and the index needs no compiled dependency.
+"""
+
+import math
+from typing import Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+Point = Tuple[float, ...]
+
+
+class _Node:
+    __slots__ = ("point", "item", "axis", "left", "right")
+    
+    def __init__(self, point: Point, item, axis: int, left: Optional["_Node"], right: Optional["_Node"]):
+        self.point = point
+        self.item = item
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class KDTree(Generic[T]):
+    """
+    Static KD-tree mapping points to items.
+    
+    Args:
+        entries: (point, item) pairs; every point has the same number of dimensions
+    """
+    
+    def __init__(self, entries: Sequence[Tuple[Point, T]]):
+        self.size = len(entries)
+        self.dimensions = len(entries[0][0]) if entries else 0
+        self._root = self._build(list(entries), 0)
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _build(self, entries: List[Tuple[Point, T]], depth: int) -> Optional[_Node]:
+        if not entries:
+            return None
+        axis = depth % self.dimensions
+        entries.sort(key=lambda entry: entry[0][axis])
+        middle = len(entries) // 2
+        point, item = entries[middle]
+        return _Node(
+            point,
+            item,
+            axis,
+            self._build(entries[:middle], depth + 1),
+            self._build(entries[middle + 1:], depth + 1)
+        )
+    
+    def nearest(
+        self,
+        point: Point,
+        accept: Optional[Callable[[T], bool]] = None
+    ) -> Optional[Tuple[T, float]]:
+        """
+        The item closest to ``point`` by Euclidean distance.
+        
+        Args:
+            point: Query point
+            accept: Only consider items for which this returns True
+        
+        Returns:
+            (item, distance), or None if no item is accepted
+        """
+        best: List = [None, math.inf]
+        
+        def visit(node: Optional[_Node]):
+            if node is None:
+                return
+            squared = sum((a - b) ** 2 for a, b in zip(point, node.point))
+            if squared < best[1] and (accept is None or accept(node.item)):
+                best[0], best[1] = node.item, squared
+            
+            offset = point[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if offset < 0 else (node.right, node.left)
+            visit(near)
+            # The far side can only hold a closer point if the splitting plane is closer
+            if offset * offset < best[1]:
+                visit(far)
+        
+        visit(self._root)
+        if best[0] is None:
+            return None
+        return best[0], math.sqrt(best[1])
@@ -0,0 +1,99 @@
+"""
+Helpers for reading numbers out of free-text LLM fields.
+"""
+
+import re
+from typing import Optional, Tuple
+
+
+UNIT_TO_MONTHS = {
+    "day": 1 / 30.0,
+    "week": 12 / 52.0,
+    "month": 1.0,
+    "mo": 1.0,
+    "year": 12.0,
+    "yr": 12.0
+}
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_RANGE_SEPARATOR = r"\s*(?:-|–|—|to)\s*"
+
+DURATION_PATTERN = re.compile(
+    _NUMBER + r"(?:" + _RANGE_SEPARATOR + _NUMBER + r")?\s*(day|week|month|mo|year|yr)s?\b",
+    re.IGNORECASE
+)
+PERCENT_PATTERN = re.compile(
+    _NUMBER + r"\s*%?(?:" + _RANGE_SEPARATOR + _NUMBER + r")?\s*%",
+    re.IGNORECASE
+)
+
+
+def parse_duration_months(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    Parse the first duration or duration range in a text as months.
+    
+    "12-18 months" -> (12, 18), "1.5 to 2 years" -> (18, 24),
+    "4-8 weeks to obtain permits" -> (0.92, 1.85).
+    
+    Returns:
+        (low, high) in months, or None if no duration is present
+    """
+    if not text:
+        return None
+    
+    match = DURATION_PATTERN.search(text)
+    if not match:
+        return None
+    
+    low = float(match.group(1))
+    high = float(match.group(2)) if match.group(2) else low
+    factor = UNIT_TO_MONTHS[match.group(3).lower()]
+    return min(low, high) * factor, max(low, high) * factor
+
+
+def parse_percent_range(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    Parse the first percentage or percentage range in a text as fractions.
+    
+    "15-20% ROI" -> (0.15, 0.20), "about 25%" -> (0.25, 0.25).
+    
+    Returns:
+        (low, high) as fractions, or None if no percentage is present
+    """
+    if not text:
+        return None
+    
+    match = PERCENT_PATTERN.search(text)
+    if not match:
+        return None
+    
+    low = float(match.group(1))
+    high = float(match.group(2)) if match.group(2) else low
+    return min(low, high) / 100.0, max(low, high) / 100.0
+
+
+NUMBER_PATTERN = re.compile(r"^\s*(-)?\s*\$?\s*(\d[\d,]*(?:\.\d+)?|\.\d+)\s*([km%])?\s*$", re.IGNORECASE)
+
+NUMBER_SUFFIXES = {"k": 1e3, "m": 1e6, "%": 0.01}
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """
+    Parse a number written the way LLMs often write them.
+    
+    "$75,000" -> 75000.0, "1.2M" -> 1200000.0, "15%" -> 0.15, "-$500" -> -500.0.
+    
+    Returns:
+        The number, or None if the text is not a single number
+    """
+    if not text:
+        return None
+    
+    match = NUMBER_PATTERN.match(text)
+    if not match:
+        return None
+    
+    value = float(match.group(2).replace(",", ""))
+    if match.group(3):
+        value *= NUMBER_SUFFIXES[match.group(3).lower()]
+    return -value if match.group(1) else value
@@ -0,0 +1,388 @@
+"""
+Lightweight tracing spans for workflow runs.
+
+Spans nest through context variables, so code deep inside an agent can open
+a span without a tracer being passed around; outside an active trace they
+are no-ops. Finished traces are exported as OpenTelemetry OTLP/JSON, one
+``ExportTraceServiceRequest`` per line (the layout written by the
+OpenTelemetry Collector file exporter), and can be summarized as a critical
+path and a text Gantt chart.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+SERVICE_NAME = "food-truck-research"
+
+# Attribute names follow the OpenTelemetry GenAI conventions where one exists
+INPUT_TOKENS = "gen_ai.usage.input_tokens"
+OUTPUT_TOKENS = "gen_ai.usage.output_tokens"
+
+_active_trace: ContextVar[Optional["Trace"]] = ContextVar("active_trace", default=None)
+_active_span: ContextVar[Optional["Span"]] = ContextVar("active_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+    
+    def __init__(
+        self,
+        trace_id: str,
+        name: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        span_id: Optional[str] = None,
+        start_ns: Optional[int] = None
+    ):
+        self.trace_id = trace_id
+        self.span_id = span_id or os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+    
+    @property
+    def duration_ms(self) -> float:
+        """Wall time in milliseconds (up to now if the span is still open)."""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+    
+    def set_attribute(self, key: str, value: Any):
+        """Set an attribute, e.g. ``cache_hit`` or ``fallback_used``."""
+        self.attributes[key] = value
+    
+    def increment(self, key: str, amount: float = 1):
+        """Add to a numeric attribute, starting from zero."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+    
+    def end(self):
+        """Close the span if it is still open."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+
+class _NoopSpan(Span):
+    """Returned when no trace is active; records nothing."""
+    
+    def __init__(self):
+        super().__init__("", "noop", start_ns=0)
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def increment(self, key: str, amount: float = 1):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans recorded for one workflow run."""
+    
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+    
+    def add(self, span: Span):
+        """Record a span; safe to call from several threads."""
+        with self._lock:
+            self.spans.append(span)
+    
+    @property
+    def root(self) -> Optional[Span]:
+        """The span without a parent."""
+        return next((span for span in self.spans if span.parent_id is None), None)
+    
+    def children(self) -> Dict[Optional[str], List[Span]]:
+        """Spans grouped by parent id, each group in start order."""
+        grouped: Dict[Optional[str], List[Span]] = {}
+        for span in sorted(self.spans, key=lambda span: span.start_ns):
+            grouped.setdefault(span.parent_id, []).append(span)
+        return grouped
+    
+    def record_queue_waits(self, queued_at: Optional[float] = None):
+        """
+        Store ``queue_wait_ms`` on every span.
+        
+        A span's wait is the gap between the moment it could have started
+        (its parent started and every earlier sibling finished) and when it
+        did start. The root's wait runs from ``queued_at`` when known.
+        """
+        by_id = {span.span_id: span for span in self.spans}
+        for parent_id, siblings in self.children().items():
+            for index, span in enumerate(siblings):
+                if parent_id is None:
+                    ready_ns = int(queued_at * 1e9) if queued_at else span.start_ns
+                else:
+                    finished = [
+                        sibling.end_ns for sibling in siblings[:index]
+                        if sibling.end_ns is not None and sibling.end_ns <= span.start_ns
+                    ]
+                    ready_ns = max([by_id[parent_id].start_ns] + finished) if parent_id in by_id else span.start_ns
+                span.attributes["queue_wait_ms"] = round(max(0, span.start_ns - ready_ns) / 1e6, 3)
+    
+    def critical_path(self) -> List[Span]:
+        """
+        Spans that determined the run's end-to-end latency, in start order.
+        
+        Starting from the root, the path follows the child that finished last,
+        then the sibling that finished before that child started, and so on,
+        descending into each chosen child.
+        """
+        root = self.root
+        if root is None:
+            return []
+        children = self.children()
+        
+        def walk(span: Span) -> List[Span]:
+            path = [span]
+            cursor = span.end_ns if span.end_ns is not None else time.time_ns()
+            chosen = []
+            for child in sorted(children.get(span.span_id, []), key=lambda child: child.end_ns or 0, reverse=True):
+                if child.end_ns is not None and child.end_ns <= cursor:
+                    chosen.append(child)
+                    cursor = child.start_ns
+            for child in reversed(chosen):
+                path.extend(walk(child))
+            return path
+        
+        return walk(root)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Compact per-run timing summary suitable for storing with the result."""
+        root = self.root
+        children = self.children()
+        critical = self.critical_path()
+        attempts = [span for span in self.spans if span.name == "llm_attempt"]
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": round(root.duration_ms, 3) if root else 0.0,
+            "queue_wait_ms": root.attributes.get("queue_wait_ms", 0.0) if root else 0.0,
+            "cache_hit": bool(root and root.attributes.get("cache_hit")),
+            "nodes": {
+                span.name: round(span.duration_ms, 3) for span in self.spans if span.attributes.get("kind") == "node"
+            },
+            "critical_path": [
+                {"name": self._qualified_name(span), "duration_ms": round(span.duration_ms, 3)}
+                for span in critical[1:]
+                if span.span_id not in children
+            ],
+            "llm_attempts": len(attempts),
+            "retries": sum(1 for span in attempts if span.attributes.get("attempt", 1) > 1),
+            "input_tokens": sum(span.attributes.get(INPUT_TOKENS, 0) for span in attempts),
+            "output_tokens": sum(span.attributes.get(OUTPUT_TOKENS, 0) for span in attempts),
+            "fallbacks": [span.attributes.get("agent", span.name) for span in self.spans if span.name == "fallback"]
+        }
+    
+    def _qualified_name(self, span: Span) -> str:
+        """Span name prefixed with its enclosing node, e.g. "market_research_node/llm_attempt"."""
+        by_id = {candidate.span_id: candidate for candidate in self.spans}
+        parent = by_id.get(span.parent_id)
+        while parent is not None and parent.attributes.get("kind") != "node":
+            parent = by_id.get(parent.parent_id)
+        return f"{parent.name}/{span.name}" if parent is not None and parent is not span else span.name
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        spans = []
+        for span in self.spans:
+            encoded = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns if span.end_ns is not None else span.start_ns),
+                "attributes": [_encode_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            }
+            if span.parent_id:
+                encoded["parentSpanId"] = span.parent_id
+            spans.append(encoded)
+        
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_encode_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "food_truck_research"}, "spans": spans}]
+        }]}
+    
+    @classmethod
+    def from_otlp(cls, request: Dict[str, Any]) -> "Trace":
+        """Rebuild a trace from ``to_otlp`` output."""
+        trace = None
+        for resource_spans in request.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for encoded in scope_spans.get("spans", []):
+                    if trace is None:
+                        trace = cls(encoded["traceId"])
+                    span = Span(
+                        encoded["traceId"],
+                        encoded["name"],
+                        parent_id=encoded.get("parentSpanId") or None,
+                        attributes=dict(_decode_attribute(item) for item in encoded.get("attributes", [])),
+                        span_id=encoded["spanId"],
+                        start_ns=int(encoded["startTimeUnixNano"])
+                    )
+                    span.end_ns = int(encoded["endTimeUnixNano"])
+                    if encoded.get("status", {}).get("code") == 2:
+                        span.error = encoded["status"].get("message", "")
+                    trace.add(span)
+        return trace or cls()
+
+
+def _encode_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encode one attribute as an OTLP key/value pair."""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    elif isinstance(value, str):
+        encoded = {"stringValue": value}
+    else:
+        encoded = {"stringValue": json.dumps(value, default=str)}
+    return {"key": key, "value": encoded}
+
+
+def _decode_attribute(item: Dict[str, Any]) -> tuple:
+    """Decode an OTLP key/value pair."""
+    value = item.get("value", {})
+    if "intValue" in value:
+        return item["key"], int(value["intValue"])
+    for kind in ("boolValue", "doubleValue", "stringValue"):
+        if kind in value:
+            return item["key"], value[kind]
+    return item["key"], None
+
+
+@contextmanager
+def start_trace(name: str, queued_at: Optional[float] = None, **attributes: Any) -> Iterator[Trace]:
+    """
+    Record a new trace with a root span around the block.
+    
+    Args:
+        name: Root span name
+        queued_at: Unix time the work was queued, for the root's queue wait
+        **attributes: Root span attributes
+    """
+    trace = Trace()
+    root = Span(trace.trace_id, name, attributes=attributes)
+    trace.add(root)
+    trace_token = _active_trace.set(trace)
+    span_token = _active_span.set(root)
+    try:
+        yield trace
+    except BaseException as e:
+        root.error = str(e) or type(e).__name__
+        raise
+    finally:
+        root.end()
+        _active_span.reset(span_token)
+        _active_trace.reset(trace_token)
+        trace.record_queue_waits(queued_at)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time the block as a child of the current span.
+    
+    Exceptions are recorded on the span and re-raised. Without an active
+    trace this yields a span that records nothing.
+    """
+    trace = _active_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    
+    parent = _active_span.get()
+    current = Span(trace.trace_id, name, parent_id=parent.span_id if parent else None, attributes=attributes)
+    trace.add(current)
+    token = _active_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = str(e) or type(e).__name__
+        raise
+    finally:
+        current.end()
+        _active_span.reset(token)
+
+
+def current_span() -> Span:
+    """The innermost open span, or a no-op span outside a trace."""
+    return _active_span.get() or NOOP_SPAN
+
+
+def export_trace(trace: Trace, path: str):
+    """Append a trace to an OTLP/JSON lines file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    line = json.dumps(trace.to_otlp(), separators=(",", ":"))
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+
+def load_traces(path: str) -> List[Trace]:
+    """Read every trace from an OTLP/JSON lines file, skipping unreadable lines."""
+    traces = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                traces.append(Trace.from_otlp(json.loads(line)))
+            except (ValueError, KeyError):
+                continue
+    return traces
+
+
+def format_gantt(trace: Trace, width: int = 50) -> str:
+    """
+    Render a trace as a text Gantt chart.
+    
+    Spans on the critical path are marked with "*". Bars are positioned
+    relative to the root span.
+    """
+    root = trace.root
+    if root is None:
+        return "(empty trace)"
+    
+    children = trace.children()
+    critical = {span.span_id for span in trace.critical_path()}
+    total_ns = max((root.end_ns or root.start_ns) - root.start_ns, 1)
+    
+    lines = [f"Trace {trace.trace_id}  {root.name}  {root.duration_ms / 1000:.2f}s"]
+    
+    def render(span: Span, depth: int):
+        start = int((span.start_ns - root.start_ns) / total_ns * width)
+        length = max(1, int(round(span.duration_ms * 1e6 / total_ns * width)))
+        bar = " " * min(start, width - 1) + "█" * min(length, width - min(start, width - 1))
+        marker = "*" if span.span_id in critical else " "
+        label = ("  " * depth + span.name)[:34]
+        notes = []
+        if span.attributes.get("attempt", 1) > 1:
+            notes.append(f"attempt {span.attributes['attempt']}")
+        if span.attributes.get("fallback_used"):
+            notes.append("fallback")
+        if span.attributes.get("cache_hit"):
+            notes.append("cache hit")
+        if span.error:
+            notes.append("error")
+        lines.append(
+            f"{marker} {label:<34} |{bar:<{width}}| {span.duration_ms / 1000:>7.2f}s"
+            + (f"  ({', '.join(notes)})" if notes else "")
+        )
+        for child in children.get(span.span_id, []):
+            render(child, depth + 1)
+    
+    render(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+"""
+Shared pytest configuration for the food truck research test suite.
+
+Every test gets an API key, fresh shared agents and empty metrics. Tests
+that exercise agents replace their LLM with a ``FakeLLM``, which replies
+from a script and records what it was sent.
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pytest
+
+# Add src to Python path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from graph.workflow import clear_agent_cache  # noqa: E402
+from utils.metrics import REGISTRY  # noqa: E402
+
+
+AGENTS = ("market_agent", "financial_agent", "operations_agent", "business_agent")
+
+# A reply with no JSON, so agents fall back to their parsers
+PROSE = "Looks promising overall."
+
+
+@pytest.fixture(autouse=True)
+def fresh_agents(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    clear_agent_cache()
+    REGISTRY.clear()
+    yield
+    clear_agent_cache()
+    REGISTRY.clear()
+
+
+class FakeResponse:
+    """Stands in for a chat model message, optionally with token usage."""
+    
+    def __init__(self, content: str, usage: Optional[Dict[str, int]] = None):
+        self.content = content
+        if usage is not None:
+            self.usage_metadata = usage
+
+
+class FakeLLM:
+    """
+    Chat model that replies from a script and records every call.
+    
+    Args:
+        *replies: Replies in turn, the last one repeating; dicts are sent as
+            JSON and exceptions are raised (default: ``PROSE``)
+        usage: Token usage attached to every response
+    """
+    
+    def __init__(self, *replies: Any, usage: Optional[Dict[str, int]] = None):
+        self.replies = list(replies) or [PROSE]
+        self.usage = usage
+        self.messages: List[List[str]] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def calls(self) -> int:
+        return len(self.messages)
+    
+    @property
+    def prompts(self) -> List[str]:
+        """The user prompt of each call."""
+        return [contents[-1] for contents in self.messages]
+    
+    def reply(self, messages: Sequence[Dict[str, str]]) -> Any:
+        """The next scripted reply; override to answer based on the prompt."""
+        return self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+    
+    def invoke(self, messages: Sequence[Dict[str, str]]) -> FakeResponse:
+        with self._lock:
+            self.messages.append([message["content"] for message in messages])
+            reply = self.reply(messages)
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(reply if isinstance(reply, str) else json.dumps(reply), self.usage)
+
+
+def install_llms(workflow: Any, make_llm: Callable[[], Any] = FakeLLM, agents: Sequence[str] = AGENTS) -> Any:
+    """Give each agent of a workflow its own LLM from ``make_llm`` and a small risk simulation."""
+    for name in agents:
+        getattr(workflow, name).llm = make_llm()
+    workflow.business_agent.risk_scenarios = 500
+    return workflow
@@ -0,0 +1,121 @@
+"""
+Tests for resumable batch runs.
+"""
+
+import functools
+import json
+import threading
+
+from batch.runner import (
+    BatchProgress,
+    completed_locations,
+    format_duration,
+    read_locations,
+    run_batch,
+    run_batch_processes
+)
+
+
+class _Workflow:
+    """Records calls and fails for locations listed in ``failing``."""
+    
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.lock = threading.Lock()
+    
+    def run_research(self, location, max_cache_age=None):
+        with self.lock:
+            self.calls.append(location)
+        if location in self.failing:
+            return {"location": location, "status": "error", "error_message": "boom"}
+        return {"location": location, "status": "success"}
+
+
+def test_read_locations_from_text_and_csv(tmp_path):
+    text = tmp_path / "locations.txt"
+    text.write_text("# markets\nAustin, TX\n\nSt. Louis, Missouri\nsaint louis, MO\n")
+    assert read_locations(str(text)) == ["Austin, TX", "St. Louis, Missouri"]
+    
+    split = tmp_path / "split.csv"
+    split.write_text("city,state\nBoise,ID\nTulsa,OK\n")
+    assert read_locations(str(split)) == ["Boise, ID", "Tulsa, OK"]
+    
+    unquoted = tmp_path / "unquoted.csv"
+    unquoted.write_text("id,location\n1,Austin, TX\n2,\"Waco, TX\"\n")
+    assert read_locations(str(unquoted)) == ["Austin, TX", "Waco, TX"]
+
+
+def test_batch_writes_each_result_and_resumes(tmp_path):
+    output = tmp_path / "out.jsonl"
+    locations = ["Austin, TX", "Boise, ID", "Tulsa, OK"]
+    first = _Workflow(failing=["Tulsa, OK"])
+    
+    summary = run_batch(locations, first, str(output), concurrency=2)
+    
+    assert summary["completed"] == 3
+    assert summary["status_counts"] == {"error": 1, "success": 2}
+    assert len(output.read_text().splitlines()) == 3
+    
+    # Simulate a crash mid-write, then resume with error retries
+    with open(output, "a") as handle:
+        handle.write('{"location": "Waco')
+    second = _Workflow()
+    summary = run_batch(locations + ["Waco, TX"], second, str(output), retry_errors=True)
+    
+    assert sorted(second.calls) == ["Tulsa, OK", "Waco, TX"]
+    assert summary["skipped"] == 2
+    assert completed_locations(str(output), include_errors=False) == {
+        "austin, TX", "boise, ID", "tulsa, OK", "waco, TX"
+    }
+    assert json.loads(output.read_text().splitlines()[-1])["status"] == "success"
+
+
+def test_worker_exceptions_become_error_records(tmp_path):
+    class Broken:
+        def run_research(self, location, max_cache_age=None):
+            raise RuntimeError("no client")
+    
+    output = tmp_path / "out.jsonl"
+    summary = run_batch(["Austin, TX"], Broken(), str(output))
+    
+    assert summary["status_counts"] == {"error": 1}
+    assert "no client" in json.loads(output.read_text())["error_message"]
+
+
+def test_progress_eta_and_durations():
+    progress = BatchProgress(total=4)
+    assert progress.eta_seconds is None
+    
+    progress.started_at -= 10
+    progress.record("success")
+    
+    assert 29 < progress.eta_seconds < 31
+    assert format_duration(3725) == "1h 02m"
+    assert format_duration(65) == "1m 05s"
+
+
+def test_process_pool_merges_results_and_metrics(tmp_path):
+    output = tmp_path / "out.jsonl"
+    locations = [f"City {index}, TX" for index in range(6)]
+    (tmp_path / "reports").mkdir()
+    
+    summary = run_batch_processes(
+        locations,
+        functools.partial(_Workflow, failing=["City 5, TX"]),
+        str(output),
+        processes=2,
+        concurrency=2,
+        report_dir=str(tmp_path / "reports"),
+        report_formats=["json"]
+    )
+    
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["location"] for record in records) == sorted(locations)
+    assert summary["status_counts"] == {"error": 1, "success": 5}
+    assert len(summary["processes"]) == 2
+    assert sum(metrics["completed"] for metrics in summary["processes"]) == 6
+    assert len(list((tmp_path / "reports").iterdir())) == 5
+    
+    resumed = run_batch_processes(locations, functools.partial(_Workflow), str(output), processes=2)
+    assert resumed["skipped"] == 6 and resumed["processes"] == []
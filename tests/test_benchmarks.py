@@ -0,0 +1,52 @@
+"""
+Tests for the workflow benchmark suite and its simulated LLM backend.
+"""
+
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from simulated_llm import SimulatedLLM, simulated_workflow  # noqa: E402
+from workflow_benchmarks import compare, load_baseline, save_baseline, scaled_backoff  # noqa: E402
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {
+        "single_run_ms": {"value": 10.0, "unit": "ms", "better": "lower"},
+        "throughput_c8_runs_per_s": {"value": 30.0, "unit": "runs/s", "better": "higher"}
+    }
+    
+    assert compare({
+        "single_run_ms": {"value": 14.0, "unit": "ms", "better": "lower"},
+        "throughput_c8_runs_per_s": {"value": 21.0, "unit": "runs/s", "better": "higher"},
+        "new_metric": {"value": 1.0, "unit": "ms", "better": "lower"}
+    }, baseline, threshold=0.5) == []
+    
+    regressions = compare({
+        "single_run_ms": {"value": 16.0, "unit": "ms", "better": "lower"},
+        "throughput_c8_runs_per_s": {"value": 19.0, "unit": "runs/s", "better": "higher"}
+    }, baseline, threshold=0.5)
+    assert [regression.split()[0] for regression in regressions] == ["single_run_ms", "throughput_c8_runs_per_s"]
+
+
+def test_save_baseline_keeps_metrics_that_were_not_rerun(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save_baseline({"a": {"value": 1.0, "unit": "ms", "better": "lower"}}, path)
+    save_baseline({"b": {"value": 2.0, "unit": "ms", "better": "lower"}}, path)
+    
+    assert set(load_baseline(path)) == {"a", "b"}
+
+
+def test_simulated_backend_runs_the_workflow_and_recovers_from_injected_errors():
+    llm = SimulatedLLM(error_rate=0.3, seed=7)
+    workflow = simulated_workflow(llm, risk_scenarios=500)
+    
+    with scaled_backoff(0.0):
+        result = workflow.run_research("Austin, TX")
+    
+    assert result["status"] == "success"
+    assert result["business_recommendation"]["recommendation"] == "conditional"
+    assert llm.errors > 0 and llm.calls == 4 + llm.errors
+    assert result["trace_summary"]["retries"] == llm.errors
@@ -0,0 +1,58 @@
+"""
+Tests for the columnar results exporter.
+"""
+
+import numpy as np
+
+from storage.columnar_export import flatten_results, write_columnar, load_columnar
+
+
+def _result(location, truck_cost, recommendation):
+    return {
+        "location": location,
+        "status": "success",
+        "market_research": {"competition_level": "Low", "target_customers": ["Students"]},
+        "financial_analysis": {
+            "startup_costs": {"food_truck": truck_cost, "equipment": 25000.0},
+            "revenue_projections": {"monthly_revenue": 20000.0},
+            "funding_requirements": truck_cost + 25000.0
+        },
+        "business_recommendation": {"recommendation": recommendation, "confidence_level": "High"}
+    }
+
+
+def test_flatten_expands_numeric_maps_into_columns():
+    columns = flatten_results([_result("Austin, TX", 75000.0, "go"), _result("Boise, ID", 60000.0, "no_go")])
+    
+    assert columns["startup_costs__food_truck"].tolist() == [75000.0, 60000.0]
+    assert columns["startup_costs__total"].tolist() == [100000.0, 85000.0]
+    assert columns["n_target_customers"].dtype == np.int32
+    assert np.isnan(columns["permit_costs__total"]).all()
+
+
+def test_write_and_memory_map_round_trip(tmp_path):
+    results = [_result("Austin, TX", 75000.0, "go"), _result("Boise, ID", 60000.0, "no_go")]
+    write_columnar(results, str(tmp_path))
+    
+    table = load_columnar(str(tmp_path))
+    
+    assert len(table) == 2
+    assert isinstance(table["funding_requirements"], np.memmap)
+    assert table.decode("recommendation").tolist() == ["go", "no_go"]
+    go_code = table.category_code("recommendation", "go")
+    assert table["location"][table["recommendation"] == go_code].tolist() == ["Austin, TX"]
+
+
+def test_map_keys_that_normalize_alike_get_their_own_columns(tmp_path):
+    result = _result("Austin, TX", 75000.0, "go")
+    result["financial_analysis"]["startup_costs"] = {"food_truck": 75000.0, "Food Truck": 5000.0, "Total": 1.0}
+    
+    columns = flatten_results([result, _result("Boise, ID", 60000.0, "no_go")])
+    startup = {name: values.tolist() for name, values in columns.items() if name.startswith("startup_costs__")}
+    
+    assert len(startup) == 5 and startup["startup_costs__food_truck"] == [75000.0, 60000.0]
+    assert startup["startup_costs__total"] == [80001.0, 85000.0]
+    assert sorted(values[0] for values in startup.values() if not np.isnan(values[0])) == [1.0, 5000.0, 75000.0, 80001.0]
+    
+    write_columnar([result], str(tmp_path))
+    assert len([name for name in load_columnar(str(tmp_path)).column_names if name.startswith("startup_costs__")]) == 4
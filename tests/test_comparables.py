@@ -0,0 +1,111 @@
+"""
+Tests for the nearest comparable city used by agent fallbacks.
+"""
+
+import math
+import random
+import time
+
+import pytest
+
+from analysis import comparables
+from analysis.comparables import ComparableIndex, city_point, load_city_coordinates
+from graph.workflow import FoodTruckResearchWorkflow
+from storage.results_store import ResultsStore
+from utils.spatial_index import KDTree
+
+from tests.conftest import install_llms
+
+
+def _sections(workflow, funding):
+    """Valid result sections, as a previous successful run would have stored them."""
+    financial = workflow.financial_agent._extract_financial_data_fallback("")
+    return {
+        "market_research": workflow.market_agent._extract_market_data_fallback("", "").dict(),
+        "financial_analysis": financial.copy(update={"funding_requirements": funding}).dict(),
+        "operations_analysis": workflow.operations_agent._extract_operations_data_fallback("").dict()
+    }
+
+
+def test_kdtree_matches_brute_force():
+    generator = random.Random(3)
+    points = [tuple(generator.uniform(-100, 100) for _ in range(4)) for _ in range(500)]
+    tree = KDTree([(point, index) for index, point in enumerate(points)])
+    
+    for _ in range(50):
+        query = tuple(generator.uniform(-100, 100) for _ in range(4))
+        index, distance = tree.nearest(query, accept=lambda item: item % 2 == 0)
+        expected = min((index for index in range(len(points)) if index % 2 == 0), key=lambda i: math.dist(query, points[i]))
+        assert index == expected and distance == pytest.approx(math.dist(query, points[expected]))
+    
+    assert KDTree([]).nearest((0.0, 0.0)) is None
+
+
+def test_nearest_city_weighs_distance_and_size_and_skips_fallback_sections():
+    index = ComparableIndex()
+    for location, funding in (("New York, NY", 250000.0), ("Trenton, NJ", 80000.0), ("Austin, TX", 90000.0)):
+        index.add({"location": location, "status": "success", "financial_analysis": {"funding_requirements": funding}})
+    index.add({
+        "location": "San Antonio, TX",
+        "status": "success",
+        "financial_analysis": {"funding_requirements": 1.0},
+        "fallbacks": {"financial_analysis": "defaults"}
+    })
+    
+    assert index.nearest("San Antonio, Texas", "financial_analysis").location == "Austin, TX"
+    # Among nearby cities the one of similar size wins
+    assert index.nearest("Philadelphia, PA", "financial_analysis").location == "New York, NY"
+    assert index.nearest("Montpelier, VT", "financial_analysis").location == "Trenton, NJ"
+    assert index.nearest("Austin, TX", "financial_analysis").distance == 0
+    assert index.nearest("Austin, TX", "market_research") is None
+    assert index.nearest("Atlantis, ZZ", "financial_analysis") is None
+    
+    started = time.perf_counter()
+    for location in list(load_city_coordinates())[:200]:
+        index.nearest(location, "financial_analysis")
+    assert (time.perf_counter() - started) / 200 < 0.001
+
+
+def test_adding_cities_rebuilds_the_tree_lazily_and_lookups_stay_exact(monkeypatch):
+    builds = []
+    monkeypatch.setattr(comparables, "KDTree", lambda entries: builds.append(len(entries)) or KDTree(entries))
+    cities = list(load_city_coordinates())
+    index = ComparableIndex()
+    
+    for number, location in enumerate(cities[:300]):
+        index.add({"location": location, "status": "success", "financial_analysis": {"funding_requirements": number}})
+        query = cities[-1 - number]
+        expected = min(
+            cities[:number + 1],
+            key=lambda key: math.dist(city_point(load_city_coordinates()[query]), city_point(load_city_coordinates()[key]))
+        )
+        assert index.nearest(query, "financial_analysis").data["funding_requirements"] == cities.index(expected)
+    
+    # 300 cities, one lookup after each: a few rebuilds rather than one per add
+    assert len(builds) <= 5
+    
+    # Results of another model are never indexed
+    index = ComparableIndex(model_name="gpt-4")
+    index.add({"location": "Austin, TX", "status": "success", "model_name": "claude-3-haiku", "market_research": {}})
+    index.add({"location": "Dallas, TX", "status": "success", "market_research": {"location": "Dallas, TX"}}, model_name="gpt-4")
+    assert index.nearest("Austin, TX", "market_research").location == "Dallas, TX"
+
+
+def test_fallbacks_borrow_the_nearest_researched_city(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    workflow = install_llms(FoodTruckResearchWorkflow(results_store=store))
+    store.save_result({"location": "Austin, TX", "status": "success", **_sections(workflow, 90000.0)}, model_name="gpt-4")
+    # Another model's run for the same city is never borrowed
+    store.save_result({"location": "San Antonio, TX", "status": "success", **_sections(workflow, 1.0)}, model_name="other-model")
+    
+    result = workflow.run_research("San Antonio, TX")
+    
+    assert result["financial_analysis"]["funding_requirements"] == 90000.0
+    assert result["market_research"]["location"] == "San Antonio, TX"
+    assert result["fallbacks"]["financial_analysis"] == "Austin, TX"
+    assert result["fallbacks"]["business_recommendation"] == "defaults"
+    
+    # Borrowed sections are not indexed again, so San Antonio still resolves to Austin
+    assert workflow.comparables.nearest("San Antonio, TX", "financial_analysis").location == "Austin, TX"
+    # Without history (or for unknown cities) the generic estimates remain; agents are shared, so no LLM is called
+    assert FoodTruckResearchWorkflow().run_research("Atlantis, ZZ")["fallbacks"]["financial_analysis"] == "defaults"
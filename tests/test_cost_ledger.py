@@ -0,0 +1,104 @@
+"""
+Tests for LLM cost accounting and spend budgets.
+"""
+
+import json
+
+import pytest
+
+from batch.worker import run_worker
+from graph.workflow import FoodTruckResearchWorkflow
+from reporting.renderers import render_to_string, summary_row
+from storage.job_queue import JobQueue
+from utils.cost_ledger import BudgetExceededError, CostLedger, ModelPrice, load_price_table, price_for
+from utils.retry_handler import is_retryable_api_error
+
+from tests.conftest import FakeLLM, install_llms
+
+
+def _workflow(**options):
+    # One LLM shared by every agent, answering with prose so agents fall back to their parsers
+    llm = FakeLLM(usage={"input_tokens": 1000, "output_tokens": 500})
+    return install_llms(FoodTruckResearchWorkflow(model_name="gpt-4", **options), lambda: llm), llm
+
+
+def test_prices_match_the_longest_prefix_and_can_be_overridden(tmp_path):
+    path = tmp_path / "prices.json"
+    path.write_text(json.dumps({"gpt-4o": {"input_per_million": 1.0, "output_per_million": 2.0}}))
+    prices = load_price_table(str(path))
+    
+    assert price_for("gpt-4o-mini-2024-07-18", prices).input_per_million == 0.15
+    assert price_for("gpt-4o-2024-08-06", prices).output_per_million == 2.0
+    assert price_for("GPT-4", prices).input_per_million == 30.0
+    assert price_for("llama-3", prices) is None
+
+
+def test_run_costs_roll_up_per_agent_and_into_the_batch():
+    batch = CostLedger("batch", prices={"gpt-4": ModelPrice(input_per_million=30, output_per_million=60)})
+    first, second = batch.child("run-1"), batch.child("run-2")
+    
+    assert first.record("Market Research Analyst", "gpt-4", 1000, 500) == pytest.approx(0.06)
+    first.record("Financial Advisor", "gpt-4", 2000, 0)
+    second.record("Market Research Analyst", "local-model", 1000, 1000)
+    
+    assert first.summary()["cost_usd"] == pytest.approx(0.12)
+    summary = batch.summary()
+    assert summary["calls"] == 3 and summary["cost_usd"] == pytest.approx(0.12)
+    assert summary["by_agent"]["Market Research Analyst"]["calls"] == 2
+    assert summary["unpriced_calls"] == 1
+
+
+def test_budgets_refuse_new_calls_and_are_not_retried():
+    batch = CostLedger("batch", budget_usd=0.10)
+    run = batch.child("run-1", budget_usd=1.0)
+    run.check()
+    run.record("Market Research Analyst", "gpt-4", 2000, 1000)
+    
+    with pytest.raises(BudgetExceededError) as raised:
+        batch.child("run-2").check()
+    
+    assert raised.value.scope == "batch"
+    assert not is_retryable_api_error(raised.value)
+    assert run.exceeded is None
+
+
+def test_run_budget_stops_llm_calls_and_reports_cost():
+    # One gpt-4 call costs $0.06, so the second call is refused
+    workflow, llm = _workflow(run_budget_usd=0.05)
+    
+    result = workflow.run_research("Austin, TX")
+    
+    assert llm.calls == 1
+    assert result["status"] == "error" and result["budget_exceeded"]
+    assert result["error_message"].startswith("LLM budget exceeded for ")
+    assert result["cost"]["calls"] == 1 and result["cost"]["cost_usd"] == pytest.approx(0.06)
+    assert result["trace_summary"]["retries"] == 0
+    assert "LLM Cost" in render_to_string(result)
+
+
+def test_batch_budget_spans_runs():
+    workflow, llm = _workflow(cost_ledger=CostLedger("batch", budget_usd=0.30))
+    
+    first = workflow.run_research("Austin, TX")
+    second = workflow.run_research("Boise, ID")
+    
+    assert first["status"] == "success" and llm.calls == 5
+    assert second["budget_exceeded"] and "for batch" in second["error_message"]
+    assert workflow.cost_ledger.summary()["calls"] == 5
+    assert summary_row(first)["llm_cost_usd"] == pytest.approx(0.24)
+    assert "Business Consultant" in first["cost"]["by_agent"]
+    assert "## LLM Cost" in render_to_string(first)
+
+
+def test_worker_dead_letters_budget_exceeded_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+    job_id = queue.enqueue("Austin, TX")
+    
+    class _OverBudget:
+        def run_research(self, location, max_cache_age=None, queued_at=None):
+            return {"status": "error", "error_message": "LLM budget exceeded", "budget_exceeded": True}
+    
+    stats = run_worker(queue, lambda model: _OverBudget(), exit_when_empty=True)
+    
+    assert stats["dead"] == 1 and stats["retried"] == 0
+    assert queue.get(job_id)["attempts"] == 1
@@ -0,0 +1,39 @@
+"""
+Tests for the append-only workflow event log.
+"""
+
+import io
+import json
+
+from utils.event_log import append_events, make_event, export_events_jsonl
+
+
+def test_append_events_extends_in_place():
+    log = [make_event("run-1", "workflow", "start")]
+    new_events = [make_event("run-1", "market_research_node", "done", competitors=3)]
+    
+    merged = append_events(log, new_events)
+    
+    assert merged is log
+    assert [event.node for event in merged] == ["workflow", "market_research_node"]
+    assert merged[1].payload == {"competitors": 3}
+
+
+def test_append_events_handles_missing_history():
+    merged = append_events(None, [make_event("run-1", "workflow", "start")])
+    assert len(merged) == 1
+
+
+def test_export_events_jsonl_writes_one_line_per_event():
+    events = [
+        make_event("run-1", "workflow", "start"),
+        make_event("run-1", "business_synthesis_node", "failed", level="error")
+    ]
+    buffer = io.StringIO()
+    
+    written = export_events_jsonl(events, buffer)
+    
+    lines = buffer.getvalue().splitlines()
+    assert written == 2
+    assert json.loads(lines[1])["level"] == "error"
+    assert {"timestamp", "run_id", "node", "level", "message", "payload"} <= set(json.loads(lines[0]))
@@ -0,0 +1,92 @@
+"""
+Tests for the deterministic financial metrics engine.
+"""
+
+import math
+
+import numpy as np
+
+from analysis.financial_metrics import (
+    compute_financial_metrics,
+    compute_metric_arrays,
+    reconcile_financial_analysis
+)
+from models.research_models import FinancialAnalysisData
+from utils.text_parsing import parse_duration_months, parse_percent_range
+
+
+def _financial(break_even="12-18 months", roi="15-20% annual ROI", monthly_costs=14000.0):
+    return FinancialAnalysisData(
+        startup_costs={"food_truck": 75000.0, "equipment": 25000.0},
+        monthly_operating_costs={"food_costs": monthly_costs},
+        revenue_projections={"daily_revenue": 800.0, "monthly_revenue": 20000.0},
+        break_even_timeline=break_even,
+        profit_margins={"net_margin": 0.15},
+        cash_flow_analysis="Steady",
+        funding_requirements=100000.0,
+        roi_projection=roi
+    )
+
+
+def test_text_parsing_handles_ranges_and_units():
+    assert parse_duration_months("12-18 months") == (12.0, 18.0)
+    assert parse_duration_months("1.5 to 2 years") == (18.0, 24.0)
+    assert parse_percent_range("15-20% ROI within 2-3 years") == (0.15, 0.20)
+    assert parse_duration_months("soon") is None
+
+
+def test_metrics_match_closed_form_values():
+    metrics = compute_financial_metrics(_financial())
+    
+    assert metrics.monthly_net_income == 6000.0
+    assert math.isclose(metrics.break_even_months, 100000.0 / 6000.0)
+    assert metrics.payback_months == 17
+    assert math.isclose(metrics.annual_roi, 0.72)
+    # IRR is the rate at which the horizon NPV is zero
+    monthly_rate = (1 + metrics.irr) ** (1 / 12) - 1
+    npv_at_irr = -100000.0 + 6000.0 * (1 - (1 + monthly_rate) ** -36) / monthly_rate
+    assert abs(npv_at_irr) < 1e-3
+
+
+def test_unprofitable_locations_never_break_even():
+    arrays = compute_metric_arrays(np.array([100000.0, 50000.0]), np.array([10000.0, 20000.0]), np.array([12000.0, 15000.0]))
+    
+    assert np.isinf(arrays["break_even_months"][0])
+    assert np.isnan(arrays["irr"][0])
+    assert arrays["break_even_months"][1] == 10.0
+
+
+def test_reconcile_replaces_inconsistent_statements():
+    reconciled = reconcile_financial_analysis(_financial(break_even="3-4 months", monthly_costs=17000.0))
+    
+    assert len(reconciled.consistency_flags) == 2
+    assert reconciled.break_even_timeline.startswith("33.3 months")
+    assert reconciled.derived_metrics.monthly_net_income == 3000.0
+
+
+def test_reconcile_keeps_consistent_statements():
+    reconciled = reconcile_financial_analysis(_financial(roi="70-75% annual ROI"))
+    
+    assert reconciled.consistency_flags == []
+    assert reconciled.break_even_timeline == "12-18 months"
+
+
+def test_multi_year_roi_is_checked_against_the_cumulative_roi():
+    # 6000/month on 100000 is 72% a year, 116% cumulative over 3 years
+    reconciled = reconcile_financial_analysis(_financial(roi="110-120% over 3 years"))
+    assert reconciled.consistency_flags == [] and reconciled.roi_projection == "110-120% over 3 years"
+    
+    reconciled = reconcile_financial_analysis(_financial(roi="45% over 3 years"))
+    assert len(reconciled.consistency_flags) == 1
+    assert reconciled.roi_projection.startswith("72% annual ROI, 116% cumulative over 36 months")
+    
+    # Annual statements that mention a duration are still annual
+    assert reconcile_financial_analysis(_financial(roi="72% per year for 3 years")).consistency_flags == []
+
+
+def test_statements_without_a_value_are_noted_not_replaced():
+    reconciled = reconcile_financial_analysis(_financial(break_even="Depends on the season", roi="Strong returns"))
+    
+    assert reconciled.consistency_flags == [] and len(reconciled.consistency_notes) == 2
+    assert reconciled.break_even_timeline == "Depends on the season"
+    assert reconciled.roi_projection == "Strong returns"
@@ -0,0 +1,36 @@
+"""
+Tests that heavy dependencies stay out of the start-up import path.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+DEFERRED = {"langchain_openai", "langchain_anthropic", "langgraph"}
+
+
+def _loaded_after(statement):
+    code = (
+        f"import json, sys; sys.path.insert(0, {SRC_DIR!r}); {statement}; "
+        "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("module", ["main", "graph.workflow", "agents.base_agent"])
+def test_importing_entry_points_defers_heavy_dependencies(module):
+    assert not _loaded_after(f"import {module}") & DEFERRED
+
+
+def test_agent_imports_only_the_selected_provider(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    loaded = _loaded_after("from agents.market_research_agent import MarketResearchAgent; MarketResearchAgent()")
+    
+    assert "langchain_openai" in loaded
+    assert "langchain_anthropic" not in loaded
@@ -0,0 +1,134 @@
+"""
+Tests for the durable job queue and its workers.
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from batch.worker import run_worker
+from storage.job_queue import JobQueue
+
+
+class _Workflow:
+    """Succeeds unless the location is listed in ``failing``; hangs once if ``hang_flag`` exists."""
+    
+    def __init__(self, failing=(), hang_flag=None):
+        self.failing = set(failing)
+        self.hang_flag = hang_flag
+    
+    def run_research(self, location, max_cache_age=None, queued_at=None):
+        if self.hang_flag and os.path.exists(self.hang_flag):
+            os.remove(self.hang_flag)
+            time.sleep(3600)
+        if location in self.failing:
+            return {"location": location, "status": "error", "error_message": "upstream 500"}
+        time.sleep(0.01)
+        return {"location": location, "status": "success", "run_id": f"run-{location}", "pid": os.getpid()}
+
+
+def _work(path, hang_flag=None):
+    queue = JobQueue(path, visibility_timeout=0.5)
+    run_worker(queue, lambda model: _Workflow(hang_flag=hang_flag), poll_interval=0.05, exit_when_empty=True)
+
+
+def test_priority_order_and_dedupe(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    low = queue.enqueue("Austin, TX")
+    high = queue.enqueue("Boise, ID", priority=5)
+    
+    assert queue.enqueue("austin, texas") == low
+    assert queue.lease("w1")["id"] == high
+    assert queue.lease("w1")["id"] == low
+    assert queue.lease("w1") is None
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_cannot_complete(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=0.05, max_attempts=2)
+    queue.enqueue("Austin, TX")
+    
+    stale = queue.lease("w1")
+    time.sleep(0.1)
+    fresh = queue.lease("w2")
+    
+    assert fresh["id"] == stale["id"] and fresh["attempts"] == 2
+    assert not queue.complete(stale, {"status": "success"})
+    assert not queue.heartbeat(stale)
+    
+    # Out of attempts: the next expiry dead-letters the job
+    time.sleep(0.1)
+    assert queue.lease("w3") is None
+    dead = queue.get(fresh["id"])
+    assert dead["status"] == "dead" and dead["last_error"].startswith("Lease expired after 2 attempt(s)")
+
+
+def test_failures_back_off_then_dead_letter(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2, retry_backoff=0.05)
+    job_id = queue.enqueue("Austin, TX")
+    
+    assert queue.fail(queue.lease("w1"), "timeout") == "queued"
+    assert queue.lease("w1") is None
+    time.sleep(0.06)
+    assert queue.fail(queue.lease("w1"), "timeout") == "dead"
+    
+    other = queue.enqueue("Boise, ID")
+    assert queue.fail(queue.lease("w1"), "bad request", retryable=False) == "dead"
+    assert queue.counts()["dead"] == 2
+    
+    assert queue.requeue_dead([job_id]) == 1
+    assert queue.get(job_id)["attempts"] == 0
+    assert queue.get(other)["status"] == "dead"
+
+
+def test_worker_completes_retries_and_stores_results(tmp_path):
+    from storage.results_store import ResultsStore
+    
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1)
+    store = ResultsStore(str(tmp_path / "results.db"))
+    done = queue.enqueue("Austin, TX")
+    failed = queue.enqueue("Boise, ID")
+    
+    stats = run_worker(queue, lambda model: _Workflow(failing=["Boise, ID"]), results_store=store, exit_when_empty=True)
+    
+    assert stats == {"succeeded": 1, "retried": 0, "dead": 1, "lost": 0}
+    assert queue.get(done, include_result=True)["result"]["run_id"] == "run-Austin, TX"
+    assert queue.get(failed)["last_error"] == "upstream 500"
+    assert [row["location"] for row in store.query(status=None)] == ["Austin, TX"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_processes_share_the_queue_and_survive_a_killed_worker(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    hang_flag = tmp_path / "hang"
+    hang_flag.touch()
+    queue = JobQueue(path, visibility_timeout=0.5)
+    first = queue.enqueue("Austin, TX", priority=10)
+    queue.enqueue_many([f"City {index}, TX" for index in range(40)])
+    context = multiprocessing.get_context("fork")
+    
+    # The first worker hangs on its job and is killed mid-run
+    doomed = context.Process(target=_work, args=(path, str(hang_flag)))
+    doomed.start()
+    deadline = time.time() + 10
+    while hang_flag.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    os.kill(doomed.pid, signal.SIGKILL)
+    doomed.join()
+    
+    workers = [context.Process(target=_work, args=(path,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    
+    counts = queue.counts()
+    assert counts == {"queued": 0, "leased": 0, "done": 41, "dead": 0}
+    assert queue.get(first)["attempts"] == 2
+    results = [job["result"] for job in (queue.get(job_id, include_result=True) for job_id in range(1, 42))]
+    assert sorted(result["location"] for result in results) == sorted(
+        ["Austin, TX"] + [f"City {index}, TX" for index in range(40)]
+    )
+    assert len({result["pid"] for result in results}) > 1
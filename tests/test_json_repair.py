@@ -0,0 +1,99 @@
+"""
+Tests for local repair of malformed LLM JSON and follow-ups for broken fields.
+"""
+
+import json
+
+import pytest
+
+from agents.financial_advisor_agent import FinancialAdvisorAgent
+from models.research_models import FinancialAnalysisData, FoodTruckResearchState, OperationsAnalysisData
+from utils.json_repair import coerce_fields, repair_json, validate_fields
+from utils.metrics import JSON_REPAIRS
+from utils.text_parsing import parse_number
+
+from tests.conftest import FakeLLM
+
+
+FINANCIAL = {
+    "startup_costs": {"food_truck": "$82,500", "equipment": 21000},
+    "monthly_operating_costs": {"food_costs": 7000, "staff": 5000},
+    "revenue_projections": {"daily_revenue": 900, "monthly_revenue": 22500, "annual_revenue": 270000},
+    "break_even_timeline": "14 months",
+    "profit_margins": {"gross_margin": "64%", "net_margin": 0.14},
+    "cash_flow_analysis": "Hold three months of reserves",
+    "funding_requirements": "$118k",
+    "roi_projection": "18% within 2 years"
+}
+
+
+def _analyze(*responses):
+    agent = FinancialAdvisorAgent()
+    agent.llm = FakeLLM(*responses)
+    return agent.process_request(FoodTruckResearchState(location="Austin, TX")), agent.llm
+
+
+def test_repair_json_handles_fences_prose_trailing_commas_and_truncation():
+    fenced = "Here you go:\n```json\n{\"a\": [1, 2,], \"b\": {\"c\": \"}\"},}\n```\nThanks!"
+    assert repair_json(fenced) == {"a": [1, 2], "b": {"c": "}"}}
+    assert repair_json("Result: {\"a\": 1} and also {\"b\": 2, \"c\": 3}") == {"b": 2, "c": 3}
+    assert repair_json("{\"a\": {\"b\": [1, 2], \"c\": \"trunc") == {"a": {"b": [1, 2], "c": "trunc"}}
+    assert repair_json("No JSON here.") is None
+    assert repair_json("[1, 2]") is None
+
+
+def test_numbers_written_as_text_are_coerced_for_numeric_fields():
+    assert parse_number("$75,000") == 75000.0
+    assert parse_number("1.2M") == 1200000.0
+    assert parse_number("-$500") == -500.0
+    assert parse_number("about 12") is None
+    
+    data = coerce_fields(FINANCIAL, FinancialAnalysisData)
+    parsed, problems = validate_fields(FinancialAnalysisData, data)
+    
+    assert problems == {}
+    assert parsed.startup_costs["food_truck"] == 82500.0 and parsed.funding_requirements == 118000.0
+    assert parsed.profit_margins["gross_margin"] == pytest.approx(0.64)
+    assert data["break_even_timeline"] == "14 months"
+    # Free-form dictionaries are left alone
+    staffing = {"staffing_needs": {"minimum_staff": "2", "labor_costs_hourly": {"cook": "$18"}}}
+    assert coerce_fields(staffing, OperationsAnalysisData) == staffing
+
+
+def test_local_repair_needs_no_extra_llm_call():
+    response, llm = _analyze(f"```json\n{json.dumps(FINANCIAL)[:-1]},}}\n```")
+    
+    assert response.status == "SUCCESS" and not response.used_fallback
+    assert response.data.funding_requirements == 118000.0
+    assert len(llm.prompts) == 1
+    assert JSON_REPAIRS.value(agent="Financial Advisor", stage="local") == 1
+
+
+def test_follow_up_asks_only_for_missing_fields():
+    partial = {key: value for key, value in FINANCIAL.items() if key not in ("roi_projection", "cash_flow_analysis")}
+    partial["break_even_timeline"] = ["not", "a", "string"]
+    
+    response, llm = _analyze(
+        json.dumps(partial),
+        '{"roi_projection": "20% in year two", "cash_flow_analysis": "Steady all year", '
+        '"break_even_timeline": "15 months", "funding_requirements": 1}'
+    )
+    
+    assert response.status == "SUCCESS" and not response.used_fallback
+    assert response.data.cash_flow_analysis == "Steady all year"
+    # Fields that were already valid are not overwritten by the follow-up
+    assert response.data.funding_requirements == 118000.0
+    follow_up = llm.prompts[1]
+    assert "roi_projection" in follow_up and "break_even_timeline" in follow_up
+    assert "startup_costs" not in follow_up and "Austin, TX" in follow_up
+    assert JSON_REPAIRS.value(agent="Financial Advisor", stage="follow_up") == 1
+
+
+def test_mostly_broken_responses_still_fall_back_without_a_follow_up():
+    response, llm = _analyze(json.dumps({"funding_requirements": 90000}))
+    
+    assert response.status == "SUCCESS" and response.used_fallback
+    assert len(llm.prompts) == 1
+    
+    response, llm = _analyze(json.dumps({**FINANCIAL, "roi_projection": None}), "Sorry, I can't help with that.")
+    assert response.used_fallback and len(llm.prompts) == 2
@@ -0,0 +1,143 @@
+"""
+Tests for the in-process metrics registry and its Prometheus output.
+"""
+
+import asyncio
+
+import pytest
+
+from batch.runner import run_batch_processes
+from graph.workflow import FoodTruckResearchWorkflow
+from service.server import ResearchServer, ResearchService
+from storage.results_store import ResultsStore
+from utils import retry_handler
+from utils.cost_ledger import BudgetExceededError
+from utils.metrics import (
+    CACHE_HIT_RATIO,
+    FALLBACKS,
+    LLM_RETRIES,
+    LLM_SECONDS,
+    NODE_SECONDS,
+    PARSE_FAILURES,
+    RUNS,
+    RUNS_IN_FLIGHT,
+    MetricsRegistry,
+    dump_metrics
+)
+from utils.retry_handler import classify_api_error, is_retryable_api_error
+
+from tests.conftest import PROSE, FakeLLM, install_llms
+
+
+class _CountingWorkflow:
+    """Batch workflow that records one run per location in its process's registry."""
+    
+    def run_research(self, location, max_cache_age=None):
+        RUNS.inc(status="success")
+        return {"location": location, "status": "success"}
+
+
+def test_histograms_and_counters_render_in_prometheus_text_format(tmp_path):
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Request latency", ("agent",), buckets=(0.1, 1.0))
+    retries = registry.counter("retries_total", "Retries", ("reason",))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, agent='Market "A"')
+    retries.inc(reason="timeout")
+    retries.inc(2, reason="timeout")
+    
+    text = registry.render()
+    
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{agent="Market \\"A\\"",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{agent="Market \\"A\\"",le="1"} 2' in text
+    assert 'latency_seconds_bucket{agent="Market \\"A\\"",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{agent="Market \\"A\\""} 3' in text
+    assert 'retries_total{reason="timeout"} 3' in text
+    with pytest.raises(ValueError):
+        retries.inc(agent="x")
+    
+    dump_metrics(str(tmp_path / "metrics" / "batch.prom"), registry)
+    assert (tmp_path / "metrics" / "batch.prom").read_text() == text
+    assert [path.name for path in (tmp_path / "metrics").iterdir()] == ["batch.prom"]
+
+
+def test_snapshots_from_other_processes_merge_into_the_registry():
+    ours, theirs = MetricsRegistry(), MetricsRegistry()
+    for registry in (ours, theirs):
+        registry.histogram("latency_seconds", "Latency", buckets=(1.0,)).observe(0.5)
+        registry.counter("runs_total", "Runs", ("status",)).inc(status="success")
+    theirs.counter("runs_total", "Runs", ("status",)).inc(status="error")
+    
+    ours.merge(theirs.snapshot())
+    
+    assert ours.get("latency_seconds").count() == 2
+    assert ours.get("runs_total").value(status="success") == 2
+    assert ours.get("runs_total").value(status="error") == 1
+
+
+def test_api_errors_are_classified_by_reason():
+    assert classify_api_error(Exception("Rate limit exceeded")) == "rate_limit"
+    assert classify_api_error(Exception("HTTP 503 Service Unavailable")) == "server_error"
+    assert classify_api_error(TimeoutError("read")) == "timeout"
+    assert classify_api_error(Exception("401 Unauthorized")) == "auth"
+    assert classify_api_error(BudgetExceededError("run", 1.0, 1.0)) == "final"
+    assert classify_api_error(ValueError("odd")) == "unknown"
+    
+    assert is_retryable_api_error(Exception("connection error")) and is_retryable_api_error(ValueError("odd"))
+    assert not is_retryable_api_error(Exception("404 not found"))
+
+
+def test_runs_record_latency_retries_fallbacks_and_cache_hits(monkeypatch, tmp_path):
+    monkeypatch.setattr(retry_handler.time, "sleep", lambda seconds: None)
+    workflow = FoodTruckResearchWorkflow(results_store=ResultsStore(str(tmp_path / "results.db")))
+    # Rate-limited on its first call, then prose, so agents fall back to their parsers
+    llm = FakeLLM(Exception("Rate limit exceeded, please retry"), PROSE)
+    install_llms(workflow, lambda: llm)
+    
+    workflow.run_research("Austin, TX", max_cache_age=3600)
+    workflow.run_research("Austin, TX", max_cache_age=3600)
+    
+    agent = "Market Research Analyst"
+    assert LLM_RETRIES.value(agent=agent, model="gpt-4", reason="rate_limit") == 1
+    assert LLM_SECONDS.count(agent=agent, model="gpt-4", outcome="error") == 1
+    assert LLM_SECONDS.count(agent=agent, model="gpt-4", outcome="success") == 1
+    assert NODE_SECONDS.count(node="business_synthesis_node") == 1
+    assert FALLBACKS.total() == 4
+    assert PARSE_FAILURES.value(agent=agent, error="JSONDecodeError") == 1
+    assert RUNS.value(status="success") == 1 and RUNS.value(status="cached") == 1
+    assert CACHE_HIT_RATIO.value() == 0.5
+    assert RUNS_IN_FLIGHT.value() == 0
+
+
+def test_service_exposes_metrics_endpoint():
+    async def scenario():
+        service = ResearchService(lambda model_name: None, default_model="test-model")
+        server = ResearchServer(service, port=0)
+        _, port = await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            response = (await reader.read()).decode()
+            writer.close()
+        finally:
+            await server.stop()
+            service.close()
+        return response
+    
+    FALLBACKS.inc(agent="Financial Advisor")
+    response = asyncio.run(scenario())
+    
+    assert response.startswith("HTTP/1.1 200") and "text/plain; version=0.0.4" in response
+    assert 'food_truck_fallbacks_total{agent="Financial Advisor"} 1' in response
+    assert 'food_truck_service_jobs{status="queued"} 0' in response
+    assert "# TYPE food_truck_node_duration_seconds histogram" in response
+
+
+def test_process_pool_merges_worker_metrics(tmp_path):
+    locations = [f"City {index}, TX" for index in range(4)]
+    
+    run_batch_processes(locations, _CountingWorkflow, str(tmp_path / "out.jsonl"), processes=2)
+    
+    assert RUNS.value(status="success") == 4
@@ -0,0 +1,93 @@
+"""
+Tests for the bundled permit knowledge base and its use by the operations agent.
+"""
+
+import json
+
+import pytest
+
+from agents.operations_consultant_agent import OperationsConsultantAgent
+from analysis.permits import PERMIT_FIELDS, PermitKnowledgeBase, load_permit_kb
+from models.research_models import FoodTruckResearchState, OperationsAnalysisData
+from utils.metrics import JSON_REPAIRS, PERMIT_KB_LOOKUPS
+
+from tests.conftest import FakeLLM
+
+
+def _analyze(location, content):
+    agent = OperationsConsultantAgent()
+    agent.llm = FakeLLM(content)
+    return agent.process_request(FoodTruckResearchState(location=location)).data, agent.llm.messages
+
+
+def _operations_without_permits():
+    data = OperationsConsultantAgent()._extract_operations_data_fallback("").dict()
+    for field in ("permits_required", "permit_costs", "permit_timeline", "permit_source"):
+        data.pop(field)
+    return data
+
+
+def test_lookup_prefers_city_then_alias_then_state():
+    kb = load_permit_kb()
+    
+    assert kb.version and len(kb) > 10
+    assert kb.lookup("Austin, Texas").name == "Austin, TX"
+    assert kb.lookup("Brooklyn, NY").jurisdiction == kb.lookup("new york city, new york").jurisdiction == "new york, NY"
+    assert kb.lookup("St. Louis, Missouri").level == "city"
+    assert kb.lookup("El Paso, TX").level == "state" and kb.lookup("El Paso, TX").name == "Texas"
+    assert kb.lookup("Boise, ID") is None
+    assert kb.lookup("Springfield") is None
+    
+    with pytest.raises(ValueError):
+        PermitKnowledgeBase({"version": "1", "states": {"TX": {
+            "permits_required": [],
+            "cities": {"austin": {"permits_required": []}, "atx": {"aliases": ["Austin"], "permits_required": []}}
+        }}})
+    with pytest.raises(ValueError):
+        PermitKnowledgeBase({"states": {}})
+
+
+def test_response_structure_leaves_out_exactly_the_permit_fields_when_known():
+    agent = OperationsConsultantAgent()
+    
+    def structure(prompt):
+        return json.loads(prompt[prompt.index("{"):prompt.index("\n}\n") + 2])
+    
+    full, without_permits = structure(agent.create_system_prompt()), structure(agent.create_system_prompt(permits_known=True))
+    assert set(full) - set(without_permits) == set(PERMIT_FIELDS)
+    assert set(full) | {"permit_source"} == set(OperationsAnalysisData.__fields__)
+
+
+def test_known_city_permits_are_filled_without_asking_the_llm():
+    data, messages = _analyze("Houston, TX", json.dumps(_operations_without_permits()))
+    houston = load_permit_kb().lookup("Houston, TX")
+    
+    assert data.permits_required == houston.permits_required and data.permit_costs == houston.permit_costs
+    assert data.permit_timeline == houston.permit_timeline and data.permit_source == houston.source
+    system_prompt, user_prompt = messages[0]
+    assert '"permits_required"' not in system_prompt and '"health_regulations"' in system_prompt
+    assert "already known" in user_prompt and len(messages) == 1
+    assert PERMIT_KB_LOOKUPS.value(level="city") == 1
+    # A well-formed reply without the known fields is not a repair
+    assert JSON_REPAIRS.total() == 0
+
+
+def test_state_entries_ground_the_prompt_and_the_fallback():
+    operations = {
+        **_operations_without_permits(),
+        "permits_required": ["El Paso Mobile Food Unit Permit"],
+        "permit_costs": {"mobile_food_unit": 400.0},
+        "permit_timeline": "4 weeks"
+    }
+    data, messages = _analyze("El Paso, TX", json.dumps(operations))
+    
+    assert data.permits_required == ["El Paso Mobile Food Unit Permit"] and data.permit_source is None
+    assert '"permits_required"' in messages[0][0]
+    assert "KNOWN PERMIT REQUIREMENTS FOR TEXAS" in messages[0][1]
+    
+    # Fallbacks use the knowledge base instead of the generic permits
+    assert _analyze("El Paso, TX", "No JSON today.")[0].permits_required == load_permit_kb().lookup("Odessa, TX").permits_required
+    assert _analyze("Seattle, WA", "No JSON today.")[0].permit_source.startswith("Seattle, WA")
+    generic = _analyze("Boise, ID", "No JSON today.")[0]
+    assert generic.permit_source is None and "Zoning Permit" in generic.permits_required
+    assert PERMIT_KB_LOOKUPS.value(level="miss") == 1
@@ -0,0 +1,156 @@
+"""
+Tests for the deterministic pre-screen.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analysis.prescreen import PrescreenConfig, agreement_rate, load_prescreen_config, prescreen
+from models.research_models import (
+    FinancialAnalysisData,
+    FoodTruckResearchState,
+    MarketResearchData,
+    OperationsAnalysisData,
+    RecommendationType
+)
+
+from tests.conftest import FakeLLM
+
+
+def _state(competition="Low", monthly_costs=10000.0, funding=70000.0, permits="4-6 weeks"):
+    return FoodTruckResearchState(
+        location="Austin, TX",
+        market_research=MarketResearchData(
+            location="Austin, TX", competition_level=competition, target_customers=[], peak_hours=[],
+            seasonal_factors=[], market_size_estimate="", competition_analysis=[], opportunities=[], challenges=[]
+        ),
+        financial_analysis=FinancialAnalysisData(
+            startup_costs={"food_truck": funding}, monthly_operating_costs={"food_costs": monthly_costs},
+            revenue_projections={"monthly_revenue": 20000.0}, break_even_timeline="", profit_margins={},
+            cash_flow_analysis="", funding_requirements=funding, roi_projection=""
+        ),
+        operations_analysis=OperationsAnalysisData(
+            permits_required=[], permit_costs={}, permit_timeline=permits, health_regulations=[],
+            location_constraints=[], equipment_requirements=[], staffing_needs={}, daily_operations=[],
+            logistics_challenges=[]
+        )
+    )
+
+
+def test_strong_location_is_decisive_go():
+    result = prescreen(_state())
+    
+    assert result.recommendation == RecommendationType.GO
+    assert result.decisive and result.confidence_level == "High"
+    assert {"COMPETITION_LOW", "BREAK_EVEN_FAST", "NPV_POSITIVE", "PERMITS_FAST"} <= set(result.reason_codes)
+
+
+def test_unprofitable_location_is_decisive_no_go():
+    result = prescreen(_state(competition="High", monthly_costs=25000.0, funding=200000.0, permits="6-9 months"))
+    
+    assert result.recommendation == RecommendationType.NO_GO
+    assert result.decisive
+    assert "NOT_PROFITABLE" in result.reason_codes
+
+
+def test_thresholds_are_tunable_and_missing_data_is_never_decisive():
+    strict = PrescreenConfig(decisive_go_score=101.0)
+    assert not prescreen(_state(), config=strict).decisive
+    
+    partial = _state().copy(update={"operations_analysis": None})
+    result = prescreen(partial)
+    assert not result.decisive
+    assert "MISSING_OPERATIONS_ANALYSIS" in result.reason_codes
+
+
+def test_agreement_rate_excludes_applied_prescreens():
+    def result(predicted, actual, applied=False, decisive=True):
+        return {"business_recommendation": {
+            "recommendation": actual,
+            "prescreen": {"recommendation": predicted, "decisive": decisive, "applied": applied}
+        }}
+    
+    stats = agreement_rate([
+        result("go", "go"),
+        result("go", "conditional", decisive=False),
+        result("no_go", "no_go", applied=True),
+        {"business_recommendation": {"recommendation": "go"}}
+    ])
+    
+    assert (stats["compared"], stats["agreed"], stats["skipped"]) == (2, 1, 1)
+    assert stats["agreement_rate"] == 0.5
+    assert stats["decisive_agreement_rate"] == 1.0
+    assert stats["confusion"] == {"go->conditional": 1, "go->go": 1}
+
+
+def test_agreement_rate_rescores_stored_results_with_a_config():
+    state = _state()
+    stored = {
+        **{section: getattr(state, section).dict() for section in ("market_research", "financial_analysis", "operations_analysis")},
+        "location": state.location,
+        "business_recommendation": {
+            "recommendation": "go",
+            "prescreen": {"recommendation": "conditional", "decisive": False, "applied": False}
+        }
+    }
+    
+    assert agreement_rate([stored])["agreed"] == 0
+    stats = agreement_rate([stored], PrescreenConfig())
+    assert stats["agreed"] == 1 and stats["decisive_agreement_rate"] == 1.0
+    assert agreement_rate([stored], PrescreenConfig(go_threshold=101.0))["confusion"] == {"conditional->go": 1}
+
+
+def test_config_file_tunes_thresholds_and_keys_the_shared_agent(tmp_path):
+    from graph.workflow import FoodTruckResearchWorkflow
+    
+    path = tmp_path / "prescreen.json"
+    path.write_text(json.dumps({"decisive_go_score": 101.0, "points": {"PERMITS_SLOW": -20.0}}))
+    config = load_prescreen_config(str(path))
+    
+    assert load_prescreen_config(None) is None
+    assert config.points["PERMITS_SLOW"] == -20.0 and config.points["COMPETITION_LOW"] == 10.0
+    assert not prescreen(_state(), config=config).decisive
+    
+    workflow = FoodTruckResearchWorkflow(prescreen_config=config)
+    assert workflow.business_agent.prescreen_config == config
+    assert FoodTruckResearchWorkflow(prescreen_config=load_prescreen_config(str(path))).business_agent is workflow.business_agent
+    assert FoodTruckResearchWorkflow().business_agent is not workflow.business_agent
+
+
+RECOMMENDATION = {
+    "recommendation": "conditional", "confidence_level": "Medium", "key_strengths": [], "key_risks": [],
+    "success_factors": [], "next_steps": [], "timeline_recommendation": "", "alternative_suggestions": []
+}
+
+
+@pytest.mark.parametrize("skip", [False, True])
+def test_agent_skips_synthesis_only_when_enabled(skip):
+    from agents.business_consultant_agent import BusinessConsultantAgent
+    
+    agent = BusinessConsultantAgent(skip_decisive_synthesis=skip)
+    agent.llm = FakeLLM(RECOMMENDATION)
+    response = agent.process_request(_state())
+    
+    assert response.status == "SUCCESS"
+    assert response.data.prescreen.applied is skip
+    assert agent.llm.calls == (0 if skip else 1)
+    if skip:
+        assert response.data.recommendation == RecommendationType.GO
+        assert agent.prescreen_stats["skipped"] == 1
+    else:
+        assert agent.prescreen_agreement_rate == 0.0
+
+
+def test_shared_agent_counts_every_comparison_across_threads():
+    from agents.business_consultant_agent import BusinessConsultantAgent
+    
+    agent = BusinessConsultantAgent()
+    agent.llm = FakeLLM(RECOMMENDATION)
+    agent.risk_scenarios = 500
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda _: agent.process_request(_state()), range(64)))
+    
+    assert all(response.status == "SUCCESS" for response in responses)
+    assert agent.prescreen_stats == {"compared": 64, "agreed": 0, "skipped": 0}
@@ -0,0 +1,90 @@
+"""
+Tests for opt-in CPU and memory profiling of research runs.
+"""
+
+import json
+import os
+import pstats
+import tracemalloc
+
+from graph.workflow import FoodTruckResearchWorkflow
+from utils.profiling import ProfilingConfig, merge_profiles, profile_run
+
+
+def _stub_workflow(monkeypatch, profiling):
+    workflow = FoodTruckResearchWorkflow(profiling=profiling)
+    retained = []
+    
+    def node(state):
+        retained.append(bytearray(256 * 1024))
+        return {"status": "success"}
+    
+    for method in ("_market_research_node", "_financial_analysis_node", "_operations_analysis_node"):
+        monkeypatch.setattr(workflow, method, node)
+    monkeypatch.setattr(workflow, "_business_synthesis_node", lambda state: {"status": "success"})
+    return workflow
+
+
+def test_runs_are_not_profiled_unless_enabled_or_sampled(monkeypatch, tmp_path):
+    config = ProfilingConfig(cpu=True, sample_rate=0.25, output_dir=str(tmp_path))
+    
+    assert not ProfilingConfig(sample_rate=1.0).enabled
+    monkeypatch.setattr("utils.profiling.random.random", lambda: 0.5)
+    with profile_run("skipped", config) as profiler:
+        assert profiler is None
+    monkeypatch.setattr("utils.profiling.random.random", lambda: 0.1)
+    with profile_run("sampled", config) as profiler:
+        assert profiler is not None
+    with profile_run("forced-off", config, force=False) as profiler:
+        assert profiler is None
+    
+    assert os.listdir(tmp_path) == ["sampled.prof"]
+
+
+def test_forcing_a_run_without_config_records_a_cpu_profile(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    workflow = _stub_workflow(monkeypatch, None)
+    
+    result = workflow.run_research("Austin, TX", profile=True)
+    
+    assert os.path.exists(result["profile"]["cpu_profile"])
+    assert "memory_profile" not in result["profile"]
+    assert "profile" not in workflow.run_research("Austin, TX")
+
+
+def test_cpu_and_memory_profiles_land_in_the_output_dir(monkeypatch, tmp_path):
+    profiling = ProfilingConfig(cpu=True, memory=True, output_dir=str(tmp_path / "profiles"))
+    workflow = _stub_workflow(monkeypatch, profiling)
+    
+    result = workflow.run_research("Austin, TX")
+    
+    profile = result["profile"]
+    assert profile["cpu_profile"] == str(tmp_path / "profiles" / f"{result['run_id']}.prof")
+    assert pstats.Stats(profile["cpu_profile"]).total_calls > 0
+    assert any("workflow.py" in entry["function"] for entry in profile["top_functions"])
+    
+    with open(profile["memory_profile"], encoding="utf-8") as handle:
+        nodes = json.load(handle)["nodes"]
+    assert [node["node"] for node in nodes] == [
+        "market_research_node", "financial_analysis_node", "operations_analysis_node", "business_synthesis_node"
+    ]
+    assert nodes[0]["allocated_kb"] >= 256
+    assert "test_profiling.py" in nodes[0]["top_allocators"][0]["location"]
+    assert profile["memory_by_node_kb"]["business_synthesis_node"] < 256
+    assert not tracemalloc.is_tracing()
+
+
+def test_merge_profiles_combines_runs(tmp_path):
+    config = ProfilingConfig(cpu=True, output_dir=str(tmp_path))
+    for run_id in ("a", "b"):
+        with profile_run(run_id, config):
+            sum(range(1000))
+    
+    combined = merge_profiles(
+        [str(tmp_path / "a.prof"), str(tmp_path / "b.prof"), str(tmp_path / "missing.prof")],
+        str(tmp_path / "batch.prof")
+    )
+    
+    assert combined is not None
+    assert pstats.Stats(str(tmp_path / "batch.prof")).total_calls == combined.total_calls
+
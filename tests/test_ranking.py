@@ -0,0 +1,79 @@
+"""
+Tests for multi-location ranking.
+"""
+
+import numpy as np
+import pytest
+
+from analysis.ranking import RankingConfig, format_ranking_report, rank_locations, score_columns
+from storage.columnar_export import flatten_results, load_columnar, write_columnar
+
+
+def _result(location, funding, competition="Medium", recommendation="go", confidence="High", permits="2-4 months"):
+    return {
+        "location": location,
+        "status": "success",
+        "market_research": {"competition_level": competition},
+        "financial_analysis": {
+            "funding_requirements": funding,
+            "profit_margins": {"net_margin": 0.15}
+        },
+        "operations_analysis": {"permit_timeline": permits},
+        "business_recommendation": {"recommendation": recommendation, "confidence_level": confidence}
+    }
+
+
+def _results():
+    return [
+        _result("Austin, TX", 100000.0, competition="High"),
+        _result("Boise, ID", 80000.0, competition="Low"),
+        _result("Dallas, TX", 90000.0, competition="Low", recommendation="no_go"),
+        _result("Waco, TX", 80000.0, competition="Low", permits="unknown"),
+        _result("Tulsa, OK", 80000.0, competition="Low")
+    ]
+
+
+def test_scores_follow_components():
+    scored = score_columns(flatten_results(_results()))
+    
+    assert scored["competition"].tolist()[:2] == [0.2, 1.0]
+    assert scored["permit_timeline"][0] == pytest.approx(0.5)
+    assert scored["permit_timeline"][3] == 0.5
+    assert scored["score"][1] > scored["score"][0]
+
+
+def test_top_k_breaks_ties_by_funding_then_name():
+    rows = rank_locations(_results(), k=2)
+    
+    assert [row["location"] for row in rows] == ["Boise, ID", "Tulsa, OK"]
+    assert [row["rank"] for row in rows] == [1, 2]
+
+
+def test_filters_and_state_grouping():
+    rows = rank_locations(_results(), k=1, exclude_recommendations=["no_go"], group_by_state=True)
+    
+    assert [(row["state"], row["location"]) for row in rows] == [
+        ("ID", "Boise, ID"), ("OK", "Tulsa, OK"), ("TX", "Waco, TX")
+    ]
+    report = format_ranking_report(rows, group_by_state=True)
+    assert "## TX" in report and "| 1 | Waco, TX |" in report
+
+
+def test_ranking_reads_columnar_exports(tmp_path):
+    write_columnar(_results(), str(tmp_path))
+    
+    from_columns = rank_locations(load_columnar(str(tmp_path)), k=None, states=["TX"])
+    from_results = rank_locations(_results(), k=None, states=["TX"])
+    
+    assert [row["location"] for row in from_columns] == [row["location"] for row in from_results]
+    assert len(from_columns) == 3
+
+
+def test_ranking_config_from_spec():
+    config = RankingConfig.from_spec("funding=0.5, funding_ceiling=150000")
+    
+    assert config.funding_weight == 0.5
+    assert config.funding_ceiling == 150000.0
+    with pytest.raises(ValueError):
+        RankingConfig.from_spec("weather=1")
+    assert np.isclose(sum(RankingConfig().weights().values()), 1.0)
@@ -0,0 +1,93 @@
+"""
+Tests for refreshing stored research with per-section TTLs.
+"""
+
+import time
+
+import pytest
+
+from graph.refresh import DAY_SECONDS, merge_section_ttls, sections_to_refresh
+from graph.workflow import FoodTruckResearchWorkflow
+from storage.results_store import ResultsStore
+
+from tests.conftest import AGENTS, install_llms
+
+
+def _workflow(store=None):
+    return install_llms(FoodTruckResearchWorkflow(results_store=store))
+
+
+def _aged(days):
+    now = time.time()
+    return {
+        "status": "success",
+        "completed_at": now - 5 * DAY_SECONDS,
+        "market_research": {"location": "Austin, TX"},
+        "financial_analysis": {"funding_requirements": 1.0},
+        "operations_analysis": {"permits_required": []},
+        "business_recommendation": {"recommendation": "go"},
+        "section_times": {section: now - age * DAY_SECONDS for section, age in days.items()}
+    }
+
+
+def test_expired_sections_and_their_dependents_are_refreshed():
+    assert sections_to_refresh(_aged({"market_research": 40})) == [
+        "market_research", "financial_analysis", "business_recommendation"
+    ]
+    assert sections_to_refresh(_aged({"operations_analysis": 200})) == ["operations_analysis", "business_recommendation"]
+    assert sections_to_refresh(_aged({})) == []
+    # Fallback sections are placeholders, so they are always retried
+    assert sections_to_refresh({**_aged({}), "fallbacks": {"financial_analysis": "defaults"}}) == [
+        "financial_analysis", "business_recommendation"
+    ]
+    # Results without section times age from their completion; missing sections always run
+    assert sections_to_refresh({**_aged({}), "section_times": None}, {"business_recommendation": 4 * DAY_SECONDS}) == [
+        "business_recommendation"
+    ]
+    assert sections_to_refresh({**_aged({}), "market_research": None})[0] == "market_research"
+    
+    assert merge_section_ttls(["market=7d", "operations_analysis=2w", "market=12h"]) == {
+        "market_research": 12 * 3600.0,
+        "operations_analysis": 14 * DAY_SECONDS
+    }
+    with pytest.raises(ValueError):
+        merge_section_ttls(["permits=7d"])
+    with pytest.raises(ValueError):
+        merge_section_ttls(["market=soon"])
+    # "m" could mean minutes or months, so it is refused
+    for ambiguous in ("market=1m", "market=1M"):
+        with pytest.raises(ValueError):
+            merge_section_ttls([ambiguous])
+    assert merge_section_ttls(["market=1mo", "financial=90min"]) == {
+        "market_research": 30 * DAY_SECONDS, "financial_analysis": 5400.0
+    }
+
+
+def test_refresh_reruns_only_expired_sections(tmp_path):
+    first = _workflow().run_research("Austin, TX")
+    assert set(first["section_times"]) == set(first["refresh_sections"]) and len(first["refresh_sections"]) == 4
+    
+    now = time.time()
+    first["fallbacks"] = {}
+    first["operations_analysis"]["permits_required"] = ["Stored permit"]
+    first["section_times"] = {**first["section_times"], "market_research": now - 40 * DAY_SECONDS}
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.save_result(first)
+    
+    workflow = _workflow(store)
+    result = workflow.run_research("Austin, TX", refresh_ttls={})
+    
+    assert result["refresh_sections"] == ["market_research", "financial_analysis", "business_recommendation"]
+    assert [getattr(workflow, name).llm.calls for name in AGENTS] == [1, 1, 0, 1]
+    assert result["operations_analysis"]["permits_required"] == ["Stored permit"]
+    assert result["section_times"]["operations_analysis"] == first["section_times"]["operations_analysis"]
+    assert result["section_times"]["market_research"] > now
+    assert result["refreshed_from"] == first["run_id"] and result["status"] == "success"
+    assert any(event["message"].startswith("Operations Analysis reused") for event in result["events"])
+    assert store.get_latest("Austin, TX")["run_id"] == result["run_id"]
+    
+    # Nothing has expired in a result without fallbacks, so no agent runs
+    fresh = {**result, "fallbacks": {}, "completed_at": now + 1}
+    store.save_result(fresh)
+    again = _workflow(store).run_research("Austin, TX", refresh_ttls={"market_research": 30 * DAY_SECONDS})
+    assert again["cache_hit"] and again["run_id"] == result["run_id"]
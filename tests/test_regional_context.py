@@ -0,0 +1,91 @@
+"""
+Tests for state-level regional context shared by city runs.
+"""
+
+import sqlite3
+
+from graph.workflow import FoodTruckResearchWorkflow
+from storage.results_store import ResultsStore
+
+from tests.conftest import FakeLLM, install_llms
+
+
+REGIONAL = {
+    "permits_required": ["State Food Establishment License", "Sales Tax Permit"],
+    "permit_costs": {"state_food_license": 258.0},
+    "health_regulations": ["Certified food manager on duty"],
+    "sales_tax_rate": "6.25%",
+    "minimum_wage_hourly": 7.25,
+    "labor_costs_hourly": {"cook": 16.0},
+    "tax_and_labor_notes": ["No state income tax"]
+}
+
+
+def _workflow(store, operations):
+    workflow = install_llms(FoodTruckResearchWorkflow(results_store=store, regional_context=True))
+    workflow.operations_agent.llm = FakeLLM(operations)
+    workflow.regional_agent.llm = FakeLLM(REGIONAL)
+    return workflow
+
+
+def test_state_context_is_researched_once_and_shared_as_a_prompt_prefix(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    operations = FoodTruckResearchWorkflow().operations_agent._extract_operations_data_fallback("").dict()
+    operations.update(
+        permits_required=["Mobile Food Vendor Permit", "state food establishment license"],
+        permit_costs={"mobile_vendor_permit": 800.0},
+        health_regulations=["Commissary agreement"]
+    )
+    workflow = _workflow(store, operations)
+    
+    el_paso = workflow.run_research("El Paso, TX")
+    lubbock = workflow.run_research("Lubbock, Texas")
+    
+    assert len(workflow.regional_agent.llm.messages) == 1
+    assert el_paso["regional_context"]["state"] == "TX" and el_paso["regional_context"]["sales_tax_rate"] == 0.0625
+    assert el_paso["operations_analysis"]["permits_required"] == [
+        "State Food Establishment License", "Sales Tax Permit", "Mobile Food Vendor Permit"
+    ]
+    assert el_paso["operations_analysis"]["permit_costs"] == {"state_food_license": 258.0, "mobile_vendor_permit": 800.0}
+    assert lubbock["operations_analysis"]["health_regulations"] == ["Certified food manager on duty", "Commissary agreement"]
+    
+    # Both cities share the system prompt, which carries the state block; only the user prompt differs
+    (el_paso_system, el_paso_user), (lubbock_system, lubbock_user) = workflow.operations_agent.llm.messages
+    assert el_paso_system == lubbock_system and "STATE-LEVEL CONTEXT FOR TX" in el_paso_system
+    assert "only what the city or county adds" in el_paso_user and "Lubbock" in lubbock_user
+    assert workflow.financial_agent.llm.messages[0][0].endswith("- Tax and labor notes: No state income tax")
+    
+    # Another process (a new workflow on the same store) reuses the stored context
+    other = _workflow(store, operations)
+    assert other.run_research("Waco, TX")["regional_context"] == el_paso["regional_context"]
+    assert other.regional_agent.llm.messages == []
+    
+    # Locations without a state, or a failed regional pass, leave city runs unchanged
+    assert other.run_research("Springfield")["regional_context"] is None
+    other.regional_agent.llm = FakeLLM("No idea.")
+    eugene = other.run_research("Eugene, OR")
+    assert eugene["regional_context"] is None and eugene["status"] == "success"
+    assert "STATE-LEVEL" not in other.operations_agent.llm.messages[-1][0]
+    
+    # The failure is remembered, so the rest of the state's sweep does not repeat the call
+    assert other.run_research("Salem, OR")["regional_context"] is None
+    assert other.regional_agent.llm.calls == 1
+
+
+def test_store_errors_leave_city_runs_without_regional_context(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    operations = FoodTruckResearchWorkflow().operations_agent._extract_operations_data_fallback("").dict()
+    workflow = _workflow(store, operations)
+    
+    def unreadable(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+    
+    monkeypatch.setattr(store, "get_regional_context", unreadable)
+    result = workflow.run_research("El Paso, TX")
+    
+    assert result["status"] == "success" and result["regional_context"]["state"] == "TX"
+    
+    monkeypatch.setattr(workflow, "_regional_context", unreadable)
+    result = workflow.run_research("Lubbock, TX")
+    assert result["status"] == "success" and result["regional_context"] is None
+    assert any(event["message"].startswith("Regional context unavailable") for event in result["events"])
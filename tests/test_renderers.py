@@ -0,0 +1,77 @@
+"""
+Tests for the streaming report renderers.
+"""
+
+import csv
+import io
+import json
+import os
+
+import pytest
+
+from reporting.renderers import render_stream, render_to_string, write_combined_report, write_reports
+from utils.atomic_files import atomic_write
+
+
+def _result(location, recommendation="go"):
+    return {
+        "location": location,
+        "status": "success",
+        "market_research": {"competition_level": "Low", "target_customers": ["Students"], "peak_hours": []},
+        "financial_analysis": {"funding_requirements": 90000.0, "break_even_timeline": "12 months"},
+        "business_recommendation": {
+            "recommendation": recommendation,
+            "confidence_level": "High",
+            "next_steps": ["Scout <downtown> spots"]
+        }
+    }
+
+
+def test_markdown_matches_report_layout():
+    report = render_to_string(_result("Austin, TX"))
+    
+    assert report.startswith("# Food Truck Business Research Report: Austin, TX\n" + "=" * 60)
+    assert "**Recommendation:** GO (Confidence: High)" in report
+    assert "**Recommended Next Steps:**\n- Scout <downtown> spots" in report
+    assert render_to_string({"status": "error", "error_message": "boom"}) == "Research failed: boom"
+
+
+def test_batch_formats_stream_every_result():
+    results = [_result("Austin, TX"), _result("Boise, ID", "no_go")]
+    
+    buffer = io.StringIO()
+    assert render_stream(iter(results), buffer, "json") == 2
+    assert [row["location"] for row in json.loads(buffer.getvalue())] == ["Austin, TX", "Boise, ID"]
+    
+    buffer = io.StringIO()
+    render_stream(results, buffer, "csv")
+    rows = list(csv.DictReader(io.StringIO(buffer.getvalue())))
+    assert [(row["location"], row["recommendation"]) for row in rows] == [("Austin, TX", "go"), ("Boise, ID", "no_go")]
+    
+    buffer = io.StringIO()
+    render_stream(results, buffer, "html")
+    page = buffer.getvalue()
+    assert page.count("<section>") == 2 and page.rstrip().endswith("</html>")
+    assert "Scout &lt;downtown&gt; spots" in page
+
+
+def test_report_files_are_written_per_location(tmp_path):
+    paths = write_reports([_result("Austin, TX"), _result("Austin, TX")], str(tmp_path / "reports"), ["md", "csv"])
+    
+    assert sorted(os.path.basename(path) for path in paths) == [
+        "food_truck_research_austin_tx.csv", "food_truck_research_austin_tx.md"
+    ]
+    assert write_combined_report([_result("Boise, ID")], str(tmp_path / "all.csv"), "csv") == 1
+
+
+def test_atomic_write_leaves_no_partial_file(tmp_path):
+    target = tmp_path / "report.md"
+    target.write_text("previous")
+    
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(target)) as handle:
+            handle.write("partial")
+            raise RuntimeError("render failed")
+    
+    assert target.read_text() == "previous"
+    assert os.listdir(tmp_path) == ["report.md"]
@@ -0,0 +1,44 @@
+"""
+Tests for the SQLite results store.
+"""
+
+from storage.results_store import ResultsStore
+from utils.location import canonical_location
+
+
+def _result(location, recommendation, funding, completed_at):
+    return {
+        "location": location,
+        "run_id": f"{location}-{completed_at}",
+        "status": "success",
+        "completed_at": completed_at,
+        "financial_analysis": {"funding_requirements": funding},
+        "business_recommendation": {"recommendation": recommendation, "confidence_level": "High"}
+    }
+
+
+def test_canonical_location_normalizes_spelling():
+    assert canonical_location("St. Louis, Missouri") == "saint louis, MO"
+    assert canonical_location(" St Louis ,mo") == "saint louis, MO"
+
+
+def test_query_newest_per_location_applies_outcome_filters_to_latest_run():
+    store = ResultsStore(":memory:")
+    store.save_result(_result("Austin, TX", "go", 100000.0, 1000.0), model_name="gpt-4")
+    store.save_result(_result("Austin, Texas", "no_go", 100000.0, 2000.0), model_name="gpt-4")
+    store.save_result(_result("Dallas, TX", "go", 110000.0, 1500.0), model_name="gpt-4")
+    store.save_result(_result("Houston, TX", "go", 180000.0, 1500.0), model_name="gpt-4")
+    store.save_result(_result("Denver, CO", "go", 90000.0, 1500.0), model_name="gpt-4")
+    
+    rows = store.query(state="TX", recommendation="go", max_funding=120000, newest_per_location=True)
+    
+    assert [row["location"] for row in rows] == ["Dallas, TX"]
+
+
+def test_get_latest_respects_model_and_age():
+    store = ResultsStore(":memory:")
+    store.save_result(_result("Austin, TX", "go", 100000.0, 1000.0), model_name="gpt-4")
+    
+    assert store.get_latest("austin, tx", model_name="gpt-4")["business_recommendation"]["recommendation"] == "go"
+    assert store.get_latest("austin, tx", model_name="claude-3-sonnet-20240229") is None
+    assert store.get_latest("austin, tx", max_age_seconds=60) is None
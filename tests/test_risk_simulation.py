@@ -0,0 +1,46 @@
+"""
+Tests for the Monte Carlo risk simulation.
+"""
+
+from analysis.risk_simulation import RiskSimulationConfig, seasonal_profile, simulate_risk
+
+
+FINANCIAL = {
+    "startup_costs": {"food_truck": 75000.0},
+    "monthly_operating_costs": {"food_costs": 14000.0},
+    "revenue_projections": {"monthly_revenue": 20000.0},
+    "funding_requirements": 100000.0
+}
+
+
+def test_seasonal_profile_preserves_annual_revenue():
+    season, volatility_factors = seasonal_profile(["Slow winter months", "Weather dependent"], 12, 1)
+    
+    assert abs(season.mean() - 1.0) < 1e-9
+    assert season[0] < season[5]
+    assert volatility_factors == 1
+
+
+def test_simulation_without_uncertainty_matches_point_estimate():
+    config = RiskSimulationConfig(
+        revenue_volatility=0.0, cost_volatility=0.0, startup_volatility=0.0,
+        startup_overrun=0.0, ramp_up_months=0
+    )
+    
+    profile = simulate_risk(FINANCIAL, scenarios=1000, horizon_months=36, start_month=1, config=config, seed=7)
+    
+    # 100000 / 6000 = 16.7 months, so every scenario breaks even in month 17
+    assert profile.probability_by(16) == 0.0
+    assert profile.probability_by(17) == 1.0
+    assert profile.median_break_even_month == 17
+    assert abs(profile.expected_final_cash - (36 * 6000.0 - 100000.0)) < 1e-6
+
+
+def test_simulation_is_reproducible_and_monotonic():
+    first = simulate_risk(FINANCIAL, scenarios=50000, start_month=3, seed=11)
+    second = simulate_risk(FINANCIAL, scenarios=50000, start_month=3, seed=11)
+    
+    assert first.break_even_probability == second.break_even_probability
+    assert all(a <= b for a, b in zip(first.break_even_probability, first.break_even_probability[1:]))
+    assert first.cash_percentiles["p5"][-1] <= first.cash_percentiles["p95"][-1]
+    assert first.value_at_risk >= 0.0
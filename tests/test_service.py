@@ -0,0 +1,136 @@
+"""
+Tests for the research HTTP service.
+"""
+
+import asyncio
+import json
+import threading
+
+from models.research_models import RunEvent
+from service.server import ResearchServer, ResearchService
+
+
+class _FakeWorkflow:
+    """Stands in for FoodTruckResearchWorkflow; blocks until released."""
+    
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.release = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+    
+    def run_research(self, location, max_cache_age=None, on_event=None, queued_at=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        on_event(RunEvent(timestamp=0.0, run_id="run", node="market_research_node", level="info", message="done"))
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+        if location == "Nowhere":
+            return {"location": location, "status": "error", "error_message": "boom"}
+        return {"location": location, "status": "success", "run_id": "run", "market_research": {"competition_level": "Low"}}
+
+
+async def _request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), content.decode()
+
+
+def test_jobs_run_with_bounded_concurrency_and_stream_progress():
+    workflows = {}
+    
+    def factory(model_name):
+        workflows[model_name] = _FakeWorkflow(model_name)
+        return workflows[model_name]
+    
+    async def scenario():
+        service = ResearchService(factory, default_model="test-model", max_concurrency=2)
+        server = ResearchServer(service, port=0)
+        _, port = await server.start()
+        try:
+            status, body = await _request(port, "POST", "/jobs", {"location": "Austin, TX"})
+            assert status == 202
+            job_id = json.loads(body)["job_id"]
+            for location in ("Boise, ID", "Nowhere"):
+                await _request(port, "POST", "/jobs", {"location": location})
+            
+            status, body = await _request(port, "GET", f"/jobs/{job_id}/result")
+            assert status == 409
+            
+            events = asyncio.create_task(_request(port, "GET", f"/jobs/{job_id}/events"))
+            await asyncio.sleep(0.2)
+            workflow = workflows["test-model"]
+            workflow.release.set()
+            _, stream = await events
+            await service.drain()
+            
+            assert "event: progress" in stream and "market_research_node" in stream
+            assert stream.rstrip().endswith("event: done\ndata: {}")
+            assert workflow.peak == 2
+            
+            status, body = await _request(port, "GET", f"/jobs/{job_id}/result?format=markdown")
+            assert status == 200 and body.startswith("# Food Truck Business Research Report: Austin, TX")
+            
+            status, body = await _request(port, "GET", "/health")
+            assert json.loads(body)["jobs"] == {"queued": 0, "running": 0, "succeeded": 2, "failed": 1}
+            
+            assert (await _request(port, "POST", "/jobs", {"model": "x"}))[0] == 400
+            assert (await _request(port, "GET", "/jobs/unknown"))[0] == 404
+        finally:
+            await server.stop()
+            service.close()
+    
+    asyncio.run(scenario())
+
+
+async def _raw_request(port, head):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ")[1])
+
+
+def test_malformed_requests_and_unserved_models_get_400():
+    built = []
+    
+    def factory(model_name):
+        built.append(model_name)
+        workflow = _FakeWorkflow(model_name)
+        workflow.release.set()
+        return workflow
+    
+    async def scenario():
+        service = ResearchService(factory, default_model="test-model", allowed_models=["other-model"])
+        server = ResearchServer(service, port=0)
+        _, port = await server.start()
+        try:
+            for length in ("abc", "-5"):
+                head = f"POST /jobs HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n"
+                assert await _raw_request(port, head) == 400
+            for limit in ("abc", "-1"):
+                assert (await _request(port, "GET", f"/jobs?limit={limit}"))[0] == 400
+            assert (await _request(port, "GET", "/jobs?limit=0"))[0] == 200
+            
+            for model in ("made-up-model", 7):
+                assert (await _request(port, "POST", "/jobs", {"location": "Austin, TX", "model": model}))[0] == 400
+            assert (await _request(port, "POST", "/jobs", {"location": "Austin, TX", "model": "other-model"}))[0] == 202
+            await service.drain()
+            assert built == ["other-model"]
+        finally:
+            await server.stop()
+            service.close()
+    
+    asyncio.run(scenario())
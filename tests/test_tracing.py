@@ -0,0 +1,148 @@
+"""
+Tests for per-node tracing spans and the critical-path report.
+"""
+
+import json
+import time
+
+import pytest
+
+from graph.workflow import FoodTruckResearchWorkflow
+from utils import retry_handler
+from utils.tracing import Trace, current_span, export_trace, format_gantt, load_traces, span, start_trace
+
+from tests.conftest import FakeLLM, install_llms
+
+
+@pytest.fixture(autouse=True)
+def _no_retry_sleep(monkeypatch):
+    monkeypatch.setattr(retry_handler.time, "sleep", lambda seconds: None)
+
+
+RESPONSES = {
+    "Financial Advisor": {
+        "startup_costs": {"food_truck": 75000.0}, "monthly_operating_costs": {"staff": 6000.0},
+        "revenue_projections": {"monthly_revenue": 20000.0}, "break_even_timeline": "12-18 months",
+        "profit_margins": {"net_margin": 0.15}, "cash_flow_analysis": "ok", "funding_requirements": 100000.0,
+        "roi_projection": "15% ROI"
+    },
+    "Operations Consultant": {
+        "permits_required": ["Business License"], "permit_costs": {"business_license": 200.0},
+        "permit_timeline": "4-8 weeks", "health_regulations": [], "location_constraints": [],
+        "equipment_requirements": [], "staffing_needs": {"minimum_staff": 2}, "daily_operations": [],
+        "logistics_challenges": []
+    },
+    "Business Consultant": {
+        "recommendation": "go", "confidence_level": "High", "key_strengths": [], "key_risks": [],
+        "success_factors": [], "next_steps": [], "timeline_recommendation": "", "alternative_suggestions": []
+    }
+}
+
+
+class _ScriptedLLM(FakeLLM):
+    """Fails the first market call, then answers it with prose so the fallback parser runs."""
+    
+    def __init__(self):
+        super().__init__(usage={"input_tokens": 100, "output_tokens": 40})
+        self.market_calls = 0
+    
+    def reply(self, messages):
+        system_prompt = messages[0]["content"]
+        if "Market Research Analyst" in system_prompt:
+            self.market_calls += 1
+            if self.market_calls == 1:
+                return ConnectionError("connection reset")
+            return "Competition is low and demand is strong."
+        for role, payload in RESPONSES.items():
+            if role in system_prompt:
+                return payload
+        raise AssertionError("unexpected prompt")
+
+
+def test_spans_nest_and_are_noops_outside_a_trace():
+    with span("orphan") as orphan:
+        orphan.set_attribute("ignored", True)
+    assert current_span() is orphan
+    
+    with start_trace("run", location="Austin, TX") as trace:
+        with span("outer", kind="node") as outer:
+            with span("inner") as inner:
+                assert current_span() is inner
+    
+    assert [s.name for s in trace.spans] == ["run", "outer", "inner"]
+    assert inner.parent_id == outer.span_id and outer.parent_id == trace.root.span_id
+    assert trace.root.attributes["location"] == "Austin, TX"
+    assert all(s.end_ns is not None for s in trace.spans)
+
+
+def test_errors_are_recorded_on_the_span():
+    with pytest.raises(ValueError):
+        with start_trace("run") as trace:
+            with span("parse_response"):
+                raise ValueError("bad json")
+    
+    assert trace.spans[1].error == "bad json"
+    assert trace.root.error == "bad json"
+
+
+def test_queue_wait_and_critical_path():
+    with start_trace("run", queued_at=time.time() - 2) as trace:
+        with span("a", kind="node"):
+            time.sleep(0.01)
+        with span("b", kind="node"):
+            with span("short"):
+                pass
+            with span("slow"):
+                time.sleep(0.02)
+    
+    summary = trace.summary()
+    
+    assert summary["queue_wait_ms"] >= 2000
+    # Sequential siblings are all on the path; only leaves are reported
+    assert [s.name for s in trace.critical_path()] == ["run", "a", "b", "short", "slow"]
+    assert [step["name"] for step in summary["critical_path"]] == ["a", "b/short", "b/slow"]
+    assert set(summary["nodes"]) == {"a", "b"}
+
+
+def test_otlp_round_trip(tmp_path):
+    with start_trace("run", location="Austin, TX") as trace:
+        with span("llm_attempt", attempt=2, cost=0.5, cache_hit=False, tags=["a", "b"]):
+            pass
+    
+    path = str(tmp_path / "traces.jsonl")
+    export_trace(trace, path)
+    export_trace(trace, path)
+    
+    loaded = load_traces(path)
+    
+    assert len(loaded) == 2
+    restored = loaded[0]
+    assert isinstance(restored, Trace) and restored.trace_id == trace.trace_id
+    attributes = restored.spans[1].attributes
+    assert attributes["attempt"] == 2 and attributes["cost"] == 0.5 and attributes["cache_hit"] is False
+    assert json.loads(attributes["tags"]) == ["a", "b"]
+    assert restored.summary() == trace.summary()
+    assert "* " in format_gantt(restored)
+
+
+def test_workflow_run_reports_nodes_retries_tokens_and_fallbacks(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    workflow = FoodTruckResearchWorkflow(trace_path=path)
+    llm = _ScriptedLLM()
+    install_llms(workflow, lambda: llm)
+    
+    result = workflow.run_research("Austin, TX", queued_at=time.time() - 1)
+    
+    summary = result["trace_summary"]
+    assert result["status"] == "success"
+    assert list(summary["nodes"]) == [
+        "market_research_node", "financial_analysis_node", "operations_analysis_node", "business_synthesis_node"
+    ]
+    assert summary["llm_attempts"] == 5 and summary["retries"] == 1
+    assert summary["input_tokens"] == 400 and summary["output_tokens"] == 160
+    assert summary["fallbacks"] == ["Market Research Analyst"]
+    assert summary["queue_wait_ms"] >= 1000
+    
+    exported = load_traces(path)
+    assert [trace.trace_id for trace in exported] == [summary["trace_id"]]
+    assert exported[0].root.attributes["run_id"] == result["run_id"]
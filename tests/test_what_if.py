@@ -0,0 +1,78 @@
+"""
+Tests for what-if and sensitivity analysis.
+"""
+
+import math
+
+import pytest
+
+from analysis.financial_metrics import compute_financial_metrics
+from analysis.what_if import apply_overrides, parse_override, sensitivity_table, what_if
+from models.research_models import FinancialAnalysisData
+
+
+def _financial():
+    return FinancialAnalysisData(
+        startup_costs={"food_truck": 75000.0, "equipment": 25000.0},
+        monthly_operating_costs={"food_costs": 10000.0, "labor": 4000.0},
+        revenue_projections={"daily_revenue": 800.0, "monthly_revenue": 20000.0},
+        break_even_timeline="12-18 months",
+        profit_margins={"net_margin": 0.15},
+        cash_flow_analysis="Steady",
+        funding_requirements=100000.0,
+        roi_projection="15-20% annual ROI"
+    )
+
+
+def test_parse_override_forms():
+    assert parse_override("startup_costs.food_truck-=20000").dict() == {
+        "path": "startup_costs.food_truck", "mode": "add", "value": -20000.0
+    }
+    assert parse_override("revenue_projections.daily_revenue-=15%").value == pytest.approx(0.85)
+    assert parse_override("funding_requirements=90000").mode == "set"
+    with pytest.raises(ValueError):
+        parse_override("food_truck costs less")
+
+
+def test_overrides_propagate_to_funding_and_revenue():
+    updated = apply_overrides(_financial(), [
+        "startup_costs.food_truck-=20000",
+        "revenue_projections.daily_revenue*=0.85"
+    ])
+    
+    assert updated.funding_requirements == 80000.0
+    assert updated.revenue_projections["monthly_revenue"] == pytest.approx(17000.0)
+    assert updated.derived_metrics.monthly_net_income == pytest.approx(3000.0)
+    assert updated.break_even_timeline.endswith("(what-if)")
+    with pytest.raises(ValueError):
+        apply_overrides(_financial(), ["location_score=3"])
+
+
+def test_overrides_of_unknown_map_keys_are_rejected():
+    with pytest.raises(ValueError, match="valid keys are: food_truck, equipment"):
+        apply_overrides(_financial(), ["startup_costs.truck-=20000"])
+    with pytest.raises(ValueError, match="montly_revenue"):
+        apply_overrides(_financial(), ["revenue_projections.montly_revenue*=1.5"])
+    with pytest.raises(ValueError):
+        apply_overrides(_financial(), ["revenue_projections=1"])
+
+
+def test_what_if_reports_metric_changes_without_llm():
+    result = {"location": "Austin, TX", "run_id": "run-1", "financial_analysis": _financial().dict()}
+    
+    updated = what_if(result, ["monthly_operating_costs.labor+=1000"])
+    
+    assert updated["what_if"]["base_run_id"] == "run-1"
+    assert updated["what_if"]["metric_changes"]["npv"] < 0
+    assert result["financial_analysis"]["monthly_operating_costs"]["labor"] == 4000.0
+
+
+def test_sensitivity_table_matches_individual_recomputation():
+    financial = _financial()
+    rows = sensitivity_table(financial, low=-0.1, high=0.1)
+    
+    assert [row["parameter"] for row in rows][0] == "revenue_projections.daily_revenue"
+    truck = next(row for row in rows if row["parameter"] == "startup_costs.food_truck")
+    expected = compute_financial_metrics(apply_overrides(financial, ["startup_costs.food_truck*=1.1"]))
+    assert math.isclose(truck["high_npv"], expected.npv, rel_tol=1e-9)
+    assert math.isclose(truck["high_irr"], expected.irr, rel_tol=1e-6)
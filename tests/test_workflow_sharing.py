@@ -0,0 +1,59 @@
+"""
+Tests for the shared compiled graph and lazily created agents.
+"""
+
+from graph import workflow as workflow_module
+from graph.workflow import FoodTruckResearchWorkflow, compiled_graph
+
+from tests.conftest import FakeLLM
+
+
+RECOMMENDATION = {
+    "recommendation": "conditional", "confidence_level": "Medium", "key_strengths": [], "key_risks": [],
+    "success_factors": [], "next_steps": [], "timeline_recommendation": "", "alternative_suggestions": []
+}
+
+
+def test_agents_are_created_on_first_use_and_shared():
+    first = FoodTruckResearchWorkflow()
+    assert workflow_module._AGENT_CACHE == {}
+    
+    second = FoodTruckResearchWorkflow()
+    assert first.market_agent is second.market_agent
+    assert len(workflow_module._AGENT_CACHE) == 1
+    
+    assert FoodTruckResearchWorkflow(temperature=0.5).market_agent is not first.market_agent
+    assert FoodTruckResearchWorkflow(skip_decisive_synthesis=True).business_agent is not first.business_agent
+
+
+def test_assigned_agent_overrides_only_that_instance():
+    first = FoodTruckResearchWorkflow()
+    second = FoodTruckResearchWorkflow()
+    replacement = object()
+    
+    first.market_agent = replacement
+    
+    assert first.market_agent is replacement
+    assert second.market_agent is not replacement
+
+
+def test_graph_is_compiled_once_and_dispatches_to_the_calling_workflow(monkeypatch):
+    first = FoodTruckResearchWorkflow()
+    second = FoodTruckResearchWorkflow()
+    assert compiled_graph() is compiled_graph()
+    
+    calls = []
+    for instance, name in ((first, "first"), (second, "second")):
+        def node(state, name=name):
+            calls.append(name)
+            return {"status": "success"}
+        for method in ("_market_research_node", "_financial_analysis_node", "_operations_analysis_node"):
+            monkeypatch.setattr(instance, method, node)
+    first.business_agent = second.business_agent = type(first.business_agent)()
+    first.business_agent.llm = FakeLLM(RECOMMENDATION)
+    
+    result = second.run_research("Austin, TX")
+    
+    assert calls == ["second"] * 3
+    assert result["status"] == "success"
+    assert result["business_recommendation"]["recommendation"] == "conditional"